@@ -12,6 +12,11 @@ from photo_app.core.models.photo import Photo, PhotoMetadata
 from photo_app.core.models.tag import Tag
 from photo_app.core.models.album import Album
 from photo_app.core.models.user import User
+from photo_app.core.models.timeline import TimelineBucket
+from photo_app.core.models.manifest import ScanManifestEntry
+from photo_app.core.models.version import PhotoVersion, StoredChunk
+from photo_app.core.models.checkpoint import JobCheckpoint
+from photo_app.core.models.change_counter import UserChangeCounter
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -0,0 +1,45 @@
+"""add_timeline_buckets
+
+Revision ID: 3f9a1c7d2e41
+Revises: b78ecb1c8fb5
+Create Date: 2026-10-19 09:00:12.417365
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9a1c7d2e41'
+down_revision = 'b78ecb1c8fb5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('timeline_buckets',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('photo_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'day')
+    )
+    op.create_index('ix_photos_user_id_upload_date', 'photos', ['user_id', 'upload_date'], unique=False)
+
+    # 根据已有照片回填按天计数
+    op.execute(
+        """
+        INSERT INTO timeline_buckets (user_id, day, photo_count, created_at, updated_at)
+        SELECT user_id, date(upload_date), count(*), CURRENT_TIMESTAMP, CURRENT_TIMESTAMP
+        FROM photos
+        WHERE user_id IS NOT NULL
+        GROUP BY user_id, date(upload_date)
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_photos_user_id_upload_date', table_name='photos')
+    op.drop_table('timeline_buckets')
@@ -0,0 +1,167 @@
+"""add_photo_metadata_location
+
+Revision ID: 8c2d5e6f1a93
+Revises: 3f9a1c7d2e41
+Create Date: 2026-10-19 10:00:41.902114
+
+"""
+import json
+from fractions import Fraction
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c2d5e6f1a93'
+down_revision = '3f9a1c7d2e41'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+photo_metadata = sa.table(
+    'photo_metadata',
+    sa.column('id', sa.Integer),
+    sa.column('raw_exif', sa.String),
+    sa.column('latitude', sa.Float),
+    sa.column('longitude', sa.Float),
+    sa.column('geohash', sa.String),
+)
+
+# 以下解析逻辑复制自本迁移编写时的 photo_app.core.utils.geo，
+# 迁移不引用应用代码，应用代码以后的修改不会改变迁移的结果
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+_GEOHASH_PRECISION = 12
+
+
+def _encode_geohash(latitude, longitude):
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < _GEOHASH_PRECISION:
+        target, rng = (longitude, lon_range) if even else (latitude, lat_range)
+        mid = (rng[0] + rng[1]) / 2
+        if target >= mid:
+            value = (value << 1) | 1
+            rng[0] = mid
+        else:
+            value <<= 1
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits = 0
+            value = 0
+    return ''.join(chars)
+
+
+def _to_float(value):
+    if isinstance(value, (list, tuple)) and len(value) == 2:
+        numerator, denominator = value
+        return float(numerator) / float(denominator) if denominator else 0.0
+    if isinstance(value, str) and '/' in value:
+        return float(Fraction(value))
+    return float(value)
+
+
+def _dms_to_degrees(value):
+    if isinstance(value, (list, tuple)) and len(value) == 3:
+        degrees, minutes, seconds = (_to_float(v) for v in value)
+        return degrees + minutes / 60 + seconds / 3600
+    return _to_float(value)
+
+
+def _parse_gps(raw_exif):
+    try:
+        exif = json.loads(raw_exif)
+    except ValueError:
+        return None
+    if not isinstance(exif, dict):
+        return None
+    gps = exif.get('GPSInfo', exif)
+    if not isinstance(gps, dict):
+        return None
+    try:
+        if 'latitude' in gps and 'longitude' in gps:
+            latitude = float(gps['latitude'])
+            longitude = float(gps['longitude'])
+        elif 'GPSLatitude' in gps and 'GPSLongitude' in gps:
+            latitude = _dms_to_degrees(gps['GPSLatitude'])
+            longitude = _dms_to_degrees(gps['GPSLongitude'])
+            if str(gps.get('GPSLatitudeRef', 'N')).upper().startswith('S'):
+                latitude = -latitude
+            if str(gps.get('GPSLongitudeRef', 'E')).upper().startswith('W'):
+                longitude = -longitude
+        else:
+            return None
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None
+    if latitude == 0 and longitude == 0:
+        return None
+    return latitude, longitude
+
+
+def _backfill_location(conn):
+    """按主键分批从 raw_exif 解析已有记录的位置，每批一次 executemany"""
+    stmt = (
+        sa.update(photo_metadata)
+        .where(photo_metadata.c.id == sa.bindparam('row_id'))
+        .values(
+            latitude=sa.bindparam('new_latitude'),
+            longitude=sa.bindparam('new_longitude'),
+            geohash=sa.bindparam('new_geohash'),
+        )
+    )
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(photo_metadata.c.id, photo_metadata.c.raw_exif)
+            .where(photo_metadata.c.id > last_id, photo_metadata.c.raw_exif.isnot(None))
+            .order_by(photo_metadata.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            return
+        params = []
+        for row_id, raw_exif in rows:
+            location = _parse_gps(raw_exif)
+            if location is not None:
+                params.append({
+                    'row_id': row_id,
+                    'new_latitude': location[0],
+                    'new_longitude': location[1],
+                    'new_geohash': _encode_geohash(*location),
+                })
+        if params:
+            conn.execute(stmt, params)
+        last_id = rows[-1][0]
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('photo_metadata') as batch_op:
+        batch_op.add_column(sa.Column('latitude', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('longitude', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('geohash', sa.String(length=12), nullable=True))
+
+    _backfill_location(op.get_bind())
+
+    with op.batch_alter_table('photo_metadata') as batch_op:
+        batch_op.create_index('ix_photo_metadata_latitude_longitude', ['latitude', 'longitude'], unique=False)
+        batch_op.create_index(op.f('ix_photo_metadata_geohash'), ['geohash'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('photo_metadata') as batch_op:
+        batch_op.drop_index(op.f('ix_photo_metadata_geohash'))
+        batch_op.drop_index('ix_photo_metadata_latitude_longitude')
+        batch_op.drop_column('geohash')
+        batch_op.drop_column('longitude')
+        batch_op.drop_column('latitude')
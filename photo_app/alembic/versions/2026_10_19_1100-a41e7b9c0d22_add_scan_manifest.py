@@ -0,0 +1,35 @@
+"""add_scan_manifest
+
+Revision ID: a41e7b9c0d22
+Revises: 8c2d5e6f1a93
+Create Date: 2026-10-19 11:00:07.551820
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a41e7b9c0d22'
+down_revision = '8c2d5e6f1a93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('scan_manifest',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('path', sa.String(length=255), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('mtime_ns', sa.BigInteger(), nullable=False),
+    sa.Column('inode', sa.BigInteger(), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('path')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('scan_manifest')
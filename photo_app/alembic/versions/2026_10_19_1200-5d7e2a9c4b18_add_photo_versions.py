@@ -0,0 +1,47 @@
+"""add_photo_versions
+
+Revision ID: 5d7e2a9c4b18
+Revises: a41e7b9c0d22
+Create Date: 2026-10-19 12:00:42.118305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d7e2a9c4b18'
+down_revision = 'a41e7b9c0d22'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('photo_versions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('photo_id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('chunk_count', sa.Integer(), nullable=False),
+    sa.Column('chunk_manifest', sa.LargeBinary(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['photo_id'], ['photos.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('photo_id', 'version', name='uq_photo_versions_photo_id_version')
+    )
+    op.create_table('stored_chunks',
+    sa.Column('digest', sa.String(length=64), nullable=False),
+    sa.Column('size', sa.Integer(), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('released_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('digest')
+    )
+    op.create_index(op.f('ix_stored_chunks_released_at'), 'stored_chunks', ['released_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_stored_chunks_released_at'), table_name='stored_chunks')
+    op.drop_table('stored_chunks')
+    op.drop_table('photo_versions')
@@ -0,0 +1,30 @@
+"""add_photo_checksum
+
+Revision ID: c6f3b8d1e705
+Revises: 5d7e2a9c4b18
+Create Date: 2026-10-19 13:00:18.240519
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c6f3b8d1e705'
+down_revision = '5d7e2a9c4b18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('photos') as batch_op:
+        batch_op.add_column(sa.Column('checksum', sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column('verified_at', sa.DateTime(), nullable=True))
+        batch_op.create_index(op.f('ix_photos_verified_at'), ['verified_at'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('photos') as batch_op:
+        batch_op.drop_index(op.f('ix_photos_verified_at'))
+        batch_op.drop_column('verified_at')
+        batch_op.drop_column('checksum')
@@ -0,0 +1,311 @@
+"""compress_photo_metadata_exif
+
+Revision ID: 9b4e1d7c3a56
+Revises: c6f3b8d1e705
+Create Date: 2026-10-19 14:00:12.381904
+
+"""
+import json
+import zlib
+from datetime import datetime
+from fractions import Fraction
+
+from alembic import op
+import sqlalchemy as sa
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - 取决于运行环境
+    zstandard = None
+
+
+# revision identifiers, used by Alembic.
+revision = '9b4e1d7c3a56'
+down_revision = 'c6f3b8d1e705'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+_FIELDS = ('camera_make', 'camera_model', 'lens_model', 'iso', 'focal_length', 'aperture', 'captured_at')
+
+photo_metadata = sa.table(
+    'photo_metadata',
+    sa.column('id', sa.Integer),
+    sa.column('raw_exif', sa.String),
+    sa.column('exif_blob', sa.LargeBinary),
+    sa.column('latitude', sa.Float),
+    sa.column('longitude', sa.Float),
+    sa.column('geohash', sa.String),
+    sa.column('camera_make', sa.String),
+    sa.column('camera_model', sa.String),
+    sa.column('lens_model', sa.String),
+    sa.column('iso', sa.Integer),
+    sa.column('focal_length', sa.Float),
+    sa.column('aperture', sa.Float),
+    sa.column('captured_at', sa.DateTime),
+)
+
+# 以下编解码和解析逻辑复制自本迁移编写时的 photo_app.core.utils.exif 和 photo_app.core.utils.geo，
+# 迁移不引用应用代码，应用代码以后的修改不会改变迁移的结果。
+# 升级只写 zlib 格式（0x01），结果不取决于是否安装了 zstandard；应用两种格式都能读取。
+
+_CODEC_ZLIB = 0x01
+_CODEC_ZSTD = 0x02
+_ZLIB_LEVEL = 6
+
+_FIELD_KEYS = {
+    'camera_make': ('Make', 'make'),
+    'camera_model': ('Model', 'model'),
+    'lens_model': ('LensModel', 'lens_model', 'Lens', 'lens'),
+    'iso': ('ISOSpeedRatings', 'PhotographicSensitivity', 'ISO', 'iso'),
+    'focal_length': ('FocalLength', 'focal_length'),
+    'aperture': ('FNumber', 'fnumber', 'aperture'),
+    'captured_at': ('DateTimeOriginal', 'DateTimeDigitized', 'DateTime', 'datetime_original'),
+}
+_MAX_LENGTHS = {'camera_make': 64, 'camera_model': 64, 'lens_model': 128}
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+_GEOHASH_PRECISION = 12
+
+
+def _compress_exif(raw_exif):
+    return bytes([_CODEC_ZLIB]) + zlib.compress(raw_exif.encode('utf-8'), _ZLIB_LEVEL)
+
+
+def _decompress_exif(blob):
+    codec, payload = blob[0], bytes(blob[1:])
+    if codec == _CODEC_ZLIB:
+        data = zlib.decompress(payload)
+    elif codec == _CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError('zstandard is required to downgrade zstd-compressed EXIF')
+        data = zstandard.ZstdDecompressor().decompress(payload)
+    else:
+        raise ValueError(f'Unknown EXIF codec: {codec}')
+    return data.decode('utf-8')
+
+
+def _load_exif(raw_exif):
+    try:
+        exif = json.loads(raw_exif)
+    except ValueError:
+        return None
+    return exif if isinstance(exif, dict) else None
+
+
+def _rational(value):
+    if isinstance(value, (list, tuple)) and len(value) == 2:
+        numerator, denominator = value
+        return float(numerator) / float(denominator) if denominator else 0.0
+    if isinstance(value, str) and '/' in value:
+        return float(Fraction(value))
+    return float(value)
+
+
+def _parse_value(field, value):
+    if field in _MAX_LENGTHS:
+        text = str(value).strip().strip('\x00').strip()
+        return text[:_MAX_LENGTHS[field]] or None
+    if field == 'iso':
+        if isinstance(value, (list, tuple)):
+            value = value[0] if value else None
+        return int(value) if value is not None else None
+    if field in ('focal_length', 'aperture'):
+        number = _rational(value)
+        return round(number, 2) if number > 0 else None
+    if field == 'captured_at':
+        text = str(value).strip().strip('\x00')
+        for fmt in ('%Y:%m:%d %H:%M:%S', '%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S'):
+            try:
+                return datetime.strptime(text[:19], fmt)
+            except ValueError:
+                continue
+        return None
+    return value
+
+
+def _extract_fields(exif):
+    fields = {field: None for field in _FIELD_KEYS}
+    if exif is None:
+        return fields
+    for field, keys in _FIELD_KEYS.items():
+        for key in keys:
+            value = exif.get(key)
+            if value in (None, ''):
+                continue
+            try:
+                fields[field] = _parse_value(field, value)
+            except (TypeError, ValueError, ZeroDivisionError):
+                continue
+            if fields[field] is not None:
+                break
+    return fields
+
+
+def _dms_to_degrees(value):
+    if isinstance(value, (list, tuple)) and len(value) == 3:
+        degrees, minutes, seconds = (_rational(v) for v in value)
+        return degrees + minutes / 60 + seconds / 3600
+    return _rational(value)
+
+
+def _parse_gps(exif):
+    gps = exif.get('GPSInfo', exif) if exif is not None else None
+    if not isinstance(gps, dict):
+        return None
+    try:
+        if 'latitude' in gps and 'longitude' in gps:
+            latitude = float(gps['latitude'])
+            longitude = float(gps['longitude'])
+        elif 'GPSLatitude' in gps and 'GPSLongitude' in gps:
+            latitude = _dms_to_degrees(gps['GPSLatitude'])
+            longitude = _dms_to_degrees(gps['GPSLongitude'])
+            if str(gps.get('GPSLatitudeRef', 'N')).upper().startswith('S'):
+                latitude = -latitude
+            if str(gps.get('GPSLongitudeRef', 'E')).upper().startswith('W'):
+                longitude = -longitude
+        else:
+            return None
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None
+    if latitude == 0 and longitude == 0:
+        return None
+    return latitude, longitude
+
+
+def _encode_geohash(latitude, longitude):
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < _GEOHASH_PRECISION:
+        target, rng = (longitude, lon_range) if even else (latitude, lat_range)
+        mid = (rng[0] + rng[1]) / 2
+        if target >= mid:
+            value = (value << 1) | 1
+            rng[0] = mid
+        else:
+            value <<= 1
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits = 0
+            value = 0
+    return ''.join(chars)
+
+
+def _batches(conn, source_column, *extra_columns):
+    """按主键分批读取，每批单独执行更新，避免一次性加载整张表"""
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(photo_metadata.c.id, source_column, *extra_columns)
+            .where(photo_metadata.c.id > last_id, source_column.isnot(None))
+            .order_by(photo_metadata.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1][0]
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('photo_metadata') as batch_op:
+        batch_op.add_column(sa.Column('exif_blob', sa.LargeBinary(), nullable=True))
+        batch_op.add_column(sa.Column('camera_make', sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column('camera_model', sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column('lens_model', sa.String(length=128), nullable=True))
+        batch_op.add_column(sa.Column('iso', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('focal_length', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('aperture', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('captured_at', sa.DateTime(), nullable=True))
+
+    conn = op.get_bind()
+    stmt = (
+        sa.update(photo_metadata)
+        .where(photo_metadata.c.id == sa.bindparam('row_id'))
+        .values(exif_blob=sa.bindparam('new_blob'), **{f: sa.bindparam(f'new_{f}') for f in _FIELDS})
+    )
+    # raw_exif 删除之后无法再解析位置：补上还没有位置的记录（例如在位置回填加入之前已经升级过的数据库）
+    location_stmt = (
+        sa.update(photo_metadata)
+        .where(photo_metadata.c.id == sa.bindparam('row_id'))
+        .values(
+            latitude=sa.bindparam('new_latitude'),
+            longitude=sa.bindparam('new_longitude'),
+            geohash=sa.bindparam('new_geohash'),
+        )
+    )
+    for rows in _batches(conn, photo_metadata.c.raw_exif, photo_metadata.c.latitude):
+        params = []
+        locations = []
+        for row_id, raw_exif, latitude in rows:
+            exif = _load_exif(raw_exif)
+            fields = _extract_fields(exif)
+            params.append({
+                'row_id': row_id,
+                'new_blob': _compress_exif(raw_exif),
+                **{f'new_{f}': fields[f] for f in _FIELDS},
+            })
+            location = _parse_gps(exif) if latitude is None else None
+            if location is not None:
+                locations.append({
+                    'row_id': row_id,
+                    'new_latitude': location[0],
+                    'new_longitude': location[1],
+                    'new_geohash': _encode_geohash(*location),
+                })
+        conn.execute(stmt, params)
+        if locations:
+            conn.execute(location_stmt, locations)
+
+    with op.batch_alter_table('photo_metadata') as batch_op:
+        batch_op.drop_column('raw_exif')
+        batch_op.create_index('ix_photo_metadata_camera', ['camera_make', 'camera_model'], unique=False)
+        batch_op.create_index('ix_photo_metadata_lens_iso', ['lens_model', 'iso'], unique=False)
+        batch_op.create_index(op.f('ix_photo_metadata_iso'), ['iso'], unique=False)
+        batch_op.create_index(op.f('ix_photo_metadata_focal_length'), ['focal_length'], unique=False)
+        batch_op.create_index(op.f('ix_photo_metadata_aperture'), ['aperture'], unique=False)
+        batch_op.create_index(op.f('ix_photo_metadata_captured_at'), ['captured_at'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('photo_metadata') as batch_op:
+        batch_op.add_column(sa.Column('raw_exif', sa.String(length=4000), nullable=True))
+
+    conn = op.get_bind()
+    stmt = (
+        sa.update(photo_metadata)
+        .where(photo_metadata.c.id == sa.bindparam('row_id'))
+        .values(raw_exif=sa.bindparam('new_raw_exif'))
+    )
+    for rows in _batches(conn, photo_metadata.c.exif_blob):
+        # 旧列有4000字符上限，超出部分会被截断
+        conn.execute(stmt, [
+            {'row_id': row_id, 'new_raw_exif': _decompress_exif(blob)[:4000]}
+            for row_id, blob in rows
+        ])
+
+    with op.batch_alter_table('photo_metadata') as batch_op:
+        batch_op.drop_index(op.f('ix_photo_metadata_captured_at'))
+        batch_op.drop_index(op.f('ix_photo_metadata_aperture'))
+        batch_op.drop_index(op.f('ix_photo_metadata_focal_length'))
+        batch_op.drop_index(op.f('ix_photo_metadata_iso'))
+        batch_op.drop_index('ix_photo_metadata_lens_iso')
+        batch_op.drop_index('ix_photo_metadata_camera')
+        batch_op.drop_column('captured_at')
+        batch_op.drop_column('aperture')
+        batch_op.drop_column('focal_length')
+        batch_op.drop_column('iso')
+        batch_op.drop_column('lens_model')
+        batch_op.drop_column('camera_model')
+        batch_op.drop_column('camera_make')
+        batch_op.drop_column('exif_blob')
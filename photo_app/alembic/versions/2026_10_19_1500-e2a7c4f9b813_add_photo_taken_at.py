@@ -0,0 +1,82 @@
+"""add_photo_taken_at
+
+Revision ID: e2a7c4f9b813
+Revises: 9b4e1d7c3a56
+Create Date: 2026-10-19 15:00:37.115620
+
+"""
+import os
+from datetime import datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2a7c4f9b813'
+down_revision = '9b4e1d7c3a56'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+photos = sa.table(
+    'photos',
+    sa.column('id', sa.Integer),
+    sa.column('filepath', sa.String),
+    sa.column('upload_date', sa.DateTime),
+    sa.column('taken_at', sa.DateTime),
+)
+photo_metadata = sa.table(
+    'photo_metadata',
+    sa.column('photo_id', sa.Integer),
+    sa.column('captured_at', sa.DateTime),
+)
+
+
+def _taken_at(filepath, upload_date, captured_at):
+    """EXIF拍摄时间 > 文件修改时间 > 上传时间"""
+    if captured_at is not None:
+        return captured_at
+    try:
+        return datetime.fromtimestamp(os.stat(filepath).st_mtime, timezone.utc).replace(tzinfo=None)
+    except (OSError, TypeError, ValueError):
+        return upload_date or datetime.utcnow()
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('photos') as batch_op:
+        batch_op.add_column(sa.Column('taken_at', sa.DateTime(), nullable=True))
+
+    conn = op.get_bind()
+    stmt = (
+        sa.update(photos)
+        .where(photos.c.id == sa.bindparam('row_id'))
+        .values(taken_at=sa.bindparam('new_taken_at'))
+    )
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(photos.c.id, photos.c.filepath, photos.c.upload_date, photo_metadata.c.captured_at)
+            .select_from(photos.outerjoin(photo_metadata, photo_metadata.c.photo_id == photos.c.id))
+            .where(photos.c.id > last_id)
+            .order_by(photos.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        conn.execute(stmt, [
+            {'row_id': row_id, 'new_taken_at': _taken_at(filepath, upload_date, captured_at)}
+            for row_id, filepath, upload_date, captured_at in rows
+        ])
+        last_id = rows[-1][0]
+
+    with op.batch_alter_table('photos') as batch_op:
+        batch_op.alter_column('taken_at', existing_type=sa.DateTime(), nullable=False)
+        batch_op.create_index('ix_photos_user_id_taken_at_id', ['user_id', 'taken_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('photos') as batch_op:
+        batch_op.drop_index('ix_photos_user_id_taken_at_id')
+        batch_op.drop_column('taken_at')
@@ -0,0 +1,29 @@
+"""add_photo_deleted_at
+
+Revision ID: 7d3f9e2b5a14
+Revises: e2a7c4f9b813
+Create Date: 2026-10-19 16:00:21.604318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d3f9e2b5a14'
+down_revision = 'e2a7c4f9b813'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('photos') as batch_op:
+        batch_op.add_column(sa.Column('deleted_at', sa.DateTime(), nullable=True))
+        batch_op.create_index(op.f('ix_photos_deleted_at'), ['deleted_at'], unique=False)
+
+
+def downgrade() -> None:
+    # 降级前应先运行 PhotoPurger 清除软删除的照片，否则它们会重新出现
+    with op.batch_alter_table('photos') as batch_op:
+        batch_op.drop_index(op.f('ix_photos_deleted_at'))
+        batch_op.drop_column('deleted_at')
@@ -0,0 +1,30 @@
+"""add_job_checkpoints
+
+Revision ID: 4b8c1f6e9d27
+Revises: 7d3f9e2b5a14
+Create Date: 2026-10-19 17:00:48.229517
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4b8c1f6e9d27'
+down_revision = '7d3f9e2b5a14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('job_checkpoints',
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('position', sa.String(length=1024), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('job_checkpoints')
@@ -0,0 +1,34 @@
+"""add_user_change_counters
+
+Revision ID: 9c5e2a7d3f41
+Revises: 4b8c1f6e9d27
+Create Date: 2026-10-19 18:00:12.730941
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c5e2a7d3f41'
+down_revision = '4b8c1f6e9d27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('user_change_counters',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    # 列表验证器的 max(updated_at) 只需一次索引查找
+    op.create_index('ix_photos_user_id_updated_at', 'photos', ['user_id', 'updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_photos_user_id_updated_at', table_name='photos')
+    op.drop_table('user_change_counters')
@@ -0,0 +1,27 @@
+"""add_pending_encryption_key
+
+Revision ID: 3e7a9c1b5d82
+Revises: 9c5e2a7d3f41
+Create Date: 2026-10-20 09:00:37.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3e7a9c1b5d82'
+down_revision = '9c5e2a7d3f41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.add_column(sa.Column('pending_encryption_key', sa.String(length=255), nullable=True))
+
+
+def downgrade() -> None:
+    # 降级前必须完成进行中的密钥轮换，否则已轮换的文件将无法解密
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('pending_encryption_key')
@@ -0,0 +1,42 @@
+"""photo_versions_fk_no_cascade
+
+Revision ID: 6a1d8f4c2e95
+Revises: 3e7a9c1b5d82
+Create Date: 2026-10-20 09:30:05.442871
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '6a1d8f4c2e95'
+down_revision = '3e7a9c1b5d82'
+branch_labels = None
+depends_on = None
+
+FK_NAME = 'fk_photo_versions_photo_id_photos'
+# SQLite 中原外键没有名称，按命名约定反射后才能删除
+NAMING_CONVENTION = {"fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s"}
+# PostgreSQL 为未命名外键生成的名称
+PG_DEFAULT_FK_NAME = 'photo_versions_photo_id_fkey'
+
+
+def _replace_fk(old_name: str, new_name: str, ondelete) -> None:
+    # 级联删除会绕过 PhotoVersionDAO，版本引用的块永远不会被释放
+    if op.get_bind().dialect.name == 'sqlite':
+        with op.batch_alter_table('photo_versions', recreate='always',
+                                  naming_convention=NAMING_CONVENTION) as batch_op:
+            batch_op.drop_constraint(old_name, type_='foreignkey')
+            batch_op.create_foreign_key(new_name, 'photos', ['photo_id'], ['id'], ondelete=ondelete)
+    else:
+        op.drop_constraint(old_name, 'photo_versions', type_='foreignkey')
+        op.create_foreign_key(new_name, 'photo_versions', 'photos', ['photo_id'], ['id'], ondelete=ondelete)
+
+
+def upgrade() -> None:
+    old_name = FK_NAME if op.get_bind().dialect.name == 'sqlite' else PG_DEFAULT_FK_NAME
+    _replace_fk(old_name, FK_NAME, None)
+
+
+def downgrade() -> None:
+    _replace_fk(FK_NAME, FK_NAME, 'CASCADE')
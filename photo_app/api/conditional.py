@@ -0,0 +1,39 @@
+"""列表接口的条件请求
+
+客户端不断轮询照片列表和地图，绝大多数时候数据没有变化。接口先用 UserChangeCounterDAO.get_validator
+（一条只走索引的查询）计算验证器，If-None-Match / If-Modified-Since 仍然有效时直接返回 304，
+不执行列表查询，也不序列化。
+
+注意事项：
+- ETag 由用户ID、变更计数、最后修改时间、路径和规范化的查询参数生成，分页参数不同的请求ETag不同
+- Last-Modified 只精确到秒，同一秒内的修改只能由 ETag 区分，客户端应优先使用 If-None-Match
+- Cache-Control: private, no-cache，客户端每次都带验证器重新验证
+"""
+
+from datetime import timezone
+from typing import Dict, Tuple
+from urllib.parse import urlencode
+
+from fastapi import Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from photo_app.core.dao.change_counter import UserChangeCounterDAO
+from photo_app.core.utils.http_range import http_date, is_not_modified, make_weak_etag
+
+LIST_CACHE_CONTROL = "private, no-cache"
+
+
+async def check_list_validators(request: Request, session: AsyncSession, user_id: int) -> Tuple[Dict[str, str], bool]:
+    """返回 (验证器响应头, 是否应返回304)"""
+    validator = await UserChangeCounterDAO(session).get_validator(user_id)
+    query = urlencode(sorted(request.query_params.multi_items()))
+    modified = validator.last_modified
+    etag = make_weak_etag(
+        user_id, validator.version, modified.isoformat() if modified else "", request.url.path, query
+    )
+    headers = {"etag": etag, "cache-control": LIST_CACHE_CONTROL, "vary": "Authorization"}
+    last_modified = None
+    if modified is not None:
+        last_modified = modified.replace(tzinfo=modified.tzinfo or timezone.utc).timestamp()
+        headers["last-modified"] = http_date(last_modified)
+    return headers, is_not_modified(request.headers, etag, last_modified)
@@ -0,0 +1,36 @@
+"""认证依赖模块
+
+从 Authorization: Bearer <JWT> 中解析当前用户ID，令牌的 sub 字段为用户ID。
+"""
+
+from typing import Optional
+
+from fastapi import Depends, HTTPException, status
+from fastapi.security import OAuth2PasswordBearer
+from jose import JWTError, jwt
+
+from photo_app.core.config import settings
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_PREFIX}/users/login")
+
+
+def user_id_from_token(token: str) -> Optional[int]:
+    """解析令牌中的用户ID，令牌无效时返回None"""
+    try:
+        payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+        subject = payload.get("sub")
+        return int(subject) if subject is not None else None
+    except (JWTError, ValueError):
+        return None
+
+
+async def get_current_user_id(token: str = Depends(oauth2_scheme)) -> int:
+    """获取当前登录用户的ID"""
+    user_id = user_id_from_token(token)
+    if user_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user_id
@@ -0,0 +1,164 @@
+"""照片文件下载接口
+
+原图下载支持断点续传和拖动预览（Range / If-Range / multipart/byteranges），
+以及基于 ETag / Last-Modified 的条件请求。
+
+- ETag 由内容校验和与版本号生成，Last-Modified 取照片记录的 updated_at
+  （恢复版本等改写文件的操作会更新校验和，同时刷新 updated_at）
+- 配置了 X_ACCEL_REDIRECT_PREFIX 时，未加密的文件交给前置nginx发送
+- 其余情况由 PhotoFileResponse 分块发送；部署使用的 uvicorn 不支持零拷贝发送，
+  大文件的高并发下载应配置 X_ACCEL_REDIRECT_PREFIX
+
+相册和搜索结果可以导出为流式ZIP（/export），不生成临时文件。
+"""
+
+import mimetypes
+import os
+from datetime import timezone
+from typing import List, Optional
+from urllib.parse import quote
+
+import anyio
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from photo_app.api.dependencies.auth import get_current_user_id
+from photo_app.api.responses import PhotoFileResponse
+from photo_app.core.config import settings
+from photo_app.core.models.photo import Photo
+from photo_app.core.services.encryption import load_user_keys
+from photo_app.core.services.export import MAX_SEARCH_EXPORT, ExportService
+from photo_app.core.utils.http_range import (
+    RangeNotSatisfiable,
+    http_date,
+    if_range_allows,
+    is_not_modified,
+    make_etag,
+    parse_range_header,
+)
+from photo_app.infrastructure.database.base import get_db
+from photo_app.infrastructure.storage.encryption import EncryptedReader, open_with_keys
+
+router = APIRouter()
+
+
+def _accel_path(filepath: str) -> str:
+    """文件在nginx内部location下的路径；不在 STORAGE_PATH 下时返回空字符串"""
+    prefix = settings.X_ACCEL_REDIRECT_PREFIX
+    if not prefix:
+        return ""
+    root = os.path.abspath(settings.STORAGE_PATH)
+    path = os.path.abspath(filepath)
+    if os.path.commonpath([root, path]) != root:
+        return ""
+    relative = os.path.relpath(path, root).replace(os.sep, "/")
+    return f"{prefix.rstrip('/')}/{quote(relative)}"
+
+
+@router.api_route("/{photo_id}/original", methods=["GET", "HEAD"])
+async def get_original(
+    photo_id: int,
+    request: Request,
+    user_id: int = Depends(get_current_user_id),
+    session: AsyncSession = Depends(get_db),
+) -> Response:
+    """下载原图"""
+    result = await session.execute(
+        select(
+            Photo.filepath, Photo.filename, Photo.checksum, Photo.version,
+            Photo.updated_at, Photo.is_encrypted
+        ).where(Photo.id == photo_id, Photo.user_id == user_id, Photo.deleted_at.is_(None))
+    )
+    photo = result.one_or_none()
+    if photo is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Photo not found")
+    try:
+        st = await anyio.to_thread.run_sync(os.stat, photo.filepath)
+    except FileNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Photo file is missing") from None
+
+    last_modified = photo.updated_at.replace(tzinfo=photo.updated_at.tzinfo or timezone.utc).timestamp()
+    etag = make_etag(photo.checksum, photo.version, st.st_size, st.st_mtime_ns)
+    media_type = mimetypes.guess_type(photo.filename)[0] or "application/octet-stream"
+    headers = {
+        "etag": etag,
+        "last-modified": http_date(last_modified),
+        "cache-control": "private, max-age=0, must-revalidate",
+        "content-disposition": f"inline; filename*=utf-8''{quote(photo.filename)}",
+    }
+
+    # 条件请求：If-None-Match 优先于 If-Modified-Since
+    if is_not_modified(request.headers, etag, last_modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if not photo.is_encrypted:
+        accel = _accel_path(photo.filepath)
+        if accel:
+            headers["x-accel-redirect"] = accel
+            headers["accept-ranges"] = "bytes"
+            return Response(headers=headers, media_type=media_type)
+
+    open_encrypted = None
+    size = st.st_size
+    if photo.is_encrypted:
+        keys = await load_user_keys(session, user_id)
+        if not keys:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Encryption key is not available")
+
+        def open_encrypted() -> EncryptedReader:
+            return open_with_keys(photo.filepath, keys)
+
+        reader = await anyio.to_thread.run_sync(open_encrypted)
+        size = reader.size
+        reader.close()
+
+    ranges = None
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range_allows(if_range, etag, last_modified)):
+        try:
+            ranges = parse_range_header(range_header, size)
+        except RangeNotSatisfiable:
+            return Response(
+                status_code=status.HTTP_416_RANGE_NOT_SATISFIABLE,
+                headers={**headers, "content-range": f"bytes */{size}"},
+            )
+
+    return PhotoFileResponse(
+        photo.filepath,
+        size=size,
+        ranges=ranges,
+        headers=headers,
+        media_type=media_type,
+        open_encrypted=open_encrypted,
+    )
+
+
+@router.get("/export")
+async def export_archive(
+    album_id: Optional[int] = Query(None),
+    tags: Optional[List[str]] = Query(None),
+    filename: Optional[str] = Query(None),
+    limit: int = Query(MAX_SEARCH_EXPORT, ge=1, le=MAX_SEARCH_EXPORT),
+    user_id: int = Depends(get_current_user_id),
+    session: AsyncSession = Depends(get_db),
+) -> StreamingResponse:
+    """把相册（只传 album_id）或搜索结果导出为ZIP"""
+    service = ExportService(session)
+    if album_id is not None and not tags and not filename:
+        archive = await service.for_album(user_id, album_id)
+        if archive is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Album not found")
+        name = f"album-{album_id}.zip"
+    else:
+        archive = await service.for_search(
+            user_id, tags=tags, album_id=album_id, filename=filename, limit=limit
+        )
+        name = "photos.zip"
+    return StreamingResponse(
+        archive.iter_bytes(),
+        media_type="application/zip",
+        headers={"content-disposition": f'attachment; filename="{name}"'},
+    )
@@ -0,0 +1,56 @@
+"""地图视图接口
+
+服务端按Geohash网格聚合照片坐标，地图每次只需要渲染几百个聚合点。
+两个接口都支持条件请求（见 api.conditional），数据没有变化时返回304。
+"""
+
+from fastapi import APIRouter, Depends, Query, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from photo_app.api.conditional import check_list_validators
+from photo_app.api.dependencies.auth import get_current_user_id
+from photo_app.api.responses import FastJSONResponse
+from photo_app.core.dao.metadata import PhotoMetadataDAO
+from photo_app.infrastructure.database.base import get_db
+
+router = APIRouter()
+
+
+@router.get("/clusters", response_class=FastJSONResponse)
+async def get_clusters(
+    request: Request,
+    south: float = Query(..., ge=-90, le=90),
+    west: float = Query(..., ge=-180, le=180),
+    north: float = Query(..., ge=-90, le=90),
+    east: float = Query(..., ge=-180, le=180),
+    zoom: int = Query(..., ge=0, le=22),
+    user_id: int = Depends(get_current_user_id),
+    session: AsyncSession = Depends(get_db),
+) -> Response:
+    """获取地图范围内的照片聚合点"""
+    headers, not_modified = await check_list_validators(request, session, user_id)
+    if not_modified:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    dao = PhotoMetadataDAO(session)
+    clusters = await dao.cluster_by_grid(user_id, (south, west, north, east), zoom)
+    return FastJSONResponse({"zoom": zoom, "clusters": clusters}, headers=headers)
+
+
+@router.get("/photos", response_class=FastJSONResponse)
+async def get_photos_in_bbox(
+    request: Request,
+    south: float = Query(..., ge=-90, le=90),
+    west: float = Query(..., ge=-180, le=180),
+    north: float = Query(..., ge=-90, le=90),
+    east: float = Query(..., ge=-180, le=180),
+    limit: int = Query(500, ge=1, le=5000),
+    user_id: int = Depends(get_current_user_id),
+    session: AsyncSession = Depends(get_db),
+) -> Response:
+    """获取范围内的照片坐标（用于放大到街道级别后的单点展示）"""
+    headers, not_modified = await check_list_validators(request, session, user_id)
+    if not_modified:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    dao = PhotoMetadataDAO(session)
+    rows = await dao.get_in_bbox(user_id, (south, west, north, east), limit=limit)
+    return FastJSONResponse({"photos": rows}, headers=headers)
@@ -2,9 +2,13 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from prometheus_client import make_asgi_app
 
-from api.endpoints import photos, users
+from api.endpoints import files, maps, photos, users
+from api.middleware import AdmissionMiddleware
 from core.config import settings
 from infrastructure.database import init_db
+from core.services.search_index import search_indexes
+from core.utils.singleflight import read_flights
+from infrastructure.limiter.redis_flight import RedisFlightCoordinator
 
 app = FastAPI(
     title=settings.APP_NAME,
@@ -14,6 +18,11 @@ app = FastAPI(
     redoc_url=settings.REDOC_URL,
 )
 
+# Admission control: shed load with 429 before requests reach the database
+# (added before CORS so that rejections still carry CORS headers)
+if settings.ADMISSION_ENABLED:
+    app.add_middleware(AdmissionMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -30,10 +39,18 @@ app.mount("/metrics", metrics_app)
 # Include routers
 app.include_router(photos.router, prefix=f"{settings.API_PREFIX}/photos", tags=["photos"])
 app.include_router(users.router, prefix=f"{settings.API_PREFIX}/users", tags=["users"])
+app.include_router(maps.router, prefix=f"{settings.API_PREFIX}/map", tags=["map"])
+app.include_router(files.router, prefix=f"{settings.API_PREFIX}/files", tags=["files"])
 
 @app.on_event("startup")
 async def startup_event():
     await init_db()
+    if settings.SINGLEFLIGHT_REDIS_ENABLED:
+        read_flights.coordinator = RedisFlightCoordinator()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    search_indexes.flush()
 
 @app.get("/health")
 async def health_check():
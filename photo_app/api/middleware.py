@@ -0,0 +1,63 @@
+"""中间件模块
+
+AdmissionMiddleware 在路由之前调用 AdmissionController，被拒绝的请求直接返回 429 和 Retry-After，
+不进入依赖注入，也不占用数据库连接。
+
+注意事项：
+- 纯ASGI实现，不包装响应体；昂贵接口的并发租约在响应完全发送（包括流式响应）之后释放
+- 调用方标识只解码令牌不查询数据库；令牌无效时按客户端IP限流，之后由认证依赖返回401
+- 健康检查和监控指标不限流
+"""
+
+import math
+from typing import Optional
+
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from photo_app.api.dependencies.auth import user_id_from_token
+from photo_app.core.services.admission import AdmissionController
+
+EXEMPT_PATHS = ("/health", "/metrics")
+
+
+def request_identity(scope: Scope) -> str:
+    """已登录用户按用户ID，其余按客户端IP"""
+    authorization = Headers(scope=scope).get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        user_id = user_id_from_token(token.strip())
+        if user_id is not None:
+            return f"user:{user_id}"
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+class AdmissionMiddleware:
+    """请求准入控制"""
+
+    def __init__(self, app: ASGIApp, controller: Optional[AdmissionController] = None):
+        self.app = app
+        self.controller = controller or AdmissionController()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(EXEMPT_PATHS):
+            await self.app(scope, receive, send)
+            return
+
+        decision = await self.controller.admit(request_identity(scope), scope["method"], scope["path"])
+        if not decision.allowed:
+            response = JSONResponse(
+                {"detail": "Too many requests"},
+                status_code=429,
+                headers={"Retry-After": str(max(1, math.ceil(decision.retry_after)))},
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            if decision.release is not None:
+                await decision.release()
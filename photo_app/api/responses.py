@@ -0,0 +1,180 @@
+"""响应模块
+
+本模块提供两类响应：
+- FastJSONResponse: 用 orjson 编码列表接口的行数据（配合 BaseDAO.fetch_rows，不经过ORM和Pydantic）
+- PhotoFileResponse: 支持范围请求的照片文件响应，尽量不让Python进程逐字节复制文件内容
+
+文件发送方式（按优先级）：
+1. X-Accel-Redirect：由前置nginx直接发送文件（包括处理Range），应用只返回响应头
+2. ASGI zerocopysend 扩展：服务器用 os.sendfile 把文件描述符的指定区间直接写入套接字
+3. 回退：在线程池中用 os.pread 分块读取，不阻塞事件循环
+加密照片只能在进程内解密，按块解密请求区间后发送。
+
+zerocopysend 只有在服务器于 scope["extensions"] 中声明时才使用。uvicorn（见 requirements.txt 和 Dockerfile）
+没有实现该扩展，在 uvicorn 下未加密文件总是走第3种方式；需要零拷贝时应配置 X-Accel-Redirect。
+
+注意事项：
+- 单个区间返回 206 和 Content-Range；多个区间返回 multipart/byteranges
+- 条件请求（If-None-Match / If-Range 等）由接口层在构造响应前处理
+"""
+
+import os
+import secrets
+from typing import Any, Callable, List, Mapping, Optional, Tuple
+
+import anyio
+import orjson
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from photo_app.infrastructure.storage.encryption import EncryptedReader
+
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+
+ReaderFactory = Callable[[], EncryptedReader]
+
+
+class FastJSONResponse(Response):
+    """orjson编码的JSON响应，datetime 编码为 RFC 3339 字符串"""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+class PhotoFileResponse(Response):
+    """支持 Range 的照片文件响应"""
+
+    chunk_size = 256 * 1024
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        size: int,
+        ranges: Optional[List[Tuple[int, int]]] = None,
+        headers: Optional[Mapping[str, str]] = None,
+        media_type: str = "application/octet-stream",
+        open_encrypted: Optional[ReaderFactory] = None
+    ):
+        self.path = path
+        self.size = size
+        self.ranges = ranges or []
+        self.open_encrypted = open_encrypted
+        self.background = None
+        self._boundary = secrets.token_hex(16)
+        self._part_headers: List[bytes] = []
+
+        response_headers = dict(headers or {})
+        response_headers["accept-ranges"] = "bytes"
+        if not self.ranges:
+            self.status_code = 200
+            self.media_type = media_type
+            response_headers["content-length"] = str(size)
+        elif len(self.ranges) == 1:
+            start, end = self.ranges[0]
+            self.status_code = 206
+            self.media_type = media_type
+            response_headers["content-range"] = f"bytes {start}-{end}/{size}"
+            response_headers["content-length"] = str(end - start + 1)
+        else:
+            self.status_code = 206
+            self.media_type = f"multipart/byteranges; boundary={self._boundary}"
+            length = 0
+            for start, end in self.ranges:
+                part = (
+                    f"--{self._boundary}\r\n"
+                    f"Content-Type: {media_type}\r\n"
+                    f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n"
+                ).encode("latin-1")
+                self._part_headers.append(part)
+                length += len(part) + (end - start + 1) + 2
+            length += len(self._closing)
+            response_headers["content-length"] = str(length)
+        self.init_headers(response_headers)
+
+    @property
+    def _closing(self) -> bytes:
+        return f"--{self._boundary}--\r\n".encode("latin-1")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope.get("method", "GET").upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        if self.open_encrypted is not None:
+            reader = await anyio.to_thread.run_sync(self.open_encrypted)
+            sender = _EncryptedSender(reader, send)
+        else:
+            fd = await anyio.to_thread.run_sync(os.open, self.path, os.O_RDONLY)
+            zerocopy = ZEROCOPY_EXTENSION in scope.get("extensions", {})
+            sender = _FileSender(fd, send, zerocopy, self.chunk_size)
+        try:
+            await self._send_body(send, sender)
+        finally:
+            with anyio.CancelScope(shield=True):
+                await anyio.to_thread.run_sync(sender.close)
+
+    async def _send_body(self, send: Send, sender) -> None:
+        ranges = self.ranges or [(0, self.size - 1)]
+        if len(ranges) == 1:
+            start, end = ranges[0]
+            await sender.send_range(start, end + 1, more_body=False)
+            return
+        for part_header, (start, end) in zip(self._part_headers, ranges):
+            await send({"type": "http.response.body", "body": part_header, "more_body": True})
+            await sender.send_range(start, end + 1, more_body=True)
+            await send({"type": "http.response.body", "body": b"\r\n", "more_body": True})
+        await send({"type": "http.response.body", "body": self._closing, "more_body": False})
+
+
+class _FileSender:
+    def __init__(self, fd: int, send: Send, zerocopy: bool, chunk_size: int):
+        self._fd = fd
+        self._send = send
+        self._zerocopy = zerocopy
+        self._chunk_size = chunk_size
+
+    async def send_range(self, start: int, stop: int, more_body: bool) -> None:
+        if self._zerocopy:
+            await self._send({
+                "type": ZEROCOPY_EXTENSION,
+                "file": self._fd,
+                "offset": start,
+                "count": stop - start,
+                "more_body": more_body,
+            })
+            return
+        offset = start
+        while offset < stop:
+            chunk = await anyio.to_thread.run_sync(os.pread, self._fd, min(self._chunk_size, stop - offset), offset)
+            if not chunk:
+                break
+            offset += len(chunk)
+            await self._send({"type": "http.response.body", "body": chunk, "more_body": True})
+        if not more_body:
+            await self._send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class _EncryptedSender:
+    def __init__(self, reader: EncryptedReader, send: Send):
+        self._reader = reader
+        self._send = send
+
+    async def send_range(self, start: int, stop: int, more_body: bool) -> None:
+        chunks = self._reader.iter_range(start, stop)
+        while True:
+            chunk = await anyio.to_thread.run_sync(next, chunks, None)
+            if chunk is None:
+                break
+            await self._send({"type": "http.response.body", "body": chunk, "more_body": True})
+        if not more_body:
+            await self._send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    def close(self) -> None:
+        self._reader.close()
@@ -0,0 +1,141 @@
+"""列表接口序列化基准测试
+
+比较一页照片在两条路径上的CPU耗时：
+- orm: 查询ORM对象 -> Pydantic模型 -> jsonable_encoder -> json.dumps（FastAPI response_model 的默认路径）
+- rows: 列查询返回元组 -> 字典 -> orjson（PhotoDAO.get_rows_by_user + FastJSONResponse）
+
+用法：
+    python -m photo_app.benchmarks.serialization --photos 5000 --page 500 --rounds 50
+
+使用内存SQLite数据库，分别报告“查询+构造”和“编码”两个阶段每页的CPU时间（process_time）。
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel, ConfigDict
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from photo_app.api.responses import FastJSONResponse
+from photo_app.core.dao.photo import PhotoDAO
+from photo_app.core.models.base import Base
+from photo_app.core.models.photo import Photo
+from photo_app.core.models.user import User
+# 注册 relationship 引用的其他模型
+from photo_app.core.models import album, tag, timeline  # noqa: F401
+
+
+class PhotoOut(BaseModel):
+    """ORM路径使用的响应模型，字段与 LIST_COLUMNS 相同"""
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    filename: str
+    size: int
+    upload_date: datetime
+    storage_status: str
+    backup_status: str
+    is_encrypted: bool
+    version: int
+
+
+class PhotoPage(BaseModel):
+    photos: List[PhotoOut]
+    skip: int
+    limit: int
+
+
+async def _setup(photos: int):
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+    async with sessions() as session:
+        user = User(email="bench@example.com", username="bench", hashed_password="x")
+        session.add(user)
+        await session.flush()
+        start = datetime(2020, 1, 1)
+        await session.execute(insert(Photo), [
+            {
+                "filename": f"IMG_{i:06d}.jpg",
+                "filepath": f"/data/photos/{i // 1000}/IMG_{i:06d}.jpg",
+                "size": 2_000_000 + i,
+                "upload_date": start + timedelta(minutes=i),
+                "user_id": user.id,
+                "storage_status": "stored",
+                "backup_status": "completed",
+                "is_encrypted": False,
+                "version": 1,
+            }
+            for i in range(photos)
+        ])
+        await session.commit()
+        return engine, sessions, user.id
+
+
+async def _measure(rounds: int, fn: Callable[[], Awaitable[float]]) -> tuple:
+    """返回 (查询阶段, 编码阶段) 每页平均CPU毫秒数"""
+    fetch = encode = 0.0
+    for _ in range(rounds):
+        started = time.process_time()
+        encode_time = await fn()
+        total = time.process_time() - started
+        fetch += total - encode_time
+        encode += encode_time
+    return fetch / rounds * 1000, encode / rounds * 1000
+
+
+async def run(photos: int, page: int, rounds: int) -> None:
+    engine, sessions, user_id = await _setup(photos)
+
+    async def orm_path() -> float:
+        async with sessions() as session:
+            items = await PhotoDAO(session).get_by_user(user_id, limit=page)
+            started = time.process_time()
+            body = PhotoPage(photos=[PhotoOut.model_validate(p) for p in items], skip=0, limit=page)
+            json.dumps(jsonable_encoder(body)).encode("utf-8")
+            return time.process_time() - started
+
+    async def rows_path() -> float:
+        async with sessions() as session:
+            rows = await PhotoDAO(session).get_rows_by_user(user_id, limit=page)
+            started = time.process_time()
+            FastJSONResponse({"photos": rows, "skip": 0, "limit": page})
+            return time.process_time() - started
+
+    # 预热
+    await orm_path()
+    await rows_path()
+    results = {
+        "orm": await _measure(rounds, orm_path),
+        "rows": await _measure(rounds, rows_path),
+    }
+    await engine.dispose()
+
+    print(f"{photos} photos, page size {page}, {rounds} rounds (CPU ms per page)")
+    print(f"{'path':<6}{'fetch':>10}{'encode':>10}{'total':>10}")
+    for name, (fetch, encode) in results.items():
+        print(f"{name:<6}{fetch:>10.2f}{encode:>10.2f}{fetch + encode:>10.2f}")
+    orm_fetch, orm_encode = results["orm"]
+    rows_fetch, rows_encode = results["rows"]
+    print(f"encode speedup: {orm_encode / max(rows_encode, 1e-9):.1f}x, "
+          f"total speedup: {(orm_fetch + orm_encode) / max(rows_fetch + rows_encode, 1e-9):.1f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--photos", type=int, default=5000)
+    parser.add_argument("--page", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(run(args.photos, args.page, args.rounds))
+
+
+if __name__ == "__main__":
+    main()
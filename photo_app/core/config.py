@@ -49,11 +49,24 @@ class Settings(BaseSettings):
     REDIS_HOST: str = "redis"
     REDIS_PORT: int = 6379
     REDIS_DB: int = 0
+
+    # Admission control（每秒令牌数 / 桶容量）
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_USER_RATE: float = 20.0
+    ADMISSION_USER_BURST: int = 40
+    ADMISSION_EXPENSIVE_RATE: float = 1.0
+    ADMISSION_EXPENSIVE_BURST: int = 5
+    ADMISSION_EXPENSIVE_CONCURRENCY: int = 4
+    ADMISSION_LEASE_TTL: int = 300
+    # 相同的并发读取在工作进程间通过Redis合并（进程内合并始终启用）
+    SINGLEFLIGHT_REDIS_ENABLED: bool = False
     
     # Storage
     STORAGE_PATH: str = "/data/photos"
     TEMP_PATH: str = "/data/temp"
     CACHE_PATH: str = "/data/cache"
+    # 非空时由nginx通过 X-Accel-Redirect 发送原图，例如 "/_protected"
+    X_ACCEL_REDIRECT_PREFIX: str = ""
     
     # Monitoring
     PROMETHEUS_ENABLED: bool = True
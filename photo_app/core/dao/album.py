@@ -0,0 +1,101 @@
+from datetime import datetime
+from typing import Any, Iterable, List, Optional
+from sqlalchemy import select, delete, literal
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from photo_app.core.models.album import Album, photo_albums
+from photo_app.core.models.photo import Photo
+from photo_app.core.dao.base import BaseDAO
+from photo_app.core.services.invalidation import REBUILD, index_changed
+
+# 单条语句中照片ID的最大数量，避免超出数据库绑定参数上限
+BULK_BATCH_SIZE = 10_000
+
+class AlbumDAO(BaseDAO[Album]):
+    """相册数据访问对象，相册及其内容的变更同步到搜索索引和自动补全
+
+    自动补全中的相册权重按名称合并各相册的照片数（空相册至少为1），不能逐项增减，变更后重建。
+    """
+
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, Album)
+
+    async def create(self, **kwargs) -> Album:
+        """创建相册"""
+        album = await super().create(**kwargs)
+        await index_changed(self._session, album.user_id, suggest=REBUILD)
+        return album
+
+    async def update(self, id: Any, **kwargs) -> Optional[Album]:
+        """更新相册，改名后重建自动补全"""
+        album = await super().update(id, **kwargs)
+        if album is not None and "name" in kwargs:
+            await index_changed(self._session, album.user_id, suggest=REBUILD)
+        return album
+
+    async def add_photos(self, album_id: int, photo_ids: Iterable[int]) -> List[int]:
+        """把照片加入相册，返回新加入的照片ID
+
+        使用 INSERT ... SELECT ... ON CONFLICT DO NOTHING，只会加入与相册属于同一用户的未删除照片。
+        """
+        album = await self.get(album_id)
+        ids = sorted(set(photo_ids))
+        if album is None or not ids:
+            return []
+
+        added: List[int] = []
+        now = datetime.utcnow()
+        for start in range(0, len(ids), BULK_BATCH_SIZE):
+            batch = ids[start:start + BULK_BATCH_SIZE]
+            source = select(Photo.id, literal(album_id), literal(now)).where(
+                Photo.id.in_(batch), Photo.user_id == album.user_id, Photo.deleted_at.is_(None)
+            )
+            stmt = (
+                self._dialect_insert(photo_albums)
+                .from_select(["photo_id", "album_id", "added_at"], source)
+                .on_conflict_do_nothing()
+                .returning(photo_albums.c.photo_id)
+            )
+            result = await self._session.execute(stmt)
+            added.extend(result.scalars())
+
+        if added:
+            await index_changed(
+                self._session, album.user_id, lambda index: index.add_to_album(added, album_id), REBUILD
+            )
+        return added
+
+    async def remove_photos(self, album_id: int, photo_ids: Iterable[int]) -> List[int]:
+        """把照片移出相册，返回移出的照片ID"""
+        album = await self.get(album_id)
+        ids = sorted(set(photo_ids))
+        if album is None or not ids:
+            return []
+
+        removed: List[int] = []
+        for start in range(0, len(ids), BULK_BATCH_SIZE):
+            stmt = delete(photo_albums).where(
+                photo_albums.c.album_id == album_id,
+                photo_albums.c.photo_id.in_(ids[start:start + BULK_BATCH_SIZE])
+            ).returning(photo_albums.c.photo_id)
+            result = await self._session.execute(stmt)
+            removed.extend(result.scalars())
+
+        if removed:
+            await index_changed(
+                self._session, album.user_id, lambda index: index.remove_from_album(removed, album_id), REBUILD
+            )
+        return removed
+
+    async def delete(self, id: int) -> bool:
+        """删除相册及其照片关联"""
+        album = await self.get(id)
+        if album is None:
+            return False
+        result = await self._session.execute(
+            delete(photo_albums).where(photo_albums.c.album_id == id).returning(photo_albums.c.photo_id)
+        )
+        removed = list(result.scalars())
+        await self._session.execute(delete(Album).where(Album.id == id))
+        await index_changed(self._session, album.user_id, lambda index: index.remove_from_album(removed, id), REBUILD)
+        return True
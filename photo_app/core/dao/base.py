@@ -1,5 +1,6 @@
-from typing import Generic, TypeVar, Optional, List, Any
-from sqlalchemy import select, update, delete
+from typing import Generic, TypeVar, Optional, List, Any, Dict, Mapping, Sequence, Tuple
+from sqlalchemy import bindparam, select, update, delete
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql import Select
 
@@ -7,6 +8,17 @@ from photo_app.core.models.base import Base
 
 ModelType = TypeVar("ModelType", bound=Base)
 
+# SQLite 单条语句的绑定参数上限为32766，留出余量
+_MAX_BIND_PARAMS = 30000
+
+
+def _group_by_columns(rows: Sequence[Mapping[str, Any]]) -> Dict[Tuple[str, ...], List[Mapping[str, Any]]]:
+    """按字段集合分组，同一组可以共用一条语句"""
+    groups: Dict[Tuple[str, ...], List[Mapping[str, Any]]] = {}
+    for row in rows:
+        groups.setdefault(tuple(sorted(row)), []).append(row)
+    return groups
+
 class BaseDAO(Generic[ModelType]):
     """
     提供基础的数据访问操作的抽象基类
@@ -34,7 +46,7 @@ class BaseDAO(Generic[ModelType]):
     ) -> List[ModelType]:
         """获取多条记录，支持分页"""
         stmt = (
-            select(self._model_class)
+            self._build_query()
             .offset(skip)
             .limit(limit)
         )
@@ -54,6 +66,69 @@ class BaseDAO(Generic[ModelType]):
         result = await self._session.execute(stmt)
         return result.scalar_one_or_none()
 
+    async def update_many(
+        self,
+        rows: Sequence[Mapping[str, Any]],
+        *,
+        key: str = "id",
+        batch_size: int = 1000
+    ) -> int:
+        """批量更新，每个字典包含 key 列和要更新的列，返回更新的行数
+
+        字段集合相同的行共用一条 UPDATE 语句，以 executemany 方式执行，每批一次往返。
+        直接执行Core语句，会话中已加载的对象不会同步刷新。
+        """
+        table = self._model_class.__table__
+        updated = 0
+        for columns, group in _group_by_columns(rows).items():
+            values = [c for c in columns if c != key]
+            if key not in columns or not values:
+                continue
+            # 绑定参数名不能与列名相同
+            stmt = (
+                update(table)
+                .where(table.c[key] == bindparam(f"_{key}"))
+                .values({c: bindparam(f"_{c}") for c in values})
+            )
+            params = [{f"_{c}": row[c] for c in columns} for row in group]
+            for start in range(0, len(params), batch_size):
+                result = await self._session.execute(stmt, params[start:start + batch_size])
+                updated += max(result.rowcount, 0)
+        return updated
+
+    async def bulk_upsert(
+        self,
+        rows: Sequence[Mapping[str, Any]],
+        *,
+        index_elements: Sequence[str] = ("id",),
+        update_columns: Optional[Sequence[str]] = None,
+        batch_size: int = 500
+    ) -> int:
+        """批量插入，index_elements 冲突时更新（INSERT ... ON CONFLICT DO UPDATE），返回处理的行数
+
+        update_columns 默认为行中除冲突列外的所有列；为空时冲突行保持不变（DO NOTHING）。
+        """
+        table = self._model_class.__table__
+        processed = 0
+        for columns, group in _group_by_columns(rows).items():
+            targets = [
+                c for c in (update_columns if update_columns is not None else columns)
+                if c in columns and c not in index_elements
+            ]
+            rows_per_statement = max(1, min(batch_size, _MAX_BIND_PARAMS // len(columns)))
+            for start in range(0, len(group), rows_per_statement):
+                stmt = self._dialect_insert(table).values(list(group[start:start + rows_per_statement]))
+                if targets:
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=list(index_elements),
+                        set_={c: stmt.excluded[c] for c in targets}
+                    )
+                else:
+                    stmt = stmt.on_conflict_do_nothing(index_elements=list(index_elements))
+                await self._session.execute(stmt)
+                processed += len(group[start:start + rows_per_statement])
+        return processed
+
     async def delete(self, id: Any) -> bool:
         """删除记录"""
         stmt = delete(self._model_class).where(
@@ -68,6 +143,21 @@ class BaseDAO(Generic[ModelType]):
         result = await self._session.execute(stmt)
         return result.scalar() is not None
 
+    async def fetch_rows(self, stmt: Select) -> List[Dict[str, Any]]:
+        """执行列查询，直接返回字典列表，不构造ORM对象（用于列表接口的快速序列化）"""
+        result = await self._session.execute(stmt)
+        keys = list(result.keys())
+        return [dict(zip(keys, row)) for row in result.all()]
+
     def _build_query(self) -> Select:
         """构建基础查询"""
         return select(self._model_class)
+
+    def _dialect_insert(self, target: Any):
+        """构建当前数据库方言的INSERT语句，支持ON CONFLICT子句"""
+        dialect = self._session.bind.dialect.name
+        if dialect == "sqlite":
+            return sqlite.insert(target)
+        if dialect == "postgresql":
+            return postgresql.insert(target)
+        raise NotImplementedError(f"ON CONFLICT is not supported for dialect: {dialect}")
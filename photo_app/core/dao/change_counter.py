@@ -0,0 +1,77 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from photo_app.core.models.change_counter import UserChangeCounter
+from photo_app.core.models.photo import Photo
+from photo_app.core.dao.base import BaseDAO
+
+
+class ListValidator(NamedTuple):
+    """列表接口的验证器"""
+    version: int
+    # 照片行和变更计数中较晚的修改时间（UTC），用户没有任何数据时为None
+    last_modified: Optional[datetime]
+
+
+class UserChangeCounterDAO(BaseDAO[UserChangeCounter]):
+    """用户变更计数数据访问对象"""
+
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, UserChangeCounter)
+
+    async def get_validator(self, user_id: int) -> ListValidator:
+        """一条语句读取变更计数和 max(photos.updated_at)，都走索引，不扫描照片"""
+        photos_modified = (
+            select(func.max(Photo.updated_at)).where(Photo.user_id == user_id).scalar_subquery()
+        )
+        counter = select(UserChangeCounter).where(UserChangeCounter.user_id == user_id).subquery()
+        stmt = select(
+            photos_modified,
+            select(counter.c.version).scalar_subquery(),
+            select(counter.c.updated_at).scalar_subquery(),
+        )
+        modified, version, counter_modified = (await self._session.execute(stmt)).one()
+        candidates = [value for value in (modified, counter_modified) if value is not None]
+        return ListValidator(version or 0, max(candidates) if candidates else None)
+
+    async def get_version(self, user_id: int) -> int:
+        """用户当前的变更计数，没有记录时为0"""
+        result = await self._session.execute(
+            select(UserChangeCounter.version).where(UserChangeCounter.user_id == user_id)
+        )
+        return result.scalar_one_or_none() or 0
+
+    async def bump(self, user_ids: Iterable[int]) -> Dict[int, int]:
+        """递增用户的变更计数，返回用户ID到递增后计数的映射"""
+        user_ids = sorted({user_id for user_id in user_ids if user_id is not None})
+        if not user_ids:
+            return {}
+        now = datetime.utcnow()
+        stmt = self._dialect_insert(UserChangeCounter).values([
+            {"user_id": user_id, "version": 1, "updated_at": now} for user_id in user_ids
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id"],
+            set_={"version": UserChangeCounter.version + 1, "updated_at": now}
+        ).returning(UserChangeCounter.user_id, UserChangeCounter.version)
+        result = await self._session.execute(stmt)
+        return dict(result.all())
+
+    async def photo_owners(self, photo_ids: Iterable[int], *, batch_size: int = 1000) -> Dict[int, List[int]]:
+        """照片按所属用户分组"""
+        photo_ids = list(photo_ids)
+        owners: Dict[int, List[int]] = {}
+        for start in range(0, len(photo_ids), batch_size):
+            result = await self._session.execute(
+                select(Photo.id, Photo.user_id).where(Photo.id.in_(photo_ids[start:start + batch_size]))
+            )
+            for photo_id, user_id in result.all():
+                if user_id is not None:
+                    owners.setdefault(user_id, []).append(photo_id)
+        return owners
+
+    async def bump_for_photos(self, photo_ids: Iterable[int], *, batch_size: int = 1000) -> Dict[int, int]:
+        """递增照片所属用户的变更计数，每个用户只递增一次"""
+        return await self.bump(await self.photo_owners(photo_ids, batch_size=batch_size))
@@ -0,0 +1,46 @@
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from photo_app.core.models.checkpoint import JobCheckpoint
+from photo_app.core.dao.base import BaseDAO
+
+class JobCheckpointDAO(BaseDAO[JobCheckpoint]):
+    """后台任务断点数据访问对象"""
+
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, JobCheckpoint)
+
+    async def get_position(self, name: str) -> Optional[str]:
+        """获取任务的断点位置，没有断点时返回None"""
+        stmt = select(JobCheckpoint.position).where(JobCheckpoint.name == name)
+        result = await self._session.execute(stmt)
+        return result.scalar()
+
+    async def list_names(self, prefix: str) -> List[str]:
+        """列出名称以 prefix 开头的断点，例如所有未完成的账户删除"""
+        stmt = (
+            select(JobCheckpoint.name)
+            .where(JobCheckpoint.name.startswith(prefix, autoescape=True))
+            .order_by(JobCheckpoint.name)
+        )
+        result = await self._session.execute(stmt)
+        return list(result.scalars().all())
+
+    async def save(self, name: str, position: Optional[str]) -> None:
+        """写入或更新任务的断点位置"""
+        now = datetime.utcnow()
+        stmt = self._dialect_insert(JobCheckpoint).values(
+            name=name, position=position, created_at=now, updated_at=now
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["name"],
+            set_={"position": stmt.excluded.position, "updated_at": now}
+        )
+        await self._session.execute(stmt)
+
+    async def clear(self, name: str) -> bool:
+        """删除任务的断点（任务完整运行一轮之后）"""
+        result = await self._session.execute(delete(JobCheckpoint).where(JobCheckpoint.name == name))
+        return result.rowcount > 0
@@ -0,0 +1,91 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import select, delete, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from photo_app.core.models.manifest import ScanManifestEntry
+from photo_app.core.dao.base import BaseDAO
+from photo_app.infrastructure.storage.scanner import FileRecord, ManifestValue
+
+# 批量写入/删除时每条语句的最大行数
+MANIFEST_BATCH_SIZE = 500
+
+class ScanManifestDAO(BaseDAO[ScanManifestEntry]):
+    """扫描清单数据访问对象"""
+
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, ScanManifestEntry)
+
+    async def load_index(self, prefix: Optional[str] = None) -> Dict[str, ManifestValue]:
+        """以流式方式加载清单，返回 路径 -> (size, mtime_ns, inode, content_hash)"""
+        stmt = select(
+            ScanManifestEntry.path,
+            ScanManifestEntry.size,
+            ScanManifestEntry.mtime_ns,
+            ScanManifestEntry.inode,
+            ScanManifestEntry.content_hash
+        )
+        if prefix:
+            stmt = stmt.where(ScanManifestEntry.path.startswith(prefix, autoescape=True))
+        result = await self._session.stream(stmt.execution_options(yield_per=5000))
+        index: Dict[str, ManifestValue] = {}
+        async for path, size, mtime_ns, inode, content_hash in result:
+            index[path] = (size, mtime_ns, inode, content_hash)
+        return index
+
+    async def upsert_many(self, records: Iterable[FileRecord]) -> None:
+        """批量写入或更新清单条目"""
+        records = list(records)
+        now = datetime.utcnow()
+        for start in range(0, len(records), MANIFEST_BATCH_SIZE):
+            batch = records[start:start + MANIFEST_BATCH_SIZE]
+            stmt = self._dialect_insert(ScanManifestEntry).values([
+                {
+                    "path": r.path,
+                    "size": r.size,
+                    "mtime_ns": r.mtime_ns,
+                    "inode": r.inode,
+                    "content_hash": r.content_hash,
+                    "created_at": now,
+                    "updated_at": now
+                }
+                for r in batch
+            ])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["path"],
+                set_={
+                    "size": stmt.excluded.size,
+                    "mtime_ns": stmt.excluded.mtime_ns,
+                    "inode": stmt.excluded.inode,
+                    "content_hash": stmt.excluded.content_hash,
+                    "updated_at": now
+                }
+            )
+            await self._session.execute(stmt)
+
+    async def delete_paths(self, paths: Iterable[str]) -> int:
+        """批量删除清单条目"""
+        paths = list(paths)
+        deleted = 0
+        for start in range(0, len(paths), MANIFEST_BATCH_SIZE):
+            stmt = delete(ScanManifestEntry).where(
+                ScanManifestEntry.path.in_(paths[start:start + MANIFEST_BATCH_SIZE])
+            )
+            result = await self._session.execute(stmt)
+            deleted += result.rowcount
+        return deleted
+
+    async def move_paths(self, moves: Iterable[Tuple[str, FileRecord]]) -> None:
+        """记录文件移动：更新路径并刷新文件状态"""
+        for old_path, record in moves:
+            await self._session.execute(
+                update(ScanManifestEntry)
+                .where(ScanManifestEntry.path == old_path)
+                .values(
+                    path=record.path,
+                    size=record.size,
+                    mtime_ns=record.mtime_ns,
+                    inode=record.inode,
+                    updated_at=datetime.utcnow()
+                )
+            )
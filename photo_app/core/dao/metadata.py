@@ -1,9 +1,30 @@
-from typing import List, Optional, Dict, Any
-from sqlalchemy import select, and_, or_, func
+from datetime import datetime
+from functools import partial
+from typing import List, Optional, Dict, Any, Mapping, Sequence, Tuple
+from sqlalchemy import Row, select, and_, or_, func, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from photo_app.core.models.photo import PhotoMetadata
+from photo_app.core.models.photo import Photo, PhotoMetadata
 from photo_app.core.dao.base import BaseDAO
+from photo_app.core.dao.change_counter import UserChangeCounterDAO
+from photo_app.core.dao.photo import PhotoDAO
+from photo_app.core.dao.projections import DETAIL, get_projection
+from photo_app.core.services.invalidation import REBUILD, index_changed
+from photo_app.core.services.search_index import SearchIndex
+from photo_app.core.utils.exif import compress_exif, extract_fields
+from photo_app.core.utils.geo import encode_geohash, geohash_precision_for_zoom, parse_gps
+
+# (south, west, north, east)
+BoundingBox = Tuple[float, float, float, float]
+
+# update_ai_analysis 可写入的字段
+_ANALYSIS_FIELDS = ("scene_type", "scene_confidence", "faces_detected", "face_locations", "aesthetic_score")
+
+
+def _set_scenes(scenes: Mapping[int, Optional[str]], index: SearchIndex) -> None:
+    for photo_id, scene_type in scenes.items():
+        index.set_scene(photo_id, scene_type)
+
 
 class PhotoMetadataDAO(BaseDAO[PhotoMetadata]):
     """照片元数据数据访问对象"""
@@ -11,17 +32,75 @@ class PhotoMetadataDAO(BaseDAO[PhotoMetadata]):
     def __init__(self, session: AsyncSession):
         super().__init__(session, PhotoMetadata)
 
+    async def create(self, **kwargs) -> PhotoMetadata:
+        """创建元数据记录，自动从EXIF中提取地理位置和拍摄时间"""
+        metadata = await super().create(**self._with_location(kwargs))
+        await self._sync_taken_at([(metadata.photo_id, metadata.captured_at)])
+        scenes = {metadata.photo_id: metadata.scene_type} if metadata.scene_type else None
+        await self._changed([metadata.photo_id], scenes)
+        return metadata
+
+    async def update(self, id: Any, **kwargs) -> Optional[PhotoMetadata]:
+        """更新元数据记录，raw_exif 会被压缩并同步提取字段和地理位置"""
+        metadata = await super().update(id, **self._with_location(kwargs))
+        if metadata is not None:
+            await self._sync_taken_at([(metadata.photo_id, metadata.captured_at)])
+            scenes = {metadata.photo_id: metadata.scene_type} if "scene_type" in kwargs else None
+            await self._changed([metadata.photo_id], scenes)
+        return metadata
+
+    async def _sync_taken_at(self, captured: List[Tuple[int, Any]]) -> None:
+        """EXIF拍摄时间比文件修改时间可靠，存在时覆盖照片的 taken_at"""
+        rows = [
+            {"id": photo_id, "taken_at": captured_at}
+            for photo_id, captured_at in captured if captured_at is not None
+        ]
+        if rows:
+            await PhotoDAO(self._session).update_many(rows)
+
+    async def _changed(self, photo_ids: Sequence[int], scenes: Optional[Mapping[int, Optional[str]]] = None) -> None:
+        """元数据不在照片行上，修改后递增所属用户的变更计数，使列表接口的ETag失效
+
+        scenes 为照片ID到新场景类型的映射，提交后同步到已加载的搜索索引；
+        自动补全中的场景计数需要旧值，直接重建。
+        """
+        owners = await UserChangeCounterDAO(self._session).photo_owners(photo_ids)
+        for user_id, owned_ids in owners.items():
+            changes = {photo_id: scenes[photo_id] for photo_id in owned_ids if photo_id in scenes} if scenes else {}
+            if changes:
+                await index_changed(self._session, user_id, partial(_set_scenes, changes), REBUILD)
+            else:
+                await index_changed(self._session, user_id)
+
     async def get_by_photo_id(self, photo_id: int) -> Optional[PhotoMetadata]:
         """通过照片ID获取元数据"""
         stmt = select(PhotoMetadata).where(PhotoMetadata.photo_id == photo_id)
         result = await self._session.execute(stmt)
         return result.scalar_one_or_none()
 
+    async def get_projected_by_photo_ids(
+        self,
+        photo_ids: Sequence[int],
+        projection: str = DETAIL
+    ) -> List[Row]:
+        """按投影批量获取元数据列（附带 photo_id），不读取投影外的宽列"""
+        _, columns = get_projection(projection)
+        if not photo_ids or not columns:
+            return []
+        stmt = select(PhotoMetadata.photo_id, *columns).where(PhotoMetadata.photo_id.in_(list(photo_ids)))
+        result = await self._session.execute(stmt)
+        return list(result.all())
+
     async def bulk_create(self, metadata_list: List[Dict[str, Any]]) -> List[PhotoMetadata]:
         """批量创建元数据记录"""
-        instances = [PhotoMetadata(**data) for data in metadata_list]
+        instances = [PhotoMetadata(**self._with_location(data)) for data in metadata_list]
         self._session.add_all(instances)
         await self._session.flush()
+        await self._sync_taken_at([(m.photo_id, m.captured_at) for m in instances])
+        await self._changed(
+            [m.photo_id for m in instances],
+            {m.photo_id: m.scene_type for m in instances if m.scene_type}
+        )
         return instances
 
     async def update_ai_analysis(
@@ -34,24 +113,155 @@ class PhotoMetadataDAO(BaseDAO[PhotoMetadata]):
         face_locations: Optional[str] = None,
         aesthetic_score: Optional[float] = None
     ) -> Optional[PhotoMetadata]:
-        """更新AI分析结果"""
-        update_data = {
-            k: v for k, v in {
-                "scene_type": scene_type,
-                "scene_confidence": scene_confidence,
-                "faces_detected": faces_detected,
-                "face_locations": face_locations,
-                "aesthetic_score": aesthetic_score
-            }.items() if v is not None
-        }
-        
+        """更新AI分析结果（按 photo_id 一条 UPDATE ... RETURNING 完成）"""
+        update_data = self._analysis_values({
+            "scene_type": scene_type,
+            "scene_confidence": scene_confidence,
+            "faces_detected": faces_detected,
+            "face_locations": face_locations,
+            "aesthetic_score": aesthetic_score
+        })
+
         if not update_data:
             return None
-            
-        metadata = await self.get_by_photo_id(photo_id)
-        if metadata:
-            return await self.update(metadata.id, **update_data)
-        return None
+
+        stmt = (
+            update(PhotoMetadata)
+            .where(PhotoMetadata.photo_id == photo_id)
+            .values(**update_data)
+            .returning(PhotoMetadata)
+        )
+        result = await self._session.execute(stmt)
+        metadata = result.scalar_one_or_none()
+        if metadata is not None:
+            scenes = {photo_id: metadata.scene_type} if "scene_type" in update_data else None
+            await self._changed([photo_id], scenes)
+        return metadata
+
+    async def update_ai_analysis_many(
+        self,
+        results: Sequence[Mapping[str, Any]],
+        *,
+        batch_size: int = 1000
+    ) -> int:
+        """批量写入AI分析结果，每项包含 photo_id 和 update_ai_analysis 的字段，返回更新的行数"""
+        rows = []
+        for item in results:
+            values = self._analysis_values(item)
+            if values:
+                rows.append({"photo_id": item["photo_id"], **values})
+        updated = await self.update_many(rows, key="photo_id", batch_size=batch_size)
+        if updated:
+            scenes = {row["photo_id"]: row["scene_type"] for row in rows if "scene_type" in row}
+            await self._changed([row["photo_id"] for row in rows], scenes)
+        return updated
+
+    @staticmethod
+    def _analysis_values(data: Mapping[str, Any]) -> Dict[str, Any]:
+        """AI分析字段中非None的值"""
+        return {
+            field: data[field] for field in _ANALYSIS_FIELDS
+            if data.get(field) is not None
+        }
+
+    async def get_in_bbox(
+        self,
+        user_id: int,
+        bbox: BoundingBox,
+        *,
+        limit: int = 1000
+    ) -> List[Dict[str, Any]]:
+        """获取位于矩形范围内的照片坐标，只查询 photo_id、latitude、longitude 三列，返回字典列表"""
+        stmt = (
+            select(PhotoMetadata.photo_id, PhotoMetadata.latitude, PhotoMetadata.longitude)
+            .join(Photo, Photo.id == PhotoMetadata.photo_id)
+            .where(and_(Photo.user_id == user_id, Photo.deleted_at.is_(None), self._bbox_condition(bbox)))
+            .limit(limit)
+        )
+        return await self.fetch_rows(stmt)
+
+    async def cluster_by_grid(
+        self,
+        user_id: int,
+        bbox: BoundingBox,
+        zoom: int
+    ) -> List[Dict[str, Any]]:
+        """按Geohash网格聚合范围内的照片，返回每个网格的中心点和数量
+
+        网格大小随缩放级别变化，数据库只返回聚合后的点而不是每张照片的坐标。
+        """
+        cell = func.substr(PhotoMetadata.geohash, 1, geohash_precision_for_zoom(zoom)).label("cell")
+        stmt = (
+            select(
+                cell,
+                func.count(PhotoMetadata.id).label("count"),
+                func.avg(PhotoMetadata.latitude).label("latitude"),
+                func.avg(PhotoMetadata.longitude).label("longitude"),
+                func.min(PhotoMetadata.photo_id).label("sample_photo_id")
+            )
+            .join(Photo, Photo.id == PhotoMetadata.photo_id)
+            .where(and_(Photo.user_id == user_id, Photo.deleted_at.is_(None), self._bbox_condition(bbox)))
+            .group_by(cell)
+            .order_by(func.count(PhotoMetadata.id).desc())
+        )
+        result = await self._session.execute(stmt)
+        return [
+            {
+                "geohash": row.cell,
+                "count": row.count,
+                "latitude": float(row.latitude),
+                "longitude": float(row.longitude),
+                "sample_photo_id": row.sample_photo_id
+            }
+            for row in result.all()
+        ]
+
+    async def search_by_exif(
+        self,
+        user_id: int,
+        *,
+        camera_make: Optional[str] = None,
+        camera_model: Optional[str] = None,
+        lens_model: Optional[str] = None,
+        min_iso: Optional[int] = None,
+        max_iso: Optional[int] = None,
+        min_focal_length: Optional[float] = None,
+        max_focal_length: Optional[float] = None,
+        min_aperture: Optional[float] = None,
+        max_aperture: Optional[float] = None,
+        captured_range: Optional[Tuple[datetime, datetime]] = None,
+        limit: int = 100
+    ) -> List[int]:
+        """按拍摄参数筛选照片，例如某支镜头 ISO>3200 的照片；条件都落在带索引的提取列上，返回照片ID"""
+        conditions = [Photo.user_id == user_id, Photo.deleted_at.is_(None)]
+        equals = (
+            (PhotoMetadata.camera_make, camera_make),
+            (PhotoMetadata.camera_model, camera_model),
+            (PhotoMetadata.lens_model, lens_model),
+        )
+        conditions += [column == value for column, value in equals if value is not None]
+        ranges = (
+            (PhotoMetadata.iso, min_iso, max_iso),
+            (PhotoMetadata.focal_length, min_focal_length, max_focal_length),
+            (PhotoMetadata.aperture, min_aperture, max_aperture),
+        )
+        for column, low, high in ranges:
+            if low is not None:
+                conditions.append(column >= low)
+            if high is not None:
+                conditions.append(column <= high)
+        if captured_range is not None:
+            conditions.append(PhotoMetadata.captured_at.between(*captured_range))
+
+        stmt = (
+            select(PhotoMetadata.photo_id)
+            .join(Photo, Photo.id == PhotoMetadata.photo_id)
+            .where(and_(*conditions))
+            .order_by(PhotoMetadata.photo_id.desc())
+            .limit(limit)
+        )
+        result = await self._session.execute(stmt)
+        return list(result.scalars().all())
 
     async def get_photos_by_scene(
         self,
@@ -115,3 +325,49 @@ class PhotoMetadataDAO(BaseDAO[PhotoMetadata]):
             "average_faces_per_photo": float(row.avg_faces) if row.avg_faces else 0.0,
             "total_scenes_analyzed": row.scenes_analyzed
         }
+
+    @staticmethod
+    def _bbox_condition(bbox: BoundingBox):
+        """构建矩形范围条件，支持跨越180度经线的范围"""
+        south, west, north, east = bbox
+        lat_condition = PhotoMetadata.latitude.between(south, north)
+        if west <= east:
+            lon_condition = PhotoMetadata.longitude.between(west, east)
+        else:
+            lon_condition = or_(
+                PhotoMetadata.longitude >= west,
+                PhotoMetadata.longitude <= east
+            )
+        return and_(lat_condition, lon_condition)
+
+    @staticmethod
+    def _with_exif(data: Dict[str, Any]) -> Dict[str, Any]:
+        """把 raw_exif 转换为压缩列和提取字段（显式传入的提取字段优先）"""
+        if "raw_exif" not in data:
+            return data
+        data = dict(data)
+        exif = data.pop("raw_exif")
+        data["exif_blob"] = compress_exif(exif) if exif is not None else None
+        for field, value in extract_fields(exif).items():
+            data.setdefault(field, value)
+        return data
+
+    @classmethod
+    def _with_location(cls, data: Dict[str, Any]) -> Dict[str, Any]:
+        """压缩EXIF，并补全经纬度和Geohash字段
+
+        没有显式传入经纬度时按 raw_exif 重新解析，新的EXIF没有定位信息时清除旧的位置。
+        """
+        has_exif = "raw_exif" in data
+        exif = data.get("raw_exif")
+        data = cls._with_exif(data)
+        if data.get("latitude") is None or data.get("longitude") is None:
+            location = parse_gps(exif)
+            if location is None:
+                if has_exif:
+                    data.update(latitude=None, longitude=None, geohash=None)
+                return data
+            data["latitude"], data["longitude"] = location
+        if data.get("geohash") is None:
+            data["geohash"] = encode_geohash(data["latitude"], data["longitude"])
+        return data
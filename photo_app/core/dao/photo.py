@@ -1,13 +1,152 @@
-from datetime import datetime
-from typing import List, Optional, Tuple
-from sqlalchemy import select, and_, or_, func
-from sqlalchemy.orm import selectinload
+import asyncio
+import base64
+import os
+from collections import Counter
+from datetime import datetime, timezone
+from functools import partial
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import DateTime, LargeBinary, Row, select, and_, or_, func, inspect, update
+from sqlalchemy.orm import make_transient_to_detached, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
 
 from photo_app.core.models.photo import Photo, PhotoMetadata
 from photo_app.core.models.tag import Tag
 from photo_app.core.models.album import Album
 from photo_app.core.dao.base import BaseDAO
+from photo_app.core.dao.projections import DETAIL, GRID, get_projection
+from photo_app.core.dao.timeline import TimelineDAO
+from photo_app.core.dao.transaction import has_writes
+from photo_app.core.services.invalidation import REBUILD, index_changed
+from photo_app.core.services.search_index import SearchIndex, SearchIndexRegistry, search_indexes
+from photo_app.core.utils.singleflight import FlightCodec, flight_key, read_flights
+
+# 列表接口返回的列
+LIST_COLUMNS = (
+    Photo.id,
+    Photo.filename,
+    Photo.size,
+    Photo.upload_date,
+    Photo.taken_at,
+    Photo.storage_status,
+    Photo.backup_status,
+    Photo.is_encrypted,
+    Photo.version,
+)
+
+# 未被软删除的照片，所有查询默认带上该条件
+NOT_DELETED = Photo.deleted_at.is_(None)
+
+# 批量软删除时每条语句的最大ID数
+DELETE_BATCH_SIZE = 500
+
+# 列表排序方式：上传时间或拍摄时间（均以照片ID作为次要排序键，与复合索引一致）
+ORDER_UPLOAD_DATE = "upload_date"
+ORDER_TAKEN_AT = "taken_at"
+_ORDER_COLUMNS = {
+    ORDER_UPLOAD_DATE: Photo.upload_date,
+    ORDER_TAKEN_AT: Photo.taken_at,
+}
+
+
+def order_column(order_by: str):
+    """排序方式对应的列，未知时抛出ValueError"""
+    try:
+        return _ORDER_COLUMNS[order_by]
+    except KeyError:
+        raise ValueError(f"Unknown ordering: {order_by}") from None
+
+
+def _ordering(order_by: str, descending: bool = True) -> tuple:
+    column = order_column(order_by)
+    if descending:
+        return column.desc(), Photo.id.desc()
+    return column.asc(), Photo.id.asc()
+
+
+def _file_mtime(filepath: Optional[str]) -> Optional[datetime]:
+    try:
+        return datetime.fromtimestamp(os.stat(filepath).st_mtime, timezone.utc)
+    except (OSError, TypeError, ValueError):
+        return None
+
+
+def _remove_photos(photo_ids: List[int], index: SearchIndex) -> None:
+    for photo_id in photo_ids:
+        index.remove_photo(photo_id)
+
+
+def _dump_columns(instance) -> Dict[str, object]:
+    values = {}
+    for attr in instance.__mapper__.column_attrs:
+        value = getattr(instance, attr.key)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        elif isinstance(value, bytes):
+            value = base64.b64encode(value).decode("ascii")
+        values[attr.key] = value
+    return values
+
+
+def _load_columns(model, values: Dict[str, object]):
+    """按列类型还原值，构造处于分离状态的对象，可以用 merge(load=False) 合并"""
+    kwargs = {}
+    for attr in model.__mapper__.column_attrs:
+        value = values[attr.key]
+        column_type = attr.columns[0].type
+        if value is not None and isinstance(column_type, DateTime):
+            value = datetime.fromisoformat(value)
+        elif value is not None and isinstance(column_type, LargeBinary):
+            value = base64.b64decode(value)
+        kwargs[attr.key] = value
+    return model(**kwargs)
+
+
+def _encode_photo(photo: Photo) -> Dict[str, object]:
+    data = {"photo": _dump_columns(photo)}
+    unloaded = inspect(photo).unloaded
+    if "photo_metadata" not in unloaded:
+        metadata = photo.photo_metadata
+        data["photo_metadata"] = _dump_columns(metadata) if metadata is not None else None
+    if "tags" not in unloaded:
+        data["tags"] = [_dump_columns(tag) for tag in photo.tags]
+    return data
+
+
+def _decode_photo(data: Dict[str, object]) -> Photo:
+    photo = _load_columns(Photo, data["photo"])
+    # 只还原领头方已加载的关系；set_committed_value 不触发反向关系
+    if "photo_metadata" in data:
+        metadata = data["photo_metadata"]
+        if metadata is not None:
+            metadata = _load_columns(PhotoMetadata, metadata)
+            make_transient_to_detached(metadata)
+        set_committed_value(photo, "photo_metadata", metadata)
+    if "tags" in data:
+        tags = [_load_columns(Tag, tag) for tag in data["tags"]]
+        for tag in tags:
+            make_transient_to_detached(tag)
+        set_committed_value(photo, "tags", tags)
+    make_transient_to_detached(photo)
+    return photo
+
+
+def _encode_result(result):
+    if isinstance(result, list):
+        return [_encode_photo(photo) for photo in result]
+    return None if result is None else _encode_photo(result)
+
+
+def _decode_result(data):
+    if isinstance(data, list):
+        return [_decode_photo(item) for item in data]
+    return None if data is None else _decode_photo(data)
+
+
+# 合并读取的结果（单张照片、None 或照片列表）在工作进程之间以JSON传递
+PHOTO_CODEC = FlightCodec(_encode_result, _decode_result)
+
 
 class PhotoDAO(BaseDAO[Photo]):
     """照片数据访问对象，实现照片相关的所有数据库操作"""
@@ -15,15 +154,114 @@ class PhotoDAO(BaseDAO[Photo]):
     def __init__(self, session: AsyncSession):
         super().__init__(session, Photo)
 
-    async def get_with_metadata(self, photo_id: int) -> Optional[Photo]:
-        """获取照片及其元数据"""
+    async def create(self, **kwargs) -> Photo:
+        """创建照片记录，并同步时间轴计数和已加载的搜索索引
+
+        未指定 taken_at 时先取文件修改时间，写入元数据时再由EXIF拍摄时间覆盖
+        （见 PhotoMetadataDAO），都没有时使用上传时间。
+        """
+        if kwargs.get("taken_at") is None:
+            taken_at = await asyncio.to_thread(_file_mtime, kwargs.get("filepath"))
+            kwargs["taken_at"] = taken_at or kwargs.get("upload_date") or datetime.now(timezone.utc)
+        photo = await super().create(**kwargs)
+        if photo.user_id is not None:
+            await TimelineDAO(self._session).increment(photo.user_id, photo.upload_date.date())
+            photo_id = photo.id
+            await index_changed(self._session, photo.user_id, lambda index: index.add_photo(photo_id))
+        return photo
+
+    async def get(self, id: int) -> Optional[Photo]:
+        """通过ID获取未删除的照片"""
+        photo = await super().get(id)
+        return photo if photo is not None and photo.deleted_at is None else None
+
+    async def delete(self, id: int) -> bool:
+        """软删除照片，记录和文件由 PhotoPurger 在后台清除"""
+        return await self.delete_many([id]) > 0
+
+    async def delete_many(self, photo_ids: Iterable[int], *, user_id: Optional[int] = None) -> int:
+        """批量软删除照片，返回删除的数量
+
+        只设置 deleted_at，并同步时间轴计数和已加载的搜索索引；
+        关联行、文件和缩略图的删除以及存储配额的返还都交给 PhotoPurger，请求可以立即返回。
+        指定 user_id 时只删除该用户的照片。
+        """
+        photo_ids = list(photo_ids)
+        now = datetime.now(timezone.utc)
+        deltas: Dict[int, Counter] = {}
+        removed: Dict[int, List[int]] = {}
+        deleted = 0
+        for start in range(0, len(photo_ids), DELETE_BATCH_SIZE):
+            conditions = [Photo.id.in_(photo_ids[start:start + DELETE_BATCH_SIZE]), NOT_DELETED]
+            if user_id is not None:
+                conditions.append(Photo.user_id == user_id)
+            stmt = (
+                update(Photo)
+                .where(*conditions)
+                .values(deleted_at=now)
+                .returning(Photo.id, Photo.user_id, Photo.upload_date)
+            )
+            for row in (await self._session.execute(stmt)).all():
+                deleted += 1
+                if row.user_id is not None:
+                    deltas.setdefault(row.user_id, Counter())[row.upload_date.date()] -= 1
+                    removed.setdefault(row.user_id, []).append(row.id)
+
+        timeline = TimelineDAO(self._session)
+        for owner_id, days in deltas.items():
+            await timeline.apply_deltas(owner_id, days)
+        for owner_id, ids in removed.items():
+            await index_changed(self._session, owner_id, partial(_remove_photos, ids), REBUILD)
+        return deleted
+
+    async def restore(self, photo_id: int) -> bool:
+        """恢复尚未被清除的软删除照片"""
         stmt = (
-            select(Photo)
-            .options(selectinload(Photo.photo_metadata))
-            .where(Photo.id == photo_id)
+            update(Photo)
+            .where(Photo.id == photo_id, Photo.deleted_at.isnot(None))
+            .values(deleted_at=None)
+            .returning(Photo.user_id, Photo.upload_date)
         )
-        result = await self._session.execute(stmt)
-        return result.scalar_one_or_none()
+        row = (await self._session.execute(stmt)).one_or_none()
+        if row is None:
+            return False
+        if row.user_id is not None:
+            await TimelineDAO(self._session).increment(row.user_id, row.upload_date.date())
+            # 软删除时照片已从所有标签、相册和场景中移除，恢复时重建索引
+            await index_changed(self._session, row.user_id, REBUILD, REBUILD)
+        return True
+
+    async def get_with_metadata(self, photo_id: int) -> Optional[Photo]:
+        """获取照片及其元数据；并发的相同请求共享一次查询"""
+        async def query() -> Optional[Photo]:
+            stmt = (
+                select(Photo)
+                .options(selectinload(Photo.photo_metadata))
+                .where(Photo.id == photo_id, NOT_DELETED)
+            )
+            result = await self._session.execute(stmt)
+            return result.scalar_one_or_none()
+
+        return await self._shared_read(flight_key("photo_with_metadata", photo_id=photo_id), query)
+
+    async def _shared_read(self, key: str, query: Callable[[], Awaitable]):
+        """与其他会话中同时进行的相同查询共享一次执行，结果对象合并到当前会话
+
+        当前事务已有写入（包括未刷新的修改）时单独查询：既要读到自己的写入，
+        也不能作为领头方把未提交的数据交给其他会话。
+        """
+        if has_writes(self._session):
+            return await query()
+        result = await read_flights.do(key, query, PHOTO_CODEC)
+        if isinstance(result, list):
+            return [await self._adopt(photo) for photo in result]
+        return await self._adopt(result)
+
+    async def _adopt(self, photo: Optional[Photo]) -> Optional[Photo]:
+        if photo is None or photo in self._session:
+            return photo
+        # load=False 只复制已加载的属性和关系，不访问数据库
+        return await self._session.merge(photo, load=False)
 
     async def get_by_user(
         self,
@@ -31,23 +269,89 @@ class PhotoDAO(BaseDAO[Photo]):
         *,
         skip: int = 0,
         limit: int = 50,
-        include_metadata: bool = False
+        include_metadata: bool = False,
+        before: Optional[datetime] = None,
+        order_by: str = ORDER_UPLOAD_DATE
     ) -> List[Photo]:
-        """获取用户的照片列表"""
-        stmt = (
-            select(Photo)
-            .where(Photo.user_id == user_id)
-            .offset(skip)
-            .limit(limit)
-            .order_by(Photo.upload_date.desc())
-        )
-        
+        """获取用户的照片列表
+
+        before 用于时间轴跳转：只返回排序时间早于该时间的照片，
+        配合 TimelineDAO.get_cursor 可直接定位到某个月份（时间桶按上传日期统计，仅适用于按上传时间排序）。
+        order_by 为 taken_at 时按拍摄时间排序，走 (user_id, taken_at, id) 索引。
+        """
+        stmt = self._user_page(select(Photo), user_id, skip, limit, before, order_by)
         if include_metadata:
             stmt = stmt.options(selectinload(Photo.photo_metadata))
-            
+
         result = await self._session.execute(stmt)
         return list(result.scalars().all())
 
+    def _build_query(self) -> Select:
+        return select(Photo).where(NOT_DELETED)
+
+    @staticmethod
+    def _projected_query(projection: str) -> Select:
+        """只查询投影中的列，需要元数据列时左连接元数据表"""
+        photo_columns, metadata_columns = get_projection(projection)
+        stmt = select(*photo_columns, *metadata_columns).select_from(Photo).where(NOT_DELETED)
+        if metadata_columns:
+            stmt = stmt.outerjoin(PhotoMetadata, PhotoMetadata.photo_id == Photo.id)
+        return stmt
+
+    @staticmethod
+    def _user_page(
+        stmt: Select,
+        user_id: int,
+        skip: int,
+        limit: int,
+        before: Optional[datetime],
+        order_by: str = ORDER_UPLOAD_DATE
+    ) -> Select:
+        conditions = [Photo.user_id == user_id, NOT_DELETED]
+        if before is not None:
+            conditions.append(order_column(order_by) < before)
+        return (
+            stmt.where(and_(*conditions))
+            .offset(skip)
+            .limit(limit)
+            .order_by(*_ordering(order_by))
+        )
+
+    async def get_projected(self, photo_id: int, projection: str = DETAIL) -> Optional[Row]:
+        """按投影获取单张照片，例如详情页使用 detail 投影"""
+        stmt = self._projected_query(projection).where(Photo.id == photo_id)
+        result = await self._session.execute(stmt)
+        return result.one_or_none()
+
+    async def get_projected_by_user(
+        self,
+        user_id: int,
+        *,
+        projection: str = GRID,
+        skip: int = 0,
+        limit: int = 50,
+        before: Optional[datetime] = None,
+        order_by: str = ORDER_UPLOAD_DATE
+    ) -> List[Row]:
+        """与 get_by_user 相同的分页，按投影只查询需要的列，返回 Row 对象"""
+        stmt = self._user_page(self._projected_query(projection), user_id, skip, limit, before, order_by)
+        result = await self._session.execute(stmt)
+        return list(result.all())
+
+    async def get_rows_by_user(
+        self,
+        user_id: int,
+        *,
+        skip: int = 0,
+        limit: int = 50,
+        before: Optional[datetime] = None,
+        projection: Optional[str] = None,
+        order_by: str = ORDER_UPLOAD_DATE
+    ) -> List[dict]:
+        """与 get_by_user 相同的分页，返回字典；未指定投影时查询 LIST_COLUMNS"""
+        stmt = self._projected_query(projection) if projection else select(*LIST_COLUMNS).where(NOT_DELETED)
+        return await self.fetch_rows(self._user_page(stmt, user_id, skip, limit, before, order_by))
+
     async def search(
         self,
         user_id: int,
@@ -57,10 +361,31 @@ class PhotoDAO(BaseDAO[Photo]):
         date_range: Optional[Tuple[datetime, datetime]] = None,
         filename: Optional[str] = None,
         skip: int = 0,
-        limit: int = 50
+        limit: int = 50,
+        order_by: str = ORDER_UPLOAD_DATE
     ) -> List[Photo]:
-        """高级搜索功能"""
-        conditions = [Photo.user_id == user_id]
+        """高级搜索功能，date_range 作用于排序所用的时间列；并发的相同搜索共享一次查询"""
+        key = flight_key(
+            "photo_search", user_id=user_id, tags=frozenset(tags) if tags else None,
+            album_id=album_id, date_range=date_range, filename=filename,
+            skip=skip, limit=limit, order_by=order_by,
+        )
+        return await self._shared_read(
+            key, lambda: self._search(user_id, tags, album_id, date_range, filename, skip, limit, order_by)
+        )
+
+    async def _search(
+        self,
+        user_id: int,
+        tags: Optional[List[str]],
+        album_id: Optional[int],
+        date_range: Optional[Tuple[datetime, datetime]],
+        filename: Optional[str],
+        skip: int,
+        limit: int,
+        order_by: str
+    ) -> List[Photo]:
+        conditions = [Photo.user_id == user_id, NOT_DELETED]
         
         if tags:
             tag_condition = Photo.tags.any(Tag.name.in_(tags))
@@ -72,9 +397,10 @@ class PhotoDAO(BaseDAO[Photo]):
             
         if date_range:
             start_date, end_date = date_range
+            date_column = order_column(order_by)
             date_condition = and_(
-                Photo.upload_date >= start_date,
-                Photo.upload_date <= end_date
+                date_column >= start_date,
+                date_column <= end_date
             )
             conditions.append(date_condition)
             
@@ -88,12 +414,39 @@ class PhotoDAO(BaseDAO[Photo]):
             .options(selectinload(Photo.tags))
             .offset(skip)
             .limit(limit)
-            .order_by(Photo.upload_date.desc())
+            .order_by(*_ordering(order_by))
         )
         
         result = await self._session.execute(stmt)
         return list(result.scalars().all())
 
+    async def search_expression(
+        self,
+        user_id: int,
+        expression: str,
+        *,
+        skip: int = 0,
+        limit: int = 50,
+        registry: Optional[SearchIndexRegistry] = None
+    ) -> List[Photo]:
+        """布尔标签表达式搜索，例如 "beach AND 2023 AND NOT screenshot"
+
+        表达式在内存位图索引上求值，数据库只加载最终一页照片，结果按ID倒序。
+        """
+        index = await (registry or search_indexes).get(self._session, user_id)
+        page_ids = index.evaluate(expression).page(skip, limit, descending=True)
+        if not page_ids:
+            return []
+
+        stmt = (
+            select(Photo)
+            .where(and_(Photo.id.in_(page_ids), Photo.user_id == user_id, NOT_DELETED))
+            .options(selectinload(Photo.tags))
+        )
+        result = await self._session.execute(stmt)
+        photos = {photo.id: photo for photo in result.scalars().all()}
+        return [photos[photo_id] for photo_id in page_ids if photo_id in photos]
+
     async def get_storage_stats(self, user_id: int) -> dict:
         """获取存储统计信息"""
         stmt = (
@@ -102,7 +455,7 @@ class PhotoDAO(BaseDAO[Photo]):
                 func.sum(Photo.size).label("total_size"),
                 func.avg(Photo.size).label("avg_size")
             )
-            .where(Photo.user_id == user_id)
+            .where(Photo.user_id == user_id, NOT_DELETED)
         )
         result = await self._session.execute(stmt)
         row = result.one()
@@ -115,20 +468,22 @@ class PhotoDAO(BaseDAO[Photo]):
     async def get_backup_candidates(
         self,
         user_id: int,
-        limit: int = 50
+        limit: int = 50,
+        order_by: str = ORDER_UPLOAD_DATE
     ) -> List[Photo]:
-        """获取需要备份的照片"""
+        """获取需要备份的照片，最早的优先"""
         stmt = (
             select(Photo)
             .where(
                 and_(
                     Photo.user_id == user_id,
+                    NOT_DELETED,
                     Photo.backup_status == "pending",
                     Photo.storage_status == "completed"
                 )
             )
             .limit(limit)
-            .order_by(Photo.upload_date.asc())
+            .order_by(*_ordering(order_by, descending=False))
         )
         result = await self._session.execute(stmt)
         return list(result.scalars().all())
@@ -149,7 +504,12 @@ class PhotoDAO(BaseDAO[Photo]):
             
         return await self.update(photo_id, **update_data) is not None
 
-    async def get_by_tag(self, tag_name: str, user_id: int) -> List[Photo]:
+    async def get_by_tag(
+        self,
+        tag_name: str,
+        user_id: int,
+        order_by: str = ORDER_UPLOAD_DATE
+    ) -> List[Photo]:
         """获取指定标签的照片"""
         stmt = (
             select(Photo)
@@ -157,11 +517,12 @@ class PhotoDAO(BaseDAO[Photo]):
             .where(
                 and_(
                     Photo.user_id == user_id,
+                    NOT_DELETED,
                     Tag.name == tag_name
                 )
             )
             .options(selectinload(Photo.tags))
-            .order_by(Photo.upload_date.desc())
+            .order_by(*_ordering(order_by))
         )
         result = await self._session.execute(stmt)
         return list(result.scalars().all())
@@ -172,7 +533,8 @@ class PhotoDAO(BaseDAO[Photo]):
         tag_name: str,
         *,
         skip: int = 0,
-        limit: int = 50
+        limit: int = 50,
+        order_by: str = ORDER_UPLOAD_DATE
     ) -> List[Photo]:
         """获取指定标签的照片"""
         stmt = (
@@ -181,12 +543,13 @@ class PhotoDAO(BaseDAO[Photo]):
             .where(
                 and_(
                     Photo.user_id == user_id,
+                    NOT_DELETED,
                     Tag.name == tag_name
                 )
             )
             .offset(skip)
             .limit(limit)
-            .order_by(Photo.upload_date.desc())
+            .order_by(*_ordering(order_by))
         )
         result = await self._session.execute(stmt)
         return list(result.scalars().all())
@@ -0,0 +1,67 @@
+"""查询投影配置
+
+列表和详情页只需要照片的少数几列，加载整行 PhotoMetadata（压缩的完整EXIF、
+face_locations 最长1000字符）会让每页读取和传输的数据量成倍增加。
+这里按使用场景定义命名投影，DAO 只查询投影中的列，返回轻量的 Row 对象。
+
+投影：
+- grid: 网格视图，只有ID（即缩略图键，见 thumbnail_path）、版本号、上传和拍摄时间，不连接元数据表
+- detail: 详情页，照片基本信息、常用元数据和拍摄参数，不含 exif_blob / face_locations
+- full: 两张表的全部列
+"""
+
+from typing import Dict, Tuple
+
+from sqlalchemy import Column
+
+from photo_app.core.models.photo import Photo, PhotoMetadata
+
+GRID = "grid"
+DETAIL = "detail"
+FULL = "full"
+
+_GRID_PHOTO = (Photo.id, Photo.upload_date, Photo.taken_at, Photo.version)
+
+_DETAIL_PHOTO = _GRID_PHOTO + (
+    Photo.filename,
+    Photo.size,
+    Photo.storage_status,
+    Photo.backup_status,
+    Photo.is_encrypted,
+)
+_DETAIL_METADATA = (
+    PhotoMetadata.color_profile,
+    PhotoMetadata.dominant_colors,
+    PhotoMetadata.faces_detected,
+    PhotoMetadata.scene_type,
+    PhotoMetadata.scene_confidence,
+    PhotoMetadata.aesthetic_score,
+    PhotoMetadata.latitude,
+    PhotoMetadata.longitude,
+    PhotoMetadata.camera_make,
+    PhotoMetadata.camera_model,
+    PhotoMetadata.lens_model,
+    PhotoMetadata.iso,
+    PhotoMetadata.focal_length,
+    PhotoMetadata.aperture,
+    PhotoMetadata.captured_at,
+)
+
+_FULL_PHOTO = tuple(Photo.__table__.c)
+# 元数据表的 id / photo_id 与照片列重名，不放入投影
+_FULL_METADATA = tuple(c for c in PhotoMetadata.__table__.c if c.key not in ("id", "photo_id"))
+
+# 投影名 -> (照片列, 元数据列)
+PROJECTIONS: Dict[str, Tuple[Tuple[Column, ...], Tuple[Column, ...]]] = {
+    GRID: (_GRID_PHOTO, ()),
+    DETAIL: (_DETAIL_PHOTO, _DETAIL_METADATA),
+    FULL: (_FULL_PHOTO, _FULL_METADATA),
+}
+
+
+def get_projection(name: str) -> Tuple[Tuple[Column, ...], Tuple[Column, ...]]:
+    """按名称获取投影的列，名称未知时抛出ValueError"""
+    try:
+        return PROJECTIONS[name]
+    except KeyError:
+        raise ValueError(f"Unknown projection: {name}") from None
@@ -0,0 +1,155 @@
+from datetime import datetime
+from functools import partial
+from typing import Callable, Dict, Iterable, List, Optional
+from sqlalchemy import select, delete, literal
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from photo_app.core.models.photo import Photo
+from photo_app.core.models.tag import Tag, photo_tags
+from photo_app.core.dao.base import BaseDAO
+from photo_app.core.dao.photo import NOT_DELETED
+from photo_app.core.services.invalidation import adjust_tags, index_changed
+from photo_app.core.services.search_index import SearchIndex
+
+# 单条语句中照片ID的最大数量，避免超出数据库绑定参数上限
+BULK_BATCH_SIZE = 10_000
+
+
+def _apply_tags(
+    method: Callable[[SearchIndex, Iterable[int], str], None],
+    photo_ids_by_name: Dict[str, List[int]],
+    index: SearchIndex
+) -> None:
+    for name, photo_ids in photo_ids_by_name.items():
+        method(index, photo_ids, name)
+
+
+class TagDAO(BaseDAO[Tag]):
+    """标签数据访问对象，提供基于集合SQL的批量打标签操作"""
+
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, Tag)
+
+    async def get_by_name(self, name: str) -> Optional[Tag]:
+        """通过名称获取标签"""
+        stmt = select(Tag).where(Tag.name == name)
+        result = await self._session.execute(stmt)
+        return result.scalar_one_or_none()
+
+    async def ensure_tags(self, names: Iterable[str]) -> Dict[str, int]:
+        """一次UPSERT创建缺失的标签，返回名称到ID的映射"""
+        names = self._normalize_names(names)
+        if not names:
+            return {}
+
+        now = datetime.utcnow()
+        stmt = (
+            self._dialect_insert(Tag.__table__)
+            .values([{"name": name, "created_at": now, "updated_at": now} for name in names])
+            .on_conflict_do_nothing(index_elements=["name"])
+        )
+        await self._session.execute(stmt)
+
+        result = await self._session.execute(
+            select(Tag.name, Tag.id).where(Tag.name.in_(names))
+        )
+        return {name: tag_id for name, tag_id in result.all()}
+
+    async def bulk_assign(
+        self,
+        user_id: int,
+        photo_ids: Iterable[int],
+        tag_names: Iterable[str]
+    ) -> int:
+        """批量为照片添加标签，返回新增的关联数
+
+        使用 INSERT ... SELECT ... ON CONFLICT DO NOTHING 写入 photo_tags，
+        不加载Photo对象，且只会关联属于该用户的未删除照片。
+        RETURNING 返回实际新增的关联，用于增量更新自动补全计数和搜索索引。
+        """
+        names = self._normalize_names(tag_names)
+        ids = sorted(set(photo_ids))
+        if not names or not ids:
+            return 0
+
+        tag_ids = await self.ensure_tags(names)
+        names_by_id = {tag_id: name for name, tag_id in tag_ids.items()}
+
+        added: Dict[str, List[int]] = {}
+        now = datetime.utcnow()
+        for start in range(0, len(ids), BULK_BATCH_SIZE):
+            batch = ids[start:start + BULK_BATCH_SIZE]
+            source = (
+                select(Photo.id, Tag.id, literal(now))
+                .select_from(Photo)
+                .join(Tag, Tag.name.in_(names))
+                .where(Photo.id.in_(batch), Photo.user_id == user_id, NOT_DELETED)
+            )
+            stmt = (
+                self._dialect_insert(photo_tags)
+                .from_select(["photo_id", "tag_id", "added_at"], source)
+                .on_conflict_do_nothing()
+                .returning(photo_tags.c.photo_id, photo_tags.c.tag_id)
+            )
+            result = await self._session.execute(stmt)
+            for photo_id, tag_id in result.all():
+                added.setdefault(names_by_id[tag_id], []).append(photo_id)
+
+        if added:
+            await index_changed(
+                self._session,
+                user_id,
+                partial(_apply_tags, SearchIndex.add_tag, added),
+                adjust_tags({name: len(ids) for name, ids in added.items()})
+            )
+        return sum(len(ids) for ids in added.values())
+
+    async def bulk_remove(
+        self,
+        user_id: int,
+        photo_ids: Iterable[int],
+        tag_names: Iterable[str]
+    ) -> int:
+        """批量移除照片标签，返回删除的关联数"""
+        names = self._normalize_names(tag_names)
+        ids = sorted(set(photo_ids))
+        if not names or not ids:
+            return 0
+
+        result = await self._session.execute(
+            select(Tag.id, Tag.name).where(Tag.name.in_(names))
+        )
+        names_by_id = dict(result.all())
+        if not names_by_id:
+            return 0
+
+        removed: Dict[str, List[int]] = {}
+        for start in range(0, len(ids), BULK_BATCH_SIZE):
+            batch = ids[start:start + BULK_BATCH_SIZE]
+            owned_ids = select(Photo.id).where(Photo.id.in_(batch), Photo.user_id == user_id)
+            stmt = delete(photo_tags).where(
+                photo_tags.c.photo_id.in_(owned_ids),
+                photo_tags.c.tag_id.in_(list(names_by_id))
+            ).returning(photo_tags.c.photo_id, photo_tags.c.tag_id)
+            result = await self._session.execute(stmt)
+            for photo_id, tag_id in result.all():
+                removed.setdefault(names_by_id[tag_id], []).append(photo_id)
+
+        if removed:
+            await index_changed(
+                self._session,
+                user_id,
+                partial(_apply_tags, SearchIndex.remove_tag, removed),
+                adjust_tags({name: -len(ids) for name, ids in removed.items()})
+            )
+        return sum(len(ids) for ids in removed.values())
+
+    @staticmethod
+    def _normalize_names(names: Iterable[str]) -> List[str]:
+        """去除空白和重复的标签名"""
+        normalized = sorted({name.strip() for name in names if name and name.strip()})
+        max_length = Tag.__table__.c.name.type.length
+        too_long = [name for name in normalized if len(name) > max_length]
+        if too_long:
+            raise ValueError(f"Tag name exceeds {max_length} characters: {too_long[0]!r}")
+        return normalized
@@ -0,0 +1,173 @@
+from calendar import monthrange
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Mapping, Optional
+from sqlalchemy import select, delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from photo_app.core.models.photo import Photo
+from photo_app.core.models.timeline import TimelineBucket
+from photo_app.core.dao.base import BaseDAO
+
+GRANULARITIES = ("day", "month", "year")
+
+# 时间桶按上传日期计数，游标只适用于按上传时间排序的列表
+CURSOR_ORDERING = Photo.upload_date.key
+
+class TimelineDAO(BaseDAO[TimelineBucket]):
+    """时间轴数据访问对象，维护按天的照片计数并提供月/年汇总"""
+
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, TimelineBucket)
+
+    async def apply_deltas(self, user_id: int, deltas: Mapping[date, int]) -> None:
+        """增量更新若干天的照片计数"""
+        rows = [
+            {"user_id": user_id, "day": day, "photo_count": delta}
+            for day, delta in deltas.items() if delta
+        ]
+        if not rows:
+            return
+        now = datetime.utcnow()
+        stmt = self._dialect_insert(TimelineBucket).values(
+            [{**row, "created_at": now, "updated_at": now} for row in rows]
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "day"],
+            set_={
+                "photo_count": TimelineBucket.photo_count + stmt.excluded.photo_count,
+                "updated_at": now,
+            }
+        )
+        await self._session.execute(stmt)
+
+    async def increment(self, user_id: int, day: date, delta: int = 1) -> None:
+        """调整某一天的照片计数"""
+        await self.apply_deltas(user_id, {day: delta})
+
+    async def rebuild(self, user_id: int) -> int:
+        """根据photos表重新计算用户的全部桶，返回桶数量"""
+        await self._session.execute(
+            delete(TimelineBucket).where(TimelineBucket.user_id == user_id)
+        )
+        day = func.date(Photo.upload_date)
+        result = await self._session.execute(
+            select(day, func.count(Photo.id))
+            .where(Photo.user_id == user_id, Photo.deleted_at.is_(None))
+            .group_by(day)
+        )
+        deltas = {_as_date(value): count for value, count in result.all()}
+        await self.apply_deltas(user_id, deltas)
+        return len(deltas)
+
+    async def get_days(
+        self,
+        user_id: int,
+        *,
+        start: Optional[date] = None,
+        end: Optional[date] = None
+    ) -> List[TimelineBucket]:
+        """获取非空的天桶，按日期倒序"""
+        stmt = select(TimelineBucket).where(
+            TimelineBucket.user_id == user_id,
+            TimelineBucket.photo_count > 0
+        )
+        if start:
+            stmt = stmt.where(TimelineBucket.day >= start)
+        if end:
+            stmt = stmt.where(TimelineBucket.day <= end)
+        stmt = stmt.order_by(TimelineBucket.day.desc())
+        result = await self._session.execute(stmt)
+        return list(result.scalars().all())
+
+    async def get_histogram(
+        self,
+        user_id: int,
+        granularity: str = "month"
+    ) -> List[Dict[str, Any]]:
+        """获取时间轴直方图，按时间倒序
+
+        Returns:
+            [{"bucket": "2019-03", "count": 42}, ...]，bucket格式随粒度为
+            YYYY-MM-DD / YYYY-MM / YYYY
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unsupported granularity: {granularity}")
+
+        counts: Counter = Counter()
+        for bucket in await self.get_days(user_id):
+            counts[_bucket_key(bucket.day, granularity)] += bucket.photo_count
+        return [
+            {"bucket": key, "count": count}
+            for key, count in sorted(counts.items(), reverse=True)
+        ]
+
+    async def get_cursor(
+        self,
+        user_id: int,
+        year: int,
+        month: Optional[int] = None,
+        day: Optional[int] = None,
+        order_by: str = CURSOR_ORDERING
+    ) -> Dict[str, Any]:
+        """将时间桶映射为分页游标
+
+        时间桶按上传日期统计，offset 和 count 与按拍摄时间排序的列表对不上，
+        order_by 不是 upload_date 时抛出ValueError。
+
+        Returns:
+            before: 桶结束时间（不含），可直接传给 PhotoDAO.get_by_user(before=...) 做索引定位
+            offset: 比该桶更新的照片数量，即该桶第一张照片在倒序列表中的位置
+            count: 桶内照片数量
+        """
+        if order_by != CURSOR_ORDERING:
+            raise ValueError(f"Timeline cursors are only valid for {CURSOR_ORDERING} ordering, not {order_by}")
+        start, end = _bucket_range(year, month, day)
+        newer = await self._session.execute(
+            select(func.coalesce(func.sum(TimelineBucket.photo_count), 0)).where(
+                TimelineBucket.user_id == user_id,
+                TimelineBucket.day >= end
+            )
+        )
+        inside = await self._session.execute(
+            select(func.coalesce(func.sum(TimelineBucket.photo_count), 0)).where(
+                TimelineBucket.user_id == user_id,
+                TimelineBucket.day >= start,
+                TimelineBucket.day < end
+            )
+        )
+        return {
+            "before": datetime.combine(end, datetime.min.time()),
+            "offset": int(newer.scalar_one()),
+            "count": int(inside.scalar_one()),
+        }
+
+
+def _as_date(value: Any) -> date:
+    """SQLite的date()返回字符串，其他数据库返回date"""
+    if isinstance(value, str):
+        return date.fromisoformat(value)
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def _bucket_key(day: date, granularity: str) -> str:
+    if granularity == "year":
+        return f"{day.year:04d}"
+    if granularity == "month":
+        return f"{day.year:04d}-{day.month:02d}"
+    return day.isoformat()
+
+
+def _bucket_range(year: int, month: Optional[int], day: Optional[int]):
+    """返回桶的 [开始, 结束) 日期"""
+    if day is not None:
+        if month is None:
+            raise ValueError("month is required when day is given")
+        start = date(year, month, day)
+        return start, start + timedelta(days=1)
+    if month is not None:
+        start = date(year, month, 1)
+        return start, start + timedelta(days=monthrange(year, month)[1])
+    return date(year, 1, 1), date(year + 1, 1, 1)
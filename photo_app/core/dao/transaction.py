@@ -0,0 +1,72 @@
+"""会话事务状态模块
+
+通过 SQLAlchemy 会话事件跟踪每个会话当前事务的状态，供DAO和服务使用。
+
+提供的功能：
+- has_writes(session): 当前事务是否已经写入数据库（刷新ORM修改或执行 INSERT/UPDATE/DELETE）
+- after_commit(session, callback): 登记一个回调，在当前事务提交之后执行；事务回滚时丢弃
+
+注意事项：
+- 状态保存在 Session.info 中，最外层事务结束（提交或回滚）时清除
+- 回调在提交完成后同步执行，只应做内存中的更新（缓存、索引），不能再访问数据库
+- 单个回调失败只记录日志，不影响其他回调，事务已经提交
+- 在已回滚的保存点（begin_nested）内登记的回调仍会在外层事务提交后执行
+"""
+
+import logging
+from typing import Callable, List, Union
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import ORMExecuteState, Session, SessionTransaction
+
+logger = logging.getLogger(__name__)
+
+_WRITES_KEY = "transaction_has_writes"
+_CALLBACKS_KEY = "transaction_after_commit"
+
+
+def _sync(session: Union[AsyncSession, Session]) -> Session:
+    return session.sync_session if isinstance(session, AsyncSession) else session
+
+
+def has_writes(session: Union[AsyncSession, Session]) -> bool:
+    """当前事务是否有写入（包括尚未刷新的修改）"""
+    sync = _sync(session)
+    return bool(sync.info.get(_WRITES_KEY) or sync.new or sync.dirty or sync.deleted)
+
+
+def after_commit(session: Union[AsyncSession, Session], callback: Callable[[], None]) -> None:
+    """当前事务提交之后执行 callback"""
+    _sync(session).info.setdefault(_CALLBACKS_KEY, []).append(callback)
+
+
+@event.listens_for(Session, "after_flush")
+def _record_flush(session: Session, flush_context) -> None:
+    session.info[_WRITES_KEY] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _record_dml(state: ORMExecuteState) -> None:
+    if state.is_insert or state.is_update or state.is_delete:
+        state.session.info[_WRITES_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _run_callbacks(session: Session) -> None:
+    # 释放保存点也会触发 after_commit，只在最外层事务提交后执行
+    if session.in_nested_transaction():
+        return
+    callbacks: List[Callable[[], None]] = session.info.pop(_CALLBACKS_KEY, [])
+    for callback in callbacks:
+        try:
+            callback()
+        except Exception:
+            logger.exception("after_commit callback failed")
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _reset(session: Session, transaction: SessionTransaction) -> None:
+    if transaction.parent is None:
+        session.info.pop(_WRITES_KEY, None)
+        session.info.pop(_CALLBACKS_KEY, None)
@@ -0,0 +1,186 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import select, delete, update, func, case
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from photo_app.core.models.photo import Photo
+from photo_app.core.models.version import PhotoVersion, StoredChunk
+from photo_app.core.dao.base import BaseDAO
+
+# 批量更新引用计数时每条语句的最大块数
+CHUNK_BATCH_SIZE = 500
+
+DIGEST_SIZE = 32
+
+
+def pack_manifest(digests: Iterable[str]) -> bytes:
+    """十六进制块哈希列表 -> 紧凑的块清单"""
+    return b"".join(bytes.fromhex(d) for d in digests)
+
+
+def unpack_manifest(manifest: bytes) -> List[str]:
+    """块清单 -> 十六进制块哈希列表"""
+    return [
+        manifest[i:i + DIGEST_SIZE].hex()
+        for i in range(0, len(manifest), DIGEST_SIZE)
+    ]
+
+
+class PhotoVersionDAO(BaseDAO[PhotoVersion]):
+    """照片版本及块引用计数数据访问对象"""
+
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, PhotoVersion)
+
+    async def get_version(self, photo_id: int, version: int) -> Optional[PhotoVersion]:
+        """获取照片的指定版本"""
+        stmt = select(PhotoVersion).where(
+            PhotoVersion.photo_id == photo_id,
+            PhotoVersion.version == version
+        )
+        result = await self._session.execute(stmt)
+        return result.scalar_one_or_none()
+
+    async def list_versions(self, photo_id: int) -> List[PhotoVersion]:
+        """获取照片的所有版本，按版本号升序"""
+        stmt = (
+            select(PhotoVersion)
+            .where(PhotoVersion.photo_id == photo_id)
+            .order_by(PhotoVersion.version)
+        )
+        result = await self._session.execute(stmt)
+        return list(result.scalars().all())
+
+    async def add_version(
+        self,
+        photo_id: int,
+        digests: List[str],
+        chunk_sizes: Dict[str, int],
+        content_hash: str
+    ) -> PhotoVersion:
+        """登记新版本：获取块引用、写入版本记录并更新照片的版本号"""
+        await self.acquire_chunks(chunk_sizes)
+        latest = await self._session.execute(
+            select(func.max(PhotoVersion.version)).where(PhotoVersion.photo_id == photo_id)
+        )
+        version = (latest.scalar() or 0) + 1
+        now = datetime.utcnow()
+        instance = await self.create(
+            photo_id=photo_id,
+            version=version,
+            size=sum(chunk_sizes[d] for d in digests),
+            content_hash=content_hash,
+            chunk_count=len(digests),
+            chunk_manifest=pack_manifest(digests),
+            created_at=now
+        )
+        await self._session.execute(
+            update(Photo).where(Photo.id == photo_id).values(version=version, version_date=now)
+        )
+        return instance
+
+    async def remove_version(self, photo_id: int, version: int) -> bool:
+        """删除版本记录并释放其引用的块"""
+        stmt = (
+            delete(PhotoVersion)
+            .where(PhotoVersion.photo_id == photo_id, PhotoVersion.version == version)
+            .returning(PhotoVersion.chunk_manifest)
+        )
+        manifest = (await self._session.execute(stmt)).scalar_one_or_none()
+        if manifest is None:
+            return False
+        await self.release_chunks(set(unpack_manifest(manifest)))
+        return True
+
+    async def remove_all_versions(self, photo_id: int) -> int:
+        """删除照片的全部版本（删除照片前调用）"""
+        stmt = (
+            delete(PhotoVersion)
+            .where(PhotoVersion.photo_id == photo_id)
+            .returning(PhotoVersion.chunk_manifest)
+        )
+        manifests = (await self._session.execute(stmt)).scalars().all()
+        for manifest in manifests:
+            await self.release_chunks(set(unpack_manifest(manifest)))
+        return len(manifests)
+
+    async def remove_versions_of(self, photo_ids: Iterable[int]) -> int:
+        """批量删除多张照片的全部版本（清除照片时调用），返回删除的版本数"""
+        photo_ids = list(photo_ids)
+        removed = 0
+        for start in range(0, len(photo_ids), CHUNK_BATCH_SIZE):
+            stmt = (
+                delete(PhotoVersion)
+                .where(PhotoVersion.photo_id.in_(photo_ids[start:start + CHUNK_BATCH_SIZE]))
+                .returning(PhotoVersion.chunk_manifest)
+            )
+            manifests = (await self._session.execute(stmt)).scalars().all()
+            for manifest in manifests:
+                await self.release_chunks(set(unpack_manifest(manifest)))
+            removed += len(manifests)
+        return removed
+
+    async def acquire_chunks(self, chunk_sizes: Dict[str, int]) -> None:
+        """每个块的引用计数加1，新块插入记录"""
+        digests = list(chunk_sizes)
+        for start in range(0, len(digests), CHUNK_BATCH_SIZE):
+            batch = digests[start:start + CHUNK_BATCH_SIZE]
+            stmt = self._dialect_insert(StoredChunk).values([
+                {"digest": d, "size": chunk_sizes[d], "ref_count": 1, "created_at": datetime.utcnow()}
+                for d in batch
+            ])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["digest"],
+                set_={"ref_count": StoredChunk.ref_count + 1, "released_at": None}
+            )
+            await self._session.execute(stmt)
+
+    async def release_chunks(self, digests: Iterable[str]) -> None:
+        """每个块的引用计数减1，降为0时记录释放时间"""
+        digests = list(digests)
+        now = datetime.utcnow()
+        for start in range(0, len(digests), CHUNK_BATCH_SIZE):
+            stmt = (
+                update(StoredChunk)
+                .where(StoredChunk.digest.in_(digests[start:start + CHUNK_BATCH_SIZE]))
+                .values(
+                    ref_count=StoredChunk.ref_count - 1,
+                    released_at=case(
+                        (StoredChunk.ref_count <= 1, now),
+                        else_=StoredChunk.released_at
+                    )
+                )
+            )
+            await self._session.execute(stmt)
+
+    async def collect_released(self, released_before: datetime, limit: int = 1000) -> List[str]:
+        """删除释放时间早于 released_before 的无引用块记录，返回其哈希
+
+        DELETE 本身再次检查 ref_count，被并发保存重新引用（已锁定）的块在锁释放后重新判断，不会被删除。
+        调用方应在提交前删除块文件。
+        """
+        candidates = (
+            select(StoredChunk.digest)
+            .where(StoredChunk.ref_count <= 0, StoredChunk.released_at < released_before)
+            .limit(limit)
+        )
+        stmt = (
+            delete(StoredChunk)
+            .where(StoredChunk.digest.in_(candidates), StoredChunk.ref_count <= 0)
+            .returning(StoredChunk.digest)
+        )
+        result = await self._session.execute(stmt)
+        return list(result.scalars().all())
+
+    async def existing_digests(self, digests: Iterable[str]) -> set:
+        """返回已登记的块哈希"""
+        digests = list(digests)
+        found = set()
+        for start in range(0, len(digests), CHUNK_BATCH_SIZE):
+            result = await self._session.execute(
+                select(StoredChunk.digest).where(
+                    StoredChunk.digest.in_(digests[start:start + CHUNK_BATCH_SIZE])
+                )
+            )
+            found.update(result.scalars())
+        return found
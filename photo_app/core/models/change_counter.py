@@ -0,0 +1,20 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+
+from photo_app.core.models.base import Base
+
+
+class UserChangeCounter(Base):
+    """用户数据的变更计数，与 max(photos.updated_at) 一起构成列表接口的验证器（ETag / Last-Modified）
+
+    照片行的修改都会更新 photos.updated_at；元数据等不在照片行上的修改递增这里的计数。
+    """
+    __tablename__ = "user_change_counters"
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+
+    # 时间戳
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
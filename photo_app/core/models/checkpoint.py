@@ -0,0 +1,21 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import DateTime, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from photo_app.core.models.base import Base
+
+
+class JobCheckpoint(Base):
+    """后台维护任务的断点：分批运行的任务记录处理到的位置，下次从这里继续"""
+    __tablename__ = "job_checkpoints"
+
+    # 任务名，例如 "orphan_gc:storage"
+    name: Mapped[str] = mapped_column(String(100), primary_key=True)
+    # 任务自定义的位置，例如已处理的最后一个路径
+    position: Mapped[Optional[str]] = mapped_column(String(1024))
+
+    # 时间戳
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
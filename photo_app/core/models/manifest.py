@@ -0,0 +1,24 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import BigInteger, DateTime, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from photo_app.core.models.base import Base
+
+
+class ScanManifestEntry(Base):
+    """文件扫描清单：记录上次扫描时每个文件的状态，用于增量重扫"""
+    __tablename__ = "scan_manifest"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    # 与 Photo.filepath 一致的绝对路径
+    path: Mapped[str] = mapped_column(String(255), nullable=False, unique=True)
+    size: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    mtime_ns: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    inode: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    content_hash: Mapped[Optional[str]] = mapped_column(String(64))
+
+    # 时间戳
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -1,21 +1,31 @@
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Any, Mapping, Optional, Union
 
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, String, Table
+from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, Index, Integer, LargeBinary, String, Table
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from photo_app.core.models.base import Base
+from photo_app.core.utils.exif import compress_exif, decompress_exif, extract_fields, load_exif
 
 # 照片-标签关联表和照片-相册关联表已移至各自的模型文件中
 
 class Photo(Base):
     __tablename__ = "photos"
+    __table_args__ = (
+        Index("ix_photos_user_id_upload_date", "user_id", "upload_date"),
+        Index("ix_photos_user_id_taken_at_id", "user_id", "taken_at", "id"),
+        Index("ix_photos_user_id_updated_at", "user_id", "updated_at"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     filename: Mapped[str] = mapped_column(String(255), nullable=False)
     filepath: Mapped[str] = mapped_column(String(255), nullable=False, unique=True)
     size: Mapped[int] = mapped_column(Integer, nullable=False)
     upload_date: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc))
+    # 拍摄时间：EXIF拍摄时间，没有时取文件修改时间
+    taken_at: Mapped[datetime] = mapped_column(
+        DateTime, nullable=False, default=lambda: datetime.now(timezone.utc)
+    )
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
     
     # 存储状态相关字段
@@ -27,6 +37,10 @@ class Photo(Base):
     backup_status: Mapped[str] = mapped_column(String(20), default="pending")
     backup_path: Mapped[Optional[str]] = mapped_column(String(255))
     restore_status: Mapped[Optional[str]] = mapped_column(String(20))
+
+    # 完整性校验字段（BLAKE2b-256 十六进制摘要）
+    checksum: Mapped[Optional[str]] = mapped_column(String(64))
+    verified_at: Mapped[Optional[datetime]] = mapped_column(DateTime, index=True)
     
     # 加密相关字段
     is_encrypted: Mapped[bool] = mapped_column(Boolean, default=False)
@@ -37,6 +51,9 @@ class Photo(Base):
     version: Mapped[int] = mapped_column(Integer, default=1)
     version_date: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc))
 
+    # 软删除时间：非空的照片不再出现在查询中，由 PhotoPurger 在后台清除
+    deleted_at: Mapped[Optional[datetime]] = mapped_column(DateTime, index=True)
+
     # 关系
     user = relationship("User", back_populates="photos")
     photo_metadata = relationship("PhotoMetadata", back_populates="photo", uselist=False, cascade="all, delete-orphan")
@@ -45,6 +62,11 @@ class Photo(Base):
 
 class PhotoMetadata(Base):
     __tablename__ = "photo_metadata"
+    __table_args__ = (
+        Index("ix_photo_metadata_latitude_longitude", "latitude", "longitude"),
+        Index("ix_photo_metadata_camera", "camera_make", "camera_model"),
+        Index("ix_photo_metadata_lens_iso", "lens_model", "iso"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     photo_id: Mapped[int] = mapped_column(ForeignKey("photos.id"), unique=True)
@@ -57,6 +79,38 @@ class PhotoMetadata(Base):
     blur_score: Mapped[Optional[float]] = mapped_column(Integer)
     exposure_score: Mapped[Optional[float]] = mapped_column(Integer)
     aesthetic_score: Mapped[Optional[float]] = mapped_column(Integer)
-    raw_exif: Mapped[Optional[str]] = mapped_column(String(4000))
+    # 压缩的完整EXIF（见 core.utils.exif），通过 raw_exif / exif 属性读写
+    exif_blob: Mapped[Optional[bytes]] = mapped_column(LargeBinary)
+
+    # 从EXIF提取的筛选字段
+    camera_make: Mapped[Optional[str]] = mapped_column(String(64))
+    camera_model: Mapped[Optional[str]] = mapped_column(String(64))
+    lens_model: Mapped[Optional[str]] = mapped_column(String(128))
+    iso: Mapped[Optional[int]] = mapped_column(Integer, index=True)
+    focal_length: Mapped[Optional[float]] = mapped_column(Float, index=True)
+    aperture: Mapped[Optional[float]] = mapped_column(Float, index=True)
+    captured_at: Mapped[Optional[datetime]] = mapped_column(DateTime, index=True)
+
+    # 地理位置字段（由EXIF GPS解析）
+    latitude: Mapped[Optional[float]] = mapped_column(Float)
+    longitude: Mapped[Optional[float]] = mapped_column(Float)
+    geohash: Mapped[Optional[str]] = mapped_column(String(12), index=True)
 
     photo = relationship("Photo", back_populates="photo_metadata")
+
+    @property
+    def raw_exif(self) -> Optional[str]:
+        """EXIF的JSON文本"""
+        return decompress_exif(self.exif_blob)
+
+    @raw_exif.setter
+    def raw_exif(self, value: Union[Mapping[str, Any], str, None]) -> None:
+        """写入EXIF（字典或JSON文本），同时更新提取字段"""
+        self.exif_blob = compress_exif(value) if value is not None else None
+        for field, field_value in extract_fields(value).items():
+            setattr(self, field, field_value)
+
+    @property
+    def exif(self) -> Optional[Mapping[str, Any]]:
+        """解析后的EXIF字典"""
+        return load_exif(self.raw_exif)
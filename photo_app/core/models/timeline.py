@@ -0,0 +1,19 @@
+from datetime import date, datetime
+
+from sqlalchemy import Date, DateTime, ForeignKey, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+
+from photo_app.core.models.base import Base
+
+
+class TimelineBucket(Base):
+    """按天预聚合的用户照片数量，用于时间轴直方图"""
+    __tablename__ = "timeline_buckets"
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    photo_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+    # 时间戳
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
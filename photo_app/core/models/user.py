@@ -24,6 +24,8 @@ class User(Base):
     
     # 加密相关
     encryption_key: Mapped[Optional[str]] = mapped_column(String(255))
+    # 密钥轮换中的新密钥（包装后），轮换完成后移入 encryption_key
+    pending_encryption_key: Mapped[Optional[str]] = mapped_column(String(255))
     encryption_enabled: Mapped[bool] = mapped_column(Boolean, default=False)
     
     # 备份相关
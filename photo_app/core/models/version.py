@@ -0,0 +1,42 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Integer, LargeBinary, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from photo_app.core.models.base import Base
+
+
+class PhotoVersion(Base):
+    """照片版本：文件内容由按顺序排列的内容寻址块组成"""
+    __tablename__ = "photo_versions"
+    __table_args__ = (
+        UniqueConstraint("photo_id", "version", name="uq_photo_versions_photo_id_version"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    # 不使用数据库级联删除：版本必须经 PhotoVersionDAO 删除以释放块引用
+    photo_id: Mapped[int] = mapped_column(
+        ForeignKey("photos.id", name="fk_photo_versions_photo_id_photos"), nullable=False
+    )
+    version: Mapped[int] = mapped_column(Integer, nullable=False)
+    size: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    content_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    chunk_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    # 块清单：按顺序拼接的32字节块哈希
+    chunk_manifest: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class StoredChunk(Base):
+    """块存储中的数据块及其引用计数（引用它的版本数）"""
+    __tablename__ = "stored_chunks"
+
+    digest: Mapped[str] = mapped_column(String(64), primary_key=True)
+    size: Mapped[int] = mapped_column(Integer, nullable=False)
+    ref_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    # 引用计数降为0的时间，垃圾回收只清理超过宽限期的块
+    released_at: Mapped[Optional[datetime]] = mapped_column(DateTime, index=True)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,150 @@
+"""账户删除模块
+
+删除拥有大量照片的用户时，依赖 User.photos 的ORM级联会把全部子对象加载到内存，并在一个长事务中删除。
+本模块按照片ID范围分批删除用户的数据，每批一个短事务并记录断点，中断后可以继续。
+
+删除顺序：
+1. 停用账户（is_active=False），阻止新的登录和上传
+2. 按ID升序每批取 batch_size 张照片：删除标签关联、相册关联、元数据、版本和照片记录，
+   写入断点并提交，然后删除原图和缩略图
+3. 锁定用户记录后重新检查是否还有照片（停用前已经开始的上传可能在最后一批之后才提交），
+   有则回到第2步；没有则在同一个事务中删除用户的相册（包括其中其他用户照片的关联）、时间轴桶和变更计数
+4. 删除用户记录并清除断点，丢弃内存和磁盘中的搜索索引、补全索引
+
+注意事项：
+- 内存只保存一批照片的信息，与照片总数无关
+- 每批之后提交并暂停 pause 秒，其他用户的写入最多等待一批
+- 文件在记录删除提交之后再删除；在两者之间中断留下的文件由 OrphanCollector 隔离
+- resume_pending 继续所有未完成的账户删除，可在启动时调用
+- 每批之后自行提交会话，调用方应传入专用的会话
+"""
+
+import asyncio
+from dataclasses import dataclass
+from typing import List, Optional
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from photo_app.core.dao.checkpoint import JobCheckpointDAO
+from photo_app.core.models.album import Album, photo_albums
+from photo_app.core.models.change_counter import UserChangeCounter
+from photo_app.core.models.photo import Photo
+from photo_app.core.models.timeline import TimelineBucket
+from photo_app.core.models.user import User
+from photo_app.core.services.autocomplete import autocomplete
+from photo_app.core.services.purge import PurgeReport, delete_photo_rows, remove_photo_files
+from photo_app.core.services.search_index import search_indexes
+
+CHECKPOINT_PREFIX = "account_deletion:"
+
+
+@dataclass
+class AccountDeletionReport(PurgeReport):
+    """账户删除结果（本次运行）"""
+    albums: int = 0
+    # 用户记录是否已删除；False 表示因 max_batches 暂停，下次从断点继续
+    completed: bool = False
+
+
+class AccountDeletionService:
+    """分批、可恢复的账户删除"""
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        *,
+        batch_size: int = 500,
+        concurrency: int = 8,
+        pause: float = 0.05,
+        cache_path: Optional[str] = None
+    ):
+        self._session = session
+        self._batch_size = batch_size
+        self._concurrency = concurrency
+        self._pause = pause
+        self._cache_path = cache_path
+        self._checkpoints = JobCheckpointDAO(session)
+
+    async def delete_user(self, user_id: int, max_batches: Optional[int] = None) -> Optional[AccountDeletionReport]:
+        """删除用户及其全部数据，已有断点时从断点继续；用户不存在时返回None"""
+        name = f"{CHECKPOINT_PREFIX}{user_id}"
+        position = await self._checkpoints.get_position(name)
+        if position is None:
+            result = await self._session.execute(
+                update(User).where(User.id == user_id).values(is_active=False)
+            )
+            if result.rowcount == 0:
+                return None
+            position = "0"
+            await self._checkpoints.save(name, position)
+            await self._session.commit()
+
+        report = AccountDeletionReport()
+        last_id = int(position)
+        batches = 0
+        while True:
+            if max_batches is not None and batches >= max_batches:
+                return report
+            photo_ids = await self._next_batch(user_id, last_id)
+            if not photo_ids:
+                # 照片ID在插入时分配、提交时才可见，晚提交的照片ID可能小于 last_id，从头检查
+                await self._lock_user(user_id)
+                photo_ids = await self._next_batch(user_id, 0)
+                if not photo_ids:
+                    break
+            rows = await delete_photo_rows(self._session, photo_ids, soft_deleted_only=False)
+            last_id = photo_ids[-1]
+            await self._checkpoints.save(name, str(last_id))
+            await self._session.commit()
+
+            await remove_photo_files(rows, report, concurrency=self._concurrency, cache_path=self._cache_path)
+            report.photos += len(rows)
+            report.bytes_freed += sum(row.size for row in rows)
+            batches += 1
+            await asyncio.sleep(self._pause)
+
+        await self._delete_account(user_id, report)
+        await self._checkpoints.clear(name)
+        await self._session.commit()
+        search_indexes.invalidate(user_id)
+        autocomplete.invalidate(user_id)
+        report.completed = True
+        return report
+
+    async def resume_pending(self) -> List[int]:
+        """继续所有未完成的账户删除，返回已完成删除的用户ID"""
+        finished = []
+        for name in await self._checkpoints.list_names(CHECKPOINT_PREFIX):
+            user_id = int(name[len(CHECKPOINT_PREFIX):])
+            report = await self.delete_user(user_id)
+            if report is not None and report.completed:
+                finished.append(user_id)
+        return finished
+
+    async def _next_batch(self, user_id: int, after_id: int) -> List[int]:
+        result = await self._session.execute(
+            select(Photo.id)
+            .where(Photo.user_id == user_id, Photo.id > after_id)
+            .order_by(Photo.id)
+            .limit(self._batch_size)
+        )
+        return list(result.scalars().all())
+
+    async def _lock_user(self, user_id: int) -> None:
+        """在当前事务中锁定用户记录，之后的上传要等到本事务结束
+
+        SQLite 由写语句获取数据库写锁；PostgreSQL 插入照片时对用户行加 KEY SHARE 锁，与 FOR UPDATE 冲突。
+        """
+        await self._session.execute(update(User).where(User.id == user_id).values(is_active=False))
+        await self._session.execute(select(User.id).where(User.id == user_id).with_for_update())
+
+    async def _delete_account(self, user_id: int, report: AccountDeletionReport) -> None:
+        """照片删完之后删除相册、时间轴桶和用户记录"""
+        album_ids = select(Album.id).where(Album.user_id == user_id)
+        await self._session.execute(delete(photo_albums).where(photo_albums.c.album_id.in_(album_ids)))
+        result = await self._session.execute(delete(Album).where(Album.user_id == user_id))
+        report.albums = result.rowcount
+        await self._session.execute(delete(TimelineBucket).where(TimelineBucket.user_id == user_id))
+        await self._session.execute(delete(UserChangeCounter).where(UserChangeCounter.user_id == user_id))
+        await self._session.execute(delete(User).where(User.id == user_id))
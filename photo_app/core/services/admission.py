@@ -0,0 +1,131 @@
+"""请求准入控制模块
+
+在请求进入路由和数据库之前按调用方限流，过载时尽早返回 429，而不是让请求排队等待数据库连接。
+
+检查顺序：
+1. 调用方的总令牌桶（已登录用户按用户ID，匿名请求按客户端IP）
+2. 命中昂贵接口规则时，检查调用方在该接口上的令牌桶
+3. 昂贵接口共享一个全局并发上限，请求结束后释放租约
+
+注意事项：
+- 限流状态默认保存在Redis中，所有工作进程共享；Redis不可用时回退到进程内限流，
+  并在 retry_interval 秒后再尝试Redis
+- 回退期间每个进程各自计数，总体放行量最多为进程数倍
+- 被拒绝的请求仍然消耗前面阶段的令牌，持续重试的调用方会一直被限流
+"""
+
+import logging
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Awaitable, Callable, List, Optional, Sequence
+
+from photo_app.core.config import settings
+from photo_app.core.utils.ratelimit import LimiterUnavailable, LocalLimiter
+from photo_app.infrastructure.limiter.redis_backend import RedisLimiter
+
+logger = logging.getLogger(__name__)
+
+# 并发已满时建议的重试间隔（秒）
+CONCURRENCY_RETRY_AFTER = 1.0
+
+
+@dataclass(frozen=True)
+class RouteRule:
+    """昂贵接口规则：method 与 path 完全匹配时生效"""
+    name: str
+    method: str
+    path: str
+    rate: float
+    burst: float
+
+    def matches(self, method: str, path: str) -> bool:
+        return method == self.method and path.rstrip("/") == self.path
+
+
+@dataclass
+class Decision:
+    """准入结果"""
+    allowed: bool
+    retry_after: float = 0.0
+    # 放行昂贵请求时持有并发租约，请求结束后必须调用
+    release: Optional[Callable[[], Awaitable[None]]] = None
+
+
+def default_rules() -> List[RouteRule]:
+    prefix = settings.API_PREFIX
+    rate, burst = settings.ADMISSION_EXPENSIVE_RATE, settings.ADMISSION_EXPENSIVE_BURST
+    return [
+        RouteRule("export", "GET", f"{prefix}/files/export", rate, burst),
+        RouteRule("bulk_delete", "POST", f"{prefix}/photos/delete", rate, burst),
+        RouteRule("map_clusters", "GET", f"{prefix}/map/clusters", rate, burst),
+    ]
+
+
+class AdmissionController:
+    """按调用方和接口的令牌桶，加上昂贵接口的全局并发上限"""
+
+    def __init__(
+        self,
+        backend=None,
+        *,
+        fallback: Optional[LocalLimiter] = None,
+        rules: Optional[Sequence[RouteRule]] = None,
+        rate: Optional[float] = None,
+        burst: Optional[float] = None,
+        concurrency: Optional[int] = None,
+        lease_ttl: Optional[float] = None,
+        retry_interval: float = 30.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self._backend = backend if backend is not None else RedisLimiter()
+        self._fallback = fallback or LocalLimiter()
+        self._rules = list(rules) if rules is not None else default_rules()
+        self._rate = rate or settings.ADMISSION_USER_RATE
+        self._burst = burst or settings.ADMISSION_USER_BURST
+        self._concurrency = concurrency or settings.ADMISSION_EXPENSIVE_CONCURRENCY
+        self._lease_ttl = lease_ttl or settings.ADMISSION_LEASE_TTL
+        self._retry_interval = retry_interval
+        self._clock = clock
+        self._backend_down_until = 0.0
+
+    def match(self, method: str, path: str) -> Optional[RouteRule]:
+        for rule in self._rules:
+            if rule.matches(method, path):
+                return rule
+        return None
+
+    async def admit(self, identity: str, method: str, path: str) -> Decision:
+        """判断是否放行请求，identity 形如 "user:42" 或 "ip:10.0.0.1" """
+        rule = self.match(method, path)
+        if self._clock() >= self._backend_down_until:
+            try:
+                return await self._admit(self._backend, identity, rule)
+            except LimiterUnavailable as exc:
+                logger.warning("Rate limiter backend unavailable, using in-process limits: %s", exc)
+                self._backend_down_until = self._clock() + self._retry_interval
+        return await self._admit(self._fallback, identity, rule)
+
+    async def _admit(self, backend, identity: str, rule: Optional[RouteRule]) -> Decision:
+        allowed, wait = await backend.take(identity, self._rate, self._burst)
+        if not allowed:
+            return Decision(False, wait)
+        if rule is None:
+            return Decision(True)
+
+        allowed, wait = await backend.take(f"{rule.name}:{identity}", rule.rate, rule.burst)
+        if not allowed:
+            return Decision(False, wait)
+
+        lease_id = uuid.uuid4().hex
+        if not await backend.acquire_slot("expensive", self._concurrency, lease_id, self._lease_ttl):
+            return Decision(False, CONCURRENCY_RETRY_AFTER)
+
+        async def release() -> None:
+            try:
+                await backend.release_slot("expensive", lease_id)
+            except LimiterUnavailable:
+                # 租约在 lease_ttl 后自动过期
+                pass
+
+        return Decision(True, release=release)
@@ -0,0 +1,281 @@
+"""自动补全模块
+
+本模块为标签名、相册名和场景类型提供内存中的前缀索引，按使用次数加权返回前K个建议。
+
+主要组件：
+- PrefixIndex: 有序数组实现的前缀索引，二分定位前缀区间后取权重最高的K项
+- AutocompleteIndex: 单个用户的标签/相册/场景索引集合
+- AutocompleteService: 按用户懒加载索引并接收增量更新
+- autocomplete: 全局服务实例
+
+注意事项：
+- 补全查询只访问内存；索引记录构建时的变更计数，每个用户最多每 VERSION_CHECK_INTERVAL 秒
+  与数据库比较一次（一次主键查询），不一致（其他进程的写入）时重建
+- 本进程的写入在提交后立即生效；其他工作进程的写入最多延迟 VERSION_CHECK_INTERVAL 秒可见，
+  同一用户的重建也最多每个间隔一次
+- 写入通过 services.invalidation.index_changed 登记，提交后应用：标签计数增量更新，
+  相册、场景和照片删除/恢复丢弃索引，下次访问时重建
+- 前缀比较不区分大小写
+"""
+
+import asyncio
+import heapq
+import time
+from bisect import bisect_left, bisect_right
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from photo_app.core.dao.change_counter import UserChangeCounterDAO
+from photo_app.core.dao.transaction import has_writes
+from photo_app.core.models.album import Album, photo_albums
+from photo_app.core.models.photo import Photo, PhotoMetadata
+from photo_app.core.models.tag import Tag, photo_tags
+
+KIND_TAG = "tag"
+KIND_ALBUM = "album"
+KIND_SCENE = "scene"
+KINDS = (KIND_TAG, KIND_ALBUM, KIND_SCENE)
+
+# 与数据库比较变更计数的最小间隔（秒），即其他进程写入后补全结果可能过期的最长时间
+VERSION_CHECK_INTERVAL = 5.0
+
+# 短前缀（命中范围大）的结果会被缓存，缓存条目保存的最大建议数
+CACHED_PREFIX_LENGTH = 2
+CACHED_TOP_K = 20
+
+
+class Suggestion(NamedTuple):
+    kind: str
+    name: str
+    weight: int
+
+
+class PrefixIndex:
+    """有序数组前缀索引"""
+
+    def __init__(self, entries: Iterable[Tuple[str, int]] = ()):
+        items = sorted(
+            ((name.casefold(), name, weight) for name, weight in entries if weight > 0)
+        )
+        self._keys: List[str] = [key for key, _, _ in items]
+        self._names: List[str] = [name for _, name, _ in items]
+        self._weights: List[int] = [weight for _, _, weight in items]
+        self._cache: Dict[str, List[Tuple[str, int]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _find(self, name: str) -> Tuple[int, bool]:
+        key = name.casefold()
+        pos = bisect_left(self._keys, key)
+        while pos < len(self._keys) and self._keys[pos] == key:
+            if self._names[pos] == name:
+                return pos, True
+            if self._names[pos] > name:
+                break
+            pos += 1
+        return pos, False
+
+    def adjust(self, name: str, delta: int) -> None:
+        """调整名称的权重，权重降为0时移除"""
+        if not delta:
+            return
+        pos, found = self._find(name)
+        if found:
+            weight = self._weights[pos] + delta
+            if weight > 0:
+                self._weights[pos] = weight
+            else:
+                del self._keys[pos], self._names[pos], self._weights[pos]
+        elif delta > 0:
+            self._keys.insert(pos, name.casefold())
+            self._names.insert(pos, name)
+            self._weights.insert(pos, delta)
+        else:
+            return
+        self._cache.clear()
+
+    def remove(self, name: str) -> None:
+        pos, found = self._find(name)
+        if found:
+            del self._keys[pos], self._names[pos], self._weights[pos]
+            self._cache.clear()
+
+    def weight(self, name: str) -> int:
+        pos, found = self._find(name)
+        return self._weights[pos] if found else 0
+
+    def top(self, prefix: str, k: int = 10) -> List[Tuple[str, int]]:
+        """返回以prefix开头、权重最高的k个 (名称, 权重)"""
+        key = prefix.casefold()
+        cacheable = len(key) <= CACHED_PREFIX_LENGTH and k <= CACHED_TOP_K
+        if cacheable and key in self._cache:
+            return self._cache[key][:k]
+
+        lo = bisect_left(self._keys, key)
+        hi = bisect_right(self._keys, key + "\U0010ffff", lo)
+        limit = CACHED_TOP_K if cacheable else k
+        weights = self._weights
+        best = heapq.nsmallest(limit, range(lo, hi), key=lambda i: (-weights[i], self._names[i]))
+        result = [(self._names[i], weights[i]) for i in best]
+
+        if cacheable:
+            self._cache[key] = result
+        return result[:k]
+
+
+class AutocompleteIndex:
+    """单个用户的自动补全索引"""
+
+    def __init__(self, user_id: int, entries: Optional[Dict[str, Iterable[Tuple[str, int]]]] = None):
+        self.user_id = user_id
+        entries = entries or {}
+        self.indexes: Dict[str, PrefixIndex] = {
+            kind: PrefixIndex(entries.get(kind, ())) for kind in KINDS
+        }
+        # 索引内容对应的用户变更计数，以及最近一次与数据库核对的时间（time.monotonic）
+        self.version = 0
+        self.checked_at = 0.0
+
+    @classmethod
+    async def build(cls, session: AsyncSession, user_id: int) -> "AutocompleteIndex":
+        """从数据库加载名称和使用次数"""
+        tag_rows = await session.execute(
+            select(Tag.name, func.count())
+            .select_from(photo_tags)
+            .join(Tag, Tag.id == photo_tags.c.tag_id)
+            .join(Photo, Photo.id == photo_tags.c.photo_id)
+            .where(Photo.user_id == user_id, Photo.deleted_at.is_(None))
+            .group_by(Tag.name)
+        )
+        album_rows = await session.execute(
+            select(Album.name, func.count(Photo.id))
+            .select_from(Album)
+            .outerjoin(photo_albums, photo_albums.c.album_id == Album.id)
+            .outerjoin(Photo, and_(Photo.id == photo_albums.c.photo_id, Photo.deleted_at.is_(None)))
+            .where(Album.user_id == user_id)
+            .group_by(Album.name)
+        )
+        scene_rows = await session.execute(
+            select(PhotoMetadata.scene_type, func.count())
+            .join(Photo, Photo.id == PhotoMetadata.photo_id)
+            .where(
+                Photo.user_id == user_id,
+                Photo.deleted_at.is_(None),
+                PhotoMetadata.scene_type.isnot(None)
+            )
+            .group_by(PhotoMetadata.scene_type)
+        )
+        # 空相册也应能被补全，权重至少为1
+        albums = [(name, max(count, 1)) for name, count in album_rows.all()]
+        return cls(user_id, {
+            KIND_TAG: tag_rows.all(),
+            KIND_ALBUM: albums,
+            KIND_SCENE: scene_rows.all(),
+        })
+
+    def suggest(
+        self,
+        prefix: str,
+        k: int = 10,
+        kinds: Optional[Sequence[str]] = None
+    ) -> List[Suggestion]:
+        """返回前缀匹配的建议，多种类型按权重合并"""
+        candidates = [
+            Suggestion(kind, name, weight)
+            for kind in (kinds or KINDS)
+            for name, weight in self.indexes[kind].top(prefix, k)
+        ]
+        return heapq.nsmallest(k, candidates, key=lambda s: (-s.weight, s.name, s.kind))
+
+
+class AutocompleteService:
+    """按用户懒加载的自动补全服务"""
+
+    def __init__(self, check_interval: float = VERSION_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._indexes: Dict[int, AutocompleteIndex] = {}
+        self._locks: Dict[int, asyncio.Lock] = {}
+
+    async def get(self, session: AsyncSession, user_id: int) -> AutocompleteIndex:
+        """获取用户索引
+
+        距上次核对不足 check_interval 秒时直接返回内存中的索引，不访问数据库；
+        否则读取变更计数，未加载或版本与数据库不一致时从数据库加载。
+        """
+        index = self._indexes.get(user_id)
+        now = time.monotonic()
+        writing = has_writes(session)
+        if index is not None and not writing and now - index.checked_at < self.check_interval:
+            return index
+
+        version = await UserChangeCounterDAO(session).get_version(user_id)
+        if index is not None and index.version == version:
+            index.checked_at = now
+            return index
+        if writing:
+            # 加载结果包含会话中未提交的写入，不能缓存
+            return await self._build(session, user_id, version)
+
+        lock = self._locks.setdefault(user_id, asyncio.Lock())
+        async with lock:
+            index = self._indexes.get(user_id)
+            if index is None or index.version != version:
+                index = await self._build(session, user_id, version)
+                self._indexes[user_id] = index
+            return index
+
+    @staticmethod
+    async def _build(session: AsyncSession, user_id: int, version: int) -> AutocompleteIndex:
+        index = await AutocompleteIndex.build(session, user_id)
+        index.version = version
+        index.checked_at = time.monotonic()
+        return index
+
+    def peek(self, user_id: int) -> Optional[AutocompleteIndex]:
+        return self._indexes.get(user_id)
+
+    async def suggest(
+        self,
+        session: AsyncSession,
+        user_id: int,
+        prefix: str,
+        k: int = 10,
+        kinds: Optional[Sequence[str]] = None
+    ) -> List[Suggestion]:
+        """获取补全建议"""
+        index = await self.get(session, user_id)
+        return index.suggest(prefix, k, kinds)
+
+    def invalidate(self, user_id: int) -> None:
+        self._indexes.pop(user_id, None)
+
+    def clear(self) -> None:
+        self._indexes.clear()
+
+    # 增量更新：在事务提交之后调用，仅在索引已加载时生效
+
+    def apply(
+        self,
+        user_id: int,
+        version: int,
+        update: Optional[Callable[[AutocompleteIndex], None]] = None
+    ) -> None:
+        """应用一次已提交的变更，version 为该变更递增后的变更计数，update 为None表示不影响索引内容
+
+        索引版本不是 version - 1 时说明中间有本进程没有看到的变更，丢弃索引，下次访问时重建。
+        """
+        index = self.peek(user_id)
+        if index is None:
+            return
+        if index.version != version - 1:
+            self._indexes.pop(user_id, None)
+            return
+        if update is not None:
+            update(index)
+        index.version = version
+
+
+autocomplete = AutocompleteService()
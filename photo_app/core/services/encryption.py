@@ -0,0 +1,217 @@
+"""照片加密服务
+
+本模块负责批量加密用户照片原图和密钥轮换，文件加解密由 infrastructure.storage.encryption 完成。
+
+工作流程：
+1. 从 User.encryption_key 解包用户密钥
+2. 按批次查询待处理照片，文件级操作提交到线程池（或调用方提供的进程池）并发执行
+   （任务是模块级函数的 partial，可以被进程池序列化）
+3. 每批成功的照片一次性更新 is_encrypted / encryption_method / encryption_date，
+   以及改写后文件的校验和（完整性校验按磁盘上的字节计算，见 services.integrity）
+
+密钥轮换：
+1. 新密钥先写入 User.pending_encryption_key 并提交，之后才改写文件，任何时刻每个文件的密钥都已持久化
+2. 逐个用新密钥重新加密；轮换期间读取方（下载、导出）用 load_user_keys 取得新旧两个密钥，按文件匹配
+3. 全部成功后新密钥移入 encryption_key 并提交；有失败或中途崩溃时再次调用 rotate_key 继续
+
+注意事项：
+- 文件先写临时文件再原子替换，中途失败不会留下半加密的原图
+- 已加密的文件会被跳过，重复执行是安全的
+- 除 rotate_key 外会话由调用方提交
+"""
+
+import asyncio
+import logging
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from functools import partial
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from photo_app.core.models.photo import Photo
+from photo_app.core.models.user import User
+from photo_app.infrastructure.storage.encryption import (
+    ALGORITHM_AES_GCM,
+    DEFAULT_CHUNK_SIZE,
+    ENCRYPTION_METHODS,
+    EncryptionError,
+    encrypt_in_place,
+    generate_key,
+    reencrypt_in_place,
+    unwrap_key,
+    unwrap_keys,
+    wrap_key,
+)
+from photo_app.infrastructure.storage.scanner import hash_file
+
+logger = logging.getLogger(__name__)
+
+
+def _rewrite(job, path: str) -> str:
+    """执行文件改写任务，返回改写后文件的校验和"""
+    job(path)
+    return hash_file(path)
+
+
+@dataclass
+class EncryptionResult:
+    """批量加密结果"""
+    processed: List[int] = field(default_factory=list)
+    # 照片ID -> 失败原因
+    failed: Dict[int, str] = field(default_factory=dict)
+
+
+class PhotoEncryptionService:
+    """照片批量加密服务"""
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        *,
+        executor: Optional[Executor] = None,
+        max_workers: int = 4,
+        batch_size: int = 100,
+        algorithm: str = ALGORITHM_AES_GCM,
+        chunk_size: int = DEFAULT_CHUNK_SIZE
+    ):
+        self._session = session
+        self._executor = executor
+        self._max_workers = max_workers
+        self._batch_size = batch_size
+        self._algorithm = algorithm
+        self._chunk_size = chunk_size
+
+    @property
+    def method(self) -> str:
+        return ENCRYPTION_METHODS[self._algorithm]
+
+    async def enable_for_user(self, user: User) -> bytes:
+        """为用户生成密钥并开启加密；已有密钥时直接返回"""
+        if user.encryption_key:
+            key = unwrap_key(user.encryption_key)
+        else:
+            key = generate_key()
+            user.encryption_key = wrap_key(key)
+        user.encryption_enabled = True
+        await self._session.flush()
+        return key
+
+    @staticmethod
+    def user_key(user: User) -> bytes:
+        """加密新照片使用的密钥；轮换期间为新密钥，避免新文件在轮换完成后无法解密"""
+        if user.pending_encryption_key:
+            return unwrap_key(user.pending_encryption_key)
+        if not user.encryption_key:
+            raise EncryptionError(f"User {user.id} has no encryption key")
+        return unwrap_key(user.encryption_key)
+
+    async def encrypt_photos(
+        self,
+        user_id: int,
+        key: bytes,
+        photo_ids: Optional[Sequence[int]] = None
+    ) -> EncryptionResult:
+        """加密用户尚未加密的照片"""
+        stmt = select(Photo.id, Photo.filepath).where(
+            Photo.user_id == user_id, Photo.is_encrypted.is_(False)
+        )
+        if photo_ids is not None:
+            stmt = stmt.where(Photo.id.in_(photo_ids))
+        rows = (await self._session.execute(stmt.order_by(Photo.id))).all()
+
+        job = partial(encrypt_in_place, key=key, algorithm=self._algorithm, chunk_size=self._chunk_size)
+        return await self._process(rows, job)
+
+    async def rotate_key(self, user: User, new_key: Optional[bytes] = None) -> EncryptionResult:
+        """轮换用户密钥：用新密钥重新加密所有已加密照片，全部成功后才替换存储的密钥
+
+        有失败或中途崩溃时 pending_encryption_key 保持不变，再次调用（可省略 new_key）即可继续，
+        已轮换的文件会被跳过。本方法自行提交会话。
+        """
+        if not user.encryption_key:
+            raise EncryptionError(f"User {user.id} has no encryption key")
+        old_key = unwrap_key(user.encryption_key)
+        if user.pending_encryption_key:
+            pending = unwrap_key(user.pending_encryption_key)
+            if new_key is not None and new_key != pending:
+                raise EncryptionError(f"User {user.id} has an unfinished key rotation")
+            new_key = pending
+        elif new_key is None:
+            raise ValueError("new_key is required to start a key rotation")
+        else:
+            # 先持久化新密钥再改写任何文件
+            user.pending_encryption_key = wrap_key(new_key)
+            await self._session.commit()
+
+        rows = (await self._session.execute(
+            select(Photo.id, Photo.filepath)
+            .where(Photo.user_id == user.id, Photo.is_encrypted.is_(True))
+            .order_by(Photo.id)
+        )).all()
+
+        job = partial(
+            reencrypt_in_place, old_key=old_key, new_key=new_key,
+            algorithm=self._algorithm, chunk_size=self._chunk_size
+        )
+        result = await self._process(rows, job)
+        if not result.failed:
+            user.encryption_key = wrap_key(new_key)
+            user.pending_encryption_key = None
+        await self._session.commit()
+        return result
+
+    async def _process(self, rows, job) -> EncryptionResult:
+        result = EncryptionResult()
+        loop = asyncio.get_running_loop()
+        executor = self._executor or ThreadPoolExecutor(max_workers=self._max_workers)
+        try:
+            for start in range(0, len(rows), self._batch_size):
+                batch = rows[start:start + self._batch_size]
+                outcomes = await asyncio.gather(
+                    *(loop.run_in_executor(executor, partial(_rewrite, job), path) for _, path in batch),
+                    return_exceptions=True,
+                )
+                succeeded: Dict[int, str] = {}
+                for (photo_id, path), outcome in zip(batch, outcomes):
+                    if isinstance(outcome, (OSError, EncryptionError, ValueError)):
+                        logger.warning("Failed to encrypt photo %s (%s): %s", photo_id, path, outcome)
+                        result.failed[photo_id] = str(outcome)
+                    elif isinstance(outcome, BaseException):
+                        raise outcome
+                    else:
+                        succeeded[photo_id] = outcome
+                if succeeded:
+                    await self._mark_encrypted(succeeded)
+                    result.processed.extend(succeeded)
+        finally:
+            if self._executor is None:
+                executor.shutdown(wait=True)
+        return result
+
+    async def _mark_encrypted(self, checksums: Dict[int, str]) -> None:
+        """checksums: 照片ID -> 改写后文件的校验和"""
+        now = datetime.now(timezone.utc)
+        await self._session.execute(
+            update(Photo),
+            [
+                {
+                    "id": photo_id,
+                    "checksum": checksum,
+                    "is_encrypted": True,
+                    "encryption_method": self.method,
+                    "encryption_date": now,
+                }
+                for photo_id, checksum in checksums.items()
+            ],
+        )
+
+
+async def load_user_keys(session: AsyncSession, user_id: int) -> List[bytes]:
+    """用户当前可用于解密的密钥；密钥轮换期间包含新旧两个，新密钥在前"""
+    row = (await session.execute(
+        select(User.pending_encryption_key, User.encryption_key).where(User.id == user_id)
+    )).one_or_none()
+    return unwrap_keys(*row) if row is not None else []
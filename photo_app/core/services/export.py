@@ -0,0 +1,149 @@
+"""照片导出服务
+
+本模块把相册或搜索结果打包为ZIP，边读文件边发送（core.utils.zipstream），
+不经过临时目录，第一个字节立即发出，内存占用与归档大小无关。
+
+工作流程：
+1. for_album / for_search 在请求期间查询出要导出的照片（只取ID、文件名、路径、是否加密）
+   以及解包后的用户密钥，之后的流式发送不再使用数据库会话
+2. ExportArchive.iter_bytes 逐个打开文件，在线程池中分块读取并写入ZIP流
+3. 加密照片按块解密后写入，归档中始终是原图明文
+
+注意事项：
+- 文件不存在的照片会被跳过（记录在 skipped 中），归档中重名的文件会追加序号
+- 文件在发送过程中被截断时ZipStreamError会中断响应，客户端得到不完整的下载而不是损坏的归档
+"""
+
+import logging
+import os
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import AsyncIterator, Callable, List, NamedTuple, Optional, Tuple
+
+import anyio
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from photo_app.core.dao.photo import PhotoDAO
+from photo_app.core.models.album import Album, photo_albums
+from photo_app.core.models.photo import Photo
+from photo_app.core.utils.zipstream import ZipStream, unique_name
+from photo_app.core.services.encryption import load_user_keys
+from photo_app.infrastructure.storage.encryption import open_with_keys
+
+READ_SIZE = 1024 * 1024
+MAX_SEARCH_EXPORT = 10000
+
+logger = logging.getLogger(__name__)
+
+
+class ExportItem(NamedTuple):
+    photo_id: int
+    filename: str
+    filepath: str
+    is_encrypted: bool
+
+
+class _OpenedFile(NamedTuple):
+    size: int
+    mtime: datetime
+    read: Callable[[], Optional[bytes]]
+    close: Callable[[], None]
+
+
+@dataclass
+class ExportArchive:
+    """待发送的导出归档"""
+    items: List[ExportItem]
+    # 用户密钥，密钥轮换期间包含新旧两个
+    keys: List[bytes] = field(default_factory=list)
+    chunk_size: int = READ_SIZE
+    skipped: List[int] = field(default_factory=list)
+
+    def _open(self, item: ExportItem) -> _OpenedFile:
+        mtime = datetime.fromtimestamp(os.stat(item.filepath).st_mtime)
+        if item.is_encrypted:
+            reader = open_with_keys(item.filepath, self.keys)
+            chunks = reader.iter_range(0, reader.size)
+            return _OpenedFile(reader.size, mtime, lambda: next(chunks, None), reader.close)
+
+        f = open(item.filepath, "rb")
+        size = os.fstat(f.fileno()).st_size
+        remaining = [size]
+
+        def read() -> Optional[bytes]:
+            if not remaining[0]:
+                return None
+            chunk = f.read(min(self.chunk_size, remaining[0]))
+            remaining[0] -= len(chunk)
+            return chunk or None
+
+        return _OpenedFile(size, mtime, read, f.close)
+
+    async def iter_bytes(self) -> AsyncIterator[bytes]:
+        stream = ZipStream()
+        used = set()
+        for item in self.items:
+            if item.is_encrypted and not self.keys:
+                self.skipped.append(item.photo_id)
+                continue
+            try:
+                opened = await anyio.to_thread.run_sync(self._open, item)
+            except FileNotFoundError:
+                logger.warning("Skipping missing file %s of photo %s in export", item.filepath, item.photo_id)
+                self.skipped.append(item.photo_id)
+                continue
+            try:
+                yield stream.begin(unique_name(item.filename, used), opened.size, opened.mtime)
+                while True:
+                    chunk = await anyio.to_thread.run_sync(opened.read)
+                    if chunk is None:
+                        break
+                    yield stream.update(chunk)
+                yield stream.end()
+            finally:
+                await anyio.to_thread.run_sync(opened.close)
+        yield stream.finish()
+
+
+_ITEM_COLUMNS: Tuple = (Photo.id, Photo.filename, Photo.filepath, Photo.is_encrypted)
+
+
+class ExportService:
+    """构造相册和搜索结果的导出归档"""
+
+    def __init__(self, session: AsyncSession, chunk_size: int = READ_SIZE):
+        self._session = session
+        self._chunk_size = chunk_size
+
+    async def _archive(self, user_id: int, rows) -> ExportArchive:
+        items = [ExportItem(*row) for row in rows]
+        keys = []
+        if any(item.is_encrypted for item in items):
+            keys = await load_user_keys(self._session, user_id)
+        return ExportArchive(items, keys, self._chunk_size)
+
+    async def for_album(self, user_id: int, album_id: int) -> Optional[ExportArchive]:
+        """相册中的全部照片，按加入相册的顺序；相册不存在时返回None"""
+        album = (await self._session.execute(
+            select(Album.id).where(Album.id == album_id, Album.user_id == user_id)
+        )).scalar()
+        if album is None:
+            return None
+        rows = await self._session.execute(
+            select(*_ITEM_COLUMNS)
+            .join(photo_albums, photo_albums.c.photo_id == Photo.id)
+            .where(
+                photo_albums.c.album_id == album_id,
+                Photo.user_id == user_id,
+                Photo.deleted_at.is_(None)
+            )
+            .order_by(photo_albums.c.added_at, Photo.id)
+        )
+        return await self._archive(user_id, rows.all())
+
+    async def for_search(self, user_id: int, *, limit: int = MAX_SEARCH_EXPORT, **criteria) -> ExportArchive:
+        """PhotoDAO.search 的结果，criteria 与 search 的关键字参数相同"""
+        photos = await PhotoDAO(self._session).search(user_id, limit=limit, **criteria)
+        rows = [(p.id, p.filename, p.filepath, p.is_encrypted) for p in photos]
+        return await self._archive(user_id, rows)
@@ -0,0 +1,260 @@
+"""完整性校验服务
+
+本模块维护照片的内容校验和，并提供两种校验方式：
+
+1. Merkle比对（IntegrityService.compare）：
+   - 按用户把 (照片ID, 校验和) 流式构建为Merkle树
+   - 与另一侧的树逐层比较，只展开哈希不同的子树，最终只比较少数分歧桶中的照片
+   - 不读取任何文件内容；另一侧由调用方以 NodeSource 提供，目前只有 InMemoryNodeSource，
+     需要先取得对方的 (照片ID, 校验和) 清单（例如另一个实例的数据库），备份存储本身不提供节点
+2. 抽样校验（SamplingVerifier）：
+   - 每次按 verified_at 从旧到新抽取一小部分照片，重新计算主存储（及可访问的备份）文件的哈希
+   - 多个文件并发读取，总读取速率由令牌桶限制
+   - 经过 1/sample_fraction 次运行即可覆盖全部照片
+
+注意事项：
+- 校验和是存储在磁盘上的字节的 BLAKE2b-256（加密照片即密文），与扫描模块的 hash_file 一致；
+  改写文件的操作（加密、密钥轮换、恢复版本）同时更新校验和
+- 主存储文件损坏时 storage_status 置为 corrupted，文件丢失置为 missing
+- 备份损坏或丢失时 backup_status 重置为 pending，交给现有备份流程重新上传
+- 会话由调用方提交
+"""
+
+import asyncio
+import hashlib
+import math
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import BinaryIO, Callable, Dict, List, Optional, Sequence, Set
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from photo_app.core.dao.photo import PhotoDAO
+from photo_app.core.models.photo import Photo
+from photo_app.core.utils.merkle import (
+    DEFAULT_DEPTH,
+    MerkleTree,
+    NodeSource,
+    bucket_of,
+    find_divergent_buckets,
+)
+from photo_app.core.utils.ratelimit import TokenBucket
+from photo_app.infrastructure.storage.scanner import FileRecord, hash_files
+
+READ_SIZE = 1024 * 1024
+
+# 单条语句中照片ID的最大数量，避免超出数据库绑定参数上限
+BULK_BATCH_SIZE = 10_000
+
+
+@dataclass
+class IntegrityReport:
+    """Merkle比对结果"""
+    root_matches: bool
+    divergent_buckets: List[int] = field(default_factory=list)
+    # 两侧校验和不同的照片
+    mismatched: List[int] = field(default_factory=list)
+    # 主存储有、另一侧没有的照片
+    missing_in_backup: List[int] = field(default_factory=list)
+    # 另一侧有、主存储没有的照片
+    unknown_in_backup: List[int] = field(default_factory=list)
+
+
+@dataclass
+class VerificationReport:
+    """抽样校验结果"""
+    checked: int = 0
+    bytes_read: int = 0
+    corrupted: List[int] = field(default_factory=list)
+    missing: List[int] = field(default_factory=list)
+    backup_corrupted: List[int] = field(default_factory=list)
+
+
+class IntegrityService:
+    """校验和维护与Merkle比对服务"""
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        *,
+        depth: int = DEFAULT_DEPTH,
+        batch_size: int = 500,
+        hash_workers: int = 4
+    ):
+        self._session = session
+        self._depth = depth
+        self._batch_size = batch_size
+        self._hash_workers = hash_workers
+
+    async def fill_checksums(self, user_id: Optional[int] = None) -> int:
+        """为尚无校验和的照片计算校验和，返回处理的照片数"""
+        stmt = select(Photo.id, Photo.filepath).where(Photo.checksum.is_(None))
+        if user_id is not None:
+            stmt = stmt.where(Photo.user_id == user_id)
+        rows = (await self._session.execute(stmt.order_by(Photo.id))).all()
+
+        filled = 0
+        for start in range(0, len(rows), self._batch_size):
+            batch = rows[start:start + self._batch_size]
+            ids_by_path = {path: photo_id for photo_id, path in batch}
+            records = [FileRecord(path, 0, 0, 0) for path in ids_by_path]
+            hashed = await asyncio.to_thread(hash_files, records, max_workers=self._hash_workers)
+            await PhotoDAO(self._session).update_many([
+                {"id": ids_by_path[record.path], "checksum": record.content_hash}
+                for record in hashed
+            ])
+            filled += len(hashed)
+        return filled
+
+    def _leaf_query(self, user_id: int):
+        return (
+            select(Photo.id, Photo.checksum)
+            .where(
+                Photo.user_id == user_id,
+                Photo.checksum.isnot(None),
+                Photo.backup_status == "completed"
+            )
+            .execution_options(yield_per=5000)
+        )
+
+    async def build_tree(self, user_id: int) -> MerkleTree:
+        """流式构建用户已备份照片的Merkle树"""
+        tree = MerkleTree(self._depth)
+        result = await self._session.stream(self._leaf_query(user_id))
+        async for photo_id, checksum in result:
+            tree.add(photo_id, checksum)
+        return tree
+
+    async def _bucket_leaves(self, user_id: int, buckets: Set[int]) -> Dict[int, str]:
+        leaves = {}
+        result = await self._session.stream(self._leaf_query(user_id))
+        async for photo_id, checksum in result:
+            if bucket_of(photo_id, self._depth) in buckets:
+                leaves[photo_id] = checksum
+        return leaves
+
+    async def compare(self, user_id: int, backup: NodeSource) -> IntegrityReport:
+        """与另一侧比对，只下钻到不一致的子树"""
+        tree = await self.build_tree(user_id)
+        buckets = await find_divergent_buckets(tree, backup)
+        report = IntegrityReport(root_matches=not buckets, divergent_buckets=buckets)
+        if not buckets:
+            return report
+
+        local = await self._bucket_leaves(user_id, set(buckets))
+        remote = await backup.leaves(buckets)
+        for photo_id, checksum in sorted(local.items()):
+            remote_checksum = remote.get(photo_id)
+            if remote_checksum is None:
+                report.missing_in_backup.append(photo_id)
+            elif remote_checksum != checksum:
+                report.mismatched.append(photo_id)
+        report.unknown_in_backup = sorted(set(remote) - set(local))
+        return report
+
+
+def _read_into_digest(f: BinaryIO, digest, size: int) -> int:
+    chunk = f.read(size)
+    digest.update(chunk)
+    return len(chunk)
+
+
+class SamplingVerifier:
+    """限速的并行抽样校验器"""
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        *,
+        resolve_backup_path: Optional[Callable[[str], str]] = None,
+        sample_fraction: float = 0.01,
+        min_sample: int = 100,
+        concurrency: int = 4,
+        bytes_per_second: int = 50 * 1024 * 1024,
+        read_size: int = READ_SIZE
+    ):
+        self._session = session
+        self._resolve_backup_path = resolve_backup_path
+        self._sample_fraction = sample_fraction
+        self._min_sample = min_sample
+        self._concurrency = concurrency
+        self._read_size = read_size
+        self._limiter = TokenBucket(bytes_per_second, max(bytes_per_second, read_size))
+
+    async def _hash(self, path: str, report: VerificationReport) -> Optional[str]:
+        """限速计算文件哈希，文件不存在时返回None"""
+        digest = hashlib.blake2b(digest_size=32)
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            return None
+        with f:
+            while True:
+                await self._limiter.acquire(self._read_size)
+                size = await asyncio.to_thread(_read_into_digest, f, digest, self._read_size)
+                report.bytes_read += size
+                if size < self._read_size:
+                    return digest.hexdigest()
+
+    async def _sample(self, user_id: Optional[int]) -> Sequence:
+        conditions = [Photo.checksum.isnot(None)]
+        if user_id is not None:
+            conditions.append(Photo.user_id == user_id)
+        total = (await self._session.execute(
+            select(func.count()).select_from(Photo).where(*conditions)
+        )).scalar_one()
+        size = min(total, max(self._min_sample, math.ceil(total * self._sample_fraction)))
+        rows = await self._session.execute(
+            select(Photo.id, Photo.filepath, Photo.checksum, Photo.backup_path, Photo.backup_status)
+            .where(*conditions)
+            .order_by(Photo.verified_at.asc().nulls_first(), Photo.id)
+            .limit(size)
+        )
+        return rows.all()
+
+    async def verify(self, user_id: Optional[int] = None) -> VerificationReport:
+        """执行一轮抽样校验"""
+        report = VerificationReport()
+        semaphore = asyncio.Semaphore(self._concurrency)
+        verified: List[int] = []
+
+        async def check(photo_id, filepath, checksum, backup_path, backup_status):
+            async with semaphore:
+                actual = await self._hash(filepath, report)
+                if actual is None:
+                    report.missing.append(photo_id)
+                    return
+                if actual != checksum:
+                    report.corrupted.append(photo_id)
+                    return
+                if self._resolve_backup_path and backup_path and backup_status == "completed":
+                    backup = await self._hash(self._resolve_backup_path(backup_path), report)
+                    if backup != checksum:
+                        report.backup_corrupted.append(photo_id)
+                verified.append(photo_id)
+
+        rows = await self._sample(user_id)
+        await asyncio.gather(*(check(*row) for row in rows))
+        report.checked = len(rows)
+        await self._record(report, verified)
+        return report
+
+    async def _record(self, report: VerificationReport, verified: List[int]) -> None:
+        now = datetime.utcnow()
+        updates = (
+            (verified, {"verified_at": now}),
+            (report.corrupted, {"storage_status": "corrupted", "verified_at": now}),
+            (report.missing, {"storage_status": "missing", "verified_at": now}),
+            (report.backup_corrupted, {"backup_status": "pending"}),
+        )
+        for photo_ids, values in updates:
+            for start in range(0, len(photo_ids), BULK_BATCH_SIZE):
+                await self._session.execute(
+                    update(Photo)
+                    .where(Photo.id.in_(photo_ids[start:start + BULK_BATCH_SIZE]))
+                    .values(**values)
+                )
+        report.corrupted.sort()
+        report.missing.sort()
+        report.backup_corrupted.sort()
@@ -0,0 +1,68 @@
+"""缓存失效模块
+
+集中管理依赖用户数据的内存索引（搜索索引和自动补全）：
+- index_changed: 写入照片、标签、相册、场景时调用，递增用户变更计数，提交后把增量应用到已加载的索引
+- adjust_tags: 标签使用次数变化对应的自动补全增量更新
+
+注意事项：
+- 两种索引都记录构建时的变更计数，获取时与数据库比较，其他进程的写入会使本进程的索引重建
+- 无法增量更新时传入 REBUILD，提交后丢弃对应的索引，下次访问时重建
+"""
+
+from functools import partial
+from typing import Callable, Dict, Optional, Union
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from photo_app.core.dao.change_counter import UserChangeCounterDAO
+from photo_app.core.dao.transaction import after_commit
+from photo_app.core.services.autocomplete import KIND_TAG, AutocompleteIndex, autocomplete
+from photo_app.core.services.search_index import SearchIndex, search_indexes
+
+
+class _Rebuild:
+    def __repr__(self) -> str:
+        return "REBUILD"
+
+
+# 索引无法增量更新，提交后丢弃
+REBUILD = _Rebuild()
+
+SearchUpdate = Union[Callable[[SearchIndex], None], _Rebuild]
+SuggestUpdate = Union[Callable[[AutocompleteIndex], None], _Rebuild]
+
+
+async def index_changed(
+    session: AsyncSession,
+    user_id: int,
+    search: Optional[SearchUpdate] = None,
+    suggest: Optional[SuggestUpdate] = None
+) -> None:
+    """登记当前事务中用户数据的一次变更
+
+    Args:
+        session: 执行写入的会话，变更在该会话的事务提交之后才应用，回滚时不生效
+        user_id: 用户ID
+        search: 应用到已加载搜索索引的增量更新，None 表示不影响索引内容
+        suggest: 应用到已加载自动补全索引的增量更新，None 表示不影响索引内容
+    """
+    version = (await UserChangeCounterDAO(session).bump([user_id]))[user_id]
+
+    def apply() -> None:
+        for registry, update in ((search_indexes, search), (autocomplete, suggest)):
+            if update is REBUILD:
+                registry.invalidate(user_id)
+            else:
+                registry.apply(user_id, version, update)
+
+    after_commit(session, apply)
+
+
+def adjust_tags(tag_deltas: Dict[str, int]) -> Callable[[AutocompleteIndex], None]:
+    """按各标签使用次数的变化量更新自动补全"""
+    return partial(_adjust, KIND_TAG, dict(tag_deltas))
+
+
+def _adjust(kind: str, deltas: Dict[str, int], index: AutocompleteIndex) -> None:
+    for name, delta in deltas.items():
+        index.indexes[kind].adjust(name, delta)
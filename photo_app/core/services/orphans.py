@@ -0,0 +1,270 @@
+"""孤立文件与悬空记录回收模块
+
+上传中途崩溃会在存储目录留下没有照片记录的文件（孤立文件），手工删除文件会留下指向不存在文件的照片记录（悬空记录）。
+本模块把存储目录、缓存目录与 photos 表对账。
+
+工作流程：
+1. 按完整路径的字典序遍历 STORAGE_PATH（walk_sorted），同时按 filepath 键集分页读取照片记录
+2. 两个有序序列归并连接：
+   - 只有文件：孤立文件，修改时间早于宽限期的移入隔离区
+   - 只有记录：悬空记录，上传时间早于宽限期的 storage_status 置为 missing
+3. 每处理 page_size 个条目执行一次修复、把当前路径写入断点（job_checkpoints）并提交，然后暂停 pause 秒
+4. 缓存目录中的缩略图按照片ID分批检查，照片已不存在且早于宽限期的直接删除（缩略图可以重新生成）
+
+注意事项：
+- 每次运行可以用 max_items 限制处理量，下次从断点继续；完整走完一轮后清除断点，下一轮从头开始
+- 隔离区默认为 STORAGE_PATH/.quarantine，保留原相对路径，确认无误后再人工清理
+- 以"."开头的文件和目录（块存储、隔离区）不参与遍历
+- 软删除的照片仍然引用其文件（由 PhotoPurger 删除），不视为孤立文件，也不标记为 missing
+- PostgreSQL 下 filepath 使用 "C" 排序规则，保证数据库顺序与遍历顺序一致
+- 每页之后自行提交会话，调用方应传入专用的会话
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Deque, Iterator, List, Optional, Sequence
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from photo_app.core.config import settings
+from photo_app.core.dao.checkpoint import JobCheckpointDAO
+from photo_app.core.models.photo import Photo
+from photo_app.infrastructure.storage.scanner import FileRecord, walk_sorted
+from photo_app.infrastructure.storage.thumbnails import THUMBNAIL_DIR_NAME, THUMBNAIL_SUFFIX
+
+CHECKPOINT_STORAGE = "orphan_gc:storage"
+CHECKPOINT_THUMBNAILS = "orphan_gc:thumbnails"
+
+QUARANTINE_DIR_NAME = ".quarantine"
+
+STORAGE_MISSING = "missing"
+
+
+@dataclass
+class GarbageReport:
+    """回收结果"""
+    files_scanned: int = 0
+    rows_scanned: int = 0
+    # 移入隔离区的孤立文件（原路径）
+    quarantined: List[str] = field(default_factory=list)
+    # 标记为 missing 的照片
+    missing_photo_ids: List[int] = field(default_factory=list)
+    thumbnails_removed: int = 0
+    # 尚在宽限期内而跳过的孤立文件和悬空记录
+    recent_skipped: int = 0
+    # 是否已走完一轮；False 表示因 max_items 暂停，下次从断点继续
+    completed: bool = False
+
+
+def _quarantine(paths: Sequence[str], root: str, quarantine_root: str) -> List[str]:
+    """把文件移入隔离区并保留相对路径，返回成功移动的原路径"""
+    moved = []
+    for path in paths:
+        target = os.path.join(quarantine_root, os.path.relpath(path, root))
+        if os.path.exists(target):
+            target = f"{target}.{time.time_ns()}"
+        try:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(path, target)
+        except FileNotFoundError:
+            continue
+        moved.append(path)
+    return moved
+
+
+def _remove(paths: Sequence[str]) -> int:
+    removed = 0
+    for path in paths:
+        try:
+            os.unlink(path)
+            removed += 1
+        except FileNotFoundError:
+            continue
+    return removed
+
+
+def _naive(value: datetime) -> datetime:
+    return value.replace(tzinfo=None) if value.tzinfo is not None else value
+
+
+class OrphanCollector:
+    """存储目录与照片记录的增量对账器"""
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        *,
+        storage_path: Optional[str] = None,
+        cache_path: Optional[str] = None,
+        quarantine_path: Optional[str] = None,
+        grace_period: timedelta = timedelta(hours=24),
+        page_size: int = 1000,
+        pause: float = 0.1
+    ):
+        self._session = session
+        self._root = os.path.abspath(storage_path or settings.STORAGE_PATH)
+        self._thumbnail_root = os.path.abspath(
+            os.path.join(cache_path or settings.CACHE_PATH, THUMBNAIL_DIR_NAME)
+        )
+        self._quarantine_root = os.path.abspath(
+            quarantine_path or os.path.join(self._root, QUARANTINE_DIR_NAME)
+        )
+        self._grace_period = grace_period
+        self._page_size = page_size
+        self._pause = pause
+        self._checkpoints = JobCheckpointDAO(session)
+
+    async def collect(self, max_items: Optional[int] = None) -> GarbageReport:
+        """从断点继续对账存储目录，max_items 限制本次处理的条目数（文件和记录合计）"""
+        report = GarbageReport()
+        position = await self._checkpoints.get_position(CHECKPOINT_STORAGE)
+        file_cutoff_ns = time.time_ns() - int(self._grace_period.total_seconds() * 1e9)
+        row_cutoff = datetime.utcnow() - self._grace_period
+
+        walker = walk_sorted(self._root, start_after=position, extensions=None)
+        files: Deque[FileRecord] = deque()
+        rows: Deque = deque()
+        files_done = rows_done = False
+        last_row_path = position
+        orphans: List[str] = []
+        dangling: List[int] = []
+        processed = 0
+
+        while max_items is None or processed < max_items:
+            if not files and not files_done:
+                batch = await asyncio.to_thread(self._next_files, walker)
+                files.extend(batch)
+                files_done = len(batch) < self._page_size
+            if not rows and not rows_done:
+                batch = await self._rows_after(last_row_path)
+                rows.extend(batch)
+                rows_done = len(batch) < self._page_size
+                if batch:
+                    last_row_path = batch[-1].filepath
+            if not files and not rows:
+                report.completed = True
+                break
+
+            if rows and (not files or rows[0].filepath < files[0].path):
+                row = rows.popleft()
+                report.rows_scanned += 1
+                position = row.filepath
+                if row.deleted_at is None and row.storage_status != STORAGE_MISSING:
+                    if row.upload_date is not None and _naive(row.upload_date) < row_cutoff:
+                        dangling.append(row.id)
+                    else:
+                        report.recent_skipped += 1
+            elif rows and rows[0].filepath == files[0].path:
+                rows.popleft()
+                position = files.popleft().path
+                report.rows_scanned += 1
+                report.files_scanned += 1
+            else:
+                record = files.popleft()
+                report.files_scanned += 1
+                position = record.path
+                if record.mtime_ns < file_cutoff_ns:
+                    orphans.append(record.path)
+                else:
+                    report.recent_skipped += 1
+
+            processed += 1
+            if processed % self._page_size == 0:
+                await self._flush(report, orphans, dangling, position)
+                orphans, dangling = [], []
+                await asyncio.sleep(self._pause)
+
+        # 中途暂停时缓冲区中未处理的条目会在下次运行时重新读取
+        await self._flush(report, orphans, dangling, None if report.completed else position)
+        return report
+
+    async def collect_thumbnails(self, max_items: Optional[int] = None) -> GarbageReport:
+        """从断点继续检查缓存中的缩略图，删除照片已不存在的缩略图"""
+        report = GarbageReport()
+        position = await self._checkpoints.get_position(CHECKPOINT_THUMBNAILS)
+        cutoff_ns = time.time_ns() - int(self._grace_period.total_seconds() * 1e9)
+        walker = walk_sorted(self._thumbnail_root, start_after=position, extensions=(THUMBNAIL_SUFFIX,))
+
+        while max_items is None or report.files_scanned < max_items:
+            batch = await asyncio.to_thread(self._next_files, walker)
+            exhausted = len(batch) < self._page_size
+            if max_items is not None:
+                batch = batch[:max_items - report.files_scanned]
+            if not batch:
+                report.completed = True
+                break
+            report.files_scanned += len(batch)
+
+            by_id = {}
+            for record in batch:
+                photo_id = os.path.basename(record.path)[:-len(THUMBNAIL_SUFFIX)]
+                if photo_id.isdigit():
+                    by_id[int(photo_id)] = record
+            known = set((await self._session.execute(
+                select(Photo.id).where(Photo.id.in_(list(by_id)))
+            )).scalars())
+            stale = [
+                record.path for photo_id, record in by_id.items()
+                if photo_id not in known and record.mtime_ns < cutoff_ns
+            ]
+            report.thumbnails_removed += await asyncio.to_thread(_remove, stale)
+
+            await self._save_position(CHECKPOINT_THUMBNAILS, batch[-1].path)
+            if exhausted and report.files_scanned != max_items:
+                report.completed = True
+                break
+            await asyncio.sleep(self._pause)
+
+        if report.completed:
+            await self._save_position(CHECKPOINT_THUMBNAILS, None)
+        return report
+
+    def _next_files(self, walker: Iterator[FileRecord]) -> List[FileRecord]:
+        return list(islice(walker, self._page_size))
+
+    async def _rows_after(self, path: Optional[str]) -> Sequence:
+        """按 filepath 顺序读取存储目录下、路径大于 path 的一页照片记录"""
+        filepath = Photo.filepath
+        if self._session.bind.dialect.name == "postgresql":
+            filepath = filepath.collate("C")
+        # 存储目录下的路径都以 "root/" 开头，"root0" 是紧随其后的上界
+        lower = path or self._root + os.sep
+        upper = self._root + chr(ord(os.sep) + 1)
+        result = await self._session.execute(
+            select(Photo.id, Photo.filepath, Photo.upload_date, Photo.storage_status, Photo.deleted_at)
+            .where(filepath > lower, filepath < upper)
+            .order_by(filepath)
+            .limit(self._page_size)
+        )
+        return result.all()
+
+    async def _flush(
+        self,
+        report: GarbageReport,
+        orphans: List[str],
+        dangling: List[int],
+        position: Optional[str]
+    ) -> None:
+        if orphans:
+            moved = await asyncio.to_thread(_quarantine, orphans, self._root, self._quarantine_root)
+            report.quarantined.extend(moved)
+        if dangling:
+            await self._session.execute(
+                update(Photo).where(Photo.id.in_(dangling)).values(storage_status=STORAGE_MISSING)
+            )
+            report.missing_photo_ids.extend(dangling)
+        await self._save_position(CHECKPOINT_STORAGE, position)
+
+    async def _save_position(self, name: str, position: Optional[str]) -> None:
+        """写入断点并提交；position 为None表示本轮已完成"""
+        if position is None:
+            await self._checkpoints.clear(name)
+        else:
+            await self._checkpoints.save(name, position)
+        await self._session.commit()
@@ -0,0 +1,235 @@
+"""软删除照片清除服务
+
+PhotoDAO.delete / delete_many 只设置 deleted_at 并立即返回，本模块在后台分批真正删除照片。
+
+工作流程：
+1. 按ID顺序取一小批 deleted_at 早于宽限期的照片
+2. 在一个短事务中删除照片记录及其关联行（标签、相册、元数据、版本），
+   按用户汇总后一次性返还 User.storage_used，然后提交
+3. 提交后删除原图和缩略图，文件操作在线程池中执行，并发数受信号量限制
+4. 批次之间让出事件循环并短暂暂停，其他写入者可以在间隙拿到 SQLite 的写锁
+
+注意事项：
+- 先提交删除记录再删除文件，失败时最多留下孤立文件，不会留下指向已删除文件的记录
+- SQLite 默认不启用外键级联，关联行在这里显式删除
+- 备份端的副本不在这里删除，由远程同步核对（reconcile）作为多余文件处理
+- 每批之后自行提交会话，调用方应传入专用的会话
+"""
+
+import asyncio
+import logging
+import os
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List, Optional, Sequence
+
+from sqlalchemy import case, delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from photo_app.core.dao.version import PhotoVersionDAO
+from photo_app.core.models.album import Album, photo_albums
+from photo_app.core.models.photo import Photo, PhotoMetadata
+from photo_app.core.models.tag import photo_tags
+from photo_app.core.models.user import User
+from photo_app.infrastructure.storage.thumbnails import thumbnail_path
+
+logger = logging.getLogger(__name__)
+
+# 同一时间只运行一个后台清除，避免两个清除器处理同一批照片
+_purge_lock = asyncio.Lock()
+# 清除运行期间又有照片被删除时置位，运行中的清除结束前再清除一轮
+_purge_requested = False
+
+
+@dataclass
+class PurgeReport:
+    """清除结果"""
+    photos: int = 0
+    bytes_freed: int = 0
+    files_removed: int = 0
+    # 原图已不存在的照片
+    missing_files: int = 0
+    # 无法删除的文件（权限等），需要人工处理
+    failed_files: List[str] = field(default_factory=list)
+
+
+def _unlink(path: str) -> Optional[bool]:
+    """删除文件：成功返回True，文件不存在返回False，其他错误返回None"""
+    try:
+        os.unlink(path)
+        return True
+    except FileNotFoundError:
+        return False
+    except OSError as exc:
+        logger.warning("Failed to remove %s: %s", path, exc)
+        return None
+
+
+class PhotoPurger:
+    """分批清除软删除的照片"""
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        *,
+        batch_size: int = 100,
+        concurrency: int = 8,
+        grace_period: timedelta = timedelta(0),
+        pause: float = 0.05,
+        cache_path: Optional[str] = None
+    ):
+        self._session = session
+        self._batch_size = batch_size
+        self._concurrency = concurrency
+        self._grace_period = grace_period
+        self._pause = pause
+        self._cache_path = cache_path
+
+    async def purge(self, max_batches: Optional[int] = None) -> PurgeReport:
+        """清除所有到期的软删除照片，max_batches 限制本次运行处理的批数"""
+        report = PurgeReport()
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            rows = await self._next_batch()
+            if not rows:
+                break
+            purged = await self._delete_rows([row.id for row in rows])
+            await self._session.commit()
+
+            await self._remove_files(purged, report)
+            report.photos += len(purged)
+            report.bytes_freed += sum(row.size for row in purged)
+            batches += 1
+            await asyncio.sleep(self._pause)
+        return report
+
+    async def _next_batch(self) -> Sequence:
+        cutoff = datetime.now(timezone.utc) - self._grace_period
+        result = await self._session.execute(
+            select(Photo.id)
+            .where(Photo.deleted_at.isnot(None), Photo.deleted_at <= cutoff)
+            .order_by(Photo.id)
+            .limit(self._batch_size)
+        )
+        return result.all()
+
+    async def _delete_rows(self, photo_ids: List[int]) -> Sequence:
+        """删除照片并按用户汇总返还存储配额"""
+        purged = await delete_photo_rows(self._session, photo_ids)
+        freed: Counter = Counter()
+        for row in purged:
+            if row.user_id is not None:
+                freed[row.user_id] += row.size
+        for user_id, size in freed.items():
+            await self._session.execute(
+                update(User)
+                .where(User.id == user_id)
+                .values(storage_used=case(
+                    (User.storage_used > size, User.storage_used - size),
+                    else_=0
+                ))
+            )
+        return purged
+
+    async def _remove_files(self, rows: Sequence, report: PurgeReport) -> None:
+        await remove_photo_files(rows, report, concurrency=self._concurrency, cache_path=self._cache_path)
+
+
+async def delete_photo_rows(
+    session: AsyncSession,
+    photo_ids: List[int],
+    *,
+    soft_deleted_only: bool = True
+) -> Sequence:
+    """删除照片及其关联行（标签、相册、元数据、版本），返回被删除照片的 (id, user_id, size, filepath)
+
+    soft_deleted_only 为True时只删除已软删除的照片，其间被恢复的照片及其关联行保持不变。
+    """
+    if soft_deleted_only:
+        # 先用带条件的写语句锁定仍处于软删除状态的照片，之后只处理这些照片。
+        # 照片记录本身最后删除：元数据和版本的外键没有级联，PostgreSQL 会拒绝先删照片
+        result = await session.execute(
+            update(Photo)
+            .where(Photo.id.in_(photo_ids), Photo.deleted_at.isnot(None))
+            .values(deleted_at=Photo.deleted_at)
+            .returning(Photo.id)
+        )
+        photo_ids = result.scalars().all()
+        if not photo_ids:
+            return []
+
+    await session.execute(delete(photo_tags).where(photo_tags.c.photo_id.in_(photo_ids)))
+    await session.execute(delete(photo_albums).where(photo_albums.c.photo_id.in_(photo_ids)))
+    await session.execute(
+        update(Album).where(Album.cover_photo_id.in_(photo_ids)).values(cover_photo_id=None)
+    )
+    await session.execute(delete(PhotoMetadata).where(PhotoMetadata.photo_id.in_(photo_ids)))
+    await PhotoVersionDAO(session).remove_versions_of(photo_ids)
+
+    result = await session.execute(
+        delete(Photo)
+        .where(Photo.id.in_(photo_ids))
+        .returning(Photo.id, Photo.user_id, Photo.size, Photo.filepath)
+    )
+    return result.all()
+
+
+async def remove_photo_files(
+    rows: Sequence,
+    report: PurgeReport,
+    *,
+    concurrency: int = 8,
+    cache_path: Optional[str] = None
+) -> None:
+    """并发删除照片的原图和缩略图，结果累加到 report"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def remove(path: str, original: bool) -> None:
+        async with semaphore:
+            removed = await asyncio.to_thread(_unlink, path)
+        if removed:
+            report.files_removed += 1
+        elif removed is None:
+            report.failed_files.append(path)
+        elif original:
+            report.missing_files += 1
+
+    tasks = []
+    for row in rows:
+        tasks.append(remove(row.filepath, True))
+        # 缩略图缺失不视为错误
+        tasks.append(remove(thumbnail_path(row.id, cache_path), False))
+    await asyncio.gather(*tasks)
+
+
+async def purge_deleted_photos(
+    session_factory: Callable[[], AsyncSession],
+    **options
+) -> Optional[PurgeReport]:
+    """后台任务入口，options 为 PhotoPurger 的参数
+
+    已有清除在运行时只登记一次重新运行并返回None；正在运行的清除结束前检查登记，
+    有登记时再清除一轮，直到没有新的请求，期间删除的照片不会被遗漏。
+    """
+    global _purge_requested
+    if _purge_lock.locked():
+        _purge_requested = True
+        return None
+    report = PurgeReport()
+    async with _purge_lock:
+        while True:
+            _purge_requested = False
+            async with session_factory() as session:
+                _merge_report(report, await PhotoPurger(session, **options).purge())
+            # 检查登记与释放锁之间没有 await，不会漏掉请求
+            if not _purge_requested:
+                return report
+
+
+def _merge_report(total: PurgeReport, part: PurgeReport) -> None:
+    total.photos += part.photos
+    total.bytes_freed += part.bytes_freed
+    total.files_removed += part.files_removed
+    total.missing_files += part.missing_files
+    total.failed_files.extend(part.failed_files)
@@ -0,0 +1,184 @@
+"""远程同步核对模块
+
+本模块核对远程存储（OneDrive等）上的实际文件与数据库中 Photo.backup_path 的记录是否一致。
+
+工作流程：
+1. 一次 lsjson 调用流式获取远程完整清单，必要时外部排序
+2. 数据库按 backup_path 排序的游标流式读取照片
+3. 两个有序序列归并连接，得到缺失、多余和大小不一致的集合
+4. 生成修复任务；可选地将需要重新上传的照片 backup_status 重置为 pending，交给现有备份流程
+
+注意事项：
+- backup_path 为相对远程根目录的路径
+- 内存占用只与外部排序的分段大小和批量大小有关，与照片总数无关
+- PostgreSQL 下使用 "C" 排序规则，保证数据库顺序与Python字符串顺序一致
+- backup_path 开头的 "/" 在SQL中去掉后再排序，两侧按同一个规范化路径归并
+- 远程清单不按用户划分；指定 user_id 时只核对该用户的照片，不生成 delete_remote 任务，
+  否则其他用户的文件会被当作多余文件
+"""
+
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Awaitable, Callable, Iterator, List, NamedTuple, Optional, Protocol
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from photo_app.core.models.photo import Photo
+from photo_app.core.utils.extsort import DEFAULT_RUN_SIZE, external_sort
+from photo_app.infrastructure.storage.rclone import RemoteEntry
+
+ACTION_UPLOAD = "upload"
+ACTION_REUPLOAD = "reupload"
+ACTION_DELETE_REMOTE = "delete_remote"
+
+
+class Listing(Protocol):
+    def entries(self) -> AsyncIterator[RemoteEntry]:
+        ...
+
+
+class FixupJob(NamedTuple):
+    action: str
+    path: str
+    photo_id: Optional[int] = None
+    expected_size: Optional[int] = None
+    remote_size: Optional[int] = None
+
+
+@dataclass
+class ReconcileReport:
+    """核对结果"""
+    matched: int = 0
+    missing: List[FixupJob] = field(default_factory=list)
+    extra: List[FixupJob] = field(default_factory=list)
+    size_mismatch: List[FixupJob] = field(default_factory=list)
+    missing_count: int = 0
+    extra_count: int = 0
+    size_mismatch_count: int = 0
+
+    @property
+    def jobs(self) -> List[FixupJob]:
+        return self.missing + self.size_mismatch + self.extra
+
+
+JobCallback = Callable[[List[FixupJob]], Awaitable[None]]
+
+
+class SyncReconciler:
+    """基于有序归并连接的远程同步核对器"""
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        listing: Listing,
+        *,
+        user_id: Optional[int] = None,
+        on_jobs: Optional[JobCallback] = None,
+        mark_pending: bool = False,
+        run_size: int = DEFAULT_RUN_SIZE,
+        batch_size: int = 1000
+    ):
+        self._session = session
+        self._listing = listing
+        self._user_id = user_id
+        self._on_jobs = on_jobs
+        self._mark_pending = mark_pending
+        self._run_size = run_size
+        self._batch_size = batch_size
+        self._buffer: List[FixupJob] = []
+        self._pending_ids: List[int] = []
+
+    async def reconcile(self) -> ReconcileReport:
+        """执行一次核对；提供 on_jobs 时修复任务分批回调，否则收集在报告中"""
+        report = ReconcileReport()
+        remote = await external_sort(self._remote_entries(), run_size=self._run_size)
+        remote_entry = _next(remote)
+        # 当前远程条目是否已被某张照片引用
+        remote_referenced = False
+
+        async for photo_id, path, size in self._db_rows():
+            # 跳过远程中排在当前路径之前的条目：未被引用的即数据库中没有
+            while remote_entry is not None and remote_entry[0] < path:
+                if not remote_referenced:
+                    await self._emit_extra(report, remote_entry)
+                remote_entry = _next(remote)
+                remote_referenced = False
+
+            if remote_entry is None or remote_entry[0] != path:
+                await self._emit(report, FixupJob(ACTION_UPLOAD, path, photo_id, expected_size=size))
+                continue
+
+            remote_referenced = True
+            if remote_entry[1] >= 0 and remote_entry[1] != size:
+                await self._emit(report, FixupJob(ACTION_REUPLOAD, path, photo_id, size, remote_entry[1]))
+            else:
+                report.matched += 1
+            # 不立即前进：多张照片可能共享同一个 backup_path
+
+        while remote_entry is not None:
+            if not remote_referenced:
+                await self._emit_extra(report, remote_entry)
+            remote_entry = _next(remote)
+            remote_referenced = False
+
+        await self._flush()
+        return report
+
+    async def _remote_entries(self):
+        async for entry in self._listing.entries():
+            yield (entry.path.lstrip("/"), entry.size)
+
+    async def _db_rows(self):
+        # 在SQL中去掉开头的 "/"，排序键与返回的路径一致
+        path = func.ltrim(Photo.backup_path, "/")
+        order = path.collate("C") if self._session.bind.dialect.name == "postgresql" else path
+        stmt = (
+            select(Photo.id, path, Photo.size)
+            .where(Photo.backup_path.isnot(None))
+            .order_by(order, Photo.id)
+        )
+        if self._user_id is not None:
+            stmt = stmt.where(Photo.user_id == self._user_id)
+        result = await self._session.stream(stmt.execution_options(yield_per=self._batch_size))
+        async for photo_id, backup_path, size in result:
+            yield photo_id, backup_path, size
+
+    async def _emit_extra(self, report: ReconcileReport, entry: tuple) -> None:
+        # 远程清单包含所有用户的文件，只核对一个用户时无法判断文件是否多余
+        if self._user_id is None:
+            await self._emit(report, FixupJob(ACTION_DELETE_REMOTE, entry[0], remote_size=entry[1]))
+
+    async def _emit(self, report: ReconcileReport, job: FixupJob) -> None:
+        if job.action == ACTION_UPLOAD:
+            report.missing_count += 1
+            target = report.missing
+        elif job.action == ACTION_REUPLOAD:
+            report.size_mismatch_count += 1
+            target = report.size_mismatch
+        else:
+            report.extra_count += 1
+            target = report.extra
+
+        if self._on_jobs is None:
+            target.append(job)
+        else:
+            self._buffer.append(job)
+        if self._mark_pending and job.photo_id is not None:
+            self._pending_ids.append(job.photo_id)
+
+        if len(self._buffer) >= self._batch_size or len(self._pending_ids) >= self._batch_size:
+            await self._flush()
+
+    async def _flush(self) -> None:
+        if self._buffer:
+            jobs, self._buffer = self._buffer, []
+            await self._on_jobs(jobs)
+        if self._pending_ids:
+            ids, self._pending_ids = self._pending_ids, []
+            await self._session.execute(
+                update(Photo).where(Photo.id.in_(ids)).values(backup_status="pending")
+            )
+
+
+def _next(iterator: Iterator[tuple]) -> Optional[tuple]:
+    return next(iterator, None)
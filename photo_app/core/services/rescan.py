@@ -0,0 +1,185 @@
+"""增量重扫模块
+
+监控服务未运行（停机、新挂载）之后，通过扫描清单比对目录树，只处理新增、修改、删除和移动的文件。
+
+工作流程：
+1. 从 scan_manifest 流式加载上次的清单
+2. 多线程 os.scandir 遍历目录树，与清单逐条比对（未变化的文件不读取内容）
+3. 新增文件中已在photos表登记的直接沿用 Photo.checksum，只对其余新增和修改的文件计算内容哈希
+4. 移动的文件批量更新 Photo.filepath；删除的文件匹配出对应的照片ID
+5. 通过 on_changes 回调把差异交给导入流程，然后写回清单
+
+注意事项：
+- 清单路径与 Photo.filepath 使用相同的绝对路径
+- 会话由调用方提交
+- filepath 有唯一约束，链式重命名（a→b、b→c）先移动后面的文件，循环重命名借助临时路径
+"""
+
+import asyncio
+import os
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from photo_app.core.config import settings
+from photo_app.core.dao.manifest import ScanManifestDAO
+from photo_app.core.dao.photo import PhotoDAO
+from photo_app.core.models.photo import Photo
+from photo_app.infrastructure.storage.scanner import (
+    FileRecord,
+    ScanDiff,
+    diff_against_manifest,
+    hash_files,
+    walk_files,
+)
+
+# 按路径查询照片时每批的路径数
+_PATH_BATCH_SIZE = 500
+
+# 循环重命名时照片暂存的路径前缀，不会与真实的绝对路径冲突
+_MOVING_PREFIX = "/.rescan-moving/"
+
+
+@dataclass
+class RescanResult:
+    """增量重扫结果"""
+    diff: ScanDiff
+    # 文件已被删除的照片ID
+    missing_photo_ids: List[int] = field(default_factory=list)
+    # 已在photos表中登记、但首次写入清单的文件数
+    adopted: int = 0
+
+
+ChangeCallback = Callable[[RescanResult], Awaitable[None]]
+
+
+class IncrementalRescanner:
+    """基于扫描清单的增量重扫服务"""
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        root: Optional[str] = None,
+        *,
+        on_changes: Optional[ChangeCallback] = None,
+        walk_workers: int = 8,
+        hash_workers: int = 4
+    ):
+        self._session = session
+        self._root = os.path.abspath(root or settings.STORAGE_PATH)
+        self._on_changes = on_changes
+        self._walk_workers = walk_workers
+        self._hash_workers = hash_workers
+        self._manifest = ScanManifestDAO(session)
+
+    async def rescan(self) -> RescanResult:
+        """执行一次增量重扫"""
+        manifest = await self._manifest.load_index(prefix=os.path.join(self._root, ""))
+        diff = await asyncio.to_thread(
+            lambda: diff_against_manifest(
+                walk_files(self._root, max_workers=self._walk_workers), manifest
+            )
+        )
+        result = RescanResult(diff=diff)
+        # 先排除已登记的照片，它们不需要重新导入，哈希也直接沿用
+        adopted = await self._adopt_known(result)
+        diff.added = await asyncio.to_thread(hash_files, diff.added, max_workers=self._hash_workers)
+        diff.changed = await asyncio.to_thread(hash_files, diff.changed, max_workers=self._hash_workers)
+
+        await self._move_photos(diff.moved)
+        for batch in _batches(diff.removed):
+            rows = await self._session.execute(
+                select(Photo.id).where(Photo.filepath.in_(batch))
+            )
+            result.missing_photo_ids.extend(rows.scalars())
+
+        if self._on_changes is not None and diff.has_changes:
+            await self._on_changes(result)
+
+        await self._manifest.upsert_many(adopted + diff.added + diff.changed)
+        await self._manifest.move_paths(diff.moved)
+        await self._manifest.delete_paths(diff.removed)
+        return result
+
+    async def _adopt_known(self, result: RescanResult) -> List[FileRecord]:
+        """从新增文件中取出已登记照片的文件（例如首次建立清单时），返回带哈希的清单条目"""
+        diff = result.diff
+        checksums: Dict[str, Optional[str]] = {}
+        for batch in _batches([r.path for r in diff.added]):
+            rows = await self._session.execute(
+                select(Photo.filepath, Photo.checksum).where(Photo.filepath.in_(batch))
+            )
+            checksums.update(rows.tuples().all())
+        if not checksums:
+            return []
+
+        result.adopted = len(checksums)
+        adopted = [r._replace(content_hash=checksums[r.path]) for r in diff.added if r.path in checksums]
+        diff.added = [r for r in diff.added if r.path not in checksums]
+        # 尚未计算校验和的照片仍需读取文件
+        unhashed = [r for r in adopted if r.content_hash is None]
+        if unhashed:
+            hashed = await asyncio.to_thread(hash_files, unhashed, max_workers=self._hash_workers)
+            adopted = [r for r in adopted if r.content_hash is not None] + hashed
+        return adopted
+
+    async def _move_photos(self, moved: List[Tuple[str, FileRecord]]) -> None:
+        """批量更新移动文件对应照片的 filepath"""
+        ids: Dict[str, int] = {}
+        for batch in _batches([old for old, _ in moved]):
+            rows = await self._session.execute(
+                select(Photo.filepath, Photo.id).where(Photo.filepath.in_(batch))
+            )
+            ids.update(rows.tuples().all())
+        moves = {old: record.path for old, record in moved if old in ids}
+        if not moves:
+            return
+
+        rows = []
+        for old, new in _order_moves(moves):
+            photo_id = ids.pop(old)
+            ids[new] = photo_id
+            rows.append({"id": photo_id, "filepath": new})
+        await PhotoDAO(self._session).update_many(rows)
+
+
+def _order_moves(moves: Dict[str, str]) -> List[Tuple[str, str]]:
+    """排列路径更新的顺序，使每次更新的目标路径都已空出
+
+    从每条重命名链的末端（目标路径不再被移走）倒序处理；剩下的都是循环，
+    先把其中一项移到暂存路径，处理完循环中其余各项后再移到最终位置。
+    """
+    sources = {new: old for old, new in moves.items()}
+    ordered: List[Tuple[str, str]] = []
+    done = set()
+
+    def unwind(path: str) -> None:
+        # 路径 path 已空出，依次处理移入它的文件
+        while path in sources and sources[path] not in done:
+            old = sources[path]
+            ordered.append((old, path))
+            done.add(old)
+            path = old
+
+    for old, new in moves.items():
+        if new not in moves:
+            ordered.append((old, new))
+            done.add(old)
+            unwind(old)
+
+    for old, new in moves.items():
+        if old in done:
+            continue
+        temp = f"{_MOVING_PREFIX}{len(ordered)}"
+        ordered.append((old, temp))
+        done.add(old)
+        unwind(old)
+        ordered.append((temp, new))
+    return ordered
+
+
+def _batches(items: List[str]):
+    for start in range(0, len(items), _PATH_BATCH_SIZE):
+        yield items[start:start + _PATH_BATCH_SIZE]
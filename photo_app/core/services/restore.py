@@ -0,0 +1,331 @@
+"""备份恢复服务
+
+本模块在数据丢失后从备份端恢复用户（或相册）的照片，由 Photo.restore_status 驱动。
+
+工作流程：
+1. plan: 把范围内已备份的照片标记为 queued
+2. run: 按优先级顺序下载
+   - 先恢复所有缩略图（体积小，浏览界面很快可用），再恢复原图
+   - 同类文件中收藏（带 favorite 标签）和相册封面优先，其余按上传时间从新到旧
+3. 有界并发下载，写入 .part 文件；中断后重新运行会从 .part 的已有长度续传
+4. 下载完成后校验大小和校验和，原子重命名为最终文件
+5. restore_status 按批写回（completed / failed），并通过回调报告吞吐量和预计剩余时间
+
+注意事项：
+- 优先级顺序只保存照片ID数组，详细信息按页加载，内存占用与照片数量基本无关
+- 批量写回状态时会提交会话，使长时间的恢复在中断后可以继续
+- 备份端缺少的缩略图会被忽略
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from array import array
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Protocol, Tuple
+
+from sqlalchemy import exists, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from photo_app.core.models.album import Album, photo_albums
+from photo_app.core.models.photo import Photo
+from photo_app.core.models.tag import Tag, photo_tags
+from photo_app.infrastructure.storage.thumbnails import thumbnail_backup_path, thumbnail_path
+
+RESTORE_QUEUED = "queued"
+RESTORE_COMPLETED = "completed"
+RESTORE_FAILED = "failed"
+
+FAVORITE_TAG = "favorite"
+
+logger = logging.getLogger(__name__)
+
+_PART_SUFFIX = ".part"
+_KIND_THUMBNAIL = "thumbnail"
+_KIND_ORIGINAL = "original"
+
+
+class RestoreSource(Protocol):
+    def open(self, path: str, offset: int = 0) -> AsyncIterator[bytes]:
+        ...
+
+
+class RestoreError(Exception):
+    """恢复的文件不完整或校验失败"""
+
+
+@dataclass
+class RestoreProgress:
+    """恢复进度（只统计原图）"""
+    total_files: int = 0
+    total_bytes: int = 0
+    completed_files: int = 0
+    failed_files: int = 0
+    bytes_done: int = 0
+    thumbnails: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+    # 本次运行实际传输的字节数（不含续传前已有的部分）
+    bytes_transferred: int = 0
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    @property
+    def throughput(self) -> float:
+        """字节/秒"""
+        elapsed = self.elapsed
+        return self.bytes_transferred / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        """预计剩余秒数，尚无吞吐量数据时为None"""
+        throughput = self.throughput
+        if not throughput:
+            return None
+        return max(self.total_bytes - self.bytes_done, 0) / throughput
+
+
+@dataclass
+class _Job:
+    kind: str
+    photo_id: int
+    remote_path: str
+    local_path: str
+    size: Optional[int] = None
+    checksum: Optional[str] = None
+
+
+ProgressCallback = Callable[[RestoreProgress], Awaitable[None]]
+
+
+class RestoreService:
+    """按优先级并行恢复照片"""
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        source: RestoreSource,
+        *,
+        concurrency: int = 8,
+        batch_size: int = 200,
+        flush_interval: float = 5.0,
+        page_size: int = 500,
+        on_progress: Optional[ProgressCallback] = None,
+        cache_path: Optional[str] = None
+    ):
+        self._session = session
+        self._source = source
+        self._concurrency = concurrency
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._page_size = page_size
+        self._on_progress = on_progress
+        self._cache_path = cache_path
+
+        # 会话不能被多个协程同时使用
+        self._db_lock = asyncio.Lock()
+        self._status_updates: Dict[str, List[int]] = {RESTORE_COMPLETED: [], RESTORE_FAILED: []}
+        self._last_flush = time.monotonic()
+
+    def _scope(self, user_id: int, album_id: Optional[int]):
+        conditions = [Photo.user_id == user_id]
+        if album_id is not None:
+            conditions.append(
+                exists().where(photo_albums.c.photo_id == Photo.id, photo_albums.c.album_id == album_id)
+            )
+        return conditions
+
+    async def plan(self, user_id: int, album_id: Optional[int] = None) -> int:
+        """把范围内已备份、尚未恢复的照片标记为待恢复，返回照片数"""
+        stmt = (
+            update(Photo)
+            .where(
+                *self._scope(user_id, album_id),
+                Photo.backup_path.isnot(None),
+                Photo.backup_status == "completed",
+                (Photo.restore_status.is_(None)) | (Photo.restore_status != RESTORE_COMPLETED)
+            )
+            .values(restore_status=RESTORE_QUEUED)
+            .execution_options(synchronize_session=False)
+        )
+        result = await self._session.execute(stmt)
+        await self._session.commit()
+        return result.rowcount
+
+    async def _priority_order(self, user_id: int) -> array:
+        """按优先级排序的待恢复照片ID"""
+        favorite = exists().where(
+            photo_tags.c.photo_id == Photo.id,
+            photo_tags.c.tag_id == Tag.id,
+            Tag.name == FAVORITE_TAG
+        )
+        cover = exists().where(Album.cover_photo_id == Photo.id)
+        stmt = (
+            select(Photo.id)
+            .where(Photo.user_id == user_id, Photo.restore_status == RESTORE_QUEUED)
+            .order_by(favorite.desc(), cover.desc(), Photo.upload_date.desc(), Photo.id.desc())
+            .execution_options(yield_per=5000)
+        )
+        ids = array("q")
+        result = await self._session.stream(stmt)
+        async for (photo_id,) in result:
+            ids.append(photo_id)
+        return ids
+
+    async def _load_page(self, ids) -> Dict[int, Tuple]:
+        async with self._db_lock:
+            rows = await self._session.execute(
+                select(Photo.id, Photo.filepath, Photo.backup_path, Photo.size, Photo.checksum)
+                .where(Photo.id.in_(list(ids)))
+            )
+            return {row[0]: row[1:] for row in rows.all()}
+
+    async def _produce(self, ids: array, queue: asyncio.Queue) -> None:
+        for kind in (_KIND_THUMBNAIL, _KIND_ORIGINAL):
+            for start in range(0, len(ids), self._page_size):
+                page_ids = ids[start:start + self._page_size]
+                rows = await self._load_page(page_ids)
+                for photo_id in page_ids:
+                    if photo_id not in rows:
+                        continue
+                    filepath, backup_path, size, checksum = rows[photo_id]
+                    if kind == _KIND_THUMBNAIL:
+                        local = thumbnail_path(photo_id, self._cache_path)
+                        if os.path.exists(local):
+                            continue
+                        job = _Job(kind, photo_id, thumbnail_backup_path(backup_path), local)
+                    else:
+                        job = _Job(kind, photo_id, backup_path, filepath, size, checksum)
+                    await queue.put(job)
+
+    async def run(self, user_id: int) -> RestoreProgress:
+        """恢复用户所有 queued 状态的照片"""
+        ids = await self._priority_order(user_id)
+        totals = await self._session.execute(
+            select(func.count(), func.coalesce(func.sum(Photo.size), 0))
+            .where(Photo.user_id == user_id, Photo.restore_status == RESTORE_QUEUED)
+        )
+        total_files, total_bytes = totals.one()
+        progress = RestoreProgress(total_files=total_files, total_bytes=total_bytes)
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self._concurrency * 4)
+        workers = [
+            asyncio.create_task(self._worker(queue, progress))
+            for _ in range(self._concurrency)
+        ]
+        try:
+            await self._produce(ids, queue)
+            await queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+        await self._flush(progress, force=True)
+        return progress
+
+    async def _worker(self, queue: asyncio.Queue, progress: RestoreProgress) -> None:
+        # 任何异常都不能让工作协程退出：工作协程全部退出后没有人消费队列，
+        # _produce 会永远阻塞在 queue.put 上
+        while True:
+            job = await queue.get()
+            try:
+                try:
+                    await self._restore(job, progress)
+                except Exception as exc:
+                    self._record_failure(job, progress, exc)
+                await self._flush(progress)
+            except Exception:
+                # 写回失败的照片保持 queued，下次运行时重新恢复
+                logger.exception("Failed to write back restore statuses")
+            finally:
+                queue.task_done()
+
+    async def _restore(self, job: _Job, progress: RestoreProgress) -> None:
+        if job.kind == _KIND_THUMBNAIL:
+            try:
+                await self._download(job, progress)
+                progress.thumbnails += 1
+            except (FileNotFoundError, RestoreError):
+                pass
+            return
+
+        await self._download(job, progress)
+        progress.completed_files += 1
+        self._status_updates[RESTORE_COMPLETED].append(job.photo_id)
+
+    def _record_failure(self, job: _Job, progress: RestoreProgress, exc: Exception) -> None:
+        logger.warning("Failed to restore %s of photo %s from %s: %s", job.kind, job.photo_id, job.remote_path, exc)
+        # 缩略图不计入进度，原图失败后标记为 failed
+        if job.kind == _KIND_ORIGINAL:
+            progress.failed_files += 1
+            self._status_updates[RESTORE_FAILED].append(job.photo_id)
+
+    async def _download(self, job: _Job, progress: RestoreProgress) -> None:
+        part = job.local_path + _PART_SUFFIX
+        await asyncio.to_thread(os.makedirs, os.path.dirname(job.local_path), exist_ok=True)
+        try:
+            offset = os.path.getsize(part)
+        except FileNotFoundError:
+            offset = 0
+        if job.size is not None and offset > job.size:
+            offset = 0
+            os.unlink(part)
+
+        original = job.kind == _KIND_ORIGINAL
+        if original:
+            progress.bytes_done += offset
+        with open(part, "ab") as f:
+            async for chunk in self._source.open(job.remote_path, offset):
+                await asyncio.to_thread(f.write, chunk)
+                if original:
+                    progress.bytes_done += len(chunk)
+                    progress.bytes_transferred += len(chunk)
+
+        received = os.path.getsize(part)
+        if job.size is not None and received < job.size:
+            # 保留 .part 文件，下次运行时续传
+            raise RestoreError(f"Incomplete download: {received} of {job.size} bytes")
+        try:
+            await asyncio.to_thread(_verify, part, job.size, job.checksum)
+        except RestoreError:
+            os.unlink(part)
+            raise
+        os.replace(part, job.local_path)
+
+    async def _flush(self, progress: RestoreProgress, force: bool = False) -> None:
+        pending = sum(len(ids) for ids in self._status_updates.values())
+        due = time.monotonic() - self._last_flush >= self._flush_interval
+        if not pending or not (force or due or pending >= self._batch_size):
+            return
+        async with self._db_lock:
+            updates = self._status_updates
+            self._status_updates = {RESTORE_COMPLETED: [], RESTORE_FAILED: []}
+            for status, photo_ids in updates.items():
+                if photo_ids:
+                    await self._session.execute(
+                        update(Photo)
+                        .where(Photo.id.in_(photo_ids))
+                        .values(restore_status=status)
+                        .execution_options(synchronize_session=False)
+                    )
+            await self._session.commit()
+            self._last_flush = time.monotonic()
+        if self._on_progress is not None:
+            await self._on_progress(progress)
+
+
+def _verify(path: str, size: Optional[int], checksum: Optional[str]) -> None:
+    actual_size = os.path.getsize(path)
+    if size is not None and actual_size != size:
+        raise RestoreError(f"Size mismatch for {path}: expected {size}, got {actual_size}")
+    if checksum is None:
+        return
+    digest = hashlib.blake2b(digest_size=32)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    if digest.hexdigest() != checksum:
+        raise RestoreError(f"Checksum mismatch for {path}")
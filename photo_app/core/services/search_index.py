@@ -0,0 +1,430 @@
+"""位图搜索索引模块
+
+本模块为每个用户维护一份内存中的位图倒排索引，覆盖标签、相册和场景类型，
+用于求值 "beach AND 2023 AND NOT screenshot" 这类布尔标签表达式。
+
+主要组件：
+- SearchIndex: 单个用户的索引，提供增量更新和表达式求值
+- SearchIndexRegistry: 按用户懒加载索引，并持久化到 CACHE_PATH
+- search_indexes: 全局注册表实例
+
+表达式语法：
+- 运算符 AND / OR / NOT（大小写不敏感），相邻的词项默认按 AND 连接
+- 支持括号和双引号，例如 "new york" OR (beach AND NOT screenshot)
+- 词项默认是标签名，也可以使用前缀 tag:、album:<id>、scene:
+
+注意事项：
+- 索引只负责计算ID集合，数据库只用于加载最终一页的照片
+- 结果按照片ID倒序排列（即入库顺序）
+- 索引记录构建时用户的变更计数（UserChangeCounter.version），磁盘文件也保存该版本；
+  每次获取索引都与数据库中的计数比较，不一致（其他进程的写入、过期的缓存文件）时重建
+- 写入通过 services.invalidation.index_changed 递增变更计数，提交之后才把增量应用到已加载的索引
+"""
+
+import asyncio
+import logging
+import os
+import re
+import struct
+import uuid
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from photo_app.core.config import settings
+from photo_app.core.dao.change_counter import UserChangeCounterDAO
+from photo_app.core.dao.transaction import has_writes
+from photo_app.core.models.album import photo_albums
+from photo_app.core.models.photo import Photo, PhotoMetadata
+from photo_app.core.models.tag import Tag, photo_tags
+from photo_app.core.utils.bitmap import RoaringBitmap
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b"PSIX2"
+_KIND_TAG = 0
+_KIND_ALBUM = 1
+_KIND_SCENE = 2
+_KIND_ALL = 3
+
+_TOKEN_RE = re.compile(r'\s*(?:(\()|(\))|"([^"]*)"|([^\s()"]+))')
+
+
+def _tokenize(expression: str) -> List[Tuple[str, str]]:
+    """将表达式拆分为 (类型, 值) 词法单元"""
+    tokens = []
+    pos = 0
+    expression = expression.strip()
+    while pos < len(expression):
+        match = _TOKEN_RE.match(expression, pos)
+        if not match or match.end() == pos:
+            raise ValueError(f"Invalid search expression near: {expression[pos:]!r}")
+        pos = match.end()
+        lparen, rparen, quoted, word = match.groups()
+        if lparen:
+            tokens.append(("(", lparen))
+        elif rparen:
+            tokens.append((")", rparen))
+        elif quoted is not None:
+            tokens.append(("term", quoted))
+        elif word.upper() in ("AND", "OR", "NOT"):
+            tokens.append((word.upper(), word))
+        else:
+            tokens.append(("term", word))
+    return tokens
+
+
+class _Parser:
+    """递归下降解析器，直接在位图上求值"""
+
+    def __init__(self, index: "SearchIndex", tokens: List[Tuple[str, str]]):
+        self._index = index
+        self._tokens = tokens
+        self._pos = 0
+
+    def _peek(self) -> Optional[str]:
+        return self._tokens[self._pos][0] if self._pos < len(self._tokens) else None
+
+    def _next(self) -> Tuple[str, str]:
+        token = self._tokens[self._pos]
+        self._pos += 1
+        return token
+
+    def parse(self) -> RoaringBitmap:
+        result = self._or()
+        if self._peek() is not None:
+            raise ValueError(f"Unexpected token: {self._tokens[self._pos][1]!r}")
+        return result
+
+    def _or(self) -> RoaringBitmap:
+        result = self._and()
+        while self._peek() == "OR":
+            self._next()
+            result = result | self._and()
+        return result
+
+    def _and(self) -> RoaringBitmap:
+        result = self._not()
+        while self._peek() in ("AND", "NOT", "term", "("):
+            if self._peek() == "AND":
+                self._next()
+            result = result & self._not()
+        return result
+
+    def _not(self) -> RoaringBitmap:
+        if self._peek() == "NOT":
+            self._next()
+            return self._index.photos - self._not()
+        return self._atom()
+
+    def _atom(self) -> RoaringBitmap:
+        kind = self._peek()
+        if kind is None:
+            raise ValueError("Unexpected end of search expression")
+        token_kind, value = self._next()
+        if token_kind == "(":
+            result = self._or()
+            if self._peek() != ")":
+                raise ValueError("Missing closing parenthesis")
+            self._next()
+            return result
+        if token_kind != "term":
+            raise ValueError(f"Unexpected token: {value!r}")
+        return self._index.lookup(value)
+
+
+class SearchIndex:
+    """单个用户的标签/相册/场景位图索引"""
+
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        self.photos = RoaringBitmap()
+        self.tags: Dict[str, RoaringBitmap] = {}
+        self.albums: Dict[int, RoaringBitmap] = {}
+        self.scenes: Dict[str, RoaringBitmap] = {}
+        # 索引内容对应的用户变更计数
+        self.version = 0
+        self.dirty = False
+
+    @classmethod
+    async def build(cls, session: AsyncSession, user_id: int) -> "SearchIndex":
+        """从数据库构建索引"""
+        index = cls(user_id)
+        owned = and_(Photo.user_id == user_id, Photo.deleted_at.is_(None))
+
+        result = await session.execute(select(Photo.id).where(owned))
+        index.photos.update(result.scalars())
+
+        tag_rows = await session.execute(
+            select(photo_tags.c.photo_id, Tag.name)
+            .join(Tag, Tag.id == photo_tags.c.tag_id)
+            .join(Photo, Photo.id == photo_tags.c.photo_id)
+            .where(owned)
+        )
+        index._fill(index.tags, tag_rows)
+
+        album_rows = await session.execute(
+            select(photo_albums.c.photo_id, photo_albums.c.album_id)
+            .join(Photo, Photo.id == photo_albums.c.photo_id)
+            .where(owned)
+        )
+        index._fill(index.albums, album_rows)
+
+        scene_rows = await session.execute(
+            select(PhotoMetadata.photo_id, PhotoMetadata.scene_type)
+            .join(Photo, Photo.id == PhotoMetadata.photo_id)
+            .where(owned, PhotoMetadata.scene_type.isnot(None))
+        )
+        index._fill(index.scenes, scene_rows)
+        return index
+
+    @staticmethod
+    def _fill(target: dict, rows: Iterable[Tuple[int, object]]) -> None:
+        grouped: Dict[object, List[int]] = {}
+        for photo_id, key in rows:
+            grouped.setdefault(key, []).append(photo_id)
+        for key, ids in grouped.items():
+            target[key] = RoaringBitmap(ids)
+
+    def lookup(self, term: str) -> RoaringBitmap:
+        """查找单个词项对应的位图"""
+        prefix, sep, value = term.partition(":")
+        if sep and prefix.lower() == "album":
+            try:
+                bitmap = self.albums.get(int(value))
+            except ValueError:
+                raise ValueError(f"Invalid album id: {value!r}") from None
+        elif sep and prefix.lower() == "scene":
+            bitmap = self.scenes.get(value)
+        elif sep and prefix.lower() == "tag":
+            bitmap = self.tags.get(value)
+        else:
+            bitmap = self.tags.get(term)
+        return bitmap if bitmap is not None else RoaringBitmap()
+
+    def evaluate(self, expression: str) -> RoaringBitmap:
+        """求值布尔表达式，返回匹配的照片ID位图"""
+        tokens = _tokenize(expression)
+        if not tokens:
+            return self.photos.copy()
+        return _Parser(self, tokens).parse()
+
+    # 增量更新
+
+    def add_photo(self, photo_id: int) -> None:
+        self.photos.add(photo_id)
+        self.dirty = True
+
+    def remove_photo(self, photo_id: int) -> None:
+        self.photos.discard(photo_id)
+        for group in (self.tags, self.albums, self.scenes):
+            for key in [k for k, bitmap in group.items() if photo_id in bitmap]:
+                self._discard(group, key, photo_id)
+        self.dirty = True
+
+    def add_tag(self, photo_ids: Iterable[int], name: str) -> None:
+        self.tags.setdefault(name, RoaringBitmap()).update(photo_ids)
+        self.dirty = True
+
+    def remove_tag(self, photo_ids: Iterable[int], name: str) -> None:
+        for photo_id in photo_ids:
+            self._discard(self.tags, name, photo_id)
+        self.dirty = True
+
+    def add_to_album(self, photo_ids: Iterable[int], album_id: int) -> None:
+        self.albums.setdefault(album_id, RoaringBitmap()).update(photo_ids)
+        self.dirty = True
+
+    def remove_from_album(self, photo_ids: Iterable[int], album_id: int) -> None:
+        for photo_id in photo_ids:
+            self._discard(self.albums, album_id, photo_id)
+        self.dirty = True
+
+    def set_scene(self, photo_id: int, scene_type: Optional[str]) -> None:
+        for key in [k for k, bitmap in self.scenes.items() if photo_id in bitmap]:
+            self._discard(self.scenes, key, photo_id)
+        if scene_type:
+            self.scenes.setdefault(scene_type, RoaringBitmap()).add(photo_id)
+        self.dirty = True
+
+    @staticmethod
+    def _discard(group: dict, key, photo_id: int) -> None:
+        bitmap = group.get(key)
+        if bitmap is None:
+            return
+        bitmap.discard(photo_id)
+        if not bitmap:
+            del group[key]
+
+    # 持久化
+
+    def to_bytes(self) -> bytes:
+        parts = [_MAGIC, struct.pack("<qq", self.user_id, self.version)]
+
+        def section(kind: int, key: str, bitmap: RoaringBitmap) -> None:
+            encoded_key = key.encode("utf-8")
+            data = bitmap.to_bytes()
+            parts.append(struct.pack("<BH", kind, len(encoded_key)))
+            parts.append(encoded_key)
+            parts.append(data)
+
+        section(_KIND_ALL, "", self.photos)
+        for name, bitmap in self.tags.items():
+            section(_KIND_TAG, name, bitmap)
+        for album_id, bitmap in self.albums.items():
+            section(_KIND_ALBUM, str(album_id), bitmap)
+        for scene, bitmap in self.scenes.items():
+            section(_KIND_SCENE, scene, bitmap)
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "SearchIndex":
+        view = memoryview(data)
+        if bytes(view[:len(_MAGIC)]) != _MAGIC:
+            raise ValueError("Invalid search index data")
+        offset = len(_MAGIC)
+        user_id, version = struct.unpack_from("<qq", view, offset)
+        offset += 16
+        index = cls(user_id)
+        index.version = version
+        while offset < len(view):
+            kind, key_len = struct.unpack_from("<BH", view, offset)
+            offset += 3
+            key = bytes(view[offset:offset + key_len]).decode("utf-8")
+            offset += key_len
+            bitmap, offset = RoaringBitmap.from_buffer(view, offset)
+            if kind == _KIND_ALL:
+                index.photos = bitmap
+            elif kind == _KIND_TAG:
+                index.tags[key] = bitmap
+            elif kind == _KIND_ALBUM:
+                index.albums[int(key)] = bitmap
+            elif kind == _KIND_SCENE:
+                index.scenes[key] = bitmap
+            else:
+                raise ValueError(f"Unknown index section: {kind}")
+        return index
+
+
+class SearchIndexRegistry:
+    """按用户懒加载的搜索索引注册表"""
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        self._cache_dir = cache_dir
+        self._indexes: Dict[int, SearchIndex] = {}
+        self._locks: Dict[int, asyncio.Lock] = {}
+
+    @property
+    def cache_dir(self) -> str:
+        return self._cache_dir or os.path.join(settings.CACHE_PATH, "search_index")
+
+    def _path(self, user_id: int) -> str:
+        return os.path.join(self.cache_dir, f"user_{user_id}.idx")
+
+    async def get(self, session: AsyncSession, user_id: int) -> SearchIndex:
+        """获取用户索引：内存 -> 磁盘缓存 -> 数据库重建，只使用版本与数据库一致的索引"""
+        version = await UserChangeCounterDAO(session).get_version(user_id)
+        index = self._indexes.get(user_id)
+        if index is not None and index.version == version:
+            return index
+        if has_writes(session):
+            # 构建结果包含会话中未提交的写入，不能缓存
+            return await self._build(session, user_id, version)
+
+        lock = self._locks.setdefault(user_id, asyncio.Lock())
+        async with lock:
+            index = self._indexes.get(user_id)
+            if index is not None and index.version == version:
+                return index
+            # 文件读写在线程池中执行，不阻塞事件循环
+            index = await asyncio.to_thread(self._load, user_id)
+            if index is None or index.version != version:
+                index = await self._build(session, user_id, version)
+                try:
+                    await asyncio.to_thread(self._save, index)
+                except OSError as exc:
+                    # 缓存文件只是加速，写入失败不影响本次请求
+                    logger.warning("Failed to save search index for user %s: %s", user_id, exc)
+            self._indexes[user_id] = index
+            return index
+
+    @staticmethod
+    async def _build(session: AsyncSession, user_id: int, version: int) -> SearchIndex:
+        # 先读取版本再构建：构建时读到的数据不会比版本旧，最多多重建一次
+        index = await SearchIndex.build(session, user_id)
+        index.version = version
+        return index
+
+    def peek(self, user_id: int) -> Optional[SearchIndex]:
+        """返回已加载的索引，未加载时返回None"""
+        return self._indexes.get(user_id)
+
+    def invalidate(self, user_id: int) -> None:
+        """丢弃用户索引（内存和磁盘），下次访问时重建"""
+        self._indexes.pop(user_id, None)
+        try:
+            os.remove(self._path(user_id))
+        except FileNotFoundError:
+            pass
+
+    def flush(self) -> None:
+        """将所有有修改的索引写回磁盘"""
+        for index in list(self._indexes.values()):
+            if index.dirty:
+                self._save(index)
+
+    def clear(self) -> None:
+        """清空内存中的索引"""
+        self._indexes.clear()
+
+    def _load(self, user_id: int) -> Optional[SearchIndex]:
+        try:
+            with open(self._path(user_id), "rb") as f:
+                return SearchIndex.from_bytes(f.read())
+        except FileNotFoundError:
+            return None
+        except OSError as exc:
+            logger.warning("Failed to read search index for user %s: %s", user_id, exc)
+            return None
+        except (ValueError, struct.error, UnicodeDecodeError):
+            # 缓存文件损坏时从数据库重建
+            return None
+
+    def _save(self, index: SearchIndex) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(index.user_id)
+        # 临时文件名唯一：多个工作进程同时保存同一用户的索引时互不干扰，后替换的生效
+        tmp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(index.to_bytes())
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        index.dirty = False
+
+    # 增量更新：在事务提交之后调用，仅在索引已加载时生效
+
+    def apply(self, user_id: int, version: int, update: Optional[Callable[[SearchIndex], None]] = None) -> None:
+        """应用一次已提交的变更，version 为该变更递增后的变更计数，update 为None表示不影响索引内容
+
+        索引版本不是 version - 1 时说明中间有本进程没有看到的变更，丢弃内存中的索引，下次访问时重建。
+        """
+        index = self.peek(user_id)
+        if index is None:
+            return
+        if index.version != version - 1:
+            self._indexes.pop(user_id, None)
+            return
+        if update is not None:
+            update(index)
+        index.version = version
+        index.dirty = True
+
+
+search_indexes = SearchIndexRegistry()
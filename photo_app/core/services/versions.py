@@ -0,0 +1,219 @@
+"""照片版本存储服务
+
+本模块用内容定义分块保存照片的编辑历史，版本之间共享未改变的数据块。
+
+工作流程：
+1. 保存版本：文件按内容定义切点分块，只写入块存储中还不存在的块，登记块清单并增加引用计数
+2. 恢复版本：按块清单顺序流式读取块，拼接回原始文件；恢复到照片自身的文件时同时更新 Photo.checksum
+3. 删除版本：删除版本记录，块引用计数减1
+4. 垃圾回收：删除引用计数为0且超过宽限期的块
+
+注意事项：
+- 只修改元数据或局部编辑的重新保存，通常只会产生几个新块
+- 块文件在登记引用之前写入，事务失败留下的孤立块由 sweep_orphan_chunks 清理
+- 写入时跳过的已存在块可能在登记引用之前被垃圾回收删除，所以登记引用之后再确认一次块文件存在，
+  缺失的块从原文件重新写入；此后引用已持有，垃圾回收不会再删除这些块
+- 垃圾回收在删除记录的同一事务内、提交之前删除文件，期间记录被锁定，保存操作无法重新引用这些块
+- 保存、恢复、删除版本由调用方提交会话；垃圾回收每批自行提交
+"""
+
+import asyncio
+import hashlib
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, BinaryIO, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from photo_app.core.dao.version import PhotoVersionDAO, unpack_manifest
+from photo_app.core.models.photo import Photo
+from photo_app.core.models.version import PhotoVersion
+from photo_app.infrastructure.storage.chunking import iter_chunks
+from photo_app.infrastructure.storage.chunkstore import ChunkStore, chunk_digest
+
+# 无引用的块在删除前保留的时间，避免与并发保存相同内容的操作冲突
+GC_GRACE_PERIOD = timedelta(hours=1)
+
+# 恢复时每次从线程池读取的块数
+_READ_BATCH = 16
+
+
+@dataclass
+class VersionSaveResult:
+    """保存版本的结果"""
+    version: int
+    size: int
+    chunk_count: int
+    # 本次实际写入块存储的块数和字节数
+    new_chunks: int
+    new_bytes: int
+
+
+def _store_file(store: ChunkStore, src: BinaryIO) -> Tuple[List[str], Dict[str, int], str, int, int]:
+    """分块并写入块存储，返回 (块哈希列表, 块大小, 文件哈希, 新块数, 新字节数)"""
+    file_digest = hashlib.blake2b(digest_size=32)
+    digests: List[str] = []
+    sizes: Dict[str, int] = {}
+    new_chunks = new_bytes = 0
+    for chunk in iter_chunks(src):
+        file_digest.update(chunk)
+        digest = chunk_digest(chunk)
+        digests.append(digest)
+        if digest not in sizes:
+            sizes[digest] = len(chunk)
+            if store.put(chunk, digest):
+                new_chunks += 1
+                new_bytes += len(chunk)
+    return digests, sizes, file_digest.hexdigest(), new_chunks, new_bytes
+
+
+def _write_missing(store: ChunkStore, src: BinaryIO, missing: Set[str]) -> Tuple[int, int]:
+    """从原文件重新写入缺失的块，返回 (写入块数, 写入字节数)"""
+    pending = set(missing)
+    written = written_bytes = 0
+    for chunk in iter_chunks(src):
+        digest = chunk_digest(chunk)
+        if digest in pending:
+            pending.discard(digest)
+            if store.put(chunk, digest):
+                written += 1
+                written_bytes += len(chunk)
+    if pending:
+        raise ValueError("File changed while saving version")
+    return written, written_bytes
+
+
+class PhotoVersionStore:
+    """基于块存储的照片版本服务"""
+
+    def __init__(self, session: AsyncSession, store: Optional[ChunkStore] = None):
+        self._session = session
+        self._store = store or ChunkStore()
+        self._versions = PhotoVersionDAO(session)
+
+    async def save_version(self, photo_id: int, path: str) -> VersionSaveResult:
+        """把文件当前内容保存为照片的新版本"""
+        def _run():
+            with open(path, "rb") as src:
+                return _store_file(self._store, src)
+
+        digests, sizes, content_hash, new_chunks, new_bytes = await asyncio.to_thread(_run)
+        version = await self._versions.add_version(photo_id, digests, sizes, content_hash)
+
+        # 引用已持有，再确认块文件都存在
+        missing = await asyncio.to_thread(lambda: {d for d in sizes if not self._store.exists(d)})
+        if missing:
+            def _repair():
+                with open(path, "rb") as src:
+                    return _write_missing(self._store, src, missing)
+
+            written, written_bytes = await asyncio.to_thread(_repair)
+            new_chunks += written
+            new_bytes += written_bytes
+        return VersionSaveResult(
+            version=version.version,
+            size=version.size,
+            chunk_count=version.chunk_count,
+            new_chunks=new_chunks,
+            new_bytes=new_bytes
+        )
+
+    async def _get_version(self, photo_id: int, version: int) -> PhotoVersion:
+        record = await self._versions.get_version(photo_id, version)
+        if record is None:
+            raise LookupError(f"Photo {photo_id} has no version {version}")
+        return record
+
+    async def iter_version(self, photo_id: int, version: int) -> AsyncIterator[bytes]:
+        """按顺序流式产出版本内容"""
+        async for chunk in self._iter_record(await self._get_version(photo_id, version)):
+            yield chunk
+
+    async def _iter_record(self, record: PhotoVersion) -> AsyncIterator[bytes]:
+        digests = unpack_manifest(record.chunk_manifest)
+        for start in range(0, len(digests), _READ_BATCH):
+            batch = digests[start:start + _READ_BATCH]
+            chunks = await asyncio.to_thread(lambda: [self._store.get(d) for d in batch])
+            for chunk in chunks:
+                yield chunk
+
+    async def restore_version(self, photo_id: int, version: int, dst_path: str) -> int:
+        """把版本内容恢复到目标路径（先写临时文件再原子替换），返回字节数
+
+        目标路径是照片当前的原图时，同时把照片的校验和更新为该版本的内容哈希，
+        并刷新 updated_at（下载接口的 Last-Modified），使旧的 If-Modified-Since / If-Range 失效。
+        """
+        record = await self._get_version(photo_id, version)
+        tmp_path = dst_path + ".restore.tmp"
+        written = 0
+        try:
+            with open(tmp_path, "wb") as dst:
+                async for chunk in self._iter_record(record):
+                    await asyncio.to_thread(dst.write, chunk)
+                    written += len(chunk)
+            os.replace(tmp_path, dst_path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        await self._session.execute(
+            update(Photo)
+            .where(Photo.id == photo_id, Photo.filepath == dst_path)
+            .values(checksum=record.content_hash, updated_at=datetime.now(timezone.utc))
+        )
+        return written
+
+    async def delete_version(self, photo_id: int, version: int) -> bool:
+        return await self._versions.remove_version(photo_id, version)
+
+    async def delete_all_versions(self, photo_id: int) -> int:
+        return await self._versions.remove_all_versions(photo_id)
+
+    async def collect_garbage(
+        self,
+        grace_period: timedelta = GC_GRACE_PERIOD,
+        batch_size: int = 1000
+    ) -> int:
+        """删除无引用的块，返回删除的块数"""
+        cutoff = datetime.utcnow() - grace_period
+        removed = 0
+        while True:
+            digests = await self._versions.collect_released(cutoff, limit=batch_size)
+            if not digests:
+                return removed
+            # 提交之前删除文件：记录在事务结束前保持锁定，并发的保存会等待提交后重新插入记录并写入文件；
+            # 提交失败时留下无文件的零引用记录，再次引用时由 save_version 重新写入
+            await asyncio.to_thread(lambda: [self._store.delete(d) for d in digests])
+            await self._session.commit()
+            removed += len(digests)
+
+    async def sweep_orphan_chunks(
+        self,
+        grace_period: timedelta = GC_GRACE_PERIOD,
+        batch_size: int = 1000
+    ) -> int:
+        """删除块存储中没有数据库记录且超过宽限期的文件"""
+        cutoff = (datetime.now() - grace_period).timestamp()
+        digests = await asyncio.to_thread(lambda: list(self._store.iter_digests()))
+        removed = 0
+        for start in range(0, len(digests), batch_size):
+            batch = digests[start:start + batch_size]
+            known = await self._versions.existing_digests(batch)
+            orphans = [d for d in batch if d not in known]
+
+            def _sweep() -> int:
+                count = 0
+                for digest in orphans:
+                    try:
+                        if os.stat(self._store.path_for(digest)).st_mtime < cutoff:
+                            count += self._store.delete(digest)
+                    except FileNotFoundError:
+                        continue
+                return count
+
+            removed += await asyncio.to_thread(_sweep)
+        return removed
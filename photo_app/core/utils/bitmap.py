@@ -0,0 +1,301 @@
+"""压缩位图模块
+
+本模块实现了一个纯Python的Roaring风格压缩位图，用于照片ID集合的快速布尔运算。
+
+结构说明：
+- 32位整数按高16位分桶，每个桶是一个容器
+- 稀疏容器：有序的 array('H')，元素不超过 ARRAY_MAX_SIZE 个
+- 稠密容器：Python int 作为 65536 位的位集，按位运算由C实现
+
+使用说明：
+1. 通过 add/update 构建位图
+2. 使用 & | - ^ 运算符进行集合运算
+3. 使用 page() 按升序或降序取出一页ID
+4. 使用 to_bytes()/from_bytes() 持久化
+"""
+
+import struct
+from array import array
+from bisect import bisect_left
+from itertools import groupby
+from typing import Dict, Iterable, Iterator, List, Tuple, Union
+
+# 稀疏容器的最大元素数，超过后转换为位集
+ARRAY_MAX_SIZE = 4096
+
+_MAGIC = b"RBM1"
+_ARRAY = 0
+_BITSET = 1
+_BITSET_BYTES = 8192
+
+Container = Union[array, int]
+
+
+def _bitset_to_array(bits: int) -> array:
+    """位集转换为有序数组"""
+    values = array("H")
+    while bits:
+        low = bits & -bits
+        values.append(low.bit_length() - 1)
+        bits ^= low
+    return values
+
+
+def _array_to_bitset(values: Iterable[int]) -> int:
+    """有序数组转换为位集"""
+    bits = 0
+    for value in values:
+        bits |= 1 << value
+    return bits
+
+
+def _cardinality(container: Container) -> int:
+    if isinstance(container, int):
+        return container.bit_count()
+    return len(container)
+
+
+def _normalize(container: Container) -> Container:
+    """根据基数选择合适的容器类型"""
+    if isinstance(container, int):
+        if container.bit_count() <= ARRAY_MAX_SIZE:
+            return _bitset_to_array(container)
+        return container
+    if len(container) > ARRAY_MAX_SIZE:
+        return _array_to_bitset(container)
+    return container
+
+
+def _as_bitset(container: Container) -> int:
+    if isinstance(container, int):
+        return container
+    return _array_to_bitset(container)
+
+
+def _and(a: Container, b: Container) -> Container:
+    if isinstance(a, int) and isinstance(b, int):
+        return _normalize(a & b)
+    if isinstance(a, int):
+        a, b = b, a
+    if isinstance(b, int):
+        return array("H", [v for v in a if (b >> v) & 1])
+    return array("H", sorted(set(a).intersection(b)))
+
+
+def _or(a: Container, b: Container) -> Container:
+    if isinstance(a, int) or isinstance(b, int):
+        return _normalize(_as_bitset(a) | _as_bitset(b))
+    return _normalize(array("H", sorted(set(a).union(b))))
+
+
+def _andnot(a: Container, b: Container) -> Container:
+    if isinstance(a, int):
+        return _normalize(a & ~_as_bitset(b))
+    if isinstance(b, int):
+        return array("H", [v for v in a if not (b >> v) & 1])
+    excluded = set(b)
+    return array("H", [v for v in a if v not in excluded])
+
+
+def _xor(a: Container, b: Container) -> Container:
+    if isinstance(a, int) or isinstance(b, int):
+        return _normalize(_as_bitset(a) ^ _as_bitset(b))
+    return _normalize(array("H", sorted(set(a).symmetric_difference(b))))
+
+
+def _iter_container(container: Container, descending: bool) -> Iterator[int]:
+    if isinstance(container, int):
+        values: Iterable[int] = _bitset_to_array(container)
+    else:
+        values = container
+    return reversed(values) if descending else iter(values)
+
+
+class RoaringBitmap:
+    """Roaring风格的压缩整数位图"""
+
+    __slots__ = ("_containers",)
+
+    def __init__(self, values: Iterable[int] = ()):
+        self._containers: Dict[int, Container] = {}
+        self.update(values)
+
+    def add(self, value: int) -> None:
+        """添加单个元素"""
+        key, low = value >> 16, value & 0xFFFF
+        container = self._containers.get(key)
+        if container is None:
+            self._containers[key] = array("H", [low])
+        elif isinstance(container, int):
+            self._containers[key] = container | (1 << low)
+        else:
+            pos = bisect_left(container, low)
+            if pos == len(container) or container[pos] != low:
+                container.insert(pos, low)
+                if len(container) > ARRAY_MAX_SIZE:
+                    self._containers[key] = _array_to_bitset(container)
+
+    def update(self, values: Iterable[int]) -> None:
+        """批量添加元素"""
+        for key, group in groupby(sorted(values), key=lambda v: v >> 16):
+            incoming = array("H", sorted({v & 0xFFFF for v in group}))
+            container = self._containers.get(key)
+            self._containers[key] = (
+                _normalize(incoming) if container is None else _or(container, incoming)
+            )
+
+    def discard(self, value: int) -> None:
+        """移除单个元素（不存在时忽略）"""
+        key, low = value >> 16, value & 0xFFFF
+        container = self._containers.get(key)
+        if container is None:
+            return
+        if isinstance(container, int):
+            container = _normalize(container & ~(1 << low))
+        else:
+            pos = bisect_left(container, low)
+            if pos < len(container) and container[pos] == low:
+                del container[pos]
+        if _cardinality(container):
+            self._containers[key] = container
+        else:
+            del self._containers[key]
+
+    def __contains__(self, value: int) -> bool:
+        container = self._containers.get(value >> 16)
+        if container is None:
+            return False
+        low = value & 0xFFFF
+        if isinstance(container, int):
+            return bool((container >> low) & 1)
+        pos = bisect_left(container, low)
+        return pos < len(container) and container[pos] == low
+
+    def __len__(self) -> int:
+        return sum(_cardinality(c) for c in self._containers.values())
+
+    def __bool__(self) -> bool:
+        return bool(self._containers)
+
+    def __iter__(self) -> Iterator[int]:
+        return self.iter()
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, RoaringBitmap):
+            return NotImplemented
+        if self._containers.keys() != other._containers.keys():
+            return False
+        return all(
+            _as_bitset(c) == _as_bitset(other._containers[k])
+            for k, c in self._containers.items()
+        )
+
+    def __repr__(self) -> str:
+        return f"RoaringBitmap(cardinality={len(self)})"
+
+    def iter(self, descending: bool = False) -> Iterator[int]:
+        """按顺序遍历元素"""
+        for key in sorted(self._containers, reverse=descending):
+            high = key << 16
+            for low in _iter_container(self._containers[key], descending):
+                yield high | low
+
+    def page(self, skip: int = 0, limit: int = 50, descending: bool = True) -> List[int]:
+        """取出一页元素，按容器基数整块跳过偏移量"""
+        result: List[int] = []
+        for key in sorted(self._containers, reverse=descending):
+            container = self._containers[key]
+            size = _cardinality(container)
+            if skip >= size:
+                skip -= size
+                continue
+            high = key << 16
+            for low in _iter_container(container, descending):
+                if skip:
+                    skip -= 1
+                    continue
+                result.append(high | low)
+                if len(result) >= limit:
+                    return result
+        return result
+
+    def copy(self) -> "RoaringBitmap":
+        clone = RoaringBitmap()
+        clone._containers = {
+            k: (c if isinstance(c, int) else array("H", c))
+            for k, c in self._containers.items()
+        }
+        return clone
+
+    def _combine(self, other: "RoaringBitmap", op, keep_left: bool, keep_right: bool) -> "RoaringBitmap":
+        result = RoaringBitmap()
+        for key, container in self._containers.items():
+            other_container = other._containers.get(key)
+            if other_container is None:
+                if keep_left:
+                    result._containers[key] = container if isinstance(container, int) else array("H", container)
+                continue
+            combined = op(container, other_container)
+            if _cardinality(combined):
+                result._containers[key] = combined
+        if keep_right:
+            for key, container in other._containers.items():
+                if key not in self._containers:
+                    result._containers[key] = container if isinstance(container, int) else array("H", container)
+        return result
+
+    def __and__(self, other: "RoaringBitmap") -> "RoaringBitmap":
+        return self._combine(other, _and, False, False)
+
+    def __or__(self, other: "RoaringBitmap") -> "RoaringBitmap":
+        return self._combine(other, _or, True, True)
+
+    def __sub__(self, other: "RoaringBitmap") -> "RoaringBitmap":
+        return self._combine(other, _andnot, True, False)
+
+    def __xor__(self, other: "RoaringBitmap") -> "RoaringBitmap":
+        return self._combine(other, _xor, True, True)
+
+    def to_bytes(self) -> bytes:
+        """序列化为紧凑的二进制格式"""
+        parts = [_MAGIC, struct.pack("<I", len(self._containers))]
+        for key in sorted(self._containers):
+            container = self._containers[key]
+            if isinstance(container, int):
+                parts.append(struct.pack("<HB", key, _BITSET))
+                parts.append(container.to_bytes(_BITSET_BYTES, "little"))
+            else:
+                parts.append(struct.pack("<HBH", key, _ARRAY, len(container) - 1))
+                parts.append(container.tobytes())
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "RoaringBitmap":
+        """从二进制格式反序列化"""
+        bitmap, offset = cls.from_buffer(memoryview(data), 0)
+        if offset != len(data):
+            raise ValueError("Trailing data after bitmap")
+        return bitmap
+
+    @classmethod
+    def from_buffer(cls, data: memoryview, offset: int) -> Tuple["RoaringBitmap", int]:
+        """从缓冲区的指定偏移处读取位图，返回位图和结束偏移"""
+        if bytes(data[offset:offset + 4]) != _MAGIC:
+            raise ValueError("Invalid bitmap data")
+        (count,) = struct.unpack_from("<I", data, offset + 4)
+        offset += 8
+        bitmap = cls()
+        for _ in range(count):
+            key, kind = struct.unpack_from("<HB", data, offset)
+            offset += 3
+            if kind == _BITSET:
+                bitmap._containers[key] = int.from_bytes(data[offset:offset + _BITSET_BYTES], "little")
+                offset += _BITSET_BYTES
+            else:
+                (size,) = struct.unpack_from("<H", data, offset)
+                offset += 2
+                values = array("H")
+                values.frombytes(data[offset:offset + (size + 1) * 2])
+                bitmap._containers[key] = values
+                offset += (size + 1) * 2
+        return bitmap, offset
@@ -0,0 +1,151 @@
+"""EXIF存储与字段提取模块
+
+完整EXIF（含厂商 MakerNote）以压缩后的JSON文本存入 PhotoMetadata.exif_blob，没有长度限制；
+常用于筛选的字段提取为独立的带索引列（见 extract_fields）。
+
+压缩格式：
+- 第一个字节为编码标记：0x01 zlib，0x02 zstd
+- 安装了 zstandard 时使用zstd（压缩率和速度都更好），否则回退到标准库zlib
+- 解码时按标记选择算法，两种格式的数据可以共存
+
+注意事项：
+- 无法解析为JSON的旧数据（例如被4000字符上限截断的 raw_exif）按原文本保存，不会丢失
+- zstd数据在未安装 zstandard 的环境中无法解码，会抛出 ExifCodecError
+"""
+
+import json
+import zlib
+from datetime import datetime
+from fractions import Fraction
+from typing import Any, Dict, Mapping, Optional, Union
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - 取决于运行环境
+    zstandard = None
+
+CODEC_ZLIB = 0x01
+CODEC_ZSTD = 0x02
+
+_ZLIB_LEVEL = 6
+_ZSTD_LEVEL = 10
+
+# 提取字段 -> 依次尝试的EXIF键（PIL的标签名，以及部分工具输出的小写键）
+_FIELD_KEYS = {
+    "camera_make": ("Make", "make"),
+    "camera_model": ("Model", "model"),
+    "lens_model": ("LensModel", "lens_model", "Lens", "lens"),
+    "iso": ("ISOSpeedRatings", "PhotographicSensitivity", "ISO", "iso"),
+    "focal_length": ("FocalLength", "focal_length"),
+    "aperture": ("FNumber", "fnumber", "aperture"),
+    "captured_at": ("DateTimeOriginal", "DateTimeDigitized", "DateTime", "datetime_original"),
+}
+
+# 提取字段的最大长度，与 PhotoMetadata 的列定义一致
+_MAX_LENGTHS = {"camera_make": 64, "camera_model": 64, "lens_model": 128}
+
+
+class ExifCodecError(Exception):
+    """EXIF数据无法解码"""
+
+
+def compress_exif(exif: Union[Mapping[str, Any], str], codec: Optional[int] = None) -> bytes:
+    """把EXIF字典（或已序列化的文本）压缩为带编码标记的字节串"""
+    if isinstance(exif, str):
+        text = exif
+    else:
+        text = json.dumps(exif, ensure_ascii=False, separators=(",", ":"), default=str)
+    data = text.encode("utf-8")
+
+    if codec is None:
+        codec = CODEC_ZSTD if zstandard is not None else CODEC_ZLIB
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise ExifCodecError("zstandard is not installed")
+        return bytes([CODEC_ZSTD]) + zstandard.ZstdCompressor(level=_ZSTD_LEVEL).compress(data)
+    if codec == CODEC_ZLIB:
+        return bytes([CODEC_ZLIB]) + zlib.compress(data, _ZLIB_LEVEL)
+    raise ExifCodecError(f"Unknown codec: {codec}")
+
+
+def decompress_exif(blob: Optional[bytes]) -> Optional[str]:
+    """解压为EXIF的JSON文本"""
+    if blob is None:
+        return None
+    if not blob:
+        raise ExifCodecError("Empty EXIF blob")
+    codec, payload = blob[0], bytes(blob[1:])
+    try:
+        if codec == CODEC_ZLIB:
+            data = zlib.decompress(payload)
+        elif codec == CODEC_ZSTD:
+            if zstandard is None:
+                raise ExifCodecError("zstandard is not installed")
+            data = zstandard.ZstdDecompressor().decompress(payload)
+        else:
+            raise ExifCodecError(f"Unknown codec: {codec}")
+    except (zlib.error, ValueError) as exc:
+        raise ExifCodecError(str(exc)) from exc
+    return data.decode("utf-8")
+
+
+def load_exif(exif: Union[Mapping[str, Any], str, None]) -> Optional[Mapping[str, Any]]:
+    """把EXIF文本解析为字典，无法解析时返回None"""
+    if isinstance(exif, str):
+        try:
+            exif = json.loads(exif)
+        except ValueError:
+            return None
+    return exif if isinstance(exif, Mapping) else None
+
+
+def _rational(value: Any) -> float:
+    """EXIF有理数可能是 [分子, 分母]、"a/b" 字符串或数字"""
+    if isinstance(value, (list, tuple)) and len(value) == 2:
+        numerator, denominator = value
+        return float(numerator) / float(denominator) if denominator else 0.0
+    if isinstance(value, str) and "/" in value:
+        return float(Fraction(value))
+    return float(value)
+
+
+def _parse_value(field: str, value: Any) -> Any:
+    if field in _MAX_LENGTHS:
+        text = str(value).strip().strip("\x00").strip()
+        return text[:_MAX_LENGTHS[field]] or None
+    if field == "iso":
+        if isinstance(value, (list, tuple)):
+            value = value[0] if value else None
+        return int(value) if value is not None else None
+    if field in ("focal_length", "aperture"):
+        number = _rational(value)
+        return round(number, 2) if number > 0 else None
+    if field == "captured_at":
+        text = str(value).strip().strip("\x00")
+        for fmt in ("%Y:%m:%d %H:%M:%S", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S"):
+            try:
+                return datetime.strptime(text[:19], fmt)
+            except ValueError:
+                continue
+        return None
+    return value
+
+
+def extract_fields(exif: Union[Mapping[str, Any], str, None]) -> Dict[str, Any]:
+    """提取用于筛选的EXIF字段，返回值的键与 PhotoMetadata 的列同名，缺失或无法解析的字段为None"""
+    fields: Dict[str, Any] = {field: None for field in _FIELD_KEYS}
+    exif = load_exif(exif)
+    if exif is None:
+        return fields
+    for field, keys in _FIELD_KEYS.items():
+        for key in keys:
+            value = exif.get(key)
+            if value in (None, ""):
+                continue
+            try:
+                fields[field] = _parse_value(field, value)
+            except (TypeError, ValueError, ZeroDivisionError):
+                continue
+            if fields[field] is not None:
+                break
+    return fields
@@ -0,0 +1,75 @@
+"""外部排序模块
+
+当数据量超过内存上限时，将数据分批排序写入临时文件，再用多路归并按序读出，内存占用与总量无关。
+
+注意事项：
+- 元素必须可以序列化为JSON（例如由字符串和数字组成的元组/列表）
+- 返回的迭代器在耗尽或关闭时删除临时文件
+"""
+
+import heapq
+import json
+import os
+import tempfile
+from typing import Any, AsyncIterable, Callable, Iterator, List, Optional, Sequence
+
+DEFAULT_RUN_SIZE = 200_000
+
+
+def _write_run(items: List[Sequence[Any]], tmp_dir: Optional[str]) -> str:
+    fd, path = tempfile.mkstemp(prefix="extsort-", suffix=".jsonl", dir=tmp_dir)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        for item in items:
+            f.write(json.dumps(item, ensure_ascii=False))
+            f.write("\n")
+    return path
+
+
+def _read_run(path: str) -> Iterator[tuple]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            yield tuple(json.loads(line))
+
+
+def _merge_runs(paths: List[str], key: Optional[Callable]) -> Iterator[tuple]:
+    try:
+        yield from heapq.merge(*(_read_run(p) for p in paths), key=key)
+    finally:
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+async def external_sort(
+    items: AsyncIterable[Sequence[Any]],
+    *,
+    key: Optional[Callable] = None,
+    run_size: int = DEFAULT_RUN_SIZE,
+    tmp_dir: Optional[str] = None
+) -> Iterator[tuple]:
+    """对异步数据流排序，返回按序产出元组的迭代器
+
+    数据量不超过 run_size 时直接在内存中排序，否则分段写入临时文件后归并。
+    """
+    buffer: List[tuple] = []
+    runs: List[str] = []
+    try:
+        async for item in items:
+            buffer.append(tuple(item))
+            if len(buffer) >= run_size:
+                buffer.sort(key=key)
+                runs.append(_write_run(buffer, tmp_dir))
+                buffer = []
+    except BaseException:
+        for path in runs:
+            os.remove(path)
+        raise
+
+    buffer.sort(key=key)
+    if not runs:
+        return iter(buffer)
+    if buffer:
+        runs.append(_write_run(buffer, tmp_dir))
+    return _merge_runs(runs, key)
@@ -0,0 +1,144 @@
+"""地理位置工具模块
+
+本模块提供EXIF GPS解析和Geohash编码，用于照片地图视图的空间索引。
+
+主要功能：
+- parse_gps: 从EXIF字典中解析十进制经纬度
+- encode_geohash / decode_geohash: Geohash编解码
+- geohash_precision_for_zoom: 地图缩放级别到Geohash聚合精度的映射
+
+注意事项：
+- Geohash前缀相同的点在空间上相邻，按前缀GROUP BY即可完成网格聚合
+- 所有坐标均为WGS84十进制度
+"""
+
+import json
+from fractions import Fraction
+from typing import Any, Mapping, Optional, Sequence, Tuple, Union
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_DECODE = {c: i for i, c in enumerate(_BASE32)}
+
+GEOHASH_PRECISION = 12
+
+# 缩放级别上限 -> Geohash前缀长度（网格单元约为屏幕上几十像素）
+_ZOOM_PRECISION = (
+    (2, 1),
+    (4, 2),
+    (7, 3),
+    (9, 4),
+    (12, 5),
+    (14, 6),
+    (16, 7),
+)
+
+
+def encode_geohash(latitude: float, longitude: float, precision: int = GEOHASH_PRECISION) -> str:
+    """将经纬度编码为Geohash字符串"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        target, rng = (longitude, lon_range) if even else (latitude, lat_range)
+        mid = (rng[0] + rng[1]) / 2
+        if target >= mid:
+            value = (value << 1) | 1
+            rng[0] = mid
+        else:
+            value <<= 1
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits = 0
+            value = 0
+    return "".join(chars)
+
+
+def decode_geohash(geohash: str) -> Tuple[float, float, float, float]:
+    """解码Geohash，返回单元格边界 (south, west, north, east)"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = _DECODE[char]
+        for shift in range(4, -1, -1):
+            rng = lon_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if (value >> shift) & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return lat_range[0], lon_range[0], lat_range[1], lon_range[1]
+
+
+def geohash_precision_for_zoom(zoom: int) -> int:
+    """根据地图缩放级别选择聚合使用的Geohash前缀长度"""
+    for max_zoom, precision in _ZOOM_PRECISION:
+        if zoom <= max_zoom:
+            return precision
+    return 8
+
+
+def _to_float(value: Any) -> float:
+    """EXIF有理数可能是 [分子, 分母]、"a/b" 字符串或数字"""
+    if isinstance(value, (list, tuple)) and len(value) == 2:
+        numerator, denominator = value
+        return float(numerator) / float(denominator) if denominator else 0.0
+    if isinstance(value, str) and "/" in value:
+        return float(Fraction(value))
+    return float(value)
+
+
+def _dms_to_degrees(value: Union[Sequence[Any], float, str]) -> float:
+    if isinstance(value, (list, tuple)) and len(value) == 3:
+        degrees, minutes, seconds = (_to_float(v) for v in value)
+        return degrees + minutes / 60 + seconds / 3600
+    return _to_float(value)
+
+
+def parse_gps(exif: Union[Mapping[str, Any], str, None]) -> Optional[Tuple[float, float]]:
+    """从EXIF数据中解析经纬度
+
+    支持 GPSInfo 子字典或顶层的 GPSLatitude/GPSLatitudeRef 等标准字段，
+    也支持已解析好的 latitude/longitude 字段。无法解析时返回None。
+    """
+    if isinstance(exif, str):
+        try:
+            exif = json.loads(exif)
+        except ValueError:
+            return None
+    if not isinstance(exif, Mapping):
+        return None
+
+    gps = exif.get("GPSInfo", exif)
+    if not isinstance(gps, Mapping):
+        return None
+
+    try:
+        if "latitude" in gps and "longitude" in gps:
+            latitude = float(gps["latitude"])
+            longitude = float(gps["longitude"])
+        elif "GPSLatitude" in gps and "GPSLongitude" in gps:
+            latitude = _dms_to_degrees(gps["GPSLatitude"])
+            longitude = _dms_to_degrees(gps["GPSLongitude"])
+            if str(gps.get("GPSLatitudeRef", "N")).upper().startswith("S"):
+                latitude = -latitude
+            if str(gps.get("GPSLongitudeRef", "E")).upper().startswith("W"):
+                longitude = -longitude
+        else:
+            return None
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None
+    if latitude == 0 and longitude == 0:
+        # 未获取到定位的相机常写入 0,0
+        return None
+    return latitude, longitude
@@ -0,0 +1,132 @@
+"""HTTP条件请求与范围请求工具模块
+
+本模块实现文件下载所需的 Range / If-Range / If-None-Match / If-Modified-Since 处理（RFC 9110）。
+
+主要功能：
+- parse_range_header: 解析 bytes 范围，合并重叠区间
+- make_etag: 由内容校验和与版本号生成强ETag
+- make_weak_etag: 由验证器的各部分生成弱ETag（列表等JSON响应）
+- etag_matches / if_range_allows: ETag比较
+- is_not_modified: If-None-Match / If-Modified-Since 判断是否返回 304
+- http_date / parse_http_date: HTTP日期格式转换
+
+注意事项：
+- 语法错误的 Range 头按规范忽略（返回完整内容），完全无法满足时抛出 RangeNotSatisfiable
+- 区间数超过 max_ranges 时忽略 Range 头，防止大量小区间放大请求
+"""
+
+import hashlib
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, List, Mapping, Optional, Tuple
+
+MAX_RANGES = 16
+
+
+class RangeNotSatisfiable(Exception):
+    """请求的区间都不在文件范围内"""
+
+
+def parse_range_header(value: str, size: int, max_ranges: int = MAX_RANGES) -> Optional[List[Tuple[int, int]]]:
+    """解析 Range 头，返回按起点排序、已合并的闭区间列表；应忽略时返回None"""
+    unit, _, spec = value.partition("=")
+    if unit.strip().lower() != "bytes" or not spec:
+        return None
+
+    ranges = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        first, dash, last = part.partition("-")
+        if not dash:
+            return None
+        first, last = first.strip(), last.strip()
+        try:
+            if first:
+                start = int(first)
+                end = int(last) if last else max(size - 1, start)
+                if start < 0 or end < start:
+                    return None
+            else:
+                # 后缀区间：最后N个字节
+                suffix = int(last)
+                if suffix < 0:
+                    return None
+                if suffix == 0:
+                    continue
+                start, end = max(size - suffix, 0), size - 1
+        except ValueError:
+            return None
+        if start >= size:
+            continue
+        ranges.append((start, min(end, size - 1)))
+
+    if not ranges:
+        raise RangeNotSatisfiable(size)
+
+    ranges.sort()
+    merged = [ranges[0]]
+    for start, end in ranges[1:]:
+        last_start, last_end = merged[-1]
+        if start <= last_end + 1:
+            merged[-1] = (last_start, max(last_end, end))
+        else:
+            merged.append((start, end))
+    if len(merged) > max_ranges:
+        return None
+    return merged
+
+
+def make_etag(checksum: Optional[str], version: int, size: int, mtime_ns: int) -> str:
+    """有校验和时生成强ETag，否则根据文件大小和修改时间生成弱ETag"""
+    if checksum:
+        return f'"{checksum[:32]}-{version}"'
+    return f'W/"{size:x}-{mtime_ns:x}"'
+
+
+def make_weak_etag(*parts: Any) -> str:
+    """由验证器的各部分生成弱ETag"""
+    digest = hashlib.blake2b("\x1f".join(map(str, parts)).encode("utf-8"), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def _opaque(tag: str) -> str:
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    """If-None-Match 使用弱比较"""
+    if header.strip() == "*":
+        return True
+    return any(_opaque(candidate.strip()) == _opaque(etag) for candidate in header.split(","))
+
+
+def is_not_modified(headers: Mapping[str, str], etag: str, last_modified: Optional[float]) -> bool:
+    """条件GET是否应返回 304；If-None-Match 存在时忽略 If-Modified-Since"""
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    if last_modified is None:
+        return False
+    modified_since = parse_http_date(headers.get("if-modified-since", ""))
+    return modified_since is not None and int(last_modified) <= int(modified_since)
+
+
+def if_range_allows(header: str, etag: str, last_modified: float) -> bool:
+    """If-Range 条件成立时才按 Range 返回部分内容；ETag需强比较"""
+    header = header.strip()
+    if header.startswith('"') or header.startswith("W/"):
+        return not etag.startswith("W/") and header == etag
+    modified_since = parse_http_date(header)
+    return modified_since is not None and int(last_modified) == int(modified_since)
+
+
+def http_date(timestamp: float) -> str:
+    return formatdate(timestamp, usegmt=True)
+
+
+def parse_http_date(value: str) -> Optional[float]:
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
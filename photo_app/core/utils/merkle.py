@@ -0,0 +1,161 @@
+"""Merkle树模块
+
+本模块为一组 (照片ID, 校验和) 构建固定形状的Merkle树，用于主存储与备份之间的完整性比对。
+
+结构说明：
+- 照片按ID的哈希分配到 FANOUT**depth 个叶子桶中，树的形状只取决于 depth，与照片数量无关
+- 桶的值是其中所有叶子哈希的模 2**128 累加和（多重集合哈希），可以流式构建、增量更新
+- 内部节点是子节点哈希拼接后的哈希
+
+比对方式：
+1. 比较根哈希，一致则两侧完全相同
+2. 否则逐层只展开哈希不同的节点，最终得到不一致的叶子桶
+3. 只对这些桶比较具体的照片校验和
+
+注意事项：
+- 两侧必须使用相同的 depth
+- 远程一侧通过 NodeSource 协议按需提供节点，只传输发生分歧的子树；
+  本模块只提供内存实现 InMemoryNodeSource，远程传输需要调用方自行实现该协议
+"""
+
+import hashlib
+from typing import Dict, Iterable, List, Optional, Protocol, Sequence, Tuple
+
+FANOUT = 16
+DEFAULT_DEPTH = 3
+
+_DIGEST_SIZE = 16
+_MODULUS = 1 << (_DIGEST_SIZE * 8)
+
+
+def _hash(*parts: bytes) -> bytes:
+    digest = hashlib.blake2b(digest_size=_DIGEST_SIZE)
+    for part in parts:
+        digest.update(part)
+    return digest.digest()
+
+
+def leaf_hash(key: int, checksum: str) -> int:
+    """单个照片的叶子哈希（整数形式，便于累加）"""
+    return int.from_bytes(_hash(b"L", key.to_bytes(8, "big"), checksum.encode("ascii")), "big")
+
+
+def bucket_of(key: int, depth: int = DEFAULT_DEPTH) -> int:
+    """照片所属的叶子桶"""
+    value = int.from_bytes(_hash(b"K", key.to_bytes(8, "big")), "big")
+    return value % (FANOUT ** depth)
+
+
+class MerkleTree:
+    """固定形状、可增量更新的Merkle树"""
+
+    def __init__(self, depth: int = DEFAULT_DEPTH):
+        if depth < 1:
+            raise ValueError("depth must be at least 1")
+        self.depth = depth
+        self._sums = [0] * (FANOUT ** depth)
+        self._counts = [0] * (FANOUT ** depth)
+        self._levels: Optional[List[List[bytes]]] = None
+
+    @classmethod
+    def from_leaves(cls, leaves: Iterable[Tuple[int, str]], depth: int = DEFAULT_DEPTH) -> "MerkleTree":
+        tree = cls(depth)
+        for key, checksum in leaves:
+            tree.add(key, checksum)
+        return tree
+
+    def __len__(self) -> int:
+        return sum(self._counts)
+
+    def add(self, key: int, checksum: str) -> None:
+        bucket = bucket_of(key, self.depth)
+        self._sums[bucket] = (self._sums[bucket] + leaf_hash(key, checksum)) % _MODULUS
+        self._counts[bucket] += 1
+        self._levels = None
+
+    def remove(self, key: int, checksum: str) -> None:
+        bucket = bucket_of(key, self.depth)
+        self._sums[bucket] = (self._sums[bucket] - leaf_hash(key, checksum)) % _MODULUS
+        self._counts[bucket] -= 1
+        self._levels = None
+
+    def update(self, key: int, old_checksum: str, new_checksum: str) -> None:
+        self.remove(key, old_checksum)
+        self.add(key, new_checksum)
+
+    def _build(self) -> List[List[bytes]]:
+        if self._levels is None:
+            level = [
+                _hash(b"B", total.to_bytes(_DIGEST_SIZE, "big"), count.to_bytes(8, "big"))
+                for total, count in zip(self._sums, self._counts)
+            ]
+            levels = [level]
+            while len(level) > 1:
+                level = [
+                    _hash(b"N", *level[i:i + FANOUT])
+                    for i in range(0, len(level), FANOUT)
+                ]
+                levels.append(level)
+            levels.reverse()
+            self._levels = levels
+        return self._levels
+
+    @property
+    def root(self) -> str:
+        return self._build()[0][0].hex()
+
+    def nodes(self, level: int, indexes: Sequence[int]) -> List[str]:
+        """返回第level层（根为0层，叶子桶为depth层）指定节点的哈希"""
+        nodes = self._build()[level]
+        return [nodes[i].hex() for i in indexes]
+
+
+class NodeSource(Protocol):
+    """可按需提供树节点和桶内校验和的一侧"""
+
+    async def nodes(self, level: int, indexes: Sequence[int]) -> List[str]:
+        ...
+
+    async def leaves(self, buckets: Sequence[int]) -> Dict[int, str]:
+        ...
+
+
+class InMemoryNodeSource:
+    """由 (照片ID, 校验和) 列表构建的节点来源，清单需要调用方从另一侧取得"""
+
+    def __init__(self, leaves: Dict[int, str], depth: int = DEFAULT_DEPTH):
+        self._leaves = leaves
+        self.tree = MerkleTree.from_leaves(leaves.items(), depth)
+        self.requested_nodes = 0
+
+    async def nodes(self, level: int, indexes: Sequence[int]) -> List[str]:
+        self.requested_nodes += len(indexes)
+        return self.tree.nodes(level, indexes)
+
+    async def leaves(self, buckets: Sequence[int]) -> Dict[int, str]:
+        wanted = set(buckets)
+        return {
+            key: checksum for key, checksum in self._leaves.items()
+            if bucket_of(key, self.tree.depth) in wanted
+        }
+
+
+async def find_divergent_buckets(local: MerkleTree, remote: NodeSource) -> List[int]:
+    """自顶向下只展开哈希不同的节点，返回不一致的叶子桶"""
+    frontier = [0]
+    for level in range(local.depth + 1):
+        if level:
+            frontier = [
+                child
+                for index in frontier
+                for child in range(index * FANOUT, (index + 1) * FANOUT)
+            ]
+        remote_nodes = await remote.nodes(level, frontier)
+        local_nodes = local.nodes(level, frontier)
+        frontier = [
+            index for index, mine, theirs in zip(frontier, local_nodes, remote_nodes)
+            if mine != theirs
+        ]
+        if not frontier:
+            break
+    return frontier
@@ -0,0 +1,103 @@
+"""令牌桶限速模块
+
+本模块提供进程内的令牌桶，用于限制后台任务的I/O速率和API请求的准入。
+
+使用说明：
+1. TokenBucket(rate, capacity) 以每秒 rate 个令牌的速度补充，最多积累 capacity 个
+2. try_acquire() 非阻塞地尝试取令牌，失败时返回需要等待的秒数
+3. acquire() 异步等待直到取得令牌
+4. LocalLimiter 按键管理多个令牌桶和并发租约，接口与 Redis 后端（infrastructure.limiter）相同
+
+注意事项：
+- 单次请求超过 capacity 时按 capacity 计算等待，避免永远无法满足
+- 不是线程安全的，只在事件循环内使用
+- LocalLimiter 的计数只在当前进程内有效，多进程部署时每个进程各自限流
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Tuple
+
+
+class LimiterUnavailable(Exception):
+    """限流后端不可用（例如Redis连接失败），调用方应回退到进程内限流"""
+
+
+class TokenBucket:
+    """令牌桶"""
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        if rate <= 0 or capacity <= 0:
+            raise ValueError("rate and capacity must be positive")
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    @property
+    def tokens(self) -> float:
+        self._refill()
+        return self._tokens
+
+    def try_acquire(self, amount: float = 1) -> Tuple[bool, float]:
+        """尝试取出令牌，返回 (是否成功, 失败时需等待的秒数)"""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self._tokens >= amount:
+            self._tokens -= amount
+            return True, 0.0
+        return False, (amount - self._tokens) / self.rate
+
+    async def acquire(self, amount: float = 1) -> None:
+        """等待直到取得令牌"""
+        while True:
+            acquired, wait = self.try_acquire(amount)
+            if acquired:
+                return
+            await asyncio.sleep(wait)
+
+
+class LocalLimiter:
+    """进程内的按键令牌桶和并发租约"""
+
+    def __init__(self, max_keys: int = 100_000, clock: Callable[[], float] = time.monotonic):
+        self._max_keys = max_keys
+        self._clock = clock
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        # 键 -> {租约ID: 过期时间}
+        self._leases: Dict[str, Dict[str, float]] = {}
+
+    async def take(self, key: str, rate: float, capacity: float, cost: float = 1) -> Tuple[bool, float]:
+        """从键对应的令牌桶中取令牌，返回 (是否成功, 失败时需等待的秒数)"""
+        bucket = self._buckets.get(key)
+        if bucket is None or bucket.rate != rate or bucket.capacity != capacity:
+            bucket = TokenBucket(rate, capacity, self._clock)
+            self._buckets[key] = bucket
+            # 淘汰最久未使用的桶，被淘汰的键下次从满桶开始
+            while len(self._buckets) > self._max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket.try_acquire(cost)
+
+    async def acquire_slot(self, key: str, limit: int, lease_id: str, ttl: float) -> bool:
+        """在并发上限内登记一个租约，租约超过 ttl 秒未释放时自动失效"""
+        now = self._clock()
+        leases = self._leases.setdefault(key, {})
+        for expired in [lease for lease, expires in leases.items() if expires <= now]:
+            del leases[expired]
+        if len(leases) >= limit:
+            return False
+        leases[lease_id] = now + ttl
+        return True
+
+    async def release_slot(self, key: str, lease_id: str) -> None:
+        """释放租约"""
+        self._leases.get(key, {}).pop(lease_id, None)
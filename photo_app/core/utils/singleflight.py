@@ -0,0 +1,105 @@
+"""请求合并（single-flight）模块
+
+同一个键的并发调用只执行一次，其余调用等待并共享同一个结果（或异常）。
+热门相册被大量同时访问时，相同的查询在数据库上只执行一次。
+
+使用说明：
+1. flight_key(name, **params) 把查询参数规范化为键：参数按名称排序，列表和集合排序去重
+2. SingleFlight.do(key, fn) 没有进行中的调用时执行 fn()，否则等待进行中的调用
+3. 配置 coordinator（见 infrastructure.limiter.redis_flight）后，进程内的领头调用再通过Redis在工作进程间合并；
+   结果只有在调用方提供 FlightCodec 时才在进程间传递，编码结果必须可以JSON序列化
+
+注意事项：
+- 只合并同时进行的调用，调用完成后立即移除，不缓存结果
+- 等待方被取消不影响领头调用；领头调用被取消时，等待方重新竞争领头执行
+- 结果对象被所有等待方共享，调用方不能就地修改；ORM对象需要合并到各自的会话中（见 PhotoDAO）
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class FlightCodec(NamedTuple):
+    """结果在进程间传递时的编码：encode 返回可JSON序列化的值，decode 还原"""
+    encode: Callable[[Any], Any]
+    decode: Callable[[Any], Any]
+
+
+class _LeaderCancelled(Exception):
+    """领头调用被取消，等待方需要重新执行"""
+
+
+def _normalize(value: Any) -> str:
+    if isinstance(value, (list, tuple)):
+        return "[" + ",".join(_normalize(item) for item in value) + "]"
+    if isinstance(value, (set, frozenset)):
+        return "[" + ",".join(sorted({_normalize(item) for item in value})) + "]"
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return repr(value)
+
+
+def flight_key(name: str, **params: Any) -> str:
+    """规范化的调用键；None 参数视为未指定"""
+    parts = [
+        f"{param}={_normalize(value)}"
+        for param, value in sorted(params.items())
+        if value is not None
+    ]
+    return f"{name}?{'&'.join(parts)}"
+
+
+class SingleFlight:
+    """按键合并并发调用"""
+
+    def __init__(self, coordinator=None):
+        # coordinator.run(key, fn, codec) 在工作进程间合并，为None时只在进程内合并
+        self.coordinator = coordinator
+        self._calls: Dict[str, asyncio.Future] = {}
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._calls
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]], codec: Optional[FlightCodec] = None) -> T:
+        while True:
+            future = self._calls.get(key)
+            if future is None:
+                break
+            try:
+                # shield: 等待方被取消时不取消共享的 future
+                return await asyncio.shield(future)
+            except _LeaderCancelled:
+                continue
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            if self.coordinator is not None:
+                result = await self.coordinator.run(key, fn, codec)
+            else:
+                result = await fn()
+        except asyncio.CancelledError:
+            self._fail(future, _LeaderCancelled())
+            raise
+        except BaseException as exc:
+            self._fail(future, exc)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+    @staticmethod
+    def _fail(future: asyncio.Future, exc: BaseException) -> None:
+        future.set_exception(exc)
+        # 没有等待方时避免 "exception was never retrieved" 警告
+        future.exception()
+
+
+# 数据库读取共用的合并器，启动时可以配置Redis协调器
+read_flights = SingleFlight()
+
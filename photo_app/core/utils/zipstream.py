@@ -0,0 +1,238 @@
+"""流式ZIP写入模块
+
+本模块边读文件边生成ZIP归档字节流，不需要临时文件，也不需要事先知道全部条目：
+- 条目一律不压缩（ZIP_STORED），照片本身已经是压缩格式
+- CRC32 在发送数据时计算，写在每个条目后的数据描述符中（通用标志位3）
+- 中央目录在最后写出；单个文件、偏移量或条目数超过ZIP限制时自动使用ZIP64扩展
+- 文件名使用UTF-8（通用标志位11）
+
+内存占用只有每个条目一条很小的中央目录记录，与文件大小无关。
+
+使用示例：
+    stream = ZipStream()
+    yield stream.begin("a.jpg", size, mtime)
+    for chunk in chunks:
+        yield stream.update(chunk)
+    yield stream.end()
+    yield stream.finish()
+"""
+
+import struct
+import zlib
+from dataclasses import dataclass
+from datetime import datetime
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Tuple
+
+ZIP64_LIMIT = 0xFFFFFFFF
+ZIP_FILECOUNT_LIMIT = 0xFFFF
+
+# 字段值由ZIP64扩展给出时写入的占位值
+_MASK32 = 0xFFFFFFFF
+_MASK16 = 0xFFFF
+
+_VERSION = 20
+_VERSION_ZIP64 = 45
+# 高字节3表示UNIX，使外部属性中的文件权限生效
+_MADE_BY = (3 << 8) | _VERSION_ZIP64
+_FLAGS = 0x0008 | 0x0800
+_EXTERNAL_ATTR = (0o100644 << 16)
+
+_LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+_CENTRAL_HEADER = struct.Struct("<IHHHHHHIIIHHHHHII")
+_END_RECORD = struct.Struct("<IHHHHIIH")
+_END_RECORD64 = struct.Struct("<IQHHIIQQQQ")
+_END_LOCATOR64 = struct.Struct("<IIQI")
+
+
+class ZipStreamError(Exception):
+    """条目实际写入的字节数与声明的大小不一致等错误"""
+
+
+@dataclass
+class _Record:
+    name: bytes
+    dos_time: int
+    dos_date: int
+    crc: int
+    size: int
+    offset: int
+    zip64: bool
+
+
+def _dos_datetime(mtime: Optional[datetime]) -> Tuple[int, int]:
+    if mtime is None or mtime.year < 1980:
+        return 0, (1 << 5) | 1
+    dos_time = (mtime.hour << 11) | (mtime.minute << 5) | (mtime.second // 2)
+    dos_date = ((mtime.year - 1980) << 9) | (mtime.month << 5) | mtime.day
+    return dos_time, dos_date
+
+
+class ZipStream:
+    """增量生成ZIP字节流，调用方负责按顺序输出各方法返回的字节"""
+
+    def __init__(self):
+        self._offset = 0
+        self._records: List[_Record] = []
+        self._current: Optional[_Record] = None
+        self._written = 0
+        self._finished = False
+
+    @property
+    def offset(self) -> int:
+        """已生成的字节数"""
+        return self._offset
+
+    def _emit(self, data: bytes) -> bytes:
+        self._offset += len(data)
+        return data
+
+    def begin(self, name: str, size: int, mtime: Optional[datetime] = None) -> bytes:
+        """开始一个条目，返回本地文件头；size 为条目的准确字节数"""
+        if self._current is not None or self._finished:
+            raise ZipStreamError("Previous entry is not finished")
+        encoded = name.encode("utf-8")
+        dos_time, dos_date = _dos_datetime(mtime)
+        zip64 = size >= ZIP64_LIMIT
+        record = _Record(encoded, dos_time, dos_date, 0, size, self._offset, zip64)
+
+        extra = b""
+        if zip64:
+            # 大小写在数据描述符中，这里的ZIP64字段只用于声明描述符使用8字节长度
+            extra = struct.pack("<HHQQ", 0x0001, 16, 0, 0)
+        header = _LOCAL_HEADER.pack(
+            0x04034B50,
+            _VERSION_ZIP64 if zip64 else _VERSION,
+            _FLAGS,
+            0,
+            dos_time,
+            dos_date,
+            0,
+            _MASK32 if zip64 else 0,
+            _MASK32 if zip64 else 0,
+            len(encoded),
+            len(extra),
+        )
+        self._current = record
+        self._written = 0
+        return self._emit(header + encoded + extra)
+
+    def update(self, chunk: bytes) -> bytes:
+        """写入当前条目的一段数据，原样返回"""
+        record = self._current
+        if record is None:
+            raise ZipStreamError("No entry in progress")
+        self._written += len(chunk)
+        if self._written > record.size:
+            raise ZipStreamError(f"Entry {record.name!r} is larger than declared {record.size} bytes")
+        record.crc = zlib.crc32(chunk, record.crc)
+        return self._emit(chunk)
+
+    def end(self) -> bytes:
+        """结束当前条目，返回数据描述符"""
+        record = self._current
+        if record is None:
+            raise ZipStreamError("No entry in progress")
+        if self._written != record.size:
+            raise ZipStreamError(
+                f"Entry {record.name!r} has {self._written} bytes, declared {record.size}"
+            )
+        if record.zip64:
+            descriptor = struct.pack("<IIQQ", 0x08074B50, record.crc, record.size, record.size)
+        else:
+            descriptor = struct.pack("<IIII", 0x08074B50, record.crc, record.size, record.size)
+        self._records.append(record)
+        self._current = None
+        return self._emit(descriptor)
+
+    def _central_entry(self, record: _Record) -> bytes:
+        extra_fields = []
+        size_field = record.size
+        offset_field = record.offset
+        if record.size >= ZIP64_LIMIT:
+            extra_fields += [record.size, record.size]
+            size_field = _MASK32
+        if record.offset >= ZIP64_LIMIT:
+            extra_fields.append(record.offset)
+            offset_field = _MASK32
+        extra = b""
+        if extra_fields:
+            extra = struct.pack(f"<HH{len(extra_fields)}Q", 0x0001, 8 * len(extra_fields), *extra_fields)
+        needs_zip64 = record.zip64 or bool(extra_fields)
+        header = _CENTRAL_HEADER.pack(
+            0x02014B50,
+            _MADE_BY,
+            _VERSION_ZIP64 if needs_zip64 else _VERSION,
+            _FLAGS,
+            0,
+            record.dos_time,
+            record.dos_date,
+            record.crc,
+            size_field,
+            size_field,
+            len(record.name),
+            len(extra),
+            0,
+            0,
+            0,
+            _EXTERNAL_ATTR,
+            offset_field,
+        )
+        return header + record.name + extra
+
+    def finish(self) -> bytes:
+        """写出中央目录和结束记录"""
+        if self._current is not None:
+            raise ZipStreamError("Entry is not finished")
+        if self._finished:
+            raise ZipStreamError("Archive is already finished")
+        self._finished = True
+
+        directory_offset = self._offset
+        directory = b"".join(self._central_entry(record) for record in self._records)
+        directory_size = len(directory)
+        count = len(self._records)
+        tail = b""
+        if count >= ZIP_FILECOUNT_LIMIT or directory_offset >= ZIP64_LIMIT or directory_size >= ZIP64_LIMIT:
+            end64_offset = directory_offset + directory_size
+            tail += _END_RECORD64.pack(
+                0x06064B50, _END_RECORD64.size - 12, _MADE_BY, _VERSION_ZIP64,
+                0, 0, count, count, directory_size, directory_offset
+            )
+            tail += _END_LOCATOR64.pack(0x07064B50, 0, end64_offset, 1)
+            count, directory_size, directory_offset = _MASK16, _MASK32, _MASK32
+        tail += _END_RECORD.pack(0x06054B50, 0, 0, count, count, directory_size, directory_offset, 0)
+        self._records = []
+        return self._emit(directory + tail)
+
+
+def iter_zip(
+    entries: Iterable[Tuple[str, int, Optional[datetime], BinaryIO]],
+    chunk_size: int = 1024 * 1024
+) -> Iterator[bytes]:
+    """把 (名称, 大小, 修改时间, 文件对象) 序列同步流式打包"""
+    stream = ZipStream()
+    for name, size, mtime, f in entries:
+        yield stream.begin(name, size, mtime)
+        remaining = size
+        while remaining:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield stream.update(chunk)
+        yield stream.end()
+    yield stream.finish()
+
+
+def unique_name(name: str, used: set) -> str:
+    """同一归档中出现重名文件时追加序号，例如 a.jpg -> a (2).jpg"""
+    candidate = name
+    stem, dot, ext = name.rpartition(".")
+    if not dot:
+        stem, ext = name, ""
+    counter = 1
+    while candidate.lower() in used:
+        counter += 1
+        candidate = f"{stem} ({counter}){dot}{ext}"
+    used.add(candidate.lower())
+    return candidate
@@ -0,0 +1,125 @@
+"""Redis限流后端模块
+
+多个工作进程共享的令牌桶和并发租约，接口与 core.utils.ratelimit.LocalLimiter 相同。
+
+实现方式：
+- 令牌桶保存在哈希 {tokens, ts} 中，由Lua脚本原子地补充和扣减，时间取自 Redis TIME，不依赖各进程的时钟
+- 并发租约保存在有序集合中，成员为租约ID，分数为过期时间；登记前先移除已过期的租约，
+  进程崩溃没有释放的租约最多占用 ttl 秒
+
+注意事项：
+- 套接字超时很短，Redis变慢时尽快失败，由调用方回退到进程内限流
+- 所有Redis错误都转换为 LimiterUnavailable
+- 未安装 redis 包时每次调用都抛出 LimiterUnavailable
+"""
+
+import asyncio
+from typing import Optional, Tuple
+
+from photo_app.core.config import settings
+from photo_app.core.utils.ratelimit import LimiterUnavailable
+
+try:
+    from redis import asyncio as aioredis
+    from redis.exceptions import RedisError
+except ImportError:  # pragma: no cover - 取决于运行环境
+    aioredis = None
+    RedisError = OSError
+
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local cost = math.min(tonumber(ARGV[3]), capacity)
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local allowed = 0
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    wait = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+return {allowed, tostring(wait)}
+"""
+
+ACQUIRE_SLOT_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local ttl = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+if redis.call('ZCARD', KEYS[1]) >= limit then
+    return 0
+end
+redis.call('ZADD', KEYS[1], now + ttl, ARGV[2])
+redis.call('EXPIRE', KEYS[1], math.ceil(ttl) + 1)
+return 1
+"""
+
+
+def redis_url() -> str:
+    return f"redis://{settings.REDIS_HOST}:{settings.REDIS_PORT}/{settings.REDIS_DB}"
+
+
+class RedisLimiter:
+    """基于Redis的按键令牌桶和并发租约"""
+
+    def __init__(self, url: Optional[str] = None, *, prefix: str = "limiter:", timeout: float = 0.05):
+        self._url = url or redis_url()
+        self._prefix = prefix
+        self._timeout = timeout
+        self._client = None
+        self._take_script = None
+        self._slot_script = None
+
+    def _connect(self):
+        if aioredis is None:
+            raise LimiterUnavailable("redis package is not installed")
+        if self._client is None:
+            # 连接在第一次命令时才建立
+            self._client = aioredis.from_url(
+                self._url,
+                socket_timeout=self._timeout,
+                socket_connect_timeout=self._timeout,
+            )
+            self._take_script = self._client.register_script(TOKEN_BUCKET_SCRIPT)
+            self._slot_script = self._client.register_script(ACQUIRE_SLOT_SCRIPT)
+        return self._client
+
+    async def take(self, key: str, rate: float, capacity: float, cost: float = 1) -> Tuple[bool, float]:
+        """从键对应的令牌桶中取令牌，返回 (是否成功, 失败时需等待的秒数)"""
+        self._connect()
+        try:
+            allowed, wait = await self._take_script(keys=[self._prefix + key], args=[rate, capacity, cost])
+        except (RedisError, OSError, asyncio.TimeoutError) as exc:
+            raise LimiterUnavailable(str(exc)) from exc
+        return bool(allowed), float(wait)
+
+    async def acquire_slot(self, key: str, limit: int, lease_id: str, ttl: float) -> bool:
+        """在并发上限内登记一个租约，租约超过 ttl 秒未释放时自动失效"""
+        self._connect()
+        try:
+            acquired = await self._slot_script(keys=[self._prefix + key], args=[limit, lease_id, ttl])
+        except (RedisError, OSError, asyncio.TimeoutError) as exc:
+            raise LimiterUnavailable(str(exc)) from exc
+        return bool(acquired)
+
+    async def release_slot(self, key: str, lease_id: str) -> None:
+        """释放租约"""
+        client = self._connect()
+        try:
+            await client.zrem(self._prefix + key, lease_id)
+        except (RedisError, OSError, asyncio.TimeoutError) as exc:
+            raise LimiterUnavailable(str(exc)) from exc
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
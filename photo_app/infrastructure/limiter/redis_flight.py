@@ -0,0 +1,153 @@
+"""Redis请求合并协调器模块
+
+在多个工作进程之间合并相同的调用，配合 core.utils.singleflight.SingleFlight 使用。
+
+工作流程：
+1. 用 SET NX PX 抢占键的锁，锁的值为本次调用的令牌
+2. 抢到锁：执行调用，把结果序列化后写入 result:<令牌>（短过期时间），然后释放锁
+3. 没抢到：读取锁中的令牌，轮询 result:<令牌> 直到结果出现；
+   锁已释放但没有结果（领头方失败或被取消）或等待超时时，自己执行调用
+
+注意事项：
+- 结果用调用方提供的 FlightCodec 编码为JSON，不使用 pickle，Redis中的数据不会被当作代码执行
+- 结果按领头方的令牌存放，锁释放后到达的调用会成为新的领头方，不会读到旧结果
+- Redis不可用时直接执行调用，不影响读取
+- 没有 codec 或编码失败时结果照常返回，其他进程的等待方在锁释放后自己执行；
+  解码失败时等待方同样自己执行
+"""
+
+import asyncio
+import json
+import logging
+import uuid
+from typing import Any, Awaitable, Callable, Optional
+
+from photo_app.core.utils.singleflight import FlightCodec
+from photo_app.infrastructure.limiter.redis_backend import RedisError, aioredis, redis_url
+
+logger = logging.getLogger(__name__)
+
+# 仅当锁的值仍为自己的令牌时删除，避免删除过期后被其他进程重新获取的锁
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+_ERRORS = (RedisError, OSError, asyncio.TimeoutError)
+
+
+class RedisFlightCoordinator:
+    """基于Redis锁的跨进程请求合并"""
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        *,
+        prefix: str = "flight:",
+        lock_ttl: float = 10.0,
+        result_ttl: float = 2.0,
+        wait_timeout: float = 5.0,
+        poll_interval: float = 0.02,
+        timeout: float = 0.05
+    ):
+        self._url = url or redis_url()
+        self._prefix = prefix
+        self._lock_ttl_ms = int(lock_ttl * 1000)
+        self._result_ttl_ms = int(result_ttl * 1000)
+        self._wait_timeout = wait_timeout
+        self._poll_interval = poll_interval
+        self._timeout = timeout
+        self._client = None
+        self._release_script = None
+
+    def _connect(self):
+        if self._client is None and aioredis is not None:
+            self._client = aioredis.from_url(
+                self._url,
+                socket_timeout=self._timeout,
+                socket_connect_timeout=self._timeout,
+            )
+            self._release_script = self._client.register_script(RELEASE_SCRIPT)
+        return self._client
+
+    async def run(self, key: str, fn: Callable[[], Awaitable[Any]], codec: Optional[FlightCodec] = None) -> Any:
+        client = self._connect()
+        if client is None:
+            return await fn()
+        lock_key = f"{self._prefix}lock:{key}"
+        token = uuid.uuid4().hex
+        try:
+            acquired = await client.set(lock_key, token, nx=True, px=self._lock_ttl_ms)
+            holder = None if acquired else await client.get(lock_key)
+        except _ERRORS as exc:
+            logger.debug("Single-flight coordinator unavailable: %s", exc)
+            return await fn()
+
+        if acquired:
+            return await self._lead(client, lock_key, token, fn, codec)
+        if holder is not None:
+            data = await self._wait(client, lock_key, holder.decode())
+            if data is not None and codec is not None:
+                try:
+                    return codec.decode(json.loads(data))
+                except (ValueError, TypeError, KeyError) as exc:
+                    logger.warning("Discarding undecodable single-flight result for %s: %s", key, exc)
+        # 锁刚释放、领头方失败、等待超时或结果无法解码
+        return await fn()
+
+    async def _lead(
+        self,
+        client,
+        lock_key: str,
+        token: str,
+        fn: Callable[[], Awaitable[Any]],
+        codec: Optional[FlightCodec]
+    ) -> Any:
+        try:
+            result = await fn()
+            data = None
+            if codec is not None:
+                try:
+                    data = json.dumps(codec.encode(result), separators=(",", ":"))
+                except (TypeError, ValueError) as exc:
+                    logger.debug("Single-flight result is not encodable: %s", exc)
+            if data is not None:
+                try:
+                    await client.set(self._result_key(token), data, px=self._result_ttl_ms)
+                except _ERRORS:
+                    pass
+            return result
+        finally:
+            try:
+                await self._release_script(keys=[lock_key], args=[token])
+            except _ERRORS:
+                # 锁在 lock_ttl 后自动过期
+                pass
+
+    async def _wait(self, client, lock_key: str, token: str) -> Optional[bytes]:
+        """等待领头方的结果，返回None表示需要自己执行"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self._wait_timeout
+        result_key = self._result_key(token)
+        while loop.time() < deadline:
+            await asyncio.sleep(self._poll_interval)
+            try:
+                # 领头方先写结果再释放锁，所以先读结果再读锁
+                data, holder = await client.pipeline(transaction=False).get(result_key).get(lock_key).execute()
+                if data is not None:
+                    return data
+                if holder is None or holder.decode() != token:
+                    return await client.get(result_key)
+            except _ERRORS:
+                return None
+        return None
+
+    def _result_key(self, token: str) -> str:
+        return f"{self._prefix}result:{token}"
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -0,0 +1,114 @@
+"""内容定义分块模块
+
+本模块实现 FastCDC 风格的内容定义分块（Content-Defined Chunking），用于照片版本的增量存储。
+
+算法说明：
+- 使用32位Gear滚动哈希：h = (h << 1) + GEAR[byte]，每个位置的哈希只取决于最近32个字节
+- 归一化分块：块长度小于 avg_size 时使用更严格的掩码，超过后使用更宽松的掩码，
+  使块长度集中在平均值附近
+- 块长度限制在 [min_size, max_size]，不足 min_size 的位置不判断切点
+
+实现说明：
+- 每个位置的哈希可以写成最近32字节Gear值移位后的和，因此用numpy按块向量化计算
+- Gear表由固定种子派生，切点只取决于文件内容，跨进程、跨版本保持稳定
+
+主要组件：
+- iter_chunks: 从文件对象流式产出数据块
+- gear_hashes: 计算一段数据每个位置的滚动哈希
+"""
+
+import hashlib
+from typing import BinaryIO, Iterator
+
+import numpy as np
+
+MIN_CHUNK_SIZE = 4 * 1024
+AVG_CHUNK_SIZE = 16 * 1024
+MAX_CHUNK_SIZE = 64 * 1024
+READ_SIZE = 1024 * 1024
+
+# Gear哈希只依赖最近 _WINDOW 个字节
+_WINDOW = 32
+
+_GEAR = np.array(
+    [
+        int.from_bytes(hashlib.blake2b(b"photo-cdc-gear" + bytes([i]), digest_size=4).digest(), "little")
+        for i in range(256)
+    ],
+    dtype=np.uint32,
+)
+
+
+def _masks(avg_size: int):
+    """归一化级别2：严格掩码比平均值多2位，宽松掩码少2位，取哈希的高位"""
+    bits = avg_size.bit_length() - 1
+    strict = ((1 << (bits + 2)) - 1) << (32 - bits - 2)
+    loose = ((1 << (bits - 2)) - 1) << (32 - bits + 2)
+    return np.uint32(strict), np.uint32(loose)
+
+
+def gear_hashes(data: bytes, context: bytes = b"") -> np.ndarray:
+    """计算 data 每个位置的Gear哈希；context 为紧邻其前的数据（最多取最后31字节）"""
+    context = context[-(_WINDOW - 1):] if context else b""
+    gear = _GEAR[np.frombuffer(context + data, dtype=np.uint8)]
+    hashes = gear.copy()
+    for shift in range(1, min(_WINDOW, len(gear))):
+        hashes[shift:] += gear[:len(gear) - shift] << np.uint32(shift)
+    return hashes[len(context):]
+
+
+def _find_cut(hashes: np.ndarray, remaining: int, min_size: int, avg_size: int, max_size: int, masks) -> int:
+    """在当前块起点之后寻找切点，返回块长度"""
+    n = min(remaining, max_size)
+    if n <= min_size:
+        return n
+    strict, loose = masks
+    normal = min(avg_size, n)
+    # 块长度L对应哈希下标L-1
+    hits = np.flatnonzero((hashes[min_size - 1:normal - 1] & strict) == 0)
+    if len(hits):
+        return min_size + int(hits[0])
+    hits = np.flatnonzero((hashes[avg_size - 1:n - 1] & loose) == 0)
+    if len(hits):
+        return avg_size + int(hits[0])
+    return n
+
+
+def iter_chunks(
+    src: BinaryIO,
+    *,
+    min_size: int = MIN_CHUNK_SIZE,
+    avg_size: int = AVG_CHUNK_SIZE,
+    max_size: int = MAX_CHUNK_SIZE,
+    read_size: int = READ_SIZE
+) -> Iterator[bytes]:
+    """按内容定义的切点流式产出数据块，内存占用约为 read_size + max_size"""
+    if not 0 < min_size < avg_size < max_size or avg_size & (avg_size - 1):
+        raise ValueError("Chunk sizes must satisfy 0 < min < avg < max with avg a power of two")
+    masks = _masks(avg_size)
+
+    data = b""
+    hashes = np.empty(0, dtype=np.uint32)
+    start = 0
+    context = b""
+    eof = False
+    while True:
+        if not eof and len(data) - start < max_size:
+            block = src.read(read_size)
+            if block:
+                block_hashes = gear_hashes(block, context)
+                context = (context + block)[-(_WINDOW - 1):]
+                data = data[start:] + block
+                hashes = np.concatenate((hashes[start:], block_hashes))
+                start = 0
+                continue
+            eof = True
+
+        remaining = len(data) - start
+        if remaining == 0:
+            return
+        length = _find_cut(
+            hashes[start:start + max_size], remaining, min_size, avg_size, max_size, masks
+        )
+        yield data[start:start + length]
+        start += length
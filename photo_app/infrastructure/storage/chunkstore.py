@@ -0,0 +1,80 @@
+"""内容寻址块存储模块
+
+本模块把数据块按内容哈希存放在 STORAGE_PATH/.chunks 下，相同内容只保存一份。
+
+存储布局：
+- 块哈希为 BLAKE2b-256 十六进制摘要，与扫描模块的文件哈希一致
+- 路径为 .chunks/<前2位>/<次2位>/<完整哈希>，避免单个目录文件过多
+
+注意事项：
+- 写入先写临时文件再原子重命名，已存在的块跳过写入并刷新修改时间，
+  使 sweep_orphan_chunks 的宽限期从最近一次使用算起
+- 引用计数保存在数据库中（StoredChunk），本模块只负责文件
+"""
+
+import hashlib
+import os
+from typing import Iterator, Optional
+
+from photo_app.core.config import settings
+
+CHUNK_DIR_NAME = ".chunks"
+_TEMP_SUFFIX = ".tmp"
+
+
+def chunk_digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=32).hexdigest()
+
+
+class ChunkStore:
+    """内容寻址的块文件存储"""
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = os.path.abspath(root or os.path.join(settings.STORAGE_PATH, CHUNK_DIR_NAME))
+
+    def path_for(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def exists(self, digest: str) -> bool:
+        return os.path.exists(self.path_for(digest))
+
+    def put(self, data: bytes, digest: Optional[str] = None) -> bool:
+        """写入数据块，返回是否实际写入了新文件"""
+        digest = digest or chunk_digest(data)
+        path = self.path_for(digest)
+        try:
+            os.utime(path)
+            return False
+        except FileNotFoundError:
+            pass
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}{_TEMP_SUFFIX}"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        return True
+
+    def get(self, digest: str, verify: bool = False) -> bytes:
+        with open(self.path_for(digest), "rb") as f:
+            data = f.read()
+        if verify and chunk_digest(data) != digest:
+            raise ValueError(f"Chunk {digest} is corrupted")
+        return data
+
+    def delete(self, digest: str) -> bool:
+        try:
+            os.unlink(self.path_for(digest))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def iter_digests(self) -> Iterator[str]:
+        """遍历存储中的所有块哈希（不含写入中的临时文件）"""
+        if not os.path.isdir(self.root):
+            return
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if not name.endswith(_TEMP_SUFFIX):
+                    yield name
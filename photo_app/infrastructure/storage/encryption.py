@@ -0,0 +1,401 @@
+"""文件加密模块
+
+本模块实现分块认证加密的流式加解密，用于加密存储的照片原图。
+
+文件格式：
+- 32字节文件头：魔数(3) + 算法(1) + 分块大小(4) + 盐(16) + nonce前缀(7) + 保留(1)
+- 之后是若干密文块，每块为 分块大小 的明文加 16 字节认证标签，最后一块可以更短
+- 每个文件用 HKDF(用户密钥, 盐) 派生独立的文件密钥
+- 块 nonce = nonce前缀 + 块序号(4字节) + 末块标志(1字节)，文件头作为附加认证数据
+
+主要组件：
+- encrypt_stream / decrypt_stream: 常量内存的流式加解密
+- EncryptedReader: 随机访问读取器，只解密请求范围覆盖的块
+- write_encrypted / encrypt_in_place / reencrypt_in_place: 原子写入的文件级操作
+- open_with_keys: 密钥轮换期间用新旧密钥中匹配的一个打开文件
+- generate_key / wrap_key / unwrap_key: 用户密钥的生成与包装存储
+
+注意事项：
+- 末块标志防止截断攻击，块序号防止块被重排
+- 认证失败统一抛出 EncryptionError
+- 文件级函数都是模块级函数，可以直接提交给线程池或进程池
+"""
+
+import base64
+import os
+import struct
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Sequence
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM, ChaCha20Poly1305
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+from photo_app.core.config import settings
+
+ALGORITHM_AES_GCM = "aes-256-gcm"
+ALGORITHM_CHACHA20 = "chacha20-poly1305"
+
+# 写入 Photo.encryption_method 的名称
+ENCRYPTION_METHODS = {
+    ALGORITHM_AES_GCM: "aes-256-gcm-chunked",
+    ALGORITHM_CHACHA20: "chacha20-poly1305-chunked",
+}
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+KEY_SIZE = 32
+TAG_SIZE = 16
+
+_MAGIC = b"PE1"
+_HEADER = struct.Struct("<3sBI16s7sx")
+HEADER_SIZE = _HEADER.size
+
+_ALGORITHM_IDS = {ALGORITHM_AES_GCM: 1, ALGORITHM_CHACHA20: 2}
+_ALGORITHMS = {v: k for k, v in _ALGORITHM_IDS.items()}
+_CIPHERS = {ALGORITHM_AES_GCM: AESGCM, ALGORITHM_CHACHA20: ChaCha20Poly1305}
+
+_FILE_KEY_INFO = b"photo-app file key v1"
+_WRAP_KEY_INFO = b"photo-app key wrapping v1"
+_TEMP_SUFFIX = ".enc.tmp"
+
+
+class EncryptionError(Exception):
+    """密文损坏、被篡改或密钥错误"""
+
+
+class _Header:
+    __slots__ = ("algorithm", "chunk_size", "salt", "nonce_prefix", "raw")
+
+    def __init__(self, algorithm: str, chunk_size: int, salt: bytes, nonce_prefix: bytes):
+        self.algorithm = algorithm
+        self.chunk_size = chunk_size
+        self.salt = salt
+        self.nonce_prefix = nonce_prefix
+        self.raw = _HEADER.pack(_MAGIC, _ALGORITHM_IDS[algorithm], chunk_size, salt, nonce_prefix)
+
+    @classmethod
+    def parse(cls, data: bytes) -> "_Header":
+        if len(data) != HEADER_SIZE:
+            raise EncryptionError("Truncated encryption header")
+        magic, algorithm_id, chunk_size, salt, nonce_prefix = _HEADER.unpack(data)
+        if magic != _MAGIC or algorithm_id not in _ALGORITHMS or chunk_size <= 0:
+            raise EncryptionError("Invalid encryption header")
+        return cls(_ALGORITHMS[algorithm_id], chunk_size, salt, nonce_prefix)
+
+    def cipher(self, key: bytes):
+        if len(key) != KEY_SIZE:
+            raise ValueError(f"Encryption key must be {KEY_SIZE} bytes")
+        file_key = HKDF(
+            algorithm=hashes.SHA256(), length=KEY_SIZE, salt=self.salt, info=_FILE_KEY_INFO
+        ).derive(key)
+        return _CIPHERS[self.algorithm](file_key)
+
+    def nonce(self, index: int, last: bool) -> bytes:
+        return self.nonce_prefix + struct.pack(">I?", index, last)
+
+
+def _read_exact(src: BinaryIO, size: int) -> bytes:
+    """读取恰好size字节，只有到达流末尾时才返回更短的数据"""
+    data = src.read(size)
+    if len(data) == size or not data:
+        return data
+    parts = [data]
+    remaining = size - len(data)
+    while remaining:
+        more = src.read(remaining)
+        if not more:
+            break
+        parts.append(more)
+        remaining -= len(more)
+    return b"".join(parts)
+
+
+def _rechunk(blocks: Iterable[bytes], size: int) -> Iterator[bytes]:
+    """把任意大小的数据块重新切分为固定大小（最后一块可以更短）"""
+    buffer = bytearray()
+    for block in blocks:
+        buffer += block
+        while len(buffer) >= size:
+            yield bytes(buffer[:size])
+            del buffer[:size]
+    yield bytes(buffer)
+
+
+def _encrypt_chunks(
+    chunks: Iterator[bytes],
+    dst: BinaryIO,
+    key: bytes,
+    algorithm: str,
+    chunk_size: int
+) -> int:
+    """加密固定大小的明文块序列，返回明文总字节数"""
+    header = _Header(algorithm, chunk_size, os.urandom(16), os.urandom(7))
+    cipher = header.cipher(key)
+    dst.write(header.raw)
+
+    total = 0
+    index = 0
+    current = next(chunks, b"")
+    while True:
+        following = next(chunks, None)
+        # 空的末尾块只在整个文件为空时写入
+        if following == b"" and current:
+            following = None
+        last = following is None
+        dst.write(cipher.encrypt(header.nonce(index, last), current, header.raw))
+        total += len(current)
+        if last:
+            return total
+        current = following
+        index += 1
+
+
+def encrypt_stream(
+    src: BinaryIO,
+    dst: BinaryIO,
+    key: bytes,
+    *,
+    algorithm: str = ALGORITHM_AES_GCM,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> int:
+    """流式加密，返回明文字节数"""
+    if algorithm not in _CIPHERS:
+        raise ValueError(f"Unsupported algorithm: {algorithm}")
+    blocks = iter(lambda: _read_exact(src, chunk_size), b"")
+    return _encrypt_chunks(_rechunk(blocks, chunk_size), dst, key, algorithm, chunk_size)
+
+
+def decrypt_stream(src: BinaryIO, dst: BinaryIO, key: bytes) -> int:
+    """流式解密，返回明文字节数"""
+    header = _Header.parse(_read_exact(src, HEADER_SIZE))
+    cipher = header.cipher(key)
+    stored_size = header.chunk_size + TAG_SIZE
+
+    total = 0
+    index = 0
+    current = _read_exact(src, stored_size)
+    while True:
+        following = _read_exact(src, stored_size)
+        last = not following
+        if len(current) < TAG_SIZE or (not last and len(current) != stored_size):
+            raise EncryptionError("Truncated ciphertext")
+        try:
+            plaintext = cipher.decrypt(header.nonce(index, last), current, header.raw)
+        except InvalidTag:
+            raise EncryptionError(f"Authentication failed for chunk {index}") from None
+        dst.write(plaintext)
+        total += len(plaintext)
+        if last:
+            return total
+        current = following
+        index += 1
+
+
+class EncryptedReader:
+    """加密文件的随机访问读取器"""
+
+    def __init__(self, fileobj: BinaryIO, key: bytes):
+        self._file = fileobj
+        fileobj.seek(0)
+        self._header = _Header.parse(_read_exact(fileobj, HEADER_SIZE))
+        self._cipher = self._header.cipher(key)
+        self._stored_size = self._header.chunk_size + TAG_SIZE
+
+        payload = fileobj.seek(0, os.SEEK_END) - HEADER_SIZE
+        self.chunk_count = max(1, -(-payload // self._stored_size))
+        tail = payload - (self.chunk_count - 1) * self._stored_size
+        if tail < TAG_SIZE:
+            raise EncryptionError("Truncated ciphertext")
+        self.size = payload - self.chunk_count * TAG_SIZE
+
+    @classmethod
+    def open(cls, path: str, key: bytes) -> "EncryptedReader":
+        fileobj = open(path, "rb")
+        try:
+            return cls(fileobj, key)
+        except BaseException:
+            fileobj.close()
+            raise
+
+    @property
+    def chunk_size(self) -> int:
+        return self._header.chunk_size
+
+    @property
+    def algorithm(self) -> str:
+        return self._header.algorithm
+
+    def read_chunk(self, index: int) -> bytes:
+        """解密并校验第index块"""
+        if not 0 <= index < self.chunk_count:
+            raise IndexError(index)
+        self._file.seek(HEADER_SIZE + index * self._stored_size)
+        data = _read_exact(self._file, self._stored_size)
+        last = index == self.chunk_count - 1
+        try:
+            return self._cipher.decrypt(self._header.nonce(index, last), data, self._header.raw)
+        except InvalidTag:
+            raise EncryptionError(f"Authentication failed for chunk {index}") from None
+
+    def iter_range(self, start: int = 0, stop: Optional[int] = None) -> Iterator[bytes]:
+        """产出明文 [start, stop) 区间的数据，只解密覆盖该区间的块"""
+        stop = self.size if stop is None else min(stop, self.size)
+        if start >= stop:
+            return
+        chunk_size = self._header.chunk_size
+        for index in range(start // chunk_size, (stop - 1) // chunk_size + 1):
+            chunk = self.read_chunk(index)
+            offset = index * chunk_size
+            yield chunk[max(start - offset, 0):stop - offset]
+
+    def read(self, start: int = 0, stop: Optional[int] = None) -> bytes:
+        return b"".join(self.iter_range(start, stop))
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "EncryptedReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def open_with_keys(path: str, keys: Sequence[bytes]) -> EncryptedReader:
+    """依次尝试密钥，返回第0块认证通过的读取器；密钥轮换期间文件可能属于新旧任一密钥"""
+    if len(keys) == 1:
+        return EncryptedReader.open(path, keys[0])
+    error = EncryptionError("No encryption key available")
+    for key in keys:
+        reader = EncryptedReader.open(path, key)
+        try:
+            reader.read_chunk(0)
+            return reader
+        except EncryptionError as exc:
+            reader.close()
+            error = exc
+    raise error
+
+
+def is_encrypted_file(path: str) -> bool:
+    """根据文件头魔数判断文件是否已加密"""
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(_MAGIC)) == _MAGIC
+    except OSError:
+        return False
+
+
+def _atomic_write(dst_path: str, write) -> int:
+    tmp_path = dst_path + _TEMP_SUFFIX
+    try:
+        with open(tmp_path, "wb") as dst:
+            result = write(dst)
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.replace(tmp_path, dst_path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    return result
+
+
+def write_encrypted(
+    src: BinaryIO,
+    dst_path: str,
+    key: bytes,
+    *,
+    algorithm: str = ALGORITHM_AES_GCM,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> int:
+    """将明文流加密写入目标路径（先写临时文件再原子替换），用于上传路径"""
+    return _atomic_write(
+        dst_path,
+        lambda dst: encrypt_stream(src, dst, key, algorithm=algorithm, chunk_size=chunk_size),
+    )
+
+
+def encrypt_in_place(
+    path: str,
+    key: bytes,
+    *,
+    algorithm: str = ALGORITHM_AES_GCM,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> int:
+    """就地加密文件；已加密的文件直接跳过，返回明文字节数"""
+    if is_encrypted_file(path):
+        with EncryptedReader.open(path, key) as reader:
+            return reader.size
+    with open(path, "rb") as src:
+        return write_encrypted(src, path, key, algorithm=algorithm, chunk_size=chunk_size)
+
+
+def reencrypt_in_place(
+    path: str,
+    old_key: bytes,
+    new_key: bytes,
+    *,
+    algorithm: str = ALGORITHM_AES_GCM,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> int:
+    """用新密钥重新加密文件（密钥轮换），逐块解密再加密，内存占用恒定
+
+    已经是新密钥加密的文件直接跳过，中断的轮换可以安全重试。
+    """
+    with EncryptedReader.open(path, new_key) as reader:
+        try:
+            reader.read_chunk(0)
+            return reader.size
+        except EncryptionError:
+            pass
+    with EncryptedReader.open(path, old_key) as reader:
+        return _atomic_write(
+            path,
+            lambda dst: _encrypt_chunks(
+                _rechunk(reader.iter_range(), chunk_size), dst, new_key, algorithm, chunk_size
+            ),
+        )
+
+
+def decrypt_file(src_path: str, dst_path: str, key: bytes) -> int:
+    """解密到目标路径"""
+    with open(src_path, "rb") as src:
+        return _atomic_write(dst_path, lambda dst: decrypt_stream(src, dst, key))
+
+
+# 用户密钥管理：User.encryption_key 中保存的是用 SECRET_KEY 派生密钥包装后的用户密钥，
+# 轮换期间 User.pending_encryption_key 保存新密钥
+
+def generate_key() -> bytes:
+    return AESGCM.generate_key(bit_length=KEY_SIZE * 8)
+
+
+def _wrapping_cipher() -> AESGCM:
+    wrapping_key = HKDF(
+        algorithm=hashes.SHA256(), length=KEY_SIZE, salt=None, info=_WRAP_KEY_INFO
+    ).derive(settings.SECRET_KEY.encode("utf-8"))
+    return AESGCM(wrapping_key)
+
+
+def wrap_key(key: bytes) -> str:
+    """包装用户密钥，结果可存入 User.encryption_key"""
+    nonce = os.urandom(12)
+    sealed = _wrapping_cipher().encrypt(nonce, key, None)
+    return base64.urlsafe_b64encode(nonce + sealed).decode("ascii")
+
+
+def unwrap_key(token: str) -> bytes:
+    """解包 User.encryption_key 中保存的用户密钥"""
+    try:
+        data = base64.urlsafe_b64decode(token.encode("ascii"))
+        return _wrapping_cipher().decrypt(data[:12], data[12:], None)
+    except (ValueError, InvalidTag):
+        raise EncryptionError("Invalid wrapped key") from None
+
+
+def unwrap_keys(*tokens: Optional[str]) -> List[bytes]:
+    """解包非空的包装密钥，例如 (pending_encryption_key, encryption_key)"""
+    return [unwrap_key(token) for token in tokens if token]
@@ -0,0 +1,170 @@
+"""远程存储清单模块
+
+本模块通过一次 rclone lsjson --recursive 调用流式获取远程存储的完整文件清单，
+代替逐个文件的 stat 调用；同时提供本地目录的等价实现用于测试和本地备份盘。
+
+主要组件：
+- RemoteEntry: 清单条目（相对路径, 大小）
+- RcloneListing: 流式解析 rclone lsjson 输出
+- LocalListing: 本地目录清单
+- RcloneReader / LocalReader: 从指定偏移开始流式读取远程文件，用于可续传的恢复
+"""
+
+import asyncio
+import json
+import os
+from typing import AsyncIterator, List, NamedTuple, Optional
+
+READ_SIZE = 1024 * 1024
+
+
+class RemoteEntry(NamedTuple):
+    path: str
+    size: int
+
+
+class RcloneListing:
+    """rclone远程清单"""
+
+    def __init__(self, remote: str, *, rclone_bin: str = "rclone", extra_args: Optional[List[str]] = None):
+        self._remote = remote
+        self._rclone_bin = rclone_bin
+        self._extra_args = extra_args or []
+
+    def command(self) -> List[str]:
+        return [
+            self._rclone_bin, "lsjson", "--recursive", "--files-only",
+            "--no-mimetype", "--no-modtime", *self._extra_args, self._remote,
+        ]
+
+    async def entries(self) -> AsyncIterator[RemoteEntry]:
+        """逐行解析 lsjson 输出；rclone 每行输出一个对象"""
+        process = await asyncio.create_subprocess_exec(
+            *self.command(),
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        stderr_task = asyncio.create_task(process.stderr.read())
+        completed = False
+        try:
+            async for raw_line in process.stdout:
+                entry = parse_lsjson_line(raw_line.decode("utf-8"))
+                if entry is not None:
+                    yield entry
+            completed = True
+        finally:
+            if not completed and process.returncode is None:
+                process.kill()
+            returncode = await process.wait()
+            stderr = await stderr_task
+        if completed and returncode != 0:
+            raise RuntimeError(
+                f"rclone lsjson failed with exit code {returncode}: {stderr.decode('utf-8', 'replace').strip()}"
+            )
+
+
+class LocalListing:
+    """本地目录清单，输出格式与 RcloneListing 相同"""
+
+    def __init__(self, root: str):
+        self._root = os.path.abspath(root)
+
+    async def entries(self) -> AsyncIterator[RemoteEntry]:
+        stack = [self._root]
+        while stack:
+            directory = stack.pop()
+            entries = await asyncio.to_thread(_list_directory, directory)
+            for path, size, is_dir in entries:
+                if is_dir:
+                    stack.append(path)
+                else:
+                    relative = os.path.relpath(path, self._root).replace(os.sep, "/")
+                    yield RemoteEntry(relative, size)
+
+
+class RcloneReader:
+    """通过 rclone cat --offset 流式读取远程文件"""
+
+    def __init__(self, remote: str, *, rclone_bin: str = "rclone", extra_args: Optional[List[str]] = None):
+        self._remote = remote.rstrip("/")
+        self._rclone_bin = rclone_bin
+        self._extra_args = extra_args or []
+
+    def command(self, path: str, offset: int = 0) -> List[str]:
+        return [
+            self._rclone_bin, "cat", "--offset", str(offset),
+            *self._extra_args, f"{self._remote}/{path.lstrip('/')}",
+        ]
+
+    async def open(self, path: str, offset: int = 0) -> AsyncIterator[bytes]:
+        process = await asyncio.create_subprocess_exec(
+            *self.command(path, offset),
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        stderr_task = asyncio.create_task(process.stderr.read())
+        completed = False
+        try:
+            while True:
+                chunk = await process.stdout.read(READ_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+            completed = True
+        finally:
+            if not completed and process.returncode is None:
+                process.kill()
+            returncode = await process.wait()
+            stderr = await stderr_task
+        if completed and returncode != 0:
+            message = stderr.decode("utf-8", "replace").strip()
+            if "not found" in message.lower():
+                raise FileNotFoundError(path)
+            raise RuntimeError(f"rclone cat failed with exit code {returncode}: {message}")
+
+
+class LocalReader:
+    """本地目录读取器，接口与 RcloneReader 相同"""
+
+    def __init__(self, root: str):
+        self._root = os.path.abspath(root)
+
+    async def open(self, path: str, offset: int = 0) -> AsyncIterator[bytes]:
+        f = await asyncio.to_thread(open, os.path.join(self._root, path.lstrip("/")), "rb")
+        try:
+            f.seek(offset)
+            while True:
+                chunk = await asyncio.to_thread(f.read, READ_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            f.close()
+
+
+def _list_directory(directory: str):
+    result = []
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        result.append((entry.path, 0, True))
+                    elif entry.is_file(follow_symlinks=False):
+                        result.append((entry.path, entry.stat(follow_symlinks=False).st_size, False))
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return result
+
+
+def parse_lsjson_line(line: str) -> Optional[RemoteEntry]:
+    """解析 lsjson 的一行输出，数组括号和目录返回None"""
+    line = line.strip().rstrip(",")
+    if not line or line in ("[", "]"):
+        return None
+    item = json.loads(line)
+    if item.get("IsDir"):
+        return None
+    return RemoteEntry(item["Path"], int(item.get("Size", -1)))
@@ -0,0 +1,203 @@
+"""目录扫描模块
+
+本模块提供并行的目录遍历和与扫描清单的差异比对，用于监控服务未运行期间的增量重扫。
+
+主要组件：
+- walk_files: 多线程 os.scandir 遍历，按目录粒度并行
+- walk_sorted: 单线程按完整路径的字典序遍历，可以从断点继续，用于与数据库有序游标归并
+- diff_against_manifest: 将遍历结果与清单比对，得到新增/修改/删除/移动
+- hash_file / hash_files: 计算文件内容哈希（BLAKE2b-256）
+
+注意事项：
+- 文件未变化的判定依据是 (size, mtime_ns, inode) 完全一致，此时不读取文件内容
+- 清单中被删除且inode、大小、mtime都相同的新路径视为移动，无需重新哈希
+- 遍历结果以流的形式与清单比对，内存只保存清单本身
+"""
+
+import hashlib
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from photo_app.infrastructure.storage.watcher import PHOTO_EXTENSIONS, is_photo_file
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# 清单条目：(size, mtime_ns, inode, content_hash)
+ManifestValue = Tuple[int, int, int, Optional[str]]
+
+
+class FileRecord(NamedTuple):
+    path: str
+    size: int
+    mtime_ns: int
+    inode: int
+    content_hash: Optional[str] = None
+
+
+@dataclass
+class ScanDiff:
+    """扫描差异"""
+    added: List[FileRecord] = field(default_factory=list)
+    changed: List[FileRecord] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    # (旧路径, 新记录)
+    moved: List[Tuple[str, FileRecord]] = field(default_factory=list)
+    unchanged: int = 0
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.added or self.changed or self.removed or self.moved)
+
+
+def _scan_directory(directory: str, extensions: frozenset) -> Tuple[List[FileRecord], List[str]]:
+    files: List[FileRecord] = []
+    subdirs: List[str] = []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False) and is_photo_file(entry.name, extensions):
+                        st = entry.stat(follow_symlinks=False)
+                        files.append(FileRecord(entry.path, st.st_size, st.st_mtime_ns, st.st_ino))
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return files, subdirs
+
+
+def walk_files(
+    root: str,
+    *,
+    max_workers: int = 8,
+    extensions: Iterable[str] = PHOTO_EXTENSIONS
+) -> Iterator[FileRecord]:
+    """并行遍历目录树，逐个产出照片文件的状态（不含哈希）"""
+    extensions = frozenset(ext.lower() for ext in extensions)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending = {pool.submit(_scan_directory, os.path.abspath(root), extensions)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                files, subdirs = future.result()
+                for subdir in subdirs:
+                    pending.add(pool.submit(_scan_directory, subdir, extensions))
+                yield from files
+
+
+def walk_sorted(
+    root: str,
+    *,
+    start_after: Optional[str] = None,
+    extensions: Optional[Iterable[str]] = PHOTO_EXTENSIONS
+) -> Iterator[FileRecord]:
+    """按完整路径的字典序遍历目录树，逐个产出文件状态（不含哈希）
+
+    同一目录内的条目按名称排序，子目录以"名称/"参与比较，深度优先的遍历顺序即为完整路径的字典序，
+    与数据库中 ORDER BY filepath（二进制排序规则）一致。
+    start_after 用于断点续扫：只产出路径大于它的文件，整棵子树都排在它之前的目录不会被读取。
+    extensions 为None时产出所有文件；以"."开头的文件和目录（块存储、隔离区等）总是跳过。
+    """
+    if extensions is not None:
+        extensions = frozenset(ext.lower() for ext in extensions)
+
+    def visit(directory: str) -> Iterator[FileRecord]:
+        entries = []
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.name.startswith("."):
+                        continue
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                        if not is_dir and not entry.is_file(follow_symlinks=False):
+                            continue
+                    except OSError:
+                        continue
+                    entries.append((entry.name + os.sep if is_dir else entry.name, entry))
+        except OSError:
+            return
+        entries.sort(key=lambda item: item[0])
+
+        for key, entry in entries:
+            if key.endswith(os.sep):
+                prefix = entry.path + os.sep
+                if start_after is not None and prefix < start_after and not start_after.startswith(prefix):
+                    continue
+                yield from visit(entry.path)
+                continue
+            if start_after is not None and entry.path <= start_after:
+                continue
+            if extensions is not None and not is_photo_file(entry.name, extensions):
+                continue
+            try:
+                st = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            yield FileRecord(entry.path, st.st_size, st.st_mtime_ns, st.st_ino)
+
+    return visit(os.path.abspath(root))
+
+
+def diff_against_manifest(
+    records: Iterable[FileRecord],
+    manifest: Dict[str, ManifestValue]
+) -> ScanDiff:
+    """将遍历结果与清单比对；manifest 会被消耗（剩余的即为已删除的条目）"""
+    diff = ScanDiff()
+    for record in records:
+        previous = manifest.pop(record.path, None)
+        if previous is None:
+            diff.added.append(record)
+            continue
+        size, mtime_ns, inode, content_hash = previous
+        if (record.size, record.mtime_ns, record.inode) == (size, mtime_ns, inode):
+            diff.unchanged += 1
+        else:
+            diff.changed.append(record)
+
+    # 按inode匹配移动/重命名的文件
+    removed_by_inode = {
+        (value[2], value[0], value[1]): (path, value[3])
+        for path, value in manifest.items()
+    }
+    still_added = []
+    for record in diff.added:
+        match = removed_by_inode.pop((record.inode, record.size, record.mtime_ns), None)
+        if match is None:
+            still_added.append(record)
+            continue
+        old_path, content_hash = match
+        del manifest[old_path]
+        diff.moved.append((old_path, record._replace(content_hash=content_hash)))
+    diff.added = still_added
+    diff.removed = sorted(manifest)
+    return diff
+
+
+def hash_file(path: str) -> str:
+    """计算文件内容的 BLAKE2b-256 十六进制摘要"""
+    digest = hashlib.blake2b(digest_size=32)
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_files(records: Iterable[FileRecord], *, max_workers: int = 4) -> List[FileRecord]:
+    """并行计算一组文件的哈希，读取失败的文件会被跳过"""
+    def _hash(record: FileRecord) -> Optional[FileRecord]:
+        try:
+            return record._replace(content_hash=hash_file(record.path))
+        except OSError:
+            return None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return [r for r in pool.map(_hash, records) if r is not None]
@@ -0,0 +1,35 @@
+"""缩略图路径模块
+
+本模块约定缩略图在本地缓存和备份端的存放位置。
+
+存储布局：
+- 本地：CACHE_PATH/thumbnails/<照片ID后三位>/<照片ID>.jpg，按ID分散到子目录
+- 备份端：.thumbnails/<原图备份路径>.jpg，与原图备份路径一一对应
+
+注意事项：
+- 缩略图可以由原图重新生成，缺失时不视为错误
+"""
+
+import os
+from typing import Optional
+
+from photo_app.core.config import settings
+
+THUMBNAIL_DIR_NAME = "thumbnails"
+THUMBNAIL_BACKUP_PREFIX = ".thumbnails"
+THUMBNAIL_SUFFIX = ".jpg"
+
+
+def thumbnail_path(photo_id: int, cache_path: Optional[str] = None) -> str:
+    """照片缩略图在本地缓存中的路径"""
+    return os.path.join(
+        cache_path or settings.CACHE_PATH,
+        THUMBNAIL_DIR_NAME,
+        f"{photo_id % 1000:03d}",
+        f"{photo_id}{THUMBNAIL_SUFFIX}",
+    )
+
+
+def thumbnail_backup_path(backup_path: str) -> str:
+    """缩略图在备份端的相对路径"""
+    return f"{THUMBNAIL_BACKUP_PREFIX}/{backup_path.lstrip('/')}{THUMBNAIL_SUFFIX}"
@@ -0,0 +1,331 @@
+"""文件监控模块
+
+本模块监控 STORAGE_PATH 下新增的照片文件，并按批次推送给导入流程。
+
+主要组件：
+- FileWatcher: 文件监控器，优先使用inotify，不可用时退化为轮询
+- is_photo_file: 判断文件名是否为支持的照片格式
+
+工作方式：
+1. inotify模式：监听 IN_CLOSE_WRITE / IN_MOVED_TO，空闲时不占用CPU，也不做周期性全量遍历
+2. 轮询模式：只重新扫描mtime发生变化的目录，而不是遍历整棵目录树
+3. 去抖：文件大小和mtime在 settle_time 内保持不变才视为写入完成
+4. 合并：就绪的文件在 batch_window 内聚合为一批，最多 max_batch 个
+
+注意事项：
+- inotify绑定使用纯Python的 inotify_simple（可选依赖）
+- 回调 on_batch 是异步函数，接收一批文件的绝对路径
+- 启动时已存在的文件不会被推送，历史文件由增量重扫处理
+- inotify事件队列溢出（IN_Q_OVERFLOW）时重新遍历目录树补齐监听，并推送上次读取事件之后
+  修改或移入的文件；同一文件可能被重复推送，on_batch 需要保证幂等
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from photo_app.core.config import settings
+
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+except ImportError:  # pragma: no cover - 取决于运行环境
+    INotify = None
+    inotify_flags = None
+
+logger = logging.getLogger(__name__)
+
+PHOTO_EXTENSIONS = frozenset({
+    ".jpg", ".jpeg", ".png", ".gif", ".webp", ".heic", ".heif", ".tif", ".tiff",
+    ".bmp", ".dng", ".cr2", ".cr3", ".nef", ".arw", ".orf", ".rw2", ".raf",
+})
+
+# 队列溢出后补推送文件时的时间余量（秒），覆盖文件系统时间戳的精度误差
+_OVERFLOW_MARGIN = 1.0
+
+# 写入中的临时文件后缀
+_TEMP_SUFFIXES = (".tmp", ".part", ".partial", ".crdownload", ".download")
+
+BatchCallback = Callable[[List[str]], Awaitable[None]]
+
+
+def is_photo_file(name: str, extensions: Iterable[str] = PHOTO_EXTENSIONS) -> bool:
+    """判断文件名是否为支持的照片格式"""
+    base = os.path.basename(name)
+    if base.startswith(".") or base.lower().endswith(_TEMP_SUFFIXES):
+        return False
+    return os.path.splitext(base)[1].lower() in extensions
+
+
+class FileWatcher:
+    """目录树文件监控器"""
+
+    def __init__(
+        self,
+        on_batch: BatchCallback,
+        root: Optional[str] = None,
+        *,
+        settle_time: float = 1.0,
+        batch_window: float = 2.0,
+        max_batch: int = 500,
+        poll_interval: float = 5.0,
+        extensions: Iterable[str] = PHOTO_EXTENSIONS,
+        use_inotify: Optional[bool] = None
+    ):
+        self._on_batch = on_batch
+        self._root = os.path.abspath(root or settings.STORAGE_PATH)
+        self._settle_time = settle_time
+        self._batch_window = batch_window
+        self._max_batch = max_batch
+        self._poll_interval = poll_interval
+        self._extensions = frozenset(ext.lower() for ext in extensions)
+        if use_inotify is None:
+            use_inotify = INotify is not None
+        if use_inotify and INotify is None:
+            raise RuntimeError("inotify_simple is not installed")
+        self._use_inotify = use_inotify
+
+        # 等待稳定的文件：路径 -> (最后变化时间, 大小, mtime_ns)
+        self._pending: Dict[str, Tuple[float, int, int]] = {}
+        # 已就绪待推送的文件（dict用作有序集合）
+        self._ready: Dict[str, None] = {}
+        self._ready_since: Optional[float] = None
+
+        # inotify：wd -> 目录
+        self._watches: Dict[int, str] = {}
+        # 上一次读取inotify事件的时间（墙钟时间，与文件时间戳比较）
+        self._last_read_at = 0.0
+        # 轮询：目录 -> mtime_ns，目录 -> 已知文件名
+        self._dir_mtimes: Dict[str, int] = {}
+        self._known: Dict[str, Set[str]] = {}
+        self._next_poll = 0.0
+
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+
+    @property
+    def backend(self) -> str:
+        return "inotify" if self._use_inotify else "polling"
+
+    def stop(self) -> None:
+        """停止监控，已就绪的文件会在退出前推送"""
+        self._stopping = True
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def run(self) -> None:
+        """运行监控循环，直到调用 stop()"""
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        if self._use_inotify:
+            await self._run_inotify()
+        else:
+            await self._run_polling()
+
+    # inotify 后端
+
+    async def _run_inotify(self) -> None:
+        inotify = INotify()
+        loop = asyncio.get_running_loop()
+        self._last_read_at = time.time()
+        self._watch_tree(inotify, self._root, existing_are_new=False)
+        loop.add_reader(inotify.fd, self._read_inotify, inotify)
+        try:
+            await self._dispatch_loop()
+        finally:
+            loop.remove_reader(inotify.fd)
+            inotify.close()
+
+    def _watch_tree(
+        self, inotify, top: str, existing_are_new: bool, changed_since: Optional[float] = None
+    ) -> None:
+        """为目录树添加监听；新建的子目录中已有的文件需要补推送
+
+        changed_since 不为 None 时，补推送mtime或ctime不早于该时间的文件（ctime覆盖移入的文件）。
+        """
+        mask = (
+            inotify_flags.CLOSE_WRITE | inotify_flags.MOVED_TO
+            | inotify_flags.CREATE | inotify_flags.DELETE_SELF
+        )
+        stack = [top]
+        while stack:
+            directory = stack.pop()
+            try:
+                wd = inotify.add_watch(directory, mask)
+            except OSError:
+                continue
+            self._watches[wd] = directory
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif self._accepts(entry.name) and (
+                            existing_are_new or self._changed_since(entry, changed_since)
+                        ):
+                            self._touch(entry.path)
+            except OSError:
+                continue
+
+    @staticmethod
+    def _changed_since(entry: os.DirEntry, since: Optional[float]) -> bool:
+        if since is None:
+            return False
+        try:
+            st = entry.stat(follow_symlinks=False)
+        except OSError:
+            return False
+        return max(st.st_mtime, st.st_ctime) >= since
+
+    def _read_inotify(self, inotify) -> None:
+        since = self._last_read_at - _OVERFLOW_MARGIN
+        self._last_read_at = time.time()
+        for event in inotify.read(timeout=0):
+            if event.mask & inotify_flags.Q_OVERFLOW:
+                # 事件已丢失，无法知道具体哪些文件变化，重新遍历整棵目录树
+                logger.warning("inotify event queue overflowed, rescanning %s", self._root)
+                self._watch_tree(inotify, self._root, existing_are_new=False, changed_since=since)
+                continue
+            if event.mask & inotify_flags.IGNORED:
+                self._watches.pop(event.wd, None)
+                continue
+            directory = self._watches.get(event.wd)
+            if directory is None or not event.name:
+                continue
+            path = os.path.join(directory, event.name)
+            if event.mask & inotify_flags.ISDIR:
+                if event.mask & (inotify_flags.CREATE | inotify_flags.MOVED_TO):
+                    self._watch_tree(inotify, path, existing_are_new=True)
+            elif event.mask & (inotify_flags.CLOSE_WRITE | inotify_flags.MOVED_TO):
+                if self._accepts(event.name):
+                    self._touch(path)
+        self._wakeup.set()
+
+    # 轮询后端
+
+    async def _run_polling(self) -> None:
+        self._scan_directory(self._root, existing_are_new=False)
+        self._next_poll = time.monotonic() + self._poll_interval
+        await self._dispatch_loop()
+
+    def _poll(self) -> None:
+        """只重新扫描mtime变化过的目录"""
+        for directory, mtime_ns in list(self._dir_mtimes.items()):
+            try:
+                current = os.stat(directory).st_mtime_ns
+            except OSError:
+                self._forget_directory(directory)
+                continue
+            if current != mtime_ns:
+                self._scan_directory(directory, existing_are_new=True)
+
+    def _scan_directory(self, top: str, existing_are_new: bool) -> None:
+        stack = [top]
+        while stack:
+            directory = stack.pop()
+            try:
+                mtime_ns = os.stat(directory).st_mtime_ns
+                with os.scandir(directory) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            known = self._known.get(directory)
+            names = set()
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.path not in self._dir_mtimes:
+                        # 新目录中的文件一律视为新增
+                        self._dir_mtimes[entry.path] = -1
+                        self._known[entry.path] = set()
+                        stack.append(entry.path)
+                    continue
+                names.add(entry.name)
+                is_new = existing_are_new and (known is None or entry.name not in known)
+                if is_new and self._accepts(entry.name):
+                    self._touch(entry.path)
+            self._known[directory] = names
+            self._dir_mtimes[directory] = mtime_ns
+
+    def _forget_directory(self, directory: str) -> None:
+        prefix = directory + os.sep
+        for path in [d for d in self._dir_mtimes if d == directory or d.startswith(prefix)]:
+            self._dir_mtimes.pop(path, None)
+            self._known.pop(path, None)
+
+    # 去抖与批量推送
+
+    def _accepts(self, name: str) -> bool:
+        return is_photo_file(name, self._extensions)
+
+    def _touch(self, path: str) -> None:
+        """记录文件发生变化，重新开始稳定计时"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            self._pending.pop(path, None)
+            return
+        self._pending[path] = (time.monotonic(), st.st_size, st.st_mtime_ns)
+
+    def _promote_settled(self) -> None:
+        """将大小和mtime已稳定的文件移入就绪队列"""
+        now = time.monotonic()
+        for path, (changed_at, size, mtime_ns) in list(self._pending.items()):
+            if now - changed_at < self._settle_time:
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                del self._pending[path]
+                continue
+            if (st.st_size, st.st_mtime_ns) != (size, mtime_ns):
+                self._pending[path] = (now, st.st_size, st.st_mtime_ns)
+                continue
+            del self._pending[path]
+            if self._ready_since is None:
+                self._ready_since = now
+            self._ready[path] = None
+
+    async def _flush(self, force: bool = False) -> None:
+        while self._ready:
+            now = time.monotonic()
+            window_elapsed = self._ready_since is not None and now - self._ready_since >= self._batch_window
+            if not (force or window_elapsed or len(self._ready) >= self._max_batch):
+                return
+            batch = list(self._ready)[:self._max_batch]
+            for path in batch:
+                del self._ready[path]
+            self._ready_since = now if self._ready else None
+            try:
+                await self._on_batch(batch)
+            except Exception:
+                logger.exception("Failed to ingest batch of %d files", len(batch))
+
+    def _next_timeout(self) -> Optional[float]:
+        """计算下一次唤醒时间；inotify模式下无待处理文件时无限等待"""
+        now = time.monotonic()
+        deadlines = []
+        if self._pending:
+            deadlines.append(min(t for t, _, _ in self._pending.values()) + self._settle_time)
+        if self._ready_since is not None:
+            deadlines.append(self._ready_since + self._batch_window)
+        if not self._use_inotify:
+            deadlines.append(self._next_poll)
+        if not deadlines:
+            return None
+        return max(0.0, min(deadlines) - now)
+
+    async def _dispatch_loop(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self._next_timeout())
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if not self._use_inotify and time.monotonic() >= self._next_poll:
+                self._poll()
+                self._next_poll = time.monotonic() + self._poll_interval
+            self._promote_settled()
+            await self._flush()
+        self._promote_settled()
+        await self._flush(force=True)
@@ -26,6 +26,7 @@
 """
 
 import asyncio
+import os
 import pytest
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
@@ -35,6 +36,11 @@ from photo_app.core.models.user import User
 from photo_app.core.models.photo import Photo, PhotoMetadata
 from photo_app.core.models.album import Album
 from photo_app.core.models.tag import Tag
+from photo_app.core.models.timeline import TimelineBucket
+from photo_app.core.models.manifest import ScanManifestEntry
+from photo_app.core.models.version import PhotoVersion, StoredChunk
+from photo_app.core.models.checkpoint import JobCheckpoint
+from photo_app.core.models.change_counter import UserChangeCounter
 
 # 使用临时文件数据库进行测试
 TEST_DATABASE_URL = "sqlite+aiosqlite:///./data/test.db"
@@ -42,6 +48,8 @@ TEST_DATABASE_URL = "sqlite+aiosqlite:///./data/test.db"
 @pytest.fixture(scope="function")
 async def test_engine():
     """创建测试引擎"""
+    # 数据库文件是测试生成的，不在版本库中（见 .gitignore）
+    os.makedirs("./data", exist_ok=True)
     engine = create_async_engine(TEST_DATABASE_URL, echo=True)
     
     async with engine.begin() as conn:
@@ -0,0 +1,112 @@
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from photo_app.api.dependencies.auth import get_current_user_id
+from photo_app.api.endpoints import maps, photos
+from photo_app.core.dao.change_counter import UserChangeCounterDAO
+from photo_app.core.dao.metadata import PhotoMetadataDAO
+from photo_app.core.dao.photo import PhotoDAO
+from photo_app.core.models.user import User
+from photo_app.infrastructure.database.base import get_db
+
+BBOX = {"south": 0, "west": 0, "north": 50, "east": 50}
+
+
+@pytest.mark.asyncio
+class TestConditionalLists:
+    async def test_photo_list_not_modified(self, client, async_session: AsyncSession, list_user, test_engine):
+        response = await client.get("/photos/", params={"limit": 10})
+        assert response.status_code == 200
+        assert len(response.json()["photos"]) == 2
+        etag = response.headers["etag"]
+        assert etag.startswith('W/"')
+        assert response.headers["cache-control"] == "private, no-cache"
+
+        statements = []
+        event.listen(test_engine.sync_engine, "before_cursor_execute",
+                     lambda *args: statements.append(args[2]))
+        response = await client.get("/photos/", params={"limit": 10}, headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+        # 只执行验证器查询
+        assert len(statements) == 1
+
+        response = await client.get(
+            "/photos/", params={"limit": 10},
+            headers={"If-Modified-Since": response.headers["last-modified"]}
+        )
+        assert response.status_code == 304
+
+        # 分页参数不同时ETag不同
+        other = await client.get("/photos/", params={"limit": 1}, headers={"If-None-Match": etag})
+        assert other.status_code == 200
+
+    async def test_changes_invalidate(self, client, async_session: AsyncSession, list_user):
+        etag = (await client.get("/photos/")).headers["etag"]
+        dao = PhotoDAO(async_session)
+        photo = await dao.create(filename="new.jpg", filepath="/lists/new.jpg", size=1, user_id=list_user.id)
+        await async_session.commit()
+        response = await client.get("/photos/", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        etag = response.headers["etag"]
+
+        await dao.delete(photo.id)
+        await async_session.commit()
+        response = await client.get("/photos/", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert len(response.json()["photos"]) == 2
+
+    async def test_metadata_change_bumps_counter(self, client, async_session: AsyncSession, list_user):
+        response = await client.get("/map/photos", params=BBOX)
+        assert response.status_code == 200
+        assert response.json()["photos"] == []
+        etag = response.headers["etag"]
+        before = await UserChangeCounterDAO(async_session).get_validator(list_user.id)
+
+        photo_id = list_user.photo_ids[0]
+        await PhotoMetadataDAO(async_session).create(photo_id=photo_id, latitude=10.0, longitude=20.0)
+        await async_session.commit()
+        after = await UserChangeCounterDAO(async_session).get_validator(list_user.id)
+        assert after.version == before.version + 1
+
+        response = await client.get("/map/photos", params=BBOX, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.json()["photos"] == [{"photo_id": photo_id, "latitude": 10.0, "longitude": 20.0}]
+        response = await client.get(
+            "/map/photos", params=BBOX, headers={"If-None-Match": response.headers["etag"]}
+        )
+        assert response.status_code == 304
+
+
+@pytest.fixture
+async def list_user(async_session: AsyncSession) -> User:
+    user = User(email="lists@example.com", username="lists", hashed_password="x")
+    async_session.add(user)
+    await async_session.flush()
+    dao = PhotoDAO(async_session)
+    user.photo_ids = [
+        (await dao.create(filename=f"{i}.jpg", filepath=f"/lists/{i}.jpg", size=1, user_id=user.id)).id
+        for i in range(2)
+    ]
+    await async_session.commit()
+    return user
+
+
+@pytest.fixture
+async def client(async_session: AsyncSession, list_user):
+    app = FastAPI()
+    app.include_router(photos.router, prefix="/photos")
+    app.include_router(maps.router, prefix="/map")
+
+    async def override_db():
+        yield async_session
+
+    app.dependency_overrides[get_db] = override_db
+    app.dependency_overrides[get_current_user_id] = lambda: list_user.id
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
@@ -0,0 +1,179 @@
+import io
+import zipfile
+from datetime import datetime
+from pathlib import Path
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from photo_app.api.dependencies.auth import get_current_user_id
+from photo_app.api.endpoints import files
+from photo_app.core.models.photo import Photo
+from photo_app.core.models.user import User
+from photo_app.infrastructure.database.base import get_db
+from photo_app.infrastructure.storage.encryption import generate_key, wrap_key, write_encrypted
+
+CONTENT = bytes(range(256)) * 40
+
+
+@pytest.mark.asyncio
+class TestOriginalDownload:
+    async def test_full_and_single_range(self, client, plain_photo):
+        url = f"/files/{plain_photo.id}/original"
+        response = await client.get(url)
+        assert response.status_code == 200
+        assert response.content == CONTENT
+        assert response.headers["accept-ranges"] == "bytes"
+        assert response.headers["content-type"] == "image/jpeg"
+        assert response.headers["etag"] == f'"{"c" * 32}-1"'
+
+        response = await client.get(url, headers={"Range": "bytes=100-199"})
+        assert response.status_code == 206
+        assert response.content == CONTENT[100:200]
+        assert response.headers["content-range"] == f"bytes 100-199/{len(CONTENT)}"
+
+        response = await client.head(url, headers={"Range": "bytes=-10"})
+        assert response.status_code == 206
+        assert response.headers["content-length"] == "10"
+        assert response.content == b""
+
+    async def test_multiple_ranges(self, client, plain_photo):
+        response = await client.get(
+            f"/files/{plain_photo.id}/original", headers={"Range": "bytes=0-9, 1000-1009"}
+        )
+        assert response.status_code == 206
+        content_type = response.headers["content-type"]
+        assert content_type.startswith("multipart/byteranges; boundary=")
+        boundary = content_type.split("boundary=")[1].encode()
+        assert int(response.headers["content-length"]) == len(response.content)
+
+        parts = response.content.split(b"--" + boundary)
+        assert parts[-1] == b"--\r\n"
+        bodies = [part.split(b"\r\n\r\n", 1)[1][:-2] for part in parts[1:-1]]
+        assert bodies == [CONTENT[0:10], CONTENT[1000:1010]]
+        assert b"Content-Range: bytes 1000-1009/" in parts[2]
+
+    async def test_unsatisfiable_range(self, client, plain_photo):
+        response = await client.get(
+            f"/files/{plain_photo.id}/original", headers={"Range": f"bytes={len(CONTENT)}-"}
+        )
+        assert response.status_code == 416
+        assert response.headers["content-range"] == f"bytes */{len(CONTENT)}"
+
+    async def test_conditional_requests(self, client, plain_photo):
+        url = f"/files/{plain_photo.id}/original"
+        first = await client.get(url)
+        etag = first.headers["etag"]
+
+        response = await client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+
+        response = await client.get(url, headers={"If-Modified-Since": first.headers["last-modified"]})
+        assert response.status_code == 304
+
+        # If-Range 不匹配时返回完整内容
+        response = await client.get(url, headers={"Range": "bytes=0-9", "If-Range": '"stale-1"'})
+        assert response.status_code == 200
+        assert response.content == CONTENT
+        response = await client.get(url, headers={"Range": "bytes=0-9", "If-Range": etag})
+        assert response.status_code == 206
+
+    async def test_rewritten_file_invalidates_date_validators(self, client, async_session: AsyncSession, plain_photo):
+        url = f"/files/{plain_photo.id}/original"
+        await async_session.execute(
+            update(Photo).where(Photo.id == plain_photo.id).values(updated_at=datetime(2020, 1, 1))
+        )
+        await async_session.commit()
+        first = await client.get(url)
+        last_modified = first.headers["last-modified"]
+        assert last_modified == "Wed, 01 Jan 2020 00:00:00 GMT"
+
+        # 与恢复版本相同：改写文件内容并更新校验和
+        Path(plain_photo.filepath).write_bytes(CONTENT[::-1])
+        await async_session.execute(update(Photo).where(Photo.id == plain_photo.id).values(checksum="d" * 64))
+        await async_session.commit()
+
+        response = await client.get(url, headers={"If-Modified-Since": last_modified})
+        assert response.status_code == 200
+        response = await client.get(url, headers={"Range": "bytes=0-9", "If-Range": last_modified})
+        assert response.status_code == 200
+        assert response.content == CONTENT[::-1]
+
+    async def test_encrypted_photo(self, client, async_session: AsyncSession, file_user, tmp_path):
+        key = generate_key()
+        file_user.encryption_key = wrap_key(key)
+        path = tmp_path / "secret.jpg"
+        write_encrypted(io.BytesIO(CONTENT), str(path), key, chunk_size=4096)
+        photo = Photo(filename="secret.jpg", filepath=str(path), size=len(CONTENT),
+                      user_id=file_user.id, is_encrypted=True)
+        async_session.add(photo)
+        await async_session.commit()
+
+        url = f"/files/{photo.id}/original"
+        response = await client.get(url)
+        assert response.status_code == 200
+        assert response.content == CONTENT
+
+        response = await client.get(url, headers={"Range": "bytes=4000-4199"})
+        assert response.status_code == 206
+        assert response.content == CONTENT[4000:4200]
+        assert response.headers["content-range"] == f"bytes 4000-4199/{len(CONTENT)}"
+
+    async def test_other_users_photo(self, client, async_session: AsyncSession, tmp_path):
+        other = User(email="other@example.com", username="other", hashed_password="x")
+        async_session.add(other)
+        await async_session.flush()
+        photo = Photo(filename="x.jpg", filepath=str(tmp_path / "x.jpg"), size=1, user_id=other.id)
+        async_session.add(photo)
+        await async_session.commit()
+
+        response = await client.get(f"/files/{photo.id}/original")
+        assert response.status_code == 404
+
+    async def test_export(self, client, plain_photo):
+        response = await client.get("/files/export", params={"filename": "plain"})
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/zip"
+        archive = zipfile.ZipFile(io.BytesIO(response.content))
+        assert archive.read("plain.jpg") == CONTENT
+
+        response = await client.get("/files/export", params={"album_id": 999})
+        assert response.status_code == 404
+
+
+@pytest.fixture
+async def file_user(async_session: AsyncSession) -> User:
+    user = User(email="files@example.com", username="files", hashed_password="x")
+    async_session.add(user)
+    await async_session.commit()
+    return user
+
+
+@pytest.fixture
+async def plain_photo(async_session: AsyncSession, file_user, tmp_path) -> Photo:
+    path = tmp_path / "plain.jpg"
+    path.write_bytes(CONTENT)
+    photo = Photo(filename="plain.jpg", filepath=str(path), size=len(CONTENT),
+                  user_id=file_user.id, checksum="c" * 64)
+    async_session.add(photo)
+    await async_session.commit()
+    return photo
+
+
+@pytest.fixture
+async def client(async_session: AsyncSession, file_user):
+    app = FastAPI()
+    app.include_router(files.router, prefix="/files")
+
+    async def override_db():
+        yield async_session
+
+    app.dependency_overrides[get_db] = override_db
+    app.dependency_overrides[get_current_user_id] = lambda: file_user.id
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
@@ -0,0 +1,40 @@
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from photo_app.core.dao.album import AlbumDAO
+from photo_app.core.models.album import Album, photo_albums
+from photo_app.core.models.photo import Photo
+
+@pytest.mark.asyncio
+class TestAlbumDAO:
+    async def test_add_and_remove_photos(self, async_session: AsyncSession, album_photos):
+        album, own, other = album_photos
+        dao = AlbumDAO(async_session)
+
+        assert await dao.add_photos(album.id, [own.id, other.id]) == [own.id]
+        # 重复加入不会产生重复关联
+        assert await dao.add_photos(album.id, [own.id]) == []
+
+        assert await dao.remove_photos(album.id, [own.id, other.id]) == [own.id]
+        rows = await async_session.execute(select(photo_albums.c.photo_id))
+        assert rows.all() == []
+
+    async def test_delete_removes_links(self, async_session: AsyncSession, album_photos):
+        album, own, _ = album_photos
+        dao = AlbumDAO(async_session)
+        await dao.add_photos(album.id, [own.id])
+
+        assert await dao.delete(album.id)
+        assert not await dao.delete(album.id)
+        assert (await async_session.execute(select(photo_albums.c.photo_id))).all() == []
+        assert await async_session.get(Album, album.id) is None
+
+@pytest.fixture
+async def album_photos(async_session: AsyncSession):
+    album = Album(name="Trip", user_id=1)
+    own = Photo(filename="own.jpg", filepath="/test/own.jpg", size=100, user_id=1)
+    other = Photo(filename="other.jpg", filepath="/test/other.jpg", size=100, user_id=2)
+    async_session.add_all([album, own, other])
+    await async_session.commit()
+    return album, own, other
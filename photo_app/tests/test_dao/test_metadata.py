@@ -30,6 +30,16 @@ class TestPhotoMetadataDAO:
         assert metadata.id == sample_metadata.id
         assert metadata.photo_id == sample_metadata.photo_id
 
+    async def test_get_projected_by_photo_ids(self, async_session: AsyncSession, sample_metadata):
+        dao = PhotoMetadataDAO(async_session)
+        rows = await dao.get_projected_by_photo_ids([sample_metadata.photo_id], projection="detail")
+
+        assert len(rows) == 1
+        assert rows[0].photo_id == sample_metadata.photo_id
+        assert rows[0].scene_type == "landscape"
+        assert "exif_blob" not in rows[0]._fields
+        assert await dao.get_projected_by_photo_ids([sample_metadata.photo_id], projection="grid") == []
+
     async def test_bulk_create(self, async_session: AsyncSession, test_user, sample_photo):
         dao = PhotoMetadataDAO(async_session)
         metadata_list = [
@@ -65,6 +75,45 @@ class TestPhotoMetadataDAO:
         assert updated.scene_confidence == 0.92
         assert updated.faces_detected == 1
 
+    async def test_update_ai_analysis_many(self, async_session: AsyncSession, sample_metadata_list):
+        dao = PhotoMetadataDAO(async_session)
+        updated = await dao.update_ai_analysis_many([
+            {"photo_id": 1, "scene_type": "portrait", "faces_detected": 3},
+            {"photo_id": 2, "scene_type": "portrait", "faces_detected": 4},
+            {"photo_id": 3, "aesthetic_score": 9.5},
+            {"photo_id": 4, "scene_type": None},
+            {"photo_id": 999, "aesthetic_score": 1.0},
+        ])
+        assert updated == 3
+
+        async_session.expire_all()
+        first = await dao.get_by_photo_id(1)
+        assert (first.scene_type, first.faces_detected) == ("portrait", 3)
+        third = await dao.get_by_photo_id(3)
+        assert third.aesthetic_score == 9.5
+        assert third.scene_type == "urban"
+        fourth = await dao.get_by_photo_id(4)
+        assert fourth.scene_type == "nature"
+
+    async def test_bulk_upsert(self, async_session: AsyncSession, sample_metadata_list):
+        dao = PhotoMetadataDAO(async_session)
+        processed = await dao.bulk_upsert(
+            [
+                {"photo_id": 1, "scene_type": "portrait", "aesthetic_score": 1.0},
+                {"photo_id": 11, "scene_type": "urban", "aesthetic_score": 6.0},
+            ],
+            index_elements=["photo_id"],
+            update_columns=["scene_type"]
+        )
+        assert processed == 2
+
+        async_session.expire_all()
+        existing = await dao.get_by_photo_id(1)
+        assert existing.scene_type == "portrait"
+        assert existing.aesthetic_score == 5.0
+        inserted = await dao.get_by_photo_id(11)
+        assert (inserted.scene_type, inserted.aesthetic_score) == ("urban", 6.0)
+
     async def test_get_photos_by_scene(self, async_session: AsyncSession, sample_metadata_list):
         dao = PhotoMetadataDAO(async_session)
         results = await dao.get_photos_by_scene(
@@ -100,6 +149,114 @@ class TestPhotoMetadataDAO:
         assert isinstance(stats["average_faces_per_photo"], float)
         assert stats["total_scenes_analyzed"] > 0
 
+    async def test_location_extracted_from_exif(self, async_session: AsyncSession, sample_photo):
+        dao = PhotoMetadataDAO(async_session)
+        metadata = await dao.create(
+            photo_id=sample_photo.id,
+            raw_exif='{"GPSInfo": {"GPSLatitude": [31, 14, 0], "GPSLatitudeRef": "N", '
+                     '"GPSLongitude": [121, 28, 30], "GPSLongitudeRef": "E"}}'
+        )
+
+        assert metadata.latitude == pytest.approx(31.2333, abs=1e-4)
+        assert metadata.longitude == pytest.approx(121.475, abs=1e-4)
+        assert metadata.geohash.startswith("wtw3")
+
+    async def test_update_refreshes_location(self, async_session: AsyncSession, sample_photo):
+        dao = PhotoMetadataDAO(async_session)
+        metadata = await dao.create(photo_id=sample_photo.id, raw_exif={"Make": "Sony"})
+        assert metadata.geohash is None
+
+        gps = {"GPSLatitude": [31, 14, 0], "GPSLatitudeRef": "N", "GPSLongitude": [121, 28, 30]}
+        updated = await dao.update(metadata.id, raw_exif={"Make": "Sony", "GPSInfo": gps})
+        assert updated.latitude == pytest.approx(31.2333, abs=1e-4)
+        assert updated.geohash.startswith("wtw3")
+
+        updated = await dao.update(metadata.id, raw_exif={"Make": "Sony"})
+        assert (updated.latitude, updated.longitude, updated.geohash) == (None, None, None)
+
+        # 不修改EXIF时保留位置
+        await dao.update(metadata.id, raw_exif={"GPSInfo": gps})
+        updated = await dao.update(metadata.id, aesthetic_score=0.5)
+        assert updated.geohash.startswith("wtw3")
+
+    async def test_exif_compressed_and_promoted(self, async_session: AsyncSession, sample_photo):
+        dao = PhotoMetadataDAO(async_session)
+        exif = {"Make": "Sony", "Model": "ILCE-7M4", "LensModel": "FE 35mm F1.4 GM",
+                "ISOSpeedRatings": 6400, "MakerNote": "m" * 20000}
+        metadata = await dao.create(photo_id=sample_photo.id, raw_exif=exif)
+        await async_session.commit()
+
+        assert metadata.exif == exif
+        assert len(metadata.exif_blob) < 1000
+        assert (metadata.camera_model, metadata.lens_model, metadata.iso) == ("ILCE-7M4", "FE 35mm F1.4 GM", 6400)
+
+        await dao.update(metadata.id, raw_exif={"Make": "Sony", "ISOSpeedRatings": 100})
+        refreshed = await dao.get_by_photo_id(sample_photo.id)
+        await async_session.refresh(refreshed)
+        assert refreshed.iso == 100 and refreshed.lens_model is None
+
+    async def test_search_by_exif(self, async_session: AsyncSession, test_user):
+        from photo_app.core.dao.photo import PhotoDAO
+
+        photo_dao = PhotoDAO(async_session)
+        dao = PhotoMetadataDAO(async_session)
+        shots = [("RF 50mm", 6400), ("RF 50mm", 800), ("RF 24-70mm", 12800), ("RF 50mm", 3200)]
+        photo_ids = []
+        for i, (lens, iso) in enumerate(shots):
+            photo = await photo_dao.create(filename=f"exif_{i}.jpg", filepath=f"/test/exif_{i}.jpg",
+                                           size=100, user_id=test_user.id)
+            await dao.create(photo_id=photo.id, raw_exif={"LensModel": lens, "ISOSpeedRatings": iso})
+            photo_ids.append(photo.id)
+        await async_session.commit()
+
+        found = await dao.search_by_exif(test_user.id, lens_model="RF 50mm", min_iso=3201)
+        assert found == [photo_ids[0]]
+        found = await dao.search_by_exif(test_user.id, min_iso=3200)
+        assert sorted(found) == sorted([photo_ids[0], photo_ids[2], photo_ids[3]])
+        assert await dao.search_by_exif(test_user.id + 1, min_iso=0) == []
+
+    async def test_get_in_bbox(self, async_session: AsyncSession, located_metadata):
+        dao = PhotoMetadataDAO(async_session)
+
+        results = await dao.get_in_bbox(1, (30.0, 120.0, 32.0, 122.0))
+        assert len(results) == 3
+
+        # 跨越180度经线的范围
+        results = await dao.get_in_bbox(1, (-20.0, 170.0, -10.0, -170.0))
+        assert results == [{"photo_id": results[0]["photo_id"], "latitude": -17.7, "longitude": 178.0}]
+
+        assert await dao.get_in_bbox(2, (30.0, 120.0, 32.0, 122.0)) == []
+
+    async def test_cluster_by_grid(self, async_session: AsyncSession, located_metadata):
+        dao = PhotoMetadataDAO(async_session)
+
+        clusters = await dao.cluster_by_grid(1, (-90.0, -180.0, 90.0, 180.0), zoom=3)
+        assert sum(c["count"] for c in clusters) == 4
+        assert clusters[0]["count"] == 3
+        assert clusters[0]["latitude"] == pytest.approx(31.2, abs=0.1)
+
+        clusters = await dao.cluster_by_grid(1, (30.0, 120.0, 32.0, 122.0), zoom=16)
+        assert len(clusters) == 3
+
+@pytest.fixture
+async def located_metadata(async_session: AsyncSession) -> list[PhotoMetadata]:
+    from photo_app.core.dao.photo import PhotoDAO
+
+    photo_dao = PhotoDAO(async_session)
+    dao = PhotoMetadataDAO(async_session)
+    locations = [(31.23, 121.47), (31.22, 121.48), (31.24, 121.46), (-17.7, 178.0)]
+    metadata_list = []
+    for i, (latitude, longitude) in enumerate(locations):
+        photo = await photo_dao.create(
+            filename=f"geo_{i}.jpg",
+            filepath=f"/test/geo_{i}.jpg",
+            size=100,
+            user_id=1
+        )
+        metadata_list.append(await dao.create(photo_id=photo.id, latitude=latitude, longitude=longitude))
+    await async_session.commit()
+    return metadata_list
+
 @pytest.fixture
 async def sample_metadata(async_session: AsyncSession, sample_photo) -> PhotoMetadata:
     dao = PhotoMetadataDAO(async_session)
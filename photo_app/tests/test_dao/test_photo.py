@@ -1,12 +1,21 @@
+import asyncio
+import json
+import os
+
+import orjson
 import pytest
 from datetime import datetime, timedelta, timezone
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import event, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-from photo_app.core.dao.photo import PhotoDAO
+from photo_app.api.responses import FastJSONResponse
+from photo_app.core.dao.metadata import PhotoMetadataDAO
+from photo_app.core.dao.photo import LIST_COLUMNS, PHOTO_CODEC, PhotoDAO
+from photo_app.core.dao.transaction import has_writes
 from photo_app.core.models.photo import Photo
 from photo_app.core.models.tag import Tag, photo_tags
 from photo_app.core.models.album import Album
+from photo_app.core.utils.singleflight import flight_key, read_flights
 
 @pytest.mark.asyncio
 class TestPhotoDAO:
@@ -106,6 +115,169 @@ class TestPhotoDAO:
         updated_photo = await dao.get(sample_photo.id)
         assert updated_photo.storage_status == "completed"
 
+    async def test_soft_delete(self, async_session: AsyncSession, test_user, sample_photos):
+        dao = PhotoDAO(async_session)
+        ids = [p.id for p in sample_photos]
+        assert await dao.delete_many(ids[:3] + [999]) == 3
+        assert await dao.delete_many(ids[:1]) == 0
+
+        remaining = await dao.get_by_user(1)
+        assert sorted(p.id for p in remaining) == ids[3:]
+        assert [row["id"] for row in await dao.get_rows_by_user(1)] == [p.id for p in remaining]
+        assert await dao.get(ids[0]) is None
+        assert (await dao.get_storage_stats(1))["total_photos"] == 2
+        # 行仍在表中，等待后台清除
+        assert (await async_session.execute(select(Photo.deleted_at).where(Photo.id == ids[0]))).scalar() is not None
+
+        assert await dao.restore(ids[0])
+        assert not await dao.restore(ids[0])
+        assert (await dao.get(ids[0])).deleted_at is None
+
+    async def test_get_rows_by_user(self, async_session: AsyncSession, test_user, sample_photos):
+        dao = PhotoDAO(async_session)
+        rows = await dao.get_rows_by_user(test_user.id, limit=3)
+        photos = await dao.get_by_user(test_user.id, limit=3)
+
+        assert [row["id"] for row in rows] == [p.id for p in photos]
+        assert set(rows[0]) == {c.key for c in LIST_COLUMNS}
+        assert rows[0]["filename"] == photos[0].filename
+        assert isinstance(rows[0], dict)
+
+        body = FastJSONResponse({"photos": rows}).body
+        assert orjson.loads(body)["photos"][0]["upload_date"] == photos[0].upload_date.isoformat()
+
+    async def test_taken_at_ordering(self, async_session: AsyncSession, test_user, tmp_path):
+        dao = PhotoDAO(async_session)
+        old_file = tmp_path / "scan.jpg"
+        old_file.write_bytes(b"x")
+        os.utime(old_file, (946684800, 946684800))  # 2000-01-01
+
+        exif = await dao.create(filename="exif.jpg", filepath="/test/exif.jpg", size=1, user_id=test_user.id)
+        recent = await dao.create(filename="new.jpg", filepath="/test/new.jpg", size=1, user_id=test_user.id)
+        scanned = await dao.create(filename="scan.jpg", filepath=str(old_file), size=1, user_id=test_user.id)
+        await PhotoMetadataDAO(async_session).create(
+            photo_id=exif.id, raw_exif={"DateTimeOriginal": "2010:06:01 12:00:00"}
+        )
+        await async_session.commit()
+
+        assert scanned.taken_at.year == 2000
+        await async_session.refresh(exif)
+        assert exif.taken_at == datetime(2010, 6, 1, 12, 0)
+
+        by_upload = await dao.get_by_user(test_user.id)
+        assert [p.id for p in by_upload] == [scanned.id, recent.id, exif.id]
+        by_taken = await dao.get_by_user(test_user.id, order_by="taken_at")
+        assert [p.id for p in by_taken] == [recent.id, exif.id, scanned.id]
+        older = await dao.get_by_user(test_user.id, order_by="taken_at", before=datetime(2011, 1, 1))
+        assert [p.id for p in older] == [exif.id, scanned.id]
+
+        found = await dao.search(test_user.id, date_range=(datetime(1999, 1, 1), datetime(2005, 1, 1)),
+                                 order_by="taken_at")
+        assert [p.id for p in found] == [scanned.id]
+        with pytest.raises(ValueError):
+            await dao.get_by_user(test_user.id, order_by="size")
+
+    async def test_projections(self, async_session: AsyncSession, test_user, sample_photos):
+        dao = PhotoDAO(async_session)
+        await PhotoMetadataDAO(async_session).create(
+            photo_id=sample_photos[0].id, scene_type="beach", raw_exif={"Make": "Canon", "MakerNote": "x" * 8000},
+            face_locations="[]"
+        )
+        await async_session.commit()
+
+        grid = await dao.get_projected_by_user(test_user.id, projection="grid", limit=10)
+        assert len(grid) == 5
+        assert set(grid[0]._fields) == {"id", "upload_date", "taken_at", "version"}
+
+        detail = await dao.get_projected(sample_photos[0].id, projection="detail")
+        assert detail.filename == sample_photos[0].filename
+        assert detail.scene_type == "beach"
+        assert detail.camera_make == "Canon"
+        assert "exif_blob" not in detail._fields and "face_locations" not in detail._fields
+
+        full = await dao.get_projected(sample_photos[0].id, projection="full")
+        assert full.exif_blob and full.filepath == sample_photos[0].filepath
+        # 没有元数据的照片也会返回
+        assert (await dao.get_projected(sample_photos[1].id)).scene_type is None
+
+        rows = await dao.get_rows_by_user(test_user.id, projection="grid", limit=2)
+        assert set(rows[0]) == {"id", "upload_date", "taken_at", "version"}
+        with pytest.raises(ValueError):
+            await dao.get_projected(sample_photos[0].id, projection="thumbnail")
+
+@pytest.mark.asyncio
+class TestSharedReads:
+    async def test_concurrent_identical_reads(self, test_engine, sample_photo_with_metadata, sample_photos_with_tags):
+        statements = []
+        event.listen(test_engine.sync_engine, "before_cursor_execute",
+                     lambda *args: statements.append(args[2]))
+        factory = async_sessionmaker(test_engine, expire_on_commit=False)
+        sessions = [factory() for _ in range(10)]
+        user_id = sample_photos_with_tags[0].user_id
+        try:
+            statements.clear()
+            photos = await asyncio.gather(*(
+                PhotoDAO(session).get_with_metadata(sample_photo_with_metadata.id) for session in sessions
+            ))
+            # 一次照片查询加一次元数据查询
+            assert len(statements) == 2
+            assert len({id(photo) for photo in photos}) == 10
+            for session, photo in zip(sessions, photos):
+                assert photo in session
+                assert photo.photo_metadata.photo_id == photo.id
+
+            statements.clear()
+            results = await asyncio.gather(*(
+                PhotoDAO(session).search(user_id, tags=tags)
+                for session, tags in zip(sessions, [["nature", "city"], ["city", "nature"]] * 5)
+            ))
+            assert len(statements) == 2
+            assert len(results[0]) == 5
+            assert all([p.id for p in r] == [p.id for p in results[0]] for r in results)
+            assert all(photo in sessions[3] and photo.tags for photo in results[3])
+            assert not read_flights.in_flight(flight_key("photo_with_metadata", photo_id=sample_photo_with_metadata.id))
+        finally:
+            for session in sessions:
+                await session.close()
+
+    async def test_session_with_writes_reads_alone(self, test_engine, async_session: AsyncSession, sample_photo):
+        await async_session.commit()
+        factory = async_sessionmaker(test_engine, expire_on_commit=False)
+        async with factory() as writer, factory() as reader:
+            await writer.execute(update(Photo).where(Photo.id == sample_photo.id).values(filename="renamed.jpg"))
+            assert has_writes(writer)
+
+            mine, theirs = await asyncio.gather(
+                PhotoDAO(writer).get_with_metadata(sample_photo.id),
+                PhotoDAO(reader).get_with_metadata(sample_photo.id),
+            )
+            # 写入方读到自己的修改，未提交的修改不会交给其他会话
+            assert mine.filename == "renamed.jpg"
+            assert theirs.filename == "test.jpg"
+
+            await writer.commit()
+            assert not has_writes(writer)
+
+    async def test_codec_round_trip(self, async_session: AsyncSession, sample_photo_with_metadata, sample_photos_with_tags):
+        dao = PhotoDAO(async_session)
+        user_id = sample_photos_with_tags[0].user_id
+        photo = await dao.get_with_metadata(sample_photo_with_metadata.id)
+        found = await dao.search(user_id, tags=["nature"])
+
+        decoded = PHOTO_CODEC.decode(json.loads(json.dumps(PHOTO_CODEC.encode(photo))))
+        assert decoded.upload_date == photo.upload_date
+        assert decoded.photo_metadata.exif_blob == photo.photo_metadata.exif_blob
+        decoded_list = PHOTO_CODEC.decode(json.loads(json.dumps(PHOTO_CODEC.encode(found))))
+        assert [[t.name for t in p.tags] for p in decoded_list] == [[t.name for t in p.tags] for p in found]
+        assert PHOTO_CODEC.decode(json.loads(json.dumps(PHOTO_CODEC.encode(None)))) is None
+
+        # 解码的对象可以不访问数据库合并到另一个会话
+        factory = async_sessionmaker(async_session.bind, expire_on_commit=False)
+        async with factory() as other:
+            merged = await other.merge(decoded, load=False)
+            assert merged in other and merged.photo_metadata.photo_id == photo.id
+
+
 @pytest.fixture
 async def sample_photo(async_session: AsyncSession) -> Photo:
     dao = PhotoDAO(async_session)
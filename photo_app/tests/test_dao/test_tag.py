@@ -0,0 +1,119 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select, func, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from photo_app.core.dao.photo import PhotoDAO
+from photo_app.core.dao.tag import TagDAO
+from photo_app.core.models.photo import Photo
+from photo_app.core.models.tag import Tag, photo_tags
+from photo_app.core.services import invalidation
+from photo_app.core.services.search_index import SearchIndexRegistry
+
+@pytest.mark.asyncio
+class TestTagDAO:
+    async def test_ensure_tags(self, async_session: AsyncSession):
+        dao = TagDAO(async_session)
+        async_session.add(Tag(name="existing"))
+        await async_session.flush()
+
+        mapping = await dao.ensure_tags(["existing", " new ", "new", ""])
+        assert set(mapping) == {"existing", "new"}
+
+        count = await async_session.scalar(select(func.count(Tag.id)))
+        assert count == 2
+
+    async def test_bulk_assign(self, async_session: AsyncSession, bulk_photos):
+        dao = TagDAO(async_session)
+        ids = [p.id for p in bulk_photos]
+
+        inserted = await dao.bulk_assign(1, ids, ["beach", "2023"])
+        assert inserted == len(ids) * 2
+
+        # 重复打标签不会产生重复关联
+        inserted = await dao.bulk_assign(1, ids[:3] + ids, ["beach"])
+        assert inserted == 0
+
+        photos = await PhotoDAO(async_session).get_by_tag("beach", 1)
+        assert {p.id for p in photos} == set(ids)
+
+    async def test_bulk_assign_skips_other_users(self, async_session: AsyncSession, bulk_photos):
+        dao = TagDAO(async_session)
+        other = await PhotoDAO(async_session).create(
+            filename="other.jpg", filepath="/test/other.jpg", size=1, user_id=2
+        )
+
+        inserted = await dao.bulk_assign(1, [other.id, bulk_photos[0].id], ["beach"])
+        assert inserted == 1
+
+        count = await async_session.scalar(
+            select(func.count()).select_from(photo_tags).where(photo_tags.c.photo_id == other.id)
+        )
+        assert count == 0
+
+    async def test_bulk_assign_skips_deleted_photos(self, async_session: AsyncSession, bulk_photos):
+        dao = TagDAO(async_session)
+        ids = [p.id for p in bulk_photos[:3]]
+        await async_session.execute(
+            update(Photo).where(Photo.id == ids[0]).values(deleted_at=datetime.utcnow())
+        )
+
+        inserted = await dao.bulk_assign(1, ids, ["beach"])
+        assert inserted == 2
+
+        tagged = await async_session.scalars(select(photo_tags.c.photo_id))
+        assert sorted(tagged) == ids[1:]
+
+    async def test_bulk_remove(self, async_session: AsyncSession, bulk_photos):
+        dao = TagDAO(async_session)
+        ids = [p.id for p in bulk_photos]
+        await dao.bulk_assign(1, ids, ["beach", "2023"])
+
+        removed = await dao.bulk_remove(1, ids[:4], ["beach", "missing"])
+        assert removed == 4
+
+        photos = await PhotoDAO(async_session).get_by_tag("beach", 1)
+        assert {p.id for p in photos} == set(ids[4:])
+        photos = await PhotoDAO(async_session).get_by_tag("2023", 1)
+        assert len(photos) == len(ids)
+
+    async def test_bulk_ops_update_search_index_after_commit(
+        self, async_session: AsyncSession, bulk_photos, tmp_path, monkeypatch
+    ):
+        registry = SearchIndexRegistry(cache_dir=str(tmp_path))
+        monkeypatch.setattr(invalidation, "search_indexes", registry)
+        first, second = bulk_photos[0].id, bulk_photos[1].id
+        dao = TagDAO(async_session)
+        index = await registry.get(async_session, 1)
+        assert not index.evaluate("beach")
+
+        await dao.bulk_assign(1, [first, second], ["beach"])
+        assert not index.evaluate("beach")
+        await async_session.commit()
+        assert registry.peek(1) is index
+        assert set(index.evaluate("beach")) == {first, second}
+
+        await dao.bulk_remove(1, [first], ["beach"])
+        await async_session.rollback()
+        assert set(index.evaluate("beach")) == {first, second}
+
+        await dao.bulk_remove(1, [first], ["beach"])
+        await async_session.commit()
+        assert await registry.get(async_session, 1) is index
+        assert list(index.evaluate("beach")) == [second]
+
+    async def test_tag_name_too_long(self, async_session: AsyncSession, bulk_photos):
+        dao = TagDAO(async_session)
+        with pytest.raises(ValueError):
+            await dao.bulk_assign(1, [bulk_photos[0].id], ["x" * 51])
+
+@pytest.fixture
+async def bulk_photos(async_session: AsyncSession) -> list[Photo]:
+    photos = [
+        Photo(filename=f"bulk_{i}.jpg", filepath=f"/test/bulk_{i}.jpg", size=100, user_id=1)
+        for i in range(20)
+    ]
+    async_session.add_all(photos)
+    await async_session.commit()
+    return photos
@@ -0,0 +1,88 @@
+import pytest
+from datetime import date, datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from photo_app.core.dao.photo import PhotoDAO
+from photo_app.core.dao.timeline import TimelineDAO
+from photo_app.core.models.photo import Photo
+
+@pytest.mark.asyncio
+class TestTimelineDAO:
+    async def test_histogram_rollups(self, async_session: AsyncSession, timeline_photos):
+        dao = TimelineDAO(async_session)
+
+        assert await dao.get_histogram(1, "year") == [
+            {"bucket": "2020", "count": 1},
+            {"bucket": "2019", "count": 4},
+        ]
+        assert await dao.get_histogram(1, "month") == [
+            {"bucket": "2020-01", "count": 1},
+            {"bucket": "2019-03", "count": 3},
+            {"bucket": "2019-02", "count": 1},
+        ]
+        days = await dao.get_histogram(1, "day")
+        assert days[2] == {"bucket": "2019-03-15", "count": 2}
+
+        with pytest.raises(ValueError):
+            await dao.get_histogram(1, "week")
+
+    async def test_delete_decrements_bucket(self, async_session: AsyncSession, timeline_photos):
+        photo_dao = PhotoDAO(async_session)
+        assert await photo_dao.delete(timeline_photos[0].id)
+
+        histogram = await TimelineDAO(async_session).get_histogram(1, "month")
+        assert histogram == [
+            {"bucket": "2020-01", "count": 1},
+            {"bucket": "2019-03", "count": 3},
+        ]
+
+    async def test_cursor_seeks_to_bucket(self, async_session: AsyncSession, timeline_photos):
+        timeline_dao = TimelineDAO(async_session)
+        cursor = await timeline_dao.get_cursor(1, 2019, 3)
+        assert cursor == {"before": datetime(2019, 4, 1), "offset": 1, "count": 3}
+
+        photos = await PhotoDAO(async_session).get_by_user(1, before=cursor["before"], limit=cursor["count"])
+        assert [p.upload_date.date() for p in photos] == [
+            date(2019, 3, 20), date(2019, 3, 15), date(2019, 3, 15)
+        ]
+
+        # 偏移量与普通分页一致
+        page = await PhotoDAO(async_session).get_by_user(1, skip=cursor["offset"], limit=1)
+        assert page[0].id == photos[0].id
+
+        # 时间桶按上传日期统计，不能用于按拍摄时间排序的列表
+        with pytest.raises(ValueError):
+            await timeline_dao.get_cursor(1, 2019, 3, order_by="taken_at")
+
+    async def test_rebuild(self, async_session: AsyncSession, timeline_photos):
+        dao = TimelineDAO(async_session)
+        async_session.add(Photo(filename="raw.jpg", filepath="/test/raw.jpg", size=1, user_id=1,
+                                upload_date=datetime(2019, 2, 3, 8)))
+        await async_session.flush()
+
+        assert await dao.rebuild(1) == 5
+        histogram = await dao.get_histogram(1, "month")
+        assert histogram[-1] == {"bucket": "2019-02", "count": 2}
+
+@pytest.fixture
+async def timeline_photos(async_session: AsyncSession) -> list[Photo]:
+    dao = PhotoDAO(async_session)
+    dates = [
+        datetime(2019, 2, 1, 12),
+        datetime(2019, 3, 15, 9),
+        datetime(2019, 3, 15, 18),
+        datetime(2019, 3, 20, 7),
+        datetime(2020, 1, 1, 0, 30),
+    ]
+    photos = []
+    for i, upload_date in enumerate(dates):
+        photo = await dao.create(
+            filename=f"timeline_{i}.jpg",
+            filepath=f"/test/timeline_{i}.jpg",
+            size=100,
+            user_id=1,
+            upload_date=upload_date
+        )
+        photos.append(photo)
+    await async_session.commit()
+    return photos
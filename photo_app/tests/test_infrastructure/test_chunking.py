@@ -0,0 +1,46 @@
+import io
+import random
+
+import pytest
+
+from photo_app.infrastructure.storage.chunking import _GEAR, gear_hashes, iter_chunks
+
+
+def _random_bytes(size: int, seed: int = 7) -> bytes:
+    return random.Random(seed).randbytes(size)
+
+
+class TestChunking:
+    def test_gear_hashes_match_rolling_definition(self):
+        data = _random_bytes(3000)
+        expected = []
+        h = 0
+        for byte in data:
+            h = ((h << 1) + int(_GEAR[byte])) & 0xFFFFFFFF
+            expected.append(h)
+
+        assert gear_hashes(data).tolist() == expected
+        assert gear_hashes(data[1000:], data[:1000]).tolist() == expected[1000:]
+
+    def test_chunk_sizes_and_reassembly(self):
+        data = _random_bytes(2_000_000)
+        chunks = list(iter_chunks(io.BytesIO(data), read_size=100_000))
+
+        assert b"".join(chunks) == data
+        assert all(4096 <= len(c) <= 65536 for c in chunks[:-1])
+        # 切点只取决于内容，与读取块大小无关
+        assert chunks == list(iter_chunks(io.BytesIO(data), read_size=1 << 20))
+
+    def test_insertion_only_changes_nearby_chunks(self):
+        data = _random_bytes(1_000_000)
+        edited = data[:500_000] + b"inserted bytes" + data[500_000:]
+        original = set(iter_chunks(io.BytesIO(data)))
+        changed = [c for c in iter_chunks(io.BytesIO(edited)) if c not in original]
+
+        assert sum(len(c) for c in changed) < 3 * 65536
+
+    def test_empty_and_invalid(self):
+        assert list(iter_chunks(io.BytesIO(b""))) == []
+        assert list(iter_chunks(io.BytesIO(b"abc"))) == [b"abc"]
+        with pytest.raises(ValueError):
+            next(iter_chunks(io.BytesIO(b"abc"), avg_size=10000))
@@ -0,0 +1,107 @@
+import io
+import os
+
+import pytest
+
+from photo_app.infrastructure.storage.encryption import (
+    ALGORITHM_AES_GCM,
+    ALGORITHM_CHACHA20,
+    HEADER_SIZE,
+    TAG_SIZE,
+    EncryptedReader,
+    EncryptionError,
+    decrypt_stream,
+    encrypt_in_place,
+    encrypt_stream,
+    generate_key,
+    is_encrypted_file,
+    reencrypt_in_place,
+    unwrap_key,
+    wrap_key,
+)
+
+CHUNK = 64
+
+
+def _encrypt(data: bytes, key: bytes, algorithm: str = ALGORITHM_AES_GCM) -> bytes:
+    out = io.BytesIO()
+    assert encrypt_stream(io.BytesIO(data), out, key, algorithm=algorithm, chunk_size=CHUNK) == len(data)
+    return out.getvalue()
+
+
+class TestStreamEncryption:
+    @pytest.mark.parametrize("algorithm", [ALGORITHM_AES_GCM, ALGORITHM_CHACHA20])
+    @pytest.mark.parametrize("size", [0, 1, CHUNK, CHUNK + 1, 5 * CHUNK, 5 * CHUNK - 3])
+    def test_round_trip(self, algorithm, size):
+        key = generate_key()
+        data = os.urandom(size)
+        ciphertext = _encrypt(data, key, algorithm)
+        chunks = max(1, -(-size // CHUNK))
+        assert len(ciphertext) == HEADER_SIZE + size + chunks * TAG_SIZE
+
+        out = io.BytesIO()
+        assert decrypt_stream(io.BytesIO(ciphertext), out, key) == size
+        assert out.getvalue() == data
+
+    def test_random_access_ranges(self):
+        key = generate_key()
+        data = os.urandom(10 * CHUNK + 7)
+        reader = EncryptedReader(io.BytesIO(_encrypt(data, key)), key)
+
+        assert reader.size == len(data)
+        assert reader.chunk_count == 11
+        for start, stop in [(0, 1), (63, 65), (100, 400), (10 * CHUNK, None), (0, None), (5, 10 ** 6)]:
+            assert reader.read(start, stop) == data[start:stop]
+        assert reader.read(700, 700) == b""
+
+    def test_tampering_is_detected(self):
+        key = generate_key()
+        ciphertext = bytearray(_encrypt(os.urandom(3 * CHUNK), key))
+        ciphertext[HEADER_SIZE + CHUNK + 20] ^= 1
+
+        with pytest.raises(EncryptionError):
+            decrypt_stream(io.BytesIO(bytes(ciphertext)), io.BytesIO(), key)
+        reader = EncryptedReader(io.BytesIO(bytes(ciphertext)), key)
+        assert len(reader.read_chunk(0)) == CHUNK
+        with pytest.raises(EncryptionError):
+            reader.read_chunk(1)
+
+    def test_truncation_and_wrong_key_are_detected(self):
+        key = generate_key()
+        ciphertext = _encrypt(os.urandom(3 * CHUNK), key)
+        truncated = ciphertext[:HEADER_SIZE + 2 * (CHUNK + TAG_SIZE)]
+
+        with pytest.raises(EncryptionError):
+            decrypt_stream(io.BytesIO(truncated), io.BytesIO(), key)
+        with pytest.raises(EncryptionError):
+            decrypt_stream(io.BytesIO(ciphertext), io.BytesIO(), generate_key())
+
+
+class TestFileOperations:
+    def test_encrypt_and_reencrypt_in_place(self, tmp_path):
+        path = tmp_path / "photo.jpg"
+        data = os.urandom(1000)
+        path.write_bytes(data)
+        old_key, new_key = generate_key(), generate_key()
+
+        assert encrypt_in_place(str(path), old_key, chunk_size=CHUNK) == 1000
+        assert is_encrypted_file(str(path))
+        first = path.read_bytes()
+        # 已加密的文件不会被二次加密
+        encrypt_in_place(str(path), old_key, chunk_size=CHUNK)
+        assert path.read_bytes() == first
+
+        reencrypt_in_place(str(path), old_key, new_key, chunk_size=100)
+        reencrypt_in_place(str(path), old_key, new_key, chunk_size=100)
+        with EncryptedReader.open(str(path), new_key) as reader:
+            assert reader.chunk_size == 100
+            assert reader.read() == data
+        assert os.listdir(tmp_path) == ["photo.jpg"]
+
+    def test_wrap_key(self):
+        key = generate_key()
+        token = wrap_key(key)
+        assert len(token) <= 255
+        assert unwrap_key(token) == key
+        with pytest.raises(EncryptionError):
+            unwrap_key(token[:-4] + "AAAA")
@@ -0,0 +1,72 @@
+import os
+
+from photo_app.infrastructure.storage.scanner import (
+    FileRecord,
+    diff_against_manifest,
+    hash_file,
+    walk_files,
+    walk_sorted,
+)
+
+
+def _make_tree(root):
+    for relative in ("a/1.jpg", "a/b/2.jpg", "a/b/c/3.png", "d/4.heic", "5.jpg", "a/skip.txt"):
+        path = root / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(relative.encode())
+
+
+class TestScanner:
+    def test_walk_files(self, tmp_path):
+        _make_tree(tmp_path)
+        records = list(walk_files(str(tmp_path), max_workers=3))
+
+        assert sorted(os.path.relpath(r.path, tmp_path) for r in records) == [
+            "5.jpg", "a/1.jpg", "a/b/2.jpg", "a/b/c/3.png", "d/4.heic"
+        ]
+        record = next(r for r in records if r.path.endswith("5.jpg"))
+        st = os.stat(record.path)
+        assert (record.size, record.mtime_ns, record.inode) == (st.st_size, st.st_mtime_ns, st.st_ino)
+
+    def test_walk_sorted(self, tmp_path):
+        _make_tree(tmp_path)
+        for relative in ("a-b.jpg", "a0.jpg", ".chunks/ab/cd"):
+            path = tmp_path / relative
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(b"x")
+
+        paths = [r.path for r in walk_sorted(str(tmp_path), extensions=None)]
+        assert paths == sorted(paths)
+        assert [os.path.relpath(p, tmp_path) for p in paths] == [
+            "5.jpg", "a-b.jpg", "a/1.jpg", "a/b/2.jpg", "a/b/c/3.png", "a/skip.txt", "a0.jpg", "d/4.heic"
+        ]
+
+        resumed = [r.path for r in walk_sorted(str(tmp_path), start_after=str(tmp_path / "a/b/2.jpg"))]
+        assert [os.path.relpath(p, tmp_path) for p in resumed] == ["a/b/c/3.png", "a0.jpg", "d/4.heic"]
+
+    def test_diff_against_manifest(self):
+        manifest = {
+            "/p/same.jpg": (10, 100, 1, "h1"),
+            "/p/edited.jpg": (10, 100, 2, "h2"),
+            "/p/deleted.jpg": (10, 100, 3, "h3"),
+            "/p/old_name.jpg": (20, 200, 4, "h4"),
+        }
+        records = [
+            FileRecord("/p/same.jpg", 10, 100, 1),
+            FileRecord("/p/edited.jpg", 12, 150, 2),
+            FileRecord("/p/new_name.jpg", 20, 200, 4),
+            FileRecord("/p/new.jpg", 5, 300, 5),
+        ]
+        diff = diff_against_manifest(records, manifest)
+
+        assert diff.unchanged == 1
+        assert [r.path for r in diff.changed] == ["/p/edited.jpg"]
+        assert [r.path for r in diff.added] == ["/p/new.jpg"]
+        assert diff.removed == ["/p/deleted.jpg"]
+        assert diff.moved == [("/p/old_name.jpg", FileRecord("/p/new_name.jpg", 20, 200, 4, "h4"))]
+
+    def test_hash_file(self, tmp_path):
+        path = tmp_path / "x.jpg"
+        path.write_bytes(b"hello")
+        assert hash_file(str(path)) == hash_file(str(path))
+        assert len(hash_file(str(path))) == 64
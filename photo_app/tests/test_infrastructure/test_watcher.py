@@ -0,0 +1,133 @@
+import asyncio
+import os
+
+import pytest
+
+from photo_app.infrastructure.storage import watcher as watcher_module
+from photo_app.infrastructure.storage.watcher import FileWatcher, is_photo_file
+
+BACKENDS = [False] + ([True] if watcher_module.INotify is not None else [])
+
+
+def test_is_photo_file():
+    assert is_photo_file("/a/IMG_0001.JPG")
+    assert is_photo_file("raw.NEF")
+    assert not is_photo_file("notes.txt")
+    assert not is_photo_file(".hidden.jpg")
+    assert not is_photo_file("upload.jpg.part")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("use_inotify", BACKENDS)
+class TestFileWatcher:
+    async def _start(self, root, use_inotify, **kwargs):
+        batches = []
+
+        async def on_batch(paths):
+            batches.append(sorted(paths))
+
+        options = dict(settle_time=0.1, batch_window=0.1, poll_interval=0.05, use_inotify=use_inotify)
+        options.update(kwargs)
+        watcher = FileWatcher(on_batch, str(root), **options)
+        task = asyncio.create_task(watcher.run())
+        await asyncio.sleep(0.1)
+        return watcher, task, batches
+
+    async def _wait_for(self, batches, count, timeout=3.0):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while sum(len(b) for b in batches) < count and loop.time() < deadline:
+            await asyncio.sleep(0.02)
+
+    async def test_new_files_are_batched(self, tmp_path, use_inotify):
+        (tmp_path / "existing.jpg").write_bytes(b"old")
+        watcher, task, batches = await self._start(tmp_path, use_inotify)
+
+        for i in range(3):
+            (tmp_path / f"new_{i}.jpg").write_bytes(b"data")
+        (tmp_path / "ignored.txt").write_bytes(b"text")
+        await self._wait_for(batches, 3)
+        watcher.stop()
+        await task
+
+        assert batches == [[str(tmp_path / f"new_{i}.jpg") for i in range(3)]]
+
+    async def test_new_subdirectory(self, tmp_path, use_inotify):
+        watcher, task, batches = await self._start(tmp_path, use_inotify)
+
+        album = tmp_path / "2024" / "trip"
+        album.mkdir(parents=True)
+        (album / "a.jpg").write_bytes(b"a")
+        await self._wait_for(batches, 1)
+        watcher.stop()
+        await task
+
+        assert [p for batch in batches for p in batch] == [str(album / "a.jpg")]
+
+    async def test_waits_for_partial_writes(self, tmp_path, use_inotify):
+        watcher, task, batches = await self._start(tmp_path, use_inotify, settle_time=0.3)
+
+        path = tmp_path / "growing.jpg"
+        with open(path, "wb") as f:
+            for _ in range(4):
+                f.write(b"x" * 1024)
+                f.flush()
+                os.utime(path)
+                await asyncio.sleep(0.1)
+        await asyncio.sleep(0.05)
+        assert batches == []
+
+        await self._wait_for(batches, 1)
+        watcher.stop()
+        await task
+        assert batches == [[str(path)]]
+
+    async def test_max_batch(self, tmp_path, use_inotify):
+        watcher, task, batches = await self._start(tmp_path, use_inotify, batch_window=10, max_batch=2)
+
+        for i in range(5):
+            (tmp_path / f"img_{i}.png").write_bytes(b"data")
+        await self._wait_for(batches, 4)
+        watcher.stop()
+        await task
+
+        assert [len(b) for b in batches] == [2, 2, 1]
+
+
+@pytest.mark.skipif(watcher_module.INotify is None, reason="inotify_simple is not installed")
+@pytest.mark.asyncio
+async def test_inotify_queue_overflow_rescans_tree(tmp_path, monkeypatch):
+    from inotify_simple import Event, flags
+
+    class OverflowedINotify:
+        """只返回一个队列溢出事件，期间的真实事件都已丢失"""
+
+        def __init__(self):
+            self.watched = []
+
+        def add_watch(self, path, mask):
+            self.watched.append(path)
+            return len(self.watched)
+
+        def read(self, timeout=None):
+            return [Event(wd=-1, mask=flags.Q_OVERFLOW, cookie=0, name="")]
+
+    monkeypatch.setattr(watcher_module, "_OVERFLOW_MARGIN", 0.0)
+    (tmp_path / "old.jpg").write_bytes(b"old")
+    watcher = FileWatcher(lambda paths: None, str(tmp_path), use_inotify=True)
+    watcher._wakeup = asyncio.Event()
+    await asyncio.sleep(0.05)
+    watcher._last_read_at = watcher_module.time.time()
+    await asyncio.sleep(0.05)
+
+    # 溢出期间新建的目录和文件
+    album = tmp_path / "trip"
+    album.mkdir()
+    (album / "a.jpg").write_bytes(b"a")
+    (tmp_path / "b.jpg").write_bytes(b"b")
+    inotify = OverflowedINotify()
+    watcher._read_inotify(inotify)
+
+    assert sorted(watcher._pending) == sorted([str(album / "a.jpg"), str(tmp_path / "b.jpg")])
+    assert sorted(inotify.watched) == [str(tmp_path), str(album)]
+    assert watcher._wakeup.is_set()
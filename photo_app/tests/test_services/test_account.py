@@ -0,0 +1,126 @@
+import pytest
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from photo_app.core.dao.checkpoint import JobCheckpointDAO
+from photo_app.core.dao.metadata import PhotoMetadataDAO
+from photo_app.core.dao.photo import PhotoDAO
+from photo_app.core.models.album import Album, photo_albums
+from photo_app.core.models.photo import Photo, PhotoMetadata
+from photo_app.core.models.tag import Tag, photo_tags
+from photo_app.core.models.timeline import TimelineBucket
+from photo_app.core.models.user import User
+from photo_app.core.services.account import CHECKPOINT_PREFIX, AccountDeletionService
+
+
+async def _count(session: AsyncSession, table, *conditions) -> int:
+    stmt = select(func.count()).select_from(table)
+    if conditions:
+        stmt = stmt.where(*conditions)
+    return (await session.execute(stmt)).scalar_one()
+
+
+@pytest.mark.asyncio
+class TestAccountDeletionService:
+    async def test_delete_in_batches_and_resume(self, async_session: AsyncSession, library, tmp_path):
+        owner, other, photos, other_photo = library
+        service = AccountDeletionService(async_session, batch_size=2, pause=0, cache_path=str(tmp_path))
+
+        report = await service.delete_user(owner.id, max_batches=1)
+        assert not report.completed
+        assert report.photos == 2
+        assert report.files_removed == 2
+        checkpoint = await JobCheckpointDAO(async_session).get_position(f"{CHECKPOINT_PREFIX}{owner.id}")
+        assert checkpoint == str(photos[1].id)
+        await async_session.refresh(owner)
+        assert owner.is_active is False
+
+        # 新的服务实例从断点继续
+        finished = await AccountDeletionService(
+            async_session, batch_size=2, pause=0, cache_path=str(tmp_path)
+        ).resume_pending()
+        assert finished == [owner.id]
+
+        assert await _count(async_session, User, User.id == owner.id) == 0
+        assert await _count(async_session, Photo, Photo.user_id == owner.id) == 0
+        assert await _count(async_session, Album, Album.user_id == owner.id) == 0
+        assert await _count(async_session, TimelineBucket, TimelineBucket.user_id == owner.id) == 0
+        assert await _count(async_session, photo_albums) == 0
+        assert await _count(async_session, photo_tags) == 1
+        assert await _count(async_session, PhotoMetadata) == 1
+        assert await JobCheckpointDAO(async_session).list_names(CHECKPOINT_PREFIX) == []
+        assert not any((tmp_path / f"{i}.jpg").exists() for i in range(5))
+
+        # 其他用户的数据不受影响
+        assert (await PhotoDAO(async_session).get(other_photo.id)) is not None
+        assert (tmp_path / "other.jpg").exists()
+        assert await _count(async_session, TimelineBucket, TimelineBucket.user_id == other.id) == 1
+
+    async def test_photos_committed_after_last_batch_are_deleted(
+        self, async_session: AsyncSession, library, tmp_path, monkeypatch
+    ):
+        owner, _, photos, _ = library
+        service = AccountDeletionService(async_session, batch_size=10, pause=0, cache_path=str(tmp_path))
+        next_batch = service._next_batch
+        uploaded = []
+
+        async def late_upload(user_id: int, after_id: int):
+            batch = await next_batch(user_id, after_id)
+            if not batch and not uploaded:
+                # 停用前开始的上传在最后一批之后才提交
+                path = tmp_path / "late.jpg"
+                path.write_bytes(b"x")
+                photo = Photo(filename="late.jpg", filepath=str(path), size=1, user_id=owner.id)
+                async_session.add(photo)
+                await async_session.flush()
+                uploaded.append(photo.id)
+            return batch
+
+        monkeypatch.setattr(service, "_next_batch", late_upload)
+        report = await service.delete_user(owner.id)
+
+        assert report.completed
+        assert report.photos == len(photos) + 1
+        assert await _count(async_session, Photo, Photo.user_id == owner.id) == 0
+        assert not (tmp_path / "late.jpg").exists()
+
+    async def test_unknown_user(self, async_session: AsyncSession):
+        assert await AccountDeletionService(async_session).delete_user(12345) is None
+
+
+@pytest.fixture
+async def library(async_session: AsyncSession, tmp_path):
+    owner = User(email="owner@example.com", username="owner", hashed_password="x")
+    other = User(email="other@example.com", username="other", hashed_password="x")
+    async_session.add_all([owner, other])
+    await async_session.flush()
+
+    dao = PhotoDAO(async_session)
+    photos = []
+    for i in range(5):
+        path = tmp_path / f"{i}.jpg"
+        path.write_bytes(b"x")
+        photos.append(await dao.create(filename=path.name, filepath=str(path), size=1, user_id=owner.id))
+    other_path = tmp_path / "other.jpg"
+    other_path.write_bytes(b"x")
+    other_photo = await dao.create(filename="other.jpg", filepath=str(other_path), size=1, user_id=other.id)
+
+    tag = Tag(name="account")
+    album = Album(name="trip", user_id=owner.id, cover_photo_id=photos[0].id)
+    async_session.add_all([tag, album])
+    await async_session.flush()
+    await async_session.execute(insert(photo_tags), [
+        {"photo_id": photos[0].id, "tag_id": tag.id},
+        {"photo_id": photos[3].id, "tag_id": tag.id},
+        {"photo_id": other_photo.id, "tag_id": tag.id},
+    ])
+    # 相册中包含其他用户的照片
+    await async_session.execute(insert(photo_albums), [
+        {"photo_id": photos[4].id, "album_id": album.id},
+        {"photo_id": other_photo.id, "album_id": album.id},
+    ])
+    metadata_dao = PhotoMetadataDAO(async_session)
+    await metadata_dao.create(photo_id=photos[2].id, scene_type="beach")
+    await metadata_dao.create(photo_id=other_photo.id, scene_type="beach")
+    await async_session.commit()
+    return owner, other, photos, other_photo
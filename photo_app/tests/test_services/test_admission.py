@@ -0,0 +1,111 @@
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from photo_app.api.middleware import AdmissionMiddleware
+from photo_app.core.services.admission import AdmissionController, RouteRule
+from photo_app.core.utils.ratelimit import LimiterUnavailable, LocalLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class BrokenLimiter:
+    calls = 0
+
+    async def take(self, *args, **kwargs):
+        self.calls += 1
+        raise LimiterUnavailable("connection refused")
+
+
+RULES = [RouteRule("export", "GET", "/export", rate=1, burst=2)]
+
+
+def _controller(clock, backend=None, **options) -> AdmissionController:
+    local = LocalLimiter(clock=clock)
+    return AdmissionController(
+        backend or local, fallback=local, rules=RULES, rate=10, burst=3,
+        concurrency=1, lease_ttl=60, clock=clock, **options
+    )
+
+
+@pytest.mark.asyncio
+class TestAdmissionController:
+    async def test_user_bucket(self):
+        clock = FakeClock()
+        controller = _controller(clock)
+        for _ in range(3):
+            assert (await controller.admit("user:1", "GET", "/photos")).allowed
+        decision = await controller.admit("user:1", "GET", "/photos")
+        assert not decision.allowed
+        assert decision.retry_after == pytest.approx(0.1)
+        # 其他调用方不受影响
+        assert (await controller.admit("user:2", "GET", "/photos")).allowed
+        clock.now += 0.1
+        assert (await controller.admit("user:1", "GET", "/photos")).allowed
+
+    async def test_route_bucket_and_concurrency(self):
+        clock = FakeClock()
+        controller = _controller(clock)
+        first = await controller.admit("user:1", "GET", "/export")
+        assert first.allowed and first.release is not None
+
+        # 全局并发上限为1
+        busy = await controller.admit("user:2", "GET", "/export")
+        assert not busy.allowed and busy.retry_after == 1.0
+        await first.release()
+
+        second = await controller.admit("user:1", "GET", "/export/")
+        assert second.allowed
+        await second.release()
+        limited = await controller.admit("user:1", "GET", "/export")
+        assert not limited.allowed
+        assert limited.retry_after == pytest.approx(1.0)
+
+    async def test_expired_lease(self):
+        clock = FakeClock()
+        controller = _controller(clock)
+        assert (await controller.admit("user:1", "GET", "/export")).allowed
+        clock.now += 61
+        assert (await controller.admit("user:2", "GET", "/export")).allowed
+
+    async def test_fallback(self):
+        clock = FakeClock()
+        broken = BrokenLimiter()
+        controller = _controller(clock, backend=broken, retry_interval=30)
+        assert (await controller.admit("user:1", "GET", "/photos")).allowed
+        assert (await controller.admit("user:1", "GET", "/photos")).allowed
+        # 回退期间不再尝试Redis
+        assert broken.calls == 1
+        clock.now += 30
+        await controller.admit("user:1", "GET", "/photos")
+        assert broken.calls == 2
+
+
+@pytest.mark.asyncio
+class TestAdmissionMiddleware:
+    async def test_too_many_requests(self):
+        app = FastAPI()
+
+        @app.get("/photos")
+        async def photos():
+            return {"ok": True}
+
+        @app.get("/health")
+        async def health():
+            return {"status": "healthy"}
+
+        controller = _controller(FakeClock())
+        transport = httpx.ASGITransport(app=AdmissionMiddleware(app, controller))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            statuses = [(await client.get("/photos")).status_code for _ in range(4)]
+            assert statuses == [200, 200, 200, 429]
+            response = await client.get("/photos")
+            assert response.headers["retry-after"] == "1"
+            assert response.json() == {"detail": "Too many requests"}
+            assert (await client.get("/health")).status_code == 200
@@ -0,0 +1,185 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from photo_app.core.dao.album import AlbumDAO
+from photo_app.core.dao.change_counter import UserChangeCounterDAO
+from photo_app.core.dao.metadata import PhotoMetadataDAO
+from photo_app.core.dao.tag import TagDAO
+from photo_app.core.models.album import Album, photo_albums
+from photo_app.core.models.photo import Photo, PhotoMetadata
+from photo_app.core.services import invalidation
+from photo_app.core.services.autocomplete import (
+    KIND_ALBUM,
+    KIND_SCENE,
+    KIND_TAG,
+    AutocompleteIndex,
+    AutocompleteService,
+    PrefixIndex,
+    Suggestion,
+)
+
+
+class TestPrefixIndex:
+    def test_top_k_by_weight(self):
+        index = PrefixIndex([("beach", 10), ("Bear", 3), ("beer", 7), ("city", 50)])
+
+        assert index.top("be", 2) == [("beach", 10), ("beer", 7)]
+        assert index.top("BE") == [("beach", 10), ("beer", 7), ("Bear", 3)]
+        assert index.top("bea") == [("beach", 10), ("Bear", 3)]
+        assert index.top("x") == []
+        assert index.top("", 1) == [("city", 50)]
+
+    def test_adjust_updates_cached_prefixes(self):
+        index = PrefixIndex([("beach", 10), ("beer", 7)])
+        assert index.top("b", 1) == [("beach", 10)]
+
+        index.adjust("beer", 5)
+        index.adjust("bridge", 1)
+        assert index.top("b") == [("beer", 12), ("beach", 10), ("bridge", 1)]
+
+        index.adjust("beer", -12)
+        assert index.top("b") == [("beach", 10), ("bridge", 1)]
+        assert len(index) == 2
+
+
+@pytest.mark.asyncio
+class TestAutocompleteService:
+    async def test_build_from_database(self, async_session: AsyncSession, library):
+        index = await AutocompleteIndex.build(async_session, user_id=1)
+
+        assert index.suggest("be", kinds=[KIND_TAG]) == [
+            Suggestion(KIND_TAG, "beach", 3),
+            Suggestion(KIND_TAG, "beer", 1),
+        ]
+        assert index.suggest("h", kinds=[KIND_ALBUM]) == [
+            Suggestion(KIND_ALBUM, "Holiday", 2),
+            Suggestion(KIND_ALBUM, "Home", 1),
+        ]
+        assert index.suggest("land") == [Suggestion(KIND_SCENE, "landscape", 2)]
+        assert [s.name for s in index.suggest("", k=2)] == ["beach", "Holiday"]
+
+    async def test_build_ignores_deleted_photos(self, async_session: AsyncSession, library):
+        await async_session.execute(
+            update(Photo).where(Photo.id == library[0].id).values(deleted_at=datetime.utcnow())
+        )
+        index = await AutocompleteIndex.build(async_session, user_id=1)
+
+        assert index.suggest("hol", kinds=[KIND_ALBUM]) == [Suggestion(KIND_ALBUM, "Holiday", 1)]
+        assert index.suggest("bea", kinds=[KIND_TAG]) == [Suggestion(KIND_TAG, "beach", 2)]
+
+    async def test_tag_dao_updates_counts_incrementally(self, async_session: AsyncSession, library, monkeypatch):
+        service = AutocompleteService()
+        monkeypatch.setattr(invalidation, "autocomplete", service)
+        await service.get(async_session, 1)
+
+        ids = [p.id for p in library]
+        dao = TagDAO(async_session)
+        await dao.bulk_assign(1, ids, ["beer", "bridge"])
+        index = service.peek(1)
+        assert index is not None
+        # 提交之前不更新
+        assert [s.name for s in index.suggest("b", kinds=[KIND_TAG])] == ["beach", "beer"]
+        await async_session.commit()
+        assert index.suggest("b", kinds=[KIND_TAG]) == [
+            Suggestion(KIND_TAG, "beer", 4),
+            Suggestion(KIND_TAG, "bridge", 4),
+            Suggestion(KIND_TAG, "beach", 3),
+        ]
+
+        await dao.bulk_remove(1, ids, ["beach"])
+        await async_session.rollback()
+        assert [s.name for s in index.suggest("b", kinds=[KIND_TAG])] == ["beer", "bridge", "beach"]
+
+        await dao.bulk_remove(1, ids, ["beach"])
+        await async_session.commit()
+        assert [s.name for s in index.suggest("b", kinds=[KIND_TAG])] == ["beer", "bridge"]
+
+    async def test_album_and_scene_writes_refresh_after_commit(
+        self, async_session: AsyncSession, library, monkeypatch
+    ):
+        service = AutocompleteService()
+        monkeypatch.setattr(invalidation, "autocomplete", service)
+        ids = [p.id for p in library]
+        holiday_id = (await async_session.execute(select(Album.id).where(Album.name == "Holiday"))).scalar_one()
+        await service.get(async_session, 1)
+
+        albums = AlbumDAO(async_session)
+        await albums.update(holiday_id, name="Vacation")
+        await albums.add_photos(holiday_id, [ids[2]])
+        await albums.create(name="Valley", user_id=1)
+        await PhotoMetadataDAO(async_session).update_ai_analysis(ids[2], scene_type="valley")
+        assert await service.suggest(async_session, 1, "va") == [
+            Suggestion(KIND_ALBUM, "Vacation", 3),
+            Suggestion(KIND_ALBUM, "Valley", 1),
+            Suggestion(KIND_SCENE, "valley", 1),
+        ]
+        # 未提交的写入不进入缓存的索引
+        assert service.peek(1).suggest("va") == []
+
+        await async_session.commit()
+        assert service.peek(1) is None
+        assert [s.name for s in await service.suggest(async_session, 1, "va")] == ["Vacation", "Valley", "valley"]
+
+    async def test_writes_from_other_processes_are_detected(self, async_session: AsyncSession, library):
+        service = AutocompleteService(check_interval=0)
+        index = await service.get(async_session, 1)
+        assert await service.get(async_session, 1) is index
+
+        # 其他进程提交的写入只体现在数据库的变更计数上
+        await TagDAO(async_session).bulk_assign(1, [library[0].id], ["bridge"])
+        await async_session.commit()
+
+        suggestions = await service.suggest(async_session, 1, "br")
+        assert suggestions == [Suggestion(KIND_TAG, "bridge", 1)]
+        assert service.peek(1) is not index
+
+    async def test_version_checked_at_most_once_per_interval(
+        self, async_session: AsyncSession, library, monkeypatch
+    ):
+        service = AutocompleteService(check_interval=60)
+        index = await service.get(async_session, 1)
+        await TagDAO(async_session).bulk_assign(1, [library[0].id], ["bridge"])
+        await async_session.commit()
+
+        async def no_queries(self, user_id):
+            raise AssertionError("autocomplete queried the database")
+
+        monkeypatch.setattr(UserChangeCounterDAO, "get_version", no_queries)
+        # 间隔内使用内存中的索引，其他进程的写入暂时不可见
+        assert await service.suggest(async_session, 1, "br") == []
+        assert service.peek(1) is index
+
+        monkeypatch.undo()
+        index.checked_at -= 60
+        assert await service.suggest(async_session, 1, "br") == [Suggestion(KIND_TAG, "bridge", 1)]
+
+
+@pytest.fixture
+async def library(async_session: AsyncSession) -> list[Photo]:
+    photos = [
+        Photo(filename=f"lib_{i}.jpg", filepath=f"/test/lib_{i}.jpg", size=100, user_id=1)
+        for i in range(4)
+    ]
+    async_session.add_all(photos)
+    holiday = Album(name="Holiday", user_id=1)
+    home = Album(name="Home", user_id=1)
+    async_session.add_all([holiday, home])
+    await async_session.flush()
+
+    dao = TagDAO(async_session)
+    await dao.bulk_assign(1, [p.id for p in photos[:3]], ["beach"])
+    await dao.bulk_assign(1, [photos[3].id], ["beer"])
+    await async_session.execute(photo_albums.insert(), [
+        {"photo_id": photos[0].id, "album_id": holiday.id},
+        {"photo_id": photos[1].id, "album_id": holiday.id},
+    ])
+    async_session.add_all([
+        PhotoMetadata(photo_id=photos[0].id, scene_type="landscape"),
+        PhotoMetadata(photo_id=photos[1].id, scene_type="landscape"),
+        PhotoMetadata(photo_id=photos[2].id, scene_type="portrait"),
+    ])
+    await async_session.commit()
+    return photos
@@ -0,0 +1,77 @@
+import io
+import zipfile
+
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from photo_app.core.models.album import Album, photo_albums
+from photo_app.core.models.photo import Photo
+from photo_app.core.models.user import User
+from photo_app.core.services.export import ExportService
+from photo_app.infrastructure.storage.encryption import generate_key, wrap_key, write_encrypted
+
+
+async def _collect(archive) -> bytes:
+    return b"".join([chunk async for chunk in archive.iter_bytes()])
+
+
+@pytest.mark.asyncio
+class TestExportService:
+    async def test_album_export(self, async_session: AsyncSession, export_user, export_album):
+        service = ExportService(async_session, chunk_size=1000)
+        archive = await service.for_album(export_user.id, export_album.id)
+        data = await _collect(archive)
+
+        zf = zipfile.ZipFile(io.BytesIO(data))
+        assert zf.testzip() is None
+        assert zf.namelist() == ["img.jpg", "img (2).jpg", "secret.jpg"]
+        assert zf.read("img.jpg") == b"first" * 1000
+        assert zf.read("img (2).jpg") == b"second" * 500
+        assert zf.read("secret.jpg") == b"encrypted" * 2000
+        assert len(archive.skipped) == 1
+
+    async def test_unknown_album(self, async_session: AsyncSession, export_user):
+        assert await ExportService(async_session).for_album(export_user.id, 12345) is None
+
+    async def test_search_export(self, async_session: AsyncSession, export_user, export_album):
+        archive = await ExportService(async_session).for_search(export_user.id, filename="img")
+        zf = zipfile.ZipFile(io.BytesIO(await _collect(archive)))
+        assert sorted(zf.namelist()) == ["img (2).jpg", "img.jpg"]
+
+
+@pytest.fixture
+async def export_user(async_session: AsyncSession) -> User:
+    key = generate_key()
+    user = User(email="export@example.com", username="export", hashed_password="x",
+                encryption_key=wrap_key(key))
+    async_session.add(user)
+    await async_session.commit()
+    user.plain_key = key
+    return user
+
+
+@pytest.fixture
+async def export_album(async_session: AsyncSession, export_user, tmp_path) -> Album:
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    (tmp_path / "a" / "img.jpg").write_bytes(b"first" * 1000)
+    (tmp_path / "b" / "img.jpg").write_bytes(b"second" * 500)
+    write_encrypted(io.BytesIO(b"encrypted" * 2000), str(tmp_path / "secret.jpg"), export_user.plain_key,
+                    chunk_size=4096)
+    photos = [
+        Photo(filename="img.jpg", filepath=str(tmp_path / "a" / "img.jpg"), size=5000, user_id=export_user.id),
+        Photo(filename="img.jpg", filepath=str(tmp_path / "b" / "img.jpg"), size=3000, user_id=export_user.id),
+        Photo(filename="gone.jpg", filepath=str(tmp_path / "gone.jpg"), size=1, user_id=export_user.id),
+        Photo(filename="secret.jpg", filepath=str(tmp_path / "secret.jpg"), size=18000,
+              user_id=export_user.id, is_encrypted=True),
+    ]
+    album = Album(name="trip", user_id=export_user.id)
+    async_session.add_all(photos + [album])
+    await async_session.flush()
+    await async_session.execute(
+        insert(photo_albums),
+        [{"photo_id": p.id, "album_id": album.id} for p in photos]
+    )
+    await async_session.commit()
+    return album
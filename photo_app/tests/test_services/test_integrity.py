@@ -0,0 +1,105 @@
+import hashlib
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from photo_app.core.models.photo import Photo
+from photo_app.core.services import integrity
+from photo_app.core.services.integrity import IntegrityService, SamplingVerifier
+from photo_app.core.utils.merkle import InMemoryNodeSource
+
+
+@pytest.mark.asyncio
+class TestIntegrityService:
+    async def test_fill_checksums_and_compare(self, async_session: AsyncSession, checked_photos):
+        service = IntegrityService(async_session)
+        assert await service.fill_checksums() == 4
+        await async_session.commit()
+
+        rows = (await async_session.execute(select(Photo.id, Photo.checksum).order_by(Photo.id))).all()
+        checksums = dict(rows)
+        assert checksums[checked_photos[0].id] == hashlib.blake2b(b"photo-0", digest_size=32).hexdigest()
+
+        backup = InMemoryNodeSource(dict(checksums))
+        report = await service.compare(1, backup)
+        assert report.root_matches and report.divergent_buckets == []
+
+        ids = [p.id for p in checked_photos]
+        remote = dict(checksums)
+        remote[ids[1]] = "0" * 64
+        del remote[ids[2]]
+        remote[999] = "1" * 64
+        report = await service.compare(1, InMemoryNodeSource(remote))
+        assert not report.root_matches
+        assert report.mismatched == [ids[1]]
+        assert report.missing_in_backup == [ids[2]]
+        assert report.unknown_in_backup == [999]
+
+
+@pytest.mark.asyncio
+class TestSamplingVerifier:
+    async def test_detects_corruption_and_rotates_sample(self, async_session: AsyncSession, checked_photos, tmp_path):
+        await IntegrityService(async_session).fill_checksums()
+        ids = [p.id for p in checked_photos]
+        (tmp_path / "photo-1.jpg").write_bytes(b"bit rot")
+        (tmp_path / "photo-2.jpg").unlink()
+        backup_root = tmp_path / "backup"
+        backup_root.mkdir()
+        (backup_root / "photo-0.jpg").write_bytes(b"photo-0")
+        (backup_root / "photo-3.jpg").write_bytes(b"truncated")
+
+        verifier = SamplingVerifier(
+            async_session,
+            resolve_backup_path=lambda p: str(backup_root / p),
+            sample_fraction=0.5,
+            min_sample=1,
+            bytes_per_second=10 * 1024 * 1024,
+        )
+        report = await verifier.verify(user_id=1)
+        assert report.checked == 2
+        assert report.corrupted == [ids[1]]
+        assert report.backup_corrupted == []
+
+        # 第二轮抽取之前没有校验过的照片
+        report = await verifier.verify(user_id=1)
+        assert report.checked == 2
+        assert report.missing == [ids[2]]
+        assert report.backup_corrupted == [ids[3]]
+
+        rows = dict((await async_session.execute(
+            select(Photo.id, Photo.storage_status).order_by(Photo.id)
+        )).all())
+        assert rows[ids[1]] == "corrupted" and rows[ids[2]] == "missing"
+        backup_status = (await async_session.execute(
+            select(Photo.backup_status).where(Photo.id == ids[3])
+        )).scalar_one()
+        assert backup_status == "pending"
+
+    async def test_status_updates_are_batched(self, async_session: AsyncSession, checked_photos, monkeypatch):
+        await IntegrityService(async_session).fill_checksums()
+        # 已校验的照片ID分多条语句更新，避免超出绑定参数上限
+        monkeypatch.setattr(integrity, "BULK_BATCH_SIZE", 3)
+
+        report = await SamplingVerifier(async_session, min_sample=4).verify(user_id=1)
+        assert report.checked == 4
+
+        unverified = (await async_session.execute(
+            select(Photo.id).where(Photo.verified_at.is_(None))
+        )).scalars().all()
+        assert unverified == []
+
+
+@pytest.fixture
+async def checked_photos(async_session: AsyncSession, tmp_path) -> list[Photo]:
+    photos = []
+    for i in range(4):
+        path = tmp_path / f"photo-{i}.jpg"
+        path.write_bytes(f"photo-{i}".encode())
+        photos.append(Photo(
+            filename=path.name, filepath=str(path), size=7, user_id=1,
+            backup_status="completed", backup_path=path.name
+        ))
+    async_session.add_all(photos)
+    await async_session.commit()
+    return photos
@@ -0,0 +1,122 @@
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from photo_app.core.dao.checkpoint import JobCheckpointDAO
+from photo_app.core.models.photo import Photo
+from photo_app.core.services.orphans import CHECKPOINT_STORAGE, OrphanCollector
+from photo_app.infrastructure.storage.thumbnails import thumbnail_path
+
+OLD = datetime(2020, 1, 1)
+
+
+def _write(path, age_days: int = 30) -> str:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"x")
+    mtime = (datetime.now() - timedelta(days=age_days)).timestamp()
+    os.utime(path, (mtime, mtime))
+    return str(path)
+
+
+async def _status(session: AsyncSession, photo_id: int) -> str:
+    return (await session.execute(select(Photo.storage_status).where(Photo.id == photo_id))).scalar_one()
+
+
+@pytest.mark.asyncio
+class TestOrphanCollector:
+    async def test_merge_join(self, async_session: AsyncSession, storage, gc_photos):
+        root, quarantine = storage
+        collector = OrphanCollector(
+            async_session, storage_path=str(root), quarantine_path=str(quarantine), pause=0
+        )
+        report = await collector.collect()
+
+        assert report.completed
+        assert report.files_scanned == 4
+        assert report.rows_scanned == 5
+        assert report.quarantined == [str(root / "a/orphan.jpg")]
+        assert report.missing_photo_ids == [gc_photos["dangling"].id]
+        # 新写入的孤立文件和刚上传的悬空记录都在宽限期内
+        assert report.recent_skipped == 2
+
+        assert (quarantine / "a/orphan.jpg").exists()
+        assert not (root / "a/orphan.jpg").exists()
+        assert (root / "a/new.jpg").exists()
+        assert (root / ".chunks/ab").exists()
+        assert await _status(async_session, gc_photos["dangling"].id) == "missing"
+        assert await _status(async_session, gc_photos["recent"].id) == "completed"
+        assert await _status(async_session, gc_photos["deleted"].id) == "completed"
+        assert await JobCheckpointDAO(async_session).get_position(CHECKPOINT_STORAGE) is None
+
+    async def test_resume_from_checkpoint(self, async_session: AsyncSession, storage, gc_photos):
+        root, quarantine = storage
+        collector = OrphanCollector(
+            async_session, storage_path=str(root), quarantine_path=str(quarantine), page_size=2, pause=0
+        )
+        report = await collector.collect(max_items=3)
+        assert not report.completed
+        position = await JobCheckpointDAO(async_session).get_position(CHECKPOINT_STORAGE)
+        assert position == str(root / "a/new.jpg")
+        assert report.missing_photo_ids == [gc_photos["dangling"].id]
+
+        scanned = report.files_scanned + report.rows_scanned
+        quarantined = []
+        while not report.completed:
+            report = await collector.collect(max_items=3)
+            scanned += report.files_scanned + report.rows_scanned
+            quarantined += report.quarantined
+            assert report.missing_photo_ids == []
+        # 每个条目只处理一次
+        assert scanned == 9
+        assert quarantined == [str(root / "a/orphan.jpg")]
+
+    async def test_thumbnails(self, async_session: AsyncSession, storage, gc_photos, tmp_path):
+        root, quarantine = storage
+        cache = tmp_path / "cache"
+        kept = _write(thumbnail_path(gc_photos["kept"].id, str(cache)))
+        stale = _write(thumbnail_path(99999, str(cache)))
+        recent = _write(thumbnail_path(99998, str(cache)), age_days=0)
+
+        collector = OrphanCollector(async_session, storage_path=str(root), cache_path=str(cache), pause=0)
+        report = await collector.collect_thumbnails()
+        assert report.completed
+        assert report.files_scanned == 3
+        assert report.thumbnails_removed == 1
+        assert os.path.exists(kept) and os.path.exists(recent)
+        assert not os.path.exists(stale)
+
+
+@pytest.fixture
+def storage(tmp_path):
+    root = tmp_path / "photos"
+    _write(root / "a/orphan.jpg")
+    _write(root / "a/new.jpg", age_days=0)
+    _write(root / ".chunks/ab")
+    return root, root / ".quarantine"
+
+
+@pytest.fixture
+async def gc_photos(async_session: AsyncSession, storage) -> dict:
+    root, _ = storage
+    photos = {
+        "kept": Photo(filename="kept.jpg", filepath=_write(root / "a/b/kept.jpg"), size=1, user_id=1,
+                      upload_date=OLD, storage_status="completed"),
+        "dangling": Photo(filename="gone.jpg", filepath=str(root / "a/gone.jpg"), size=1, user_id=1,
+                          upload_date=OLD, storage_status="completed"),
+        "recent": Photo(filename="up.jpg", filepath=str(root / "b/up.jpg"), size=1, user_id=1,
+                        storage_status="completed"),
+        "deleted": Photo(filename="del.jpg", filepath=str(root / "del.jpg"), size=1, user_id=1,
+                         upload_date=OLD, storage_status="completed", deleted_at=OLD),
+        "trashed": Photo(filename="t.jpg", filepath=_write(root / "t.jpg"), size=1, user_id=1,
+                         upload_date=OLD, storage_status="completed", deleted_at=OLD),
+    }
+    async_session.add_all(photos.values())
+    # 存储目录之外的记录不参与对账
+    async_session.add(Photo(filename="x.jpg", filepath=str(root) + "-other/x.jpg", size=1, user_id=1,
+                            upload_date=OLD, storage_status="completed"))
+    await async_session.commit()
+    return photos
@@ -0,0 +1,131 @@
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from photo_app.core.models.photo import Photo
+from photo_app.core.models.user import User
+from photo_app.core.services import encryption as encryption_service
+from photo_app.core.services.encryption import PhotoEncryptionService, load_user_keys
+from photo_app.core.services.integrity import SamplingVerifier
+from photo_app.infrastructure.storage.encryption import (
+    EncryptedReader,
+    EncryptionError,
+    generate_key,
+    is_encrypted_file,
+    open_with_keys,
+    reencrypt_in_place,
+)
+from photo_app.infrastructure.storage.scanner import hash_file
+
+
+@pytest.mark.asyncio
+class TestPhotoEncryptionService:
+    async def test_encrypt_photos(self, async_session: AsyncSession, encryption_user, photo_files):
+        service = PhotoEncryptionService(async_session, batch_size=2)
+        key = await service.enable_for_user(encryption_user)
+        assert encryption_user.encryption_enabled
+        assert service.user_key(encryption_user) == key
+
+        result = await service.encrypt_photos(encryption_user.id, key)
+        assert sorted(result.processed) == [p.id for p in photo_files[:3]]
+        assert list(result.failed) == [photo_files[3].id]
+
+        rows = (await async_session.execute(
+            select(Photo.filepath, Photo.is_encrypted, Photo.encryption_method, Photo.encryption_date, Photo.checksum)
+            .order_by(Photo.id)
+        )).all()
+        for path, encrypted, method, encrypted_at, checksum in rows[:3]:
+            assert encrypted and method == service.method and encrypted_at is not None
+            assert is_encrypted_file(path)
+            # 校验和是密文的哈希，抽样校验不会把加密后的照片判为损坏
+            assert checksum == hash_file(path)
+        assert rows[3].is_encrypted is False
+
+        report = await SamplingVerifier(async_session).verify(encryption_user.id)
+        assert report.corrupted == []
+
+    async def test_rotate_key(self, async_session: AsyncSession, encryption_user, photo_files):
+        service = PhotoEncryptionService(async_session)
+        key = await service.enable_for_user(encryption_user)
+        await service.encrypt_photos(encryption_user.id, key, photo_ids=[photo_files[0].id])
+
+        new_key = generate_key()
+        result = await service.rotate_key(encryption_user, new_key)
+        assert result.processed == [photo_files[0].id]
+        checksum = (await async_session.execute(
+            select(Photo.checksum).where(Photo.id == photo_files[0].id)
+        )).scalar_one()
+        assert checksum == hash_file(photo_files[0].filepath)
+        assert service.user_key(encryption_user) == new_key
+        with EncryptedReader.open(photo_files[0].filepath, new_key) as reader:
+            assert reader.read() == b"photo-0" * 1000
+            with pytest.raises(EncryptionError):
+                EncryptedReader.open(photo_files[0].filepath, key).read_chunk(0)
+
+    async def test_rotate_key_interrupted(self, async_session: AsyncSession, encryption_user, photo_files, monkeypatch):
+        service = PhotoEncryptionService(async_session, batch_size=1)
+        key = await service.enable_for_user(encryption_user)
+        await service.encrypt_photos(encryption_user.id, key)
+        await async_session.commit()
+        encrypted = [p.filepath for p in photo_files[:3]]
+
+        # 第二个文件轮换时进程"崩溃"
+        calls = []
+
+        def crashing(path, **kwargs):
+            calls.append(path)
+            if len(calls) == 2:
+                raise RuntimeError("worker crashed")
+            return reencrypt_in_place(path, **kwargs)
+
+        monkeypatch.setattr(encryption_service, "reencrypt_in_place", crashing)
+        new_key = generate_key()
+        with pytest.raises(RuntimeError):
+            await service.rotate_key(encryption_user, new_key)
+        await async_session.rollback()
+
+        # 新密钥在改写文件之前已经提交，所有文件仍然可以解密
+        await async_session.refresh(encryption_user)
+        assert service.user_key(encryption_user) == new_key
+        keys = await load_user_keys(async_session, encryption_user.id)
+        assert keys == [new_key, key]
+        for i, path in enumerate(encrypted):
+            with open_with_keys(path, keys) as reader:
+                assert reader.read() == f"photo-{i}".encode() * 1000
+        with pytest.raises(EncryptionError):
+            await service.rotate_key(encryption_user, generate_key())
+
+        monkeypatch.setattr(encryption_service, "reencrypt_in_place", reencrypt_in_place)
+        result = await service.rotate_key(encryption_user)
+        assert not result.failed
+        await async_session.refresh(encryption_user)
+        assert encryption_user.pending_encryption_key is None
+        assert await load_user_keys(async_session, encryption_user.id) == [new_key]
+        for path in encrypted:
+            with EncryptedReader.open(path, new_key) as reader:
+                reader.read_chunk(0)
+
+
+@pytest.fixture
+async def encryption_user(async_session: AsyncSession) -> User:
+    user = User(email="enc@example.com", username="enc", hashed_password="x")
+    async_session.add(user)
+    await async_session.commit()
+    return user
+
+
+@pytest.fixture
+async def photo_files(async_session: AsyncSession, encryption_user, tmp_path) -> list[Photo]:
+    photos = []
+    for i in range(4):
+        path = tmp_path / f"photo-{i}.jpg"
+        # 最后一张照片的文件不存在
+        if i < 3:
+            path.write_bytes(f"photo-{i}".encode() * 1000)
+        photos.append(Photo(
+            filename=path.name, filepath=str(path), size=7000, user_id=encryption_user.id,
+            checksum=hash_file(str(path)) if i < 3 else None
+        ))
+    async_session.add_all(photos)
+    await async_session.commit()
+    return photos
@@ -0,0 +1,160 @@
+import os
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from photo_app.core.dao.metadata import PhotoMetadataDAO
+from photo_app.core.dao.photo import PhotoDAO
+from photo_app.core.models.album import Album, photo_albums
+from photo_app.core.models.photo import Photo, PhotoMetadata
+from photo_app.core.models.tag import Tag, photo_tags
+from photo_app.core.models.user import User
+from photo_app.core.services.purge import PhotoPurger, delete_photo_rows, purge_deleted_photos
+from photo_app.infrastructure.storage.thumbnails import thumbnail_path
+
+
+async def _count(session: AsyncSession, table) -> int:
+    return (await session.execute(select(func.count()).select_from(table))).scalar_one()
+
+
+@pytest.mark.asyncio
+class TestPhotoPurger:
+    async def test_purge_in_batches(self, async_session: AsyncSession, purge_user, purge_photos, tmp_path):
+        ids = [p.id for p in purge_photos]
+        assert await PhotoDAO(async_session).delete_many(ids[:5], user_id=purge_user.id) == 5
+        await async_session.commit()
+
+        purger = PhotoPurger(async_session, batch_size=2, concurrency=2, pause=0, cache_path=str(tmp_path))
+        report = await purger.purge(max_batches=1)
+        assert report.photos == 2
+        # 2个原图 + 1个缩略图
+        assert report.files_removed == 3
+
+        report = await purger.purge()
+        assert report.photos == 3
+        assert report.bytes_freed == 300
+        assert report.files_removed == 2
+        assert report.missing_files == 1
+        assert report.failed_files == []
+
+        remaining = (await async_session.execute(select(Photo.id).order_by(Photo.id))).scalars().all()
+        assert remaining == ids[5:]
+        assert await _count(async_session, photo_tags) == 1
+        assert await _count(async_session, photo_albums) == 1
+        assert await _count(async_session, PhotoMetadata.__table__) == 1
+        album = (await async_session.execute(select(Album))).scalar_one()
+        await async_session.refresh(album)
+        assert album.cover_photo_id is None
+
+        await async_session.refresh(purge_user)
+        assert purge_user.storage_used == 1000 - 500
+        assert not (tmp_path / "photo_0.jpg").exists()
+        assert (tmp_path / "photo_5.jpg").exists()
+        assert not os.path.exists(thumbnail_path(ids[0], str(tmp_path)))
+
+    async def test_grace_period_and_restore(self, async_session: AsyncSession, purge_user, purge_photos, tmp_path):
+        dao = PhotoDAO(async_session)
+        await dao.delete_many([p.id for p in purge_photos[:2]])
+        await dao.restore(purge_photos[1].id)
+        await async_session.commit()
+
+        report = await PhotoPurger(async_session, grace_period=timedelta(hours=1), pause=0).purge()
+        assert report.photos == 0
+
+        report = await PhotoPurger(async_session, pause=0, cache_path=str(tmp_path)).purge()
+        assert report.photos == 1
+        assert (await async_session.execute(select(func.count(Photo.id)))).scalar_one() == 5
+
+
+    async def test_restored_photo_keeps_related_rows(self, async_session: AsyncSession, purge_photos):
+        # 照片0在选出批次之后被恢复
+        ids = [purge_photos[0].id, purge_photos[5].id]
+        await PhotoDAO(async_session).delete_many([ids[1]])
+        await async_session.commit()
+
+        rows = await delete_photo_rows(async_session, ids)
+        await async_session.commit()
+        assert [row.id for row in rows] == [ids[1]]
+        tagged = (await async_session.execute(select(photo_tags.c.photo_id))).scalars().all()
+        assert tagged == [ids[0]]
+        album = (await async_session.execute(select(Album))).scalar_one()
+        await async_session.refresh(album)
+        assert album.cover_photo_id == ids[0]
+
+    async def test_purge_request_during_run(
+        self, test_engine, async_session: AsyncSession, purge_photos, tmp_path, monkeypatch
+    ):
+        dao = PhotoDAO(async_session)
+        await dao.delete_many([purge_photos[0].id])
+        await async_session.commit()
+        factory = async_sessionmaker(test_engine, expire_on_commit=False)
+        calls = []
+
+        def session_factory():
+            calls.append(1)
+            return factory()
+
+        async def delete_during_run():
+            # 第一轮运行期间又删除了一张照片，并触发了一次清除
+            await dao.delete_many([purge_photos[1].id])
+            await async_session.commit()
+            assert await purge_deleted_photos(session_factory) is None
+
+        original_purge = PhotoPurger.purge
+
+        async def purge(self, max_batches=None):
+            report = await original_purge(self, max_batches)
+            if len(calls) == 1:
+                await delete_during_run()
+            return report
+
+        monkeypatch.setattr(PhotoPurger, "purge", purge)
+        report = await purge_deleted_photos(session_factory, pause=0, cache_path=str(tmp_path))
+        assert report.photos == 2
+        assert len(calls) == 2
+
+@pytest.fixture
+async def purge_user(async_session: AsyncSession) -> User:
+    user = User(email="purge@example.com", username="purge", hashed_password="x", storage_used=1000)
+    async_session.add(user)
+    await async_session.commit()
+    return user
+
+
+@pytest.fixture
+async def purge_photos(async_session: AsyncSession, purge_user, tmp_path) -> list[Photo]:
+    dao = PhotoDAO(async_session)
+    photos = []
+    for i in range(6):
+        path = tmp_path / f"photo_{i}.jpg"
+        # 第5张照片的原图已经丢失
+        if i != 4:
+            path.write_bytes(b"x" * 100)
+        photos.append(await dao.create(
+            filename=path.name, filepath=str(path), size=100, user_id=purge_user.id
+        ))
+
+    thumb = thumbnail_path(photos[0].id, str(tmp_path))
+    os.makedirs(os.path.dirname(thumb))
+    with open(thumb, "wb") as f:
+        f.write(b"thumb")
+
+    tag = Tag(name="purge")
+    album = Album(name="purge", user_id=purge_user.id, cover_photo_id=photos[0].id)
+    async_session.add_all([tag, album])
+    await async_session.flush()
+    await async_session.execute(insert(photo_tags), [
+        {"photo_id": photos[0].id, "tag_id": tag.id},
+        {"photo_id": photos[5].id, "tag_id": tag.id},
+    ])
+    await async_session.execute(insert(photo_albums), [
+        {"photo_id": photos[1].id, "album_id": album.id},
+        {"photo_id": photos[5].id, "album_id": album.id},
+    ])
+    metadata_dao = PhotoMetadataDAO(async_session)
+    await metadata_dao.create(photo_id=photos[2].id, scene_type="beach")
+    await metadata_dao.create(photo_id=photos[5].id, scene_type="beach")
+    await async_session.commit()
+    return photos
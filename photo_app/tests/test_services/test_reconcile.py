@@ -0,0 +1,134 @@
+import json
+import os
+import stat
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from photo_app.core.models.photo import Photo
+from photo_app.core.services.reconcile import (
+    ACTION_DELETE_REMOTE,
+    ACTION_REUPLOAD,
+    ACTION_UPLOAD,
+    SyncReconciler,
+)
+from photo_app.infrastructure.storage.rclone import LocalListing, RcloneListing, parse_lsjson_line
+
+
+def test_parse_lsjson_line():
+    assert parse_lsjson_line("[") is None
+    assert parse_lsjson_line('{"Path":"a/b.jpg","Name":"b.jpg","Size":12,"IsDir":false},') == ("a/b.jpg", 12)
+    assert parse_lsjson_line('{"Path":"a","Name":"a","Size":-1,"IsDir":true}') is None
+
+
+@pytest.mark.asyncio
+class TestSyncReconciler:
+    async def test_merge_join(self, async_session: AsyncSession, backed_up_photos, remote_dir):
+        reconciler = SyncReconciler(async_session, LocalListing(str(remote_dir)), run_size=2)
+        report = await reconciler.reconcile()
+
+        assert report.matched == 2
+        assert [(j.action, j.path) for j in report.missing] == [(ACTION_UPLOAD, "2024/c.jpg")]
+        assert [(j.action, j.path, j.expected_size, j.remote_size) for j in report.size_mismatch] == [
+            (ACTION_REUPLOAD, "2024/b.jpg", 100, 5)
+        ]
+        assert [(j.action, j.path) for j in report.extra] == [
+            (ACTION_DELETE_REMOTE, "2023/z.jpg"),
+            (ACTION_DELETE_REMOTE, "2024/d.jpg"),
+        ]
+
+    async def test_leading_slash_keeps_merge_order(self, async_session: AsyncSession, backed_up_photos, remote_dir):
+        # "/2024/c.jpg" 按原值排在 "2024/a.jpg" 之前，去掉 "/" 后应排在最后
+        backed_up_photos[2].backup_path = "/2024/c.jpg"
+        await async_session.commit()
+
+        report = await SyncReconciler(async_session, LocalListing(str(remote_dir))).reconcile()
+        assert report.matched == 2
+        assert [j.path for j in report.missing] == ["2024/c.jpg"]
+        assert [j.path for j in report.size_mismatch] == ["2024/b.jpg"]
+        assert [j.path for j in report.extra] == ["2023/z.jpg", "2024/d.jpg"]
+
+    async def test_user_scope_skips_remote_deletes(self, async_session: AsyncSession, backed_up_photos, remote_dir):
+        async_session.add(Photo(filename="z.jpg", filepath="/test/z.jpg", size=1, user_id=2,
+                                backup_path="2023/z.jpg", backup_status="completed"))
+        await async_session.commit()
+
+        report = await SyncReconciler(async_session, LocalListing(str(remote_dir)), user_id=1).reconcile()
+        assert report.matched == 2
+        assert [j.path for j in report.missing] == ["2024/c.jpg"]
+        assert report.extra == [] and report.extra_count == 0
+
+    async def test_callback_and_mark_pending(self, async_session: AsyncSession, backed_up_photos, remote_dir):
+        batches = []
+
+        async def on_jobs(jobs):
+            batches.append(jobs)
+
+        reconciler = SyncReconciler(
+            async_session, LocalListing(str(remote_dir)),
+            on_jobs=on_jobs, mark_pending=True, batch_size=2
+        )
+        report = await reconciler.reconcile()
+
+        assert report.missing == [] and report.extra == []
+        assert (report.missing_count, report.extra_count, report.size_mismatch_count) == (1, 2, 1)
+        assert sum(len(b) for b in batches) == 4
+        assert max(len(b) for b in batches) <= 2
+
+        result = await async_session.execute(select(Photo.backup_path, Photo.backup_status).order_by(Photo.backup_path))
+        statuses = dict(result.all())
+        assert statuses["2024/b.jpg"] == "pending"
+        assert statuses["2024/c.jpg"] == "pending"
+        assert statuses["2024/a.jpg"] == "completed"
+
+    async def test_rclone_listing(self, async_session: AsyncSession, backed_up_photos, tmp_path):
+        entries = [
+            {"Path": "2024/a.jpg", "Name": "a.jpg", "Size": 100, "IsDir": False},
+            {"Path": "2024", "Name": "2024", "Size": -1, "IsDir": True},
+        ]
+        script = tmp_path / "fake-rclone"
+        lines = ",\n".join(json.dumps(e) for e in entries)
+        script.write_text(f"#!/bin/sh\ncat <<'JSON'\n[\n{lines}\n]\nJSON\n")
+        script.chmod(script.stat().st_mode | stat.S_IEXEC)
+
+        listing = RcloneListing("onedrive:photos", rclone_bin=str(script))
+        report = await SyncReconciler(async_session, listing, user_id=1).reconcile()
+        assert report.matched == 2
+        assert [j.path for j in report.missing] == ["2024/b.jpg", "2024/c.jpg"]
+        assert report.extra == []
+
+    async def test_rclone_failure(self, tmp_path):
+        script = tmp_path / "failing-rclone"
+        script.write_text("#!/bin/sh\necho 'remote not found' >&2\nexit 3\n")
+        script.chmod(script.stat().st_mode | stat.S_IEXEC)
+
+        with pytest.raises(RuntimeError, match="remote not found"):
+            async for _ in RcloneListing("missing:", rclone_bin=str(script)).entries():
+                pass
+
+
+@pytest.fixture
+async def backed_up_photos(async_session: AsyncSession) -> list[Photo]:
+    photos = [
+        Photo(filename=name, filepath=f"/test/{name}", size=100, user_id=1,
+              backup_path=f"2024/{name}", backup_status="completed")
+        for name in ("a.jpg", "b.jpg", "c.jpg")
+    ]
+    # 两张照片共享同一个备份路径
+    photos.append(Photo(filename="a_copy.jpg", filepath="/test/a_copy.jpg", size=100, user_id=1,
+                        backup_path="2024/a.jpg", backup_status="completed"))
+    photos.append(Photo(filename="local.jpg", filepath="/test/local.jpg", size=100, user_id=1))
+    async_session.add_all(photos)
+    await async_session.commit()
+    return photos
+
+
+@pytest.fixture
+def remote_dir(tmp_path):
+    root = tmp_path / "remote"
+    for relative, size in (("2024/a.jpg", 100), ("2024/b.jpg", 5), ("2024/d.jpg", 1), ("2023/z.jpg", 1)):
+        path = root / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"x" * size)
+    return root
@@ -0,0 +1,132 @@
+import os
+
+import pytest
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from photo_app.core.dao.manifest import ScanManifestDAO
+from photo_app.core.dao.photo import PhotoDAO
+from photo_app.core.models.photo import Photo
+from photo_app.core.services.rescan import IncrementalRescanner, _order_moves
+from photo_app.infrastructure.storage import scanner as scanner_module
+from photo_app.infrastructure.storage.scanner import FileRecord
+
+
+@pytest.mark.asyncio
+class TestIncrementalRescanner:
+    async def test_first_scan_and_no_change_rescan(self, async_session: AsyncSession, photo_tree):
+        received = []
+
+        async def on_changes(result):
+            received.append(result)
+
+        scanner = IncrementalRescanner(async_session, str(photo_tree), on_changes=on_changes)
+        result = await scanner.rescan()
+        assert len(result.diff.added) == 2
+        assert result.adopted == 1
+        assert all(r.content_hash for r in result.diff.added)
+        assert len(received) == 1
+
+        manifest = await ScanManifestDAO(async_session).load_index()
+        assert len(manifest) == 3
+
+        result = await scanner.rescan()
+        assert result.diff.unchanged == 3
+        assert not result.diff.has_changes
+        assert len(received) == 1
+
+    async def test_incremental_changes(self, async_session: AsyncSession, photo_tree):
+        scanner = IncrementalRescanner(async_session, str(photo_tree))
+        await scanner.rescan()
+
+        (photo_tree / "new.jpg").write_bytes(b"new")
+        os.rename(photo_tree / "tracked.jpg", photo_tree / "renamed.jpg")
+        (photo_tree / "sub" / "b.jpg").write_bytes(b"edited content")
+        os.remove(photo_tree / "a.jpg")
+
+        result = await scanner.rescan()
+        diff = result.diff
+        assert [os.path.basename(r.path) for r in diff.added] == ["new.jpg"]
+        assert [os.path.basename(r.path) for r in diff.changed] == ["b.jpg"]
+        assert [os.path.basename(p) for p in diff.removed] == ["a.jpg"]
+        assert [(os.path.basename(old), os.path.basename(r.path)) for old, r in diff.moved] == [
+            ("tracked.jpg", "renamed.jpg")
+        ]
+
+        # 移动的文件同步更新 Photo.filepath
+        filepath = await async_session.scalar(select(Photo.filepath))
+        assert filepath == str(photo_tree / "renamed.jpg")
+
+        manifest = await ScanManifestDAO(async_session).load_index()
+        assert sorted(os.path.basename(p) for p in manifest) == ["b.jpg", "new.jpg", "renamed.jpg"]
+
+    async def test_removed_photo_ids(self, async_session: AsyncSession, photo_tree):
+        scanner = IncrementalRescanner(async_session, str(photo_tree))
+        await scanner.rescan()
+        os.remove(photo_tree / "tracked.jpg")
+
+        result = await scanner.rescan()
+        photo_id = await async_session.scalar(select(Photo.id))
+        assert result.missing_photo_ids == [photo_id]
+
+    async def test_known_photos_reuse_checksum(self, async_session: AsyncSession, photo_tree, monkeypatch):
+        await async_session.execute(update(Photo).values(checksum="stored-checksum"))
+        hashed = []
+        original = scanner_module.hash_file
+
+        def recording_hash_file(path):
+            hashed.append(os.path.basename(path))
+            return original(path)
+
+        monkeypatch.setattr(scanner_module, "hash_file", recording_hash_file)
+        result = await IncrementalRescanner(async_session, str(photo_tree)).rescan()
+
+        # 已登记的照片既不重新导入，也不读取文件内容
+        assert result.adopted == 1
+        assert sorted(hashed) == ["a.jpg", "b.jpg"]
+        manifest = await ScanManifestDAO(async_session).load_index()
+        assert manifest[str(photo_tree / "tracked.jpg")][3] == "stored-checksum"
+
+    async def test_swapped_paths_do_not_collide(self, async_session: AsyncSession, photo_tree):
+        photo_dao = PhotoDAO(async_session)
+        other = await photo_dao.create(
+            filename="a.jpg", filepath=str(photo_tree / "a.jpg"), size=1, user_id=1
+        )
+        other_id = other.id
+        tracked_id = await async_session.scalar(
+            select(Photo.id).where(Photo.filepath == str(photo_tree / "tracked.jpg"))
+        )
+        await async_session.commit()
+
+        # 两个文件互换路径，filepath 的唯一约束不能被中间状态违反
+        tracked, a = str(photo_tree / "tracked.jpg"), str(photo_tree / "a.jpg")
+        scanner = IncrementalRescanner(async_session, str(photo_tree))
+        await scanner._move_photos([(tracked, FileRecord(a, 7, 0, 0)), (a, FileRecord(tracked, 1, 0, 0))])
+
+        rows = await async_session.execute(select(Photo.id, Photo.filepath))
+        assert dict(rows.tuples().all()) == {tracked_id: a, other_id: tracked}
+
+
+def test_order_moves():
+    # 链式重命名先移动末端
+    assert _order_moves({"a": "b", "b": "c"}) == [("b", "c"), ("a", "b")]
+    # 循环重命名经过暂存路径
+    ordered = _order_moves({"a": "b", "b": "c", "c": "a"})
+    temp = ordered[0][1]
+    assert ordered == [("a", temp), ("c", "a"), ("b", "c"), (temp, "b")]
+
+
+@pytest.fixture
+async def photo_tree(async_session: AsyncSession, tmp_path):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "a.jpg").write_bytes(b"a")
+    (tmp_path / "sub" / "b.jpg").write_bytes(b"b")
+    (tmp_path / "tracked.jpg").write_bytes(b"tracked")
+    await PhotoDAO(async_session).create(
+        filename="tracked.jpg",
+        filepath=str(tmp_path / "tracked.jpg"),
+        size=7,
+        user_id=1
+    )
+    await async_session.commit()
+    return tmp_path
@@ -0,0 +1,125 @@
+import asyncio
+import hashlib
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from photo_app.core.models.photo import Photo
+from photo_app.core.models.tag import Tag, photo_tags
+from photo_app.core.services.restore import FAVORITE_TAG, RestoreService
+from photo_app.infrastructure.storage.rclone import LocalReader
+from photo_app.infrastructure.storage.thumbnails import thumbnail_backup_path, thumbnail_path
+
+
+class RecordingReader(LocalReader):
+    def __init__(self, root):
+        super().__init__(root)
+        self.calls = []
+
+    def open(self, path, offset=0):
+        self.calls.append((path, offset))
+        return super().open(path, offset)
+
+
+class BrokenReader:
+    async def open(self, path, offset=0):
+        raise ConnectionResetError("connection reset by peer")
+        yield b""
+
+
+@pytest.mark.asyncio
+class TestRestoreService:
+    async def test_priority_order_and_statuses(self, async_session: AsyncSession, lost_library):
+        photos, backup_root, cache = lost_library
+        reader = RecordingReader(str(backup_root))
+        reports = []
+
+        async def on_progress(progress):
+            reports.append((progress.completed_files, progress.failed_files))
+
+        service = RestoreService(
+            async_session, reader, concurrency=1, batch_size=2,
+            on_progress=on_progress, cache_path=str(cache)
+        )
+        assert await service.plan(1) == 4
+        progress = await service.run(1)
+
+        # 缩略图先于所有原图；收藏优先，其余按上传时间从新到旧
+        assert reader.calls == [
+            (thumbnail_backup_path("2.jpg"), 0),
+            (thumbnail_backup_path("3.jpg"), 0),
+            (thumbnail_backup_path("1.jpg"), 0),
+            (thumbnail_backup_path("0.jpg"), 0),
+            ("2.jpg", 0), ("3.jpg", 0), ("1.jpg", 0), ("0.jpg", 0),
+        ]
+        assert progress.thumbnails == 1
+        assert os.path.exists(thumbnail_path(photos[2].id, str(cache)))
+        assert (progress.completed_files, progress.failed_files) == (3, 1)
+        assert progress.bytes_done == progress.total_bytes - photos[0].size + len(b"corrupted")
+        assert progress.throughput > 0
+        assert reports[-1] == (3, 1)
+
+        statuses = dict((await async_session.execute(select(Photo.id, Photo.restore_status))).all())
+        assert [statuses[p.id] for p in photos] == ["failed", "completed", "completed", "completed"]
+        with open(photos[3].filepath, "rb") as f:
+            assert f.read() == b"content-3" * 100
+
+    async def test_resumes_partial_download(self, async_session: AsyncSession, lost_library):
+        photos, backup_root, cache = lost_library
+        target = photos[1].filepath
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target + ".part", "wb") as f:
+            f.write((b"content-1" * 100)[:400])
+
+        reader = RecordingReader(str(backup_root))
+        service = RestoreService(async_session, reader, cache_path=str(cache))
+        await service.plan(1)
+        await service.run(1)
+
+        assert ("1.jpg", 400) in reader.calls
+        with open(target, "rb") as f:
+            assert f.read() == b"content-1" * 100
+        assert not os.path.exists(target + ".part")
+
+
+    async def test_unexpected_errors_do_not_stop_workers(self, async_session: AsyncSession, lost_library):
+        photos, _, cache = lost_library
+        # 1个工作协程，队列容量4，8个任务：工作协程退出时 run 会一直阻塞
+        service = RestoreService(async_session, BrokenReader(), concurrency=1, cache_path=str(cache))
+        await service.plan(1)
+        progress = await asyncio.wait_for(service.run(1), timeout=5)
+
+        assert (progress.completed_files, progress.failed_files, progress.thumbnails) == (0, 4, 0)
+        statuses = (await async_session.execute(select(Photo.restore_status))).scalars().all()
+        assert statuses == ["failed"] * 4
+
+@pytest.fixture
+async def lost_library(async_session: AsyncSession, tmp_path):
+    backup_root = tmp_path / "backup"
+    library = tmp_path / "library"
+    cache = tmp_path / "cache"
+    backup_root.mkdir()
+    now = datetime(2026, 1, 1)
+    photos = []
+    for i in range(4):
+        content = f"content-{i}".encode() * 100
+        # 第0张的备份已损坏
+        (backup_root / f"{i}.jpg").write_bytes(content if i else b"corrupted")
+        photos.append(Photo(
+            filename=f"{i}.jpg", filepath=str(library / f"{i}.jpg"), size=len(content), user_id=1,
+            upload_date=now + timedelta(days=i), backup_status="completed", backup_path=f"{i}.jpg",
+            checksum=hashlib.blake2b(content, digest_size=32).hexdigest()
+        ))
+    # 只有收藏照片在备份端有缩略图
+    thumb = backup_root / thumbnail_backup_path("2.jpg")
+    thumb.parent.mkdir(parents=True)
+    thumb.write_bytes(b"thumb")
+    favorite = Tag(name=FAVORITE_TAG)
+    async_session.add_all(photos + [favorite])
+    await async_session.flush()
+    await async_session.execute(photo_tags.insert().values(photo_id=photos[2].id, tag_id=favorite.id))
+    await async_session.commit()
+    return photos, backup_root, cache
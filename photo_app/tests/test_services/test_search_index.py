@@ -0,0 +1,238 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from photo_app.core.dao.album import AlbumDAO
+from photo_app.core.dao.change_counter import UserChangeCounterDAO
+from photo_app.core.dao.metadata import PhotoMetadataDAO
+from photo_app.core.dao.photo import PhotoDAO
+from photo_app.core.models.album import Album, photo_albums
+from photo_app.core.models.photo import Photo, PhotoMetadata
+from photo_app.core.models.tag import Tag, photo_tags
+from photo_app.core.services import invalidation
+from photo_app.core.services.search_index import SearchIndex, SearchIndexRegistry
+
+
+@pytest.mark.asyncio
+class TestSearchIndex:
+    async def test_boolean_expression(self, async_session: AsyncSession, tagged_photos):
+        index = await SearchIndex.build(async_session, user_id=1)
+        ids = [p.id for p in tagged_photos]
+
+        assert list(index.evaluate("beach")) == [ids[0], ids[1], ids[2]]
+        assert list(index.evaluate("beach AND 2023 AND NOT screenshot")) == [ids[1]]
+        assert list(index.evaluate("beach 2023")) == [ids[1], ids[2]]
+        assert list(index.evaluate("screenshot OR scene:portrait")) == [ids[2], ids[3]]
+        album_id = (await async_session.execute(select(Album.id))).scalar_one()
+        assert list(index.evaluate(f"album:{album_id} AND NOT (2023)")) == [ids[0]]
+        assert list(index.evaluate("NOT beach")) == [ids[3], ids[4]]
+        assert list(index.evaluate("unknown")) == []
+
+    async def test_invalid_expression(self, async_session: AsyncSession, tagged_photos):
+        index = await SearchIndex.build(async_session, user_id=1)
+        with pytest.raises(ValueError):
+            index.evaluate("beach AND (2023")
+        with pytest.raises(ValueError):
+            index.evaluate("beach OR")
+
+    async def test_incremental_updates(self, async_session: AsyncSession, tagged_photos):
+        index = await SearchIndex.build(async_session, user_id=1)
+        ids = [p.id for p in tagged_photos]
+
+        index.add_tag([ids[4]], "beach")
+        index.remove_tag([ids[0]], "beach")
+        assert list(index.evaluate("beach")) == [ids[1], ids[2], ids[4]]
+
+        index.remove_photo(ids[1])
+        assert list(index.evaluate("beach")) == [ids[2], ids[4]]
+        assert ids[1] not in index.photos
+        assert index.dirty
+
+    async def test_registry_persists_and_invalidates(self, async_session: AsyncSession, tagged_photos, tmp_path):
+        registry = SearchIndexRegistry(cache_dir=str(tmp_path))
+        index = await registry.get(async_session, user_id=1)
+        path = tmp_path / "user_1.idx"
+        assert path.exists()
+
+        index.add_tag([tagged_photos[4].id], "sunset")
+        registry.flush()
+        registry.clear()
+
+        reloaded = await registry.get(async_session, user_id=1)
+        assert reloaded is not index
+        assert list(reloaded.evaluate("sunset")) == [tagged_photos[4].id]
+
+        registry.invalidate(1)
+        assert not path.exists()
+        assert registry.peek(1) is None
+
+    async def test_concurrent_saves_do_not_collide(self, async_session: AsyncSession, tagged_photos, tmp_path):
+        # 模拟多个工作进程同时保存同一用户的索引
+        registries = [SearchIndexRegistry(cache_dir=str(tmp_path)) for _ in range(8)]
+        index = await registries[0].get(async_session, user_id=1)
+
+        def save_repeatedly(registry):
+            for _ in range(50):
+                registry._save(index)
+
+        await asyncio.gather(*(asyncio.to_thread(save_repeatedly, registry) for registry in registries))
+        assert SearchIndex.from_bytes((tmp_path / "user_1.idx").read_bytes()).photos == index.photos
+        assert [p.name for p in tmp_path.iterdir()] == ["user_1.idx"]
+
+    async def test_unwritable_cache_does_not_fail_get(self, async_session: AsyncSession, tagged_photos, tmp_path):
+        blocker = tmp_path / "not_a_dir"
+        blocker.write_bytes(b"")
+        registry = SearchIndexRegistry(cache_dir=str(blocker))
+
+        index = await registry.get(async_session, user_id=1)
+        assert list(index.evaluate("screenshot")) == [tagged_photos[2].id]
+
+    async def test_stale_cache_file_is_rebuilt(self, async_session: AsyncSession, tagged_photos, tmp_path):
+        registry = SearchIndexRegistry(cache_dir=str(tmp_path))
+        index = await registry.get(async_session, user_id=1)
+        index.add_tag([tagged_photos[4].id], "sunset")
+        registry.flush()
+
+        # 其他进程提交了写入：内存中的索引和磁盘文件都已过期
+        await UserChangeCounterDAO(async_session).bump([1])
+        await async_session.commit()
+
+        rebuilt = await registry.get(async_session, user_id=1)
+        assert rebuilt is not index
+        assert rebuilt.version == 1
+        assert not rebuilt.evaluate("sunset")
+        registry.clear()
+        assert SearchIndex.from_bytes((tmp_path / "user_1.idx").read_bytes()).version == 1
+
+    async def test_apply_requires_consecutive_versions(self, async_session: AsyncSession, tagged_photos, tmp_path):
+        registry = SearchIndexRegistry(cache_dir=str(tmp_path))
+        index = await registry.get(async_session, user_id=1)
+        photo_id = tagged_photos[4].id
+
+        registry.apply(1, 1, lambda idx: idx.add_tag([photo_id], "sunset"))
+        assert index.version == 1
+        assert list(index.evaluate("sunset")) == [photo_id]
+
+        # 跳过了版本2，说明有本进程没有看到的变更
+        registry.apply(1, 3)
+        assert registry.peek(1) is None
+
+    async def test_search_expression(self, async_session: AsyncSession, tagged_photos, tmp_path, monkeypatch):
+        registry = SearchIndexRegistry(cache_dir=str(tmp_path))
+        monkeypatch.setattr(invalidation, "search_indexes", registry)
+        dao = PhotoDAO(async_session)
+
+        photos = await dao.search_expression(1, "beach AND NOT screenshot", registry=registry)
+        assert [p.filename for p in photos] == ["photo_1.jpg", "photo_0.jpg"]
+
+        photos = await dao.search_expression(1, "beach", skip=1, limit=1, registry=registry)
+        assert [p.filename for p in photos] == ["photo_1.jpg"]
+
+        # 未提交的写入对本会话可见，但不进入缓存的索引
+        new_photo = await dao.create(filename="new.jpg", filepath="/test/new.jpg", size=1, user_id=1)
+        new_id = new_photo.id
+        assert new_id in (await registry.get(async_session, 1)).photos
+        assert new_id not in registry.peek(1).photos
+
+        await async_session.commit()
+        assert new_id in registry.peek(1).photos
+        assert await registry.get(async_session, 1) is registry.peek(1)
+
+    async def test_photo_writes_update_loaded_index_after_commit(
+        self, async_session: AsyncSession, tagged_photos, tmp_path, monkeypatch
+    ):
+        registry = SearchIndexRegistry(cache_dir=str(tmp_path))
+        monkeypatch.setattr(invalidation, "search_indexes", registry)
+        ids = [p.id for p in tagged_photos]
+        dao = PhotoDAO(async_session)
+        index = await registry.get(async_session, 1)
+
+        new_photo = await dao.create(filename="new.jpg", filepath="/test/new.jpg", size=1, user_id=1)
+        new_id = new_photo.id
+        assert new_id not in index.photos
+        await async_session.commit()
+        assert new_id in index.photos
+
+        assert await dao.delete(ids[0])
+        await async_session.rollback()
+        assert ids[0] in index.photos
+
+        assert await dao.delete(ids[0])
+        await async_session.commit()
+        assert ids[0] not in index.photos
+        assert list(index.evaluate("beach")) == [ids[1], ids[2]]
+        assert await registry.get(async_session, 1) is index
+
+        # 恢复时标签和相册需要从数据库重新读取
+        assert await dao.restore(ids[0])
+        await async_session.commit()
+        assert registry.peek(1) is None
+        assert list((await registry.get(async_session, 1)).evaluate("beach")) == [ids[0], ids[1], ids[2]]
+
+    async def test_album_and_scene_writes_update_loaded_index(
+        self, async_session: AsyncSession, tagged_photos, tmp_path, monkeypatch
+    ):
+        registry = SearchIndexRegistry(cache_dir=str(tmp_path))
+        monkeypatch.setattr(invalidation, "search_indexes", registry)
+        ids = [p.id for p in tagged_photos]
+        album_id = (await async_session.execute(select(Album.id))).scalar_one()
+        index = await registry.get(async_session, 1)
+
+        await AlbumDAO(async_session).add_photos(album_id, [ids[3]])
+        await AlbumDAO(async_session).remove_photos(album_id, [ids[0]])
+        await PhotoMetadataDAO(async_session).update_ai_analysis(ids[3], scene_type="landscape")
+        await PhotoMetadataDAO(async_session).create(photo_id=ids[4], scene_type="portrait")
+        await async_session.commit()
+
+        assert registry.peek(1) is index
+        assert list(index.evaluate(f"album:{album_id}")) == [ids[1], ids[3]]
+        assert list(index.evaluate("scene:landscape")) == [ids[0], ids[1], ids[3]]
+        assert list(index.evaluate("scene:portrait")) == [ids[4]]
+
+        await AlbumDAO(async_session).delete(album_id)
+        await async_session.commit()
+        assert not index.evaluate(f"album:{album_id}")
+        assert await registry.get(async_session, 1) is index
+
+
+@pytest.fixture
+async def tagged_photos(async_session: AsyncSession) -> list[Photo]:
+    tags = {name: Tag(name=name) for name in ("beach", "2023", "screenshot")}
+    async_session.add_all(tags.values())
+    album = Album(name="Holiday", user_id=1)
+    async_session.add(album)
+    await async_session.flush()
+
+    layout = [
+        (["beach"], "landscape", True),
+        (["beach", "2023"], "landscape", True),
+        (["beach", "2023", "screenshot"], None, False),
+        ([], "portrait", False),
+        ([], None, False),
+    ]
+    photos = []
+    for i, (tag_names, scene, in_album) in enumerate(layout):
+        photo = Photo(filename=f"photo_{i}.jpg", filepath=f"/test/photo_{i}.jpg", size=100, user_id=1)
+        async_session.add(photo)
+        await async_session.flush()
+        for name in tag_names:
+            await async_session.execute(
+                photo_tags.insert().values(photo_id=photo.id, tag_id=tags[name].id, added_at=datetime.now(timezone.utc))
+            )
+        if scene:
+            async_session.add(PhotoMetadata(photo_id=photo.id, scene_type=scene))
+        if in_album:
+            await async_session.execute(photo_albums.insert().values(photo_id=photo.id, album_id=album.id))
+        photos.append(photo)
+
+    # 其他用户的照片不应出现在索引中
+    other = Photo(filename="other.jpg", filepath="/test/other.jpg", size=100, user_id=2)
+    async_session.add(other)
+    await async_session.flush()
+    await async_session.execute(photo_tags.insert().values(photo_id=other.id, tag_id=tags["beach"].id))
+
+    await async_session.commit()
+    return photos
@@ -0,0 +1,124 @@
+import os
+import random
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from photo_app.core.models.photo import Photo
+from photo_app.core.models.version import StoredChunk
+from photo_app.core.services.versions import PhotoVersionStore
+from photo_app.infrastructure.storage.chunkstore import ChunkStore
+from photo_app.infrastructure.storage.scanner import hash_file
+
+
+@pytest.mark.asyncio
+class TestPhotoVersionStore:
+    async def test_small_edit_writes_few_chunks(self, async_session: AsyncSession, versioned_photo, chunk_store):
+        photo, path, original = versioned_photo
+        store = PhotoVersionStore(async_session, chunk_store)
+
+        first = await store.save_version(photo.id, str(path))
+        assert first.version == 1
+        assert first.new_bytes == first.size == len(original)
+
+        # 模拟只修改了EXIF的重新保存
+        edited = original[:200] + b"new exif" + original[208:]
+        path.write_bytes(edited)
+        second = await store.save_version(photo.id, str(path))
+        assert second.version == 2
+        assert second.new_bytes < 70_000
+        await async_session.commit()
+
+        await async_session.refresh(photo)
+        assert photo.version == 2
+
+        restored = str(path) + ".v1"
+        assert await store.restore_version(photo.id, 1, restored) == len(original)
+        with open(restored, "rb") as f:
+            assert f.read() == original
+        assert b"".join([c async for c in store.iter_version(photo.id, 2)]) == edited
+
+        # 恢复到原图时校验和与修改时间随文件内容更新
+        modified = photo.updated_at
+        await store.restore_version(photo.id, 1, str(path))
+        await async_session.commit()
+        await async_session.refresh(photo)
+        assert photo.checksum == hash_file(str(path))
+        assert photo.updated_at > modified
+
+    async def test_reference_counted_gc(self, async_session: AsyncSession, versioned_photo, chunk_store):
+        photo, path, original = versioned_photo
+        store = PhotoVersionStore(async_session, chunk_store)
+        await store.save_version(photo.id, str(path))
+        path.write_bytes(original[:-1000] + os.urandom(1000))
+        await store.save_version(photo.id, str(path))
+        await async_session.commit()
+        total = len(list(chunk_store.iter_digests()))
+
+        assert await store.delete_version(photo.id, 1)
+        await async_session.commit()
+        # 宽限期内不回收
+        assert await store.collect_garbage() == 0
+
+        removed = await store.collect_garbage(grace_period=timedelta(seconds=-1))
+        assert removed == 1
+        assert len(list(chunk_store.iter_digests())) == total - 1
+        assert b"".join([c async for c in store.iter_version(photo.id, 2)]) == path.read_bytes()
+
+        await store.delete_all_versions(photo.id)
+        await async_session.commit()
+        await store.collect_garbage(grace_period=timedelta(seconds=-1))
+        assert list(chunk_store.iter_digests()) == []
+        assert (await async_session.execute(select(StoredChunk))).first() is None
+
+    async def test_released_chunk_collected_during_save(self, async_session: AsyncSession, versioned_photo, tmp_path):
+        photo, path, original = versioned_photo
+        chunk_store = RacingChunkStore(str(tmp_path / ".chunks"))
+        store = PhotoVersionStore(async_session, chunk_store)
+        await store.save_version(photo.id, str(path))
+        await store.delete_version(photo.id, 1)
+        await async_session.commit()
+
+        # 保存时跳过了已存在的（已释放的）块，随后垃圾回收删除了这些块的文件
+        chunk_store.collect_on_skip = True
+        result = await store.save_version(photo.id, str(path))
+        await async_session.commit()
+        assert result.new_bytes == len(original)
+        assert b"".join([c async for c in store.iter_version(photo.id, result.version)]) == original
+
+    async def test_sweep_orphan_chunks(self, async_session: AsyncSession, chunk_store):
+        chunk_store.put(b"orphan")
+        store = PhotoVersionStore(async_session, chunk_store)
+
+        assert await store.sweep_orphan_chunks() == 0
+        assert await store.sweep_orphan_chunks(grace_period=timedelta(seconds=-1)) == 1
+        assert list(chunk_store.iter_digests()) == []
+
+
+class RacingChunkStore(ChunkStore):
+    """跳过已存在的块之后立即删除其文件，模拟与垃圾回收的竞争"""
+    collect_on_skip = False
+
+    def put(self, data: bytes, digest=None) -> bool:
+        written = super().put(data, digest)
+        if not written and self.collect_on_skip:
+            self.delete(digest)
+        return written
+
+
+@pytest.fixture
+def chunk_store(tmp_path) -> ChunkStore:
+    return ChunkStore(str(tmp_path / ".chunks"))
+
+
+@pytest.fixture
+async def versioned_photo(async_session: AsyncSession, tmp_path):
+    data = random.Random(3).randbytes(400_000)
+    path = tmp_path / "edit.jpg"
+    path.write_bytes(data)
+    photo = Photo(filename="edit.jpg", filepath=str(path), size=len(data), user_id=1)
+    async_session.add(photo)
+    await async_session.commit()
+    return photo, path, data
@@ -0,0 +1,62 @@
+import random
+
+import pytest
+
+from photo_app.core.utils.bitmap import ARRAY_MAX_SIZE, RoaringBitmap
+
+
+class TestRoaringBitmap:
+    def test_add_discard_contains(self):
+        bitmap = RoaringBitmap()
+        bitmap.add(3)
+        bitmap.add(70000)
+        bitmap.add(3)
+
+        assert len(bitmap) == 2
+        assert 3 in bitmap and 70000 in bitmap
+        assert 4 not in bitmap
+
+        bitmap.discard(3)
+        bitmap.discard(12345)
+        assert list(bitmap) == [70000]
+
+    def test_dense_container_conversion(self):
+        values = range(0, (ARRAY_MAX_SIZE + 100) * 2, 2)
+        bitmap = RoaringBitmap(values)
+
+        assert len(bitmap) == len(values)
+        assert list(bitmap) == list(values)
+
+        for value in list(values)[:200]:
+            bitmap.discard(value)
+        assert len(bitmap) == len(values) - 200
+        assert list(bitmap) == list(values)[200:]
+
+    def test_set_operations_match_python_sets(self):
+        rng = random.Random(42)
+        a_values = {rng.randrange(0, 300000) for _ in range(20000)}
+        b_values = {rng.randrange(0, 300000) for _ in range(3000)}
+        a, b = RoaringBitmap(a_values), RoaringBitmap(b_values)
+
+        assert list(a & b) == sorted(a_values & b_values)
+        assert list(a | b) == sorted(a_values | b_values)
+        assert list(a - b) == sorted(a_values - b_values)
+        assert list(b - a) == sorted(b_values - a_values)
+        assert list(a ^ b) == sorted(a_values ^ b_values)
+
+    def test_page_descending(self):
+        bitmap = RoaringBitmap(range(1, 200001, 3))
+        expected = sorted(range(1, 200001, 3), reverse=True)
+
+        assert bitmap.page(0, 5) == expected[:5]
+        assert bitmap.page(30000, 10) == expected[30000:30010]
+        assert bitmap.page(0, 5, descending=False) == sorted(expected)[:5]
+        assert bitmap.page(len(expected), 10) == []
+
+    def test_serialization_roundtrip(self):
+        bitmap = RoaringBitmap(list(range(0, 10000)) + [1 << 20, (1 << 20) + 7])
+        restored = RoaringBitmap.from_bytes(bitmap.to_bytes())
+
+        assert restored == bitmap
+        with pytest.raises(ValueError):
+            RoaringBitmap.from_bytes(b"garbage")
@@ -0,0 +1,60 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from photo_app.core.utils import exif as exif_module
+from photo_app.core.utils.exif import (
+    CODEC_ZLIB,
+    ExifCodecError,
+    compress_exif,
+    decompress_exif,
+    extract_fields,
+)
+
+
+class TestExif:
+    def test_roundtrip(self):
+        exif = {"Make": "Canon", "MakerNote": "abc" * 5000, "名称": "照片"}
+        blob = compress_exif(exif)
+        assert len(blob) < len(json.dumps(exif)) // 10
+        assert json.loads(decompress_exif(blob)) == exif
+        assert decompress_exif(None) is None
+
+    def test_zlib_fallback(self, monkeypatch):
+        monkeypatch.setattr(exif_module, "zstandard", None)
+        blob = compress_exif({"Make": "Nikon"})
+        assert blob[0] == CODEC_ZLIB
+        assert decompress_exif(blob) == '{"Make":"Nikon"}'
+        # 非JSON的旧数据原样保存
+        assert decompress_exif(compress_exif('{"Make": "Nik')) == '{"Make": "Nik'
+        with pytest.raises(ExifCodecError):
+            decompress_exif(b"\x09abc")
+        with pytest.raises(ExifCodecError):
+            decompress_exif(b"\x02abc")
+
+    def test_extract_fields(self):
+        fields = extract_fields({
+            "Make": "Canon\x00",
+            "Model": "EOS R5",
+            "LensModel": "RF24-105mm F4 L IS USM",
+            "ISOSpeedRatings": [3200, 3200],
+            "FocalLength": [105, 1],
+            "FNumber": "28/10",
+            "DateTimeOriginal": "2023:07:14 18:22:05",
+        })
+        assert fields == {
+            "camera_make": "Canon",
+            "camera_model": "EOS R5",
+            "lens_model": "RF24-105mm F4 L IS USM",
+            "iso": 3200,
+            "focal_length": 105.0,
+            "aperture": 2.8,
+            "captured_at": datetime(2023, 7, 14, 18, 22, 5),
+        }
+
+    def test_extract_fields_tolerates_bad_values(self):
+        fields = extract_fields('{"make": "Canon", "ISO": "n/a", "FNumber": [0, 0], "DateTime": "0000:00:00"}')
+        assert fields["camera_make"] == "Canon"
+        assert fields["iso"] is None and fields["aperture"] is None and fields["captured_at"] is None
+        assert extract_fields("not json") == extract_fields(None)
@@ -0,0 +1,29 @@
+import os
+import random
+import tempfile
+
+import pytest
+
+from photo_app.core.utils.extsort import external_sort
+
+
+async def _aiter(items):
+    for item in items:
+        yield item
+
+
+@pytest.mark.asyncio
+class TestExternalSort:
+    async def test_in_memory(self):
+        result = await external_sort(_aiter([("b", 2), ("a", 1)]))
+        assert list(result) == [("a", 1), ("b", 2)]
+
+    async def test_spills_to_disk_and_cleans_up(self, tmp_path):
+        rng = random.Random(1)
+        items = [(f"path/{rng.randrange(10**6):07d}.jpg", i) for i in range(2500)]
+
+        result = await external_sort(_aiter(items), run_size=300, tmp_dir=str(tmp_path))
+        assert len(os.listdir(tmp_path)) == 9
+
+        assert list(result) == sorted(items)
+        assert os.listdir(tmp_path) == []
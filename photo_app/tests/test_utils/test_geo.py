@@ -0,0 +1,43 @@
+import pytest
+
+from photo_app.core.utils.geo import (
+    decode_geohash,
+    encode_geohash,
+    geohash_precision_for_zoom,
+    parse_gps,
+)
+
+
+class TestGeo:
+    def test_geohash_roundtrip(self):
+        geohash = encode_geohash(57.64911, 10.40744, 11)
+        assert geohash == "u4pruydqqvj"
+
+        south, west, north, east = decode_geohash(geohash)
+        assert south <= 57.64911 <= north
+        assert west <= 10.40744 <= east
+
+    def test_parse_gps_dms(self):
+        exif = {
+            "GPSInfo": {
+                "GPSLatitude": [[40, 1], [26, 1], [4608, 100]],
+                "GPSLatitudeRef": "N",
+                "GPSLongitude": [79, 58, "3600/100"],
+                "GPSLongitudeRef": "W",
+            }
+        }
+        latitude, longitude = parse_gps(exif)
+        assert latitude == pytest.approx(40.446133, abs=1e-5)
+        assert longitude == pytest.approx(-79.976667, abs=1e-5)
+
+    def test_parse_gps_json_and_invalid(self):
+        assert parse_gps('{"latitude": 31.2, "longitude": 121.5}') == (31.2, 121.5)
+        assert parse_gps('{"make": "Canon"}') is None
+        assert parse_gps("not json") is None
+        assert parse_gps({"latitude": 0, "longitude": 0}) is None
+        assert parse_gps({"latitude": 120, "longitude": 0}) is None
+
+    def test_precision_for_zoom(self):
+        assert geohash_precision_for_zoom(0) == 1
+        assert geohash_precision_for_zoom(10) == 5
+        assert geohash_precision_for_zoom(20) == 8
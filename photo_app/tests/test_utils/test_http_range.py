@@ -0,0 +1,56 @@
+import pytest
+
+from photo_app.core.utils.http_range import (
+    RangeNotSatisfiable,
+    etag_matches,
+    http_date,
+    if_range_allows,
+    make_etag,
+    parse_http_date,
+    parse_range_header,
+)
+
+
+class TestHttpRange:
+    def test_parse_single_and_suffix(self):
+        assert parse_range_header("bytes=0-99", 1000) == [(0, 99)]
+        assert parse_range_header("bytes=900-", 1000) == [(900, 999)]
+        assert parse_range_header("bytes=-100", 1000) == [(900, 999)]
+        assert parse_range_header("bytes=-5000", 1000) == [(0, 999)]
+        assert parse_range_header("bytes=990-2000", 1000) == [(990, 999)]
+
+    def test_parse_merges_overlapping(self):
+        assert parse_range_header("bytes=500-600, 0-10, 5-20, 21-30", 1000) == [(0, 30), (500, 600)]
+
+    def test_invalid_header_is_ignored(self):
+        assert parse_range_header("items=0-1", 1000) is None
+        assert parse_range_header("bytes=abc", 1000) is None
+        assert parse_range_header("bytes=10-5", 1000) is None
+        many = ",".join(f"{i * 10}-{i * 10 + 1}" for i in range(20))
+        assert parse_range_header(f"bytes={many}", 1000) is None
+
+    def test_unsatisfiable(self):
+        with pytest.raises(RangeNotSatisfiable):
+            parse_range_header("bytes=1000-", 1000)
+        with pytest.raises(RangeNotSatisfiable):
+            parse_range_header("bytes=-0", 1000)
+
+    def test_etags(self):
+        strong = make_etag("ab" * 32, 3, 10, 20)
+        assert strong == f'"{"ab" * 16}-3"'
+        weak = make_etag(None, 1, 10, 20)
+        assert weak.startswith("W/")
+
+        assert etag_matches(f'"other", {strong}', strong)
+        assert etag_matches("*", strong)
+        assert etag_matches(weak[2:], weak)
+        assert not etag_matches('"other"', strong)
+
+        assert if_range_allows(strong, strong, 0)
+        assert not if_range_allows(weak, weak, 0)
+        assert if_range_allows(http_date(1700000000), strong, 1700000000.5)
+        assert not if_range_allows(http_date(1700000000), strong, 1700000100)
+
+    def test_http_date_roundtrip(self):
+        assert parse_http_date(http_date(1700000000)) == 1700000000
+        assert parse_http_date("not a date") is None
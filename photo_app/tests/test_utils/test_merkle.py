@@ -0,0 +1,55 @@
+import pytest
+
+from photo_app.core.utils.merkle import (
+    FANOUT,
+    InMemoryNodeSource,
+    MerkleTree,
+    bucket_of,
+    find_divergent_buckets,
+)
+
+
+def _leaves(n: int):
+    return {i: f"{i:064x}" for i in range(1, n + 1)}
+
+
+class TestMerkleTree:
+    def test_root_is_order_independent_and_incremental(self):
+        leaves = _leaves(500)
+        forward = MerkleTree.from_leaves(leaves.items(), depth=2)
+        backward = MerkleTree.from_leaves(reversed(list(leaves.items())), depth=2)
+        assert forward.root == backward.root
+        assert len(forward) == 500
+
+        forward.update(7, leaves[7], "f" * 64)
+        assert forward.root != backward.root
+        forward.update(7, "f" * 64, leaves[7])
+        assert forward.root == backward.root
+
+    def test_bucket_assignment(self):
+        assert all(0 <= bucket_of(i, 2) < FANOUT ** 2 for i in range(1000))
+        assert len({bucket_of(i, 2) for i in range(1000)}) > 200
+
+
+@pytest.mark.asyncio
+class TestDivergence:
+    async def test_identical_trees_compare_only_root(self):
+        leaves = _leaves(1000)
+        remote = InMemoryNodeSource(dict(leaves))
+        local = MerkleTree.from_leaves(leaves.items())
+
+        assert await find_divergent_buckets(local, remote) == []
+        assert remote.requested_nodes == 1
+
+    async def test_drills_into_divergent_subtrees_only(self):
+        leaves = _leaves(1000)
+        remote_leaves = dict(leaves)
+        remote_leaves[42] = "0" * 64
+        del remote_leaves[900]
+        remote = InMemoryNodeSource(remote_leaves)
+        local = MerkleTree.from_leaves(leaves.items())
+
+        buckets = await find_divergent_buckets(local, remote)
+        assert sorted(buckets) == sorted({bucket_of(42), bucket_of(900)})
+        # 每层最多展开两个节点的子节点
+        assert remote.requested_nodes <= 1 + 3 * 2 * FANOUT
@@ -0,0 +1,76 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from photo_app.core.utils.singleflight import SingleFlight, flight_key
+
+
+def test_flight_key_normalization():
+    assert flight_key("search", b=1, a="x") == flight_key("search", a="x", b=1)
+    assert flight_key("search", tags=frozenset({"b", "a"})) == flight_key("search", tags={"a", "b"})
+    assert flight_key("search", a=None) == flight_key("search")
+    assert flight_key("search", a=1) != flight_key("search", a="1")
+    assert "2020-01-01T00:00:00" in flight_key("search", since=datetime(2020, 1, 1))
+
+
+@pytest.mark.asyncio
+class TestSingleFlight:
+    async def test_concurrent_calls_share_one_execution(self):
+        flights = SingleFlight()
+        calls = []
+        release = asyncio.Event()
+
+        async def load():
+            calls.append(1)
+            await release.wait()
+            return ["result"]
+
+        tasks = [asyncio.create_task(flights.do("key", load)) for _ in range(50)]
+        await asyncio.sleep(0)
+        assert flights.in_flight("key")
+        release.set()
+        results = await asyncio.gather(*tasks)
+        assert len(calls) == 1
+        assert all(result is results[0] for result in results)
+        assert not flights.in_flight("key")
+
+        # 调用完成后不缓存结果
+        await flights.do("key", load)
+        assert len(calls) == 2
+
+    async def test_errors_are_shared(self):
+        flights = SingleFlight()
+        release = asyncio.Event()
+
+        async def fail():
+            await release.wait()
+            raise ValueError("boom")
+
+        tasks = [asyncio.create_task(flights.do("key", fail)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        assert all(isinstance(result, ValueError) for result in results)
+
+    async def test_leader_cancelled(self):
+        flights = SingleFlight()
+        calls = []
+        release = asyncio.Event()
+
+        async def load():
+            calls.append(1)
+            await release.wait()
+            return len(calls)
+
+        leader = asyncio.create_task(flights.do("key", load))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flights.do("key", load))
+        await asyncio.sleep(0)
+        leader.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        # 等待方重新执行，而不是收到取消
+        assert await follower == 2
+        with pytest.raises(asyncio.CancelledError):
+            await leader
@@ -0,0 +1,60 @@
+import io
+import zipfile
+from datetime import datetime
+
+import pytest
+
+from photo_app.core.utils import zipstream
+from photo_app.core.utils.zipstream import ZipStream, ZipStreamError, iter_zip, unique_name
+
+
+def _build(files, chunk_size=7):
+    entries = [(name, len(data), datetime(2024, 5, 6, 7, 8, 10), io.BytesIO(data)) for name, data in files]
+    return b"".join(iter_zip(entries, chunk_size=chunk_size))
+
+
+class TestZipStream:
+    def test_roundtrip(self):
+        files = [("a.jpg", b"alpha" * 100), ("照片/b.jpg", b"beta" * 3), ("empty.txt", b"")]
+        archive = zipfile.ZipFile(io.BytesIO(_build(files)))
+        assert archive.testzip() is None
+        assert [info.filename for info in archive.infolist()] == [name for name, _ in files]
+        for name, data in files:
+            assert archive.read(name) == data
+            info = archive.getinfo(name)
+            assert info.compress_type == zipfile.ZIP_STORED
+            assert info.date_time == (2024, 5, 6, 7, 8, 10)
+
+    def test_zip64(self, monkeypatch):
+        # 降低阈值，用小文件覆盖ZIP64的大小、偏移量和条目数字段
+        monkeypatch.setattr(zipstream, "ZIP64_LIMIT", 50)
+        monkeypatch.setattr(zipstream, "ZIP_FILECOUNT_LIMIT", 2)
+        files = [("small.jpg", b"x" * 10), ("big.jpg", b"y" * 80), ("late.jpg", b"z" * 5)]
+        data = _build(files)
+        assert b"PK\x06\x06" in data and b"PK\x06\x07" in data
+
+        archive = zipfile.ZipFile(io.BytesIO(data))
+        assert archive.testzip() is None
+        for name, content in files:
+            assert archive.read(name) == content
+        assert archive.getinfo("big.jpg").file_size == 80
+
+    def test_declared_size_is_enforced(self):
+        stream = ZipStream()
+        stream.begin("a.jpg", 4)
+        with pytest.raises(ZipStreamError):
+            stream.update(b"12345")
+
+        stream = ZipStream()
+        stream.begin("a.jpg", 4)
+        stream.update(b"12")
+        with pytest.raises(ZipStreamError):
+            stream.end()
+
+    def test_unique_name(self):
+        used = set()
+        assert unique_name("a.jpg", used) == "a.jpg"
+        assert unique_name("A.jpg", used) == "A (2).jpg"
+        assert unique_name("a.jpg", used) == "a (3).jpg"
+        assert unique_name("README", used) == "README"
+        assert unique_name("README", used) == "README (2)"